@@ -16,6 +16,7 @@ sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from app.core.config import settings
 from app.models.user import Base
+from app.models import integration, pose, stats, swing  # noqa: F401  (register tables)
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,40 @@
+"""User subscription tier
+
+Tier the rate limits (RATE_LIMIT_FREE/PRO/ELITE) and AI budget quotas
+(AI_*_DAILY_QUOTA) are applied by. Existing users are on the free tier.
+
+Revision ID: 005_subscription_tier
+Revises: 004_swing_analyses
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '005_subscription_tier'
+down_revision: Union[str, None] = '004_swing_analyses'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add users.subscription_tier."""
+    op.add_column(
+        'users',
+        sa.Column('subscription_tier', sa.String(length=20), nullable=False, server_default='free'),
+    )
+    op.create_check_constraint(
+        'ck_users_subscription_tier',
+        'users',
+        "subscription_tier IN ('free', 'pro', 'elite')",
+    )
+
+
+def downgrade() -> None:
+    """Drop users.subscription_tier."""
+    op.drop_constraint('ck_users_subscription_tier', 'users', type_='check')
+    op.drop_column('users', 'subscription_tier')
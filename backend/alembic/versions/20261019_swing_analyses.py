@@ -0,0 +1,46 @@
+"""Swing analyses
+
+Completed AI coaching analyses, previously only kept in Redis for
+CACHE_TTL_LONG.
+
+Revision ID: 004_swing_analyses
+Revises: 003_timescale
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004_swing_analyses'
+down_revision: Union[str, None] = '003_timescale'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create swing_analyses table."""
+    op.create_table(
+        'swing_analyses',
+        sa.Column('swing_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('analysis', sa.JSON(), nullable=False),
+        sa.Column(
+            'created_at',
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('swing_id')
+    )
+    op.create_index('ix_swing_analyses_user_id', 'swing_analyses', ['user_id'])
+
+
+def downgrade() -> None:
+    """Drop swing_analyses table."""
+    op.drop_index('ix_swing_analyses_user_id', table_name='swing_analyses')
+    op.drop_table('swing_analyses')
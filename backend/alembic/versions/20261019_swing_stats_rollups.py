@@ -0,0 +1,65 @@
+"""Swing statistics rollups
+
+Revision ID: 002_swing_stats
+Revises: 001_initial
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '002_swing_stats'
+down_revision: Union[str, None] = '001_initial'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _rollup_columns() -> list:
+    return [
+        sa.Column('swings_analyzed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('scored_swings', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('score_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('issue_counts', sa.JSON(), nullable=False, server_default=sa.text("'{}'::json")),
+        sa.Column('metric_sums', sa.JSON(), nullable=False, server_default=sa.text("'{}'::json")),
+        sa.Column('metric_counts', sa.JSON(), nullable=False, server_default=sa.text("'{}'::json")),
+        sa.Column(
+            'updated_at',
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text('NOW()'),
+        ),
+    ]
+
+
+def upgrade() -> None:
+    """Create swing_stats_daily and swing_stats_totals tables."""
+
+    # Per-user, per-day rollup
+    op.create_table(
+        'swing_stats_daily',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        *_rollup_columns(),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+
+    # Per-user all-time rollup
+    op.create_table(
+        'swing_stats_totals',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('practice_days', sa.Integer(), nullable=False, server_default='0'),
+        *_rollup_columns(),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    """Drop swing_stats_totals and swing_stats_daily tables."""
+    op.drop_table('swing_stats_totals')
+    op.drop_table('swing_stats_daily')
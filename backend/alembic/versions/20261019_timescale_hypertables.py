@@ -0,0 +1,179 @@
+"""Swing time-series hypertables
+
+Create swings, pose_keypoints and integration_shots. With TimescaleDB they
+become hypertables partitioned on recorded_at, with chunk intervals sized
+for each table's ingest rate, native compression of older chunks and
+covering indexes for per-user time-range queries. On PostgreSQL without
+TimescaleDB they are created as plain tables with the same indexes. Like
+the revisions before it, this migration targets PostgreSQL only (tests
+create their SQLite schema from the models).
+
+Revision ID: 003_timescale
+Revises: 002_swing_stats
+Create Date: 2026-10-19
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003_timescale'
+down_revision: Union[str, None] = '002_swing_stats'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+# Chunk interval and compression age per hypertable. A chunk's data and
+# indexes should fit in memory while it is being written: pose_keypoints
+# takes one row per video frame (60-240 per second of swing), shots and
+# swings a few rows per user per practice session.
+HYPERTABLES = {
+    'pose_keypoints': {
+        'chunk_interval': '1 day',
+        'compress_after': '7 days',
+        'order_by': 'recorded_at DESC, frame_number',
+    },
+    'integration_shots': {
+        'chunk_interval': '7 days',
+        'compress_after': '30 days',
+        'order_by': 'recorded_at DESC, source',
+    },
+    'swings': {
+        'chunk_interval': '30 days',
+        # Swings are updated while their analysis runs
+        'compress_after': '90 days',
+        'order_by': 'recorded_at DESC, id',
+    },
+}
+
+
+def _timescaledb_available() -> bool:
+    """Whether the TimescaleDB extension is (or can be) installed."""
+    if context.is_offline_mode():
+        # SQL scripts are generated for the documented TimescaleDB deployment
+        return True
+
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return False
+    available = bind.execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'timescaledb'")
+    ).scalar()
+    if not available:
+        return False
+    try:
+        # Savepoint, so a missing privilege does not abort the migration
+        with bind.begin_nested():
+            bind.execute(sa.text('CREATE EXTENSION IF NOT EXISTS timescaledb'))
+    except sa.exc.DBAPIError as exc:
+        logger.warning(f'Cannot enable TimescaleDB: {exc.orig}')
+        return False
+    return True
+
+
+def _create_hypertable(table: str, chunk_interval: str, compress_after: str, order_by: str) -> None:
+    # The primary key and indexes created above replace the default index
+    op.execute(
+        f"SELECT create_hypertable('{table}', 'recorded_at', "
+        f"chunk_time_interval => INTERVAL '{chunk_interval}', "
+        f"create_default_indexes => FALSE)"
+    )
+    # Compressed per user, so per-user range scans decompress only their
+    # rows; unique key columns must be segment or order columns
+    op.execute(
+        f"ALTER TABLE {table} SET ("
+        f"timescaledb.compress, "
+        f"timescaledb.compress_segmentby = 'user_id', "
+        f"timescaledb.compress_orderby = '{order_by}')"
+    )
+    op.execute(f"SELECT add_compression_policy('{table}', INTERVAL '{compress_after}')")
+
+
+def upgrade() -> None:
+    """Create swings, pose_keypoints and integration_shots (hypertables with TimescaleDB)."""
+
+    # Recorded swings
+    op.create_table(
+        'swings',
+        sa.Column('id', sa.Integer(), sa.Identity(), nullable=False),
+        sa.Column(
+            'recorded_at',
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text('NOW()'),
+        ),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('club_type', sa.String(length=50), nullable=True),
+        sa.Column('intended_shape', sa.String(length=20), nullable=True),
+        sa.Column('video_url', sa.Text(), nullable=True),
+        sa.Column('thumbnail_url', sa.Text(), nullable=True),
+        sa.Column('duration_ms', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('metadata', sa.JSON(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id', 'recorded_at')
+    )
+    op.create_index(
+        'ix_swings_user_recorded_at',
+        'swings',
+        ['user_id', 'recorded_at'],
+        postgresql_include=['status', 'club_type'],
+    )
+
+    # Per-frame pose landmarks; the primary key serves per-user time ranges
+    op.create_table(
+        'pose_keypoints',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('recorded_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('frame_number', sa.Integer(), nullable=False),
+        sa.Column('swing_id', sa.Integer(), nullable=True),
+        sa.Column('session_id', sa.String(length=64), nullable=True),
+        sa.Column('timestamp_ms', sa.Integer(), nullable=False),
+        sa.Column('keypoints', sa.JSON(), nullable=False),
+        sa.Column('metrics', sa.JSON(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'recorded_at', 'frame_number')
+    )
+    op.create_index(
+        'ix_pose_keypoints_swing_frame', 'pose_keypoints', ['swing_id', 'frame_number']
+    )
+
+    # Launch monitor and simulator shots
+    op.create_table(
+        'integration_shots',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('source', sa.String(length=50), nullable=False),
+        sa.Column('recorded_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('swing_id', sa.Integer(), nullable=True),
+        sa.Column('shot_data', sa.JSON(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'source', 'recorded_at')
+    )
+    op.create_index(
+        'ix_integration_shots_user_recorded_at',
+        'integration_shots',
+        ['user_id', 'recorded_at'],
+        postgresql_include=['source', 'swing_id'],
+    )
+
+    if not _timescaledb_available():
+        logger.warning('TimescaleDB not available, swing time-series tables are plain tables')
+        return
+
+    for table, options in HYPERTABLES.items():
+        _create_hypertable(table, **options)
+
+
+def downgrade() -> None:
+    """Drop integration_shots, pose_keypoints and swings (with their policies)."""
+    op.drop_index('ix_integration_shots_user_recorded_at', table_name='integration_shots')
+    op.drop_table('integration_shots')
+    op.drop_index('ix_pose_keypoints_swing_frame', table_name='pose_keypoints')
+    op.drop_table('pose_keypoints')
+    op.drop_index('ix_swings_user_recorded_at', table_name='swings')
+    op.drop_table('swings')
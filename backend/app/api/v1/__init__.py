@@ -3,7 +3,7 @@ API v1 routes for GolfCoach Pro.
 """
 
 from fastapi import APIRouter
-from app.api.v1 import health, auth, users, swings
+from app.api.v1 import health, auth, users, swings, realtime
 
 
 api_router = APIRouter()
@@ -13,5 +13,6 @@ api_router.include_router(health.router)
 api_router.include_router(auth.router)
 api_router.include_router(users.router)
 api_router.include_router(swings.router)
+api_router.include_router(realtime.router)
 
 __all__ = ["api_router"]
@@ -5,12 +5,10 @@ Handles user registration, login, token refresh, and logout.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.core.security import verify_token, generate_tokens
-from app.core.dependencies import get_redis
-from app.core.config import settings
 from app.schemas.user import (
     UserCreate,
     UserLogin,
@@ -19,6 +17,7 @@ from app.schemas.user import (
     TokenResponse,
     LogoutRequest,
 )
+from app.services.token_revocation import token_revocations
 from app.services.user_service import UserService
 
 
@@ -26,7 +25,7 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
 @router.post("/register", response_model=AuthResponse, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)) -> AuthResponse:
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)) -> AuthResponse:
     """
     Register a new user account.
 
@@ -41,7 +40,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)) -> Auth
         HTTPException 400: Invalid input
         HTTPException 409: Email already registered
     """
-    result = UserService.register_user(db, user_data)
+    result = await UserService.register_user(db, user_data)
 
     return AuthResponse(
         user=result["user"],
@@ -53,7 +52,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)) -> Auth
 
 
 @router.post("/login", response_model=AuthResponse)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)) -> AuthResponse:
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)) -> AuthResponse:
     """
     Authenticate user and receive access token.
 
@@ -67,7 +66,7 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)) -> AuthRe
     Raises:
         HTTPException 401: Invalid credentials
     """
-    result = UserService.login_user(db, credentials.email, credentials.password)
+    result = await UserService.login_user(db, credentials.email, credentials.password)
 
     return AuthResponse(
         user=result["user"],
@@ -79,7 +78,9 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)) -> AuthRe
 
 
 @router.post("/refresh", response_model=TokenResponse)
-async def refresh_token(token_data: TokenRefresh, db: Session = Depends(get_db)) -> TokenResponse:
+async def refresh_token(
+    token_data: TokenRefresh, db: AsyncSession = Depends(get_db)
+) -> TokenResponse:
     """
     Get a new access token using refresh token.
 
@@ -98,16 +99,14 @@ async def refresh_token(token_data: TokenRefresh, db: Session = Depends(get_db))
         payload = verify_token(token_data.refresh_token, token_type="refresh")
         user_id = int(payload.get("sub"))
 
-        redis_client = get_redis()
-        blacklist_key = f"blacklist:{token_data.refresh_token}"
-        if redis_client.get(blacklist_key):
+        if await token_revocations.is_token_revoked(token_data.refresh_token, payload):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Refresh token has been revoked",
             )
 
         # Verify user exists
-        user = UserService.get_user_by_id(db, user_id)
+        user = await UserService.get_user_by_id(db, user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -136,11 +135,8 @@ async def logout(logout_data: LogoutRequest) -> None:
     """
     Invalidate refresh token (logout user).
 
-    In a production system, you would:
-    1. Add refresh token to a blacklist in Redis
-    2. Optionally revoke all sessions for the user
-
-    For now, this is a placeholder that accepts the request.
+    The token is revoked on every node until it expires. Tokens that are
+    invalid or expired cannot be used anyway and are not stored.
 
     Args:
         logout_data: Logout request with refresh token
@@ -148,10 +144,8 @@ async def logout(logout_data: LogoutRequest) -> None:
     Returns:
         No content (204)
     """
-    redis_client = get_redis()
-    ttl_seconds = settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
-    redis_client.setex(
-        f"blacklist:{logout_data.refresh_token}",
-        ttl_seconds,
-        "1",
-    )
+    try:
+        payload = verify_token(logout_data.refresh_token, token_type="refresh")
+    except HTTPException:
+        return
+    await token_revocations.revoke_token(logout_data.refresh_token, payload)
@@ -5,12 +5,13 @@ Provides basic health check and database/redis connectivity checks.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-import redis
+import redis.asyncio as aioredis
 
 from app.core.database import get_db
 from app.core.dependencies import get_redis
+from app.core.replicas import replica_router
 from app.core.config import settings
 
 
@@ -34,7 +35,7 @@ async def health_check() -> dict:
 
 
 @router.get("/db")
-async def health_check_database(db: Session = Depends(get_db)) -> dict:
+async def health_check_database(db: AsyncSession = Depends(get_db)) -> dict:
     """
     Database connectivity health check.
 
@@ -49,7 +50,7 @@ async def health_check_database(db: Session = Depends(get_db)) -> dict:
     """
     try:
         # Execute a simple query
-        result = db.execute(text("SELECT 1"))
+        result = await db.execute(text("SELECT 1"))
         result.fetchone()
 
         return {
@@ -65,10 +66,13 @@ async def health_check_database(db: Session = Depends(get_db)) -> dict:
 
 
 @router.get("/redis")
-async def health_check_redis() -> dict:
+async def health_check_redis(redis_client: aioredis.Redis = Depends(get_redis)) -> dict:
     """
     Redis connectivity health check.
 
+    Args:
+        redis_client: Shared Redis client
+
     Returns:
         Redis status
 
@@ -76,9 +80,8 @@ async def health_check_redis() -> dict:
         HTTPException: If Redis is not accessible
     """
     try:
-        redis_client = get_redis()
         # Ping Redis
-        redis_client.ping()
+        await redis_client.ping()
 
         return {
             "status": "healthy",
@@ -93,12 +96,15 @@ async def health_check_redis() -> dict:
 
 
 @router.get("/full")
-async def health_check_full(db: Session = Depends(get_db)) -> dict:
+async def health_check_full(
+    db: AsyncSession = Depends(get_db), redis_client: aioredis.Redis = Depends(get_redis)
+) -> dict:
     """
     Full health check including all dependencies.
 
     Args:
         db: Database session
+        redis_client: Shared Redis client
 
     Returns:
         Complete status information
@@ -113,7 +119,7 @@ async def health_check_full(db: Session = Depends(get_db)) -> dict:
 
     # Check database
     try:
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         checks["checks"]["database"] = "connected"
     except Exception as e:
         checks["status"] = "unhealthy"
@@ -121,11 +127,18 @@ async def health_check_full(db: Session = Depends(get_db)) -> dict:
 
     # Check Redis
     try:
-        redis_client = get_redis()
-        redis_client.ping()
+        await redis_client.ping()
         checks["checks"]["redis"] = "connected"
     except Exception as e:
         checks["status"] = "unhealthy"
         checks["checks"]["redis"] = f"failed: {str(e)}"
 
+    # Report read replica lag (reads fall back to the primary, so a lagging
+    # or unreachable replica does not make the service unhealthy)
+    if replica_router.enabled:
+        checks["checks"]["replicas"] = {
+            name: f"lag {lag:.1f}s" if lag is not None else "unavailable"
+            for name, lag in replica_router.status().items()
+        }
+
     return checks
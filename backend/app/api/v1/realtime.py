@@ -0,0 +1,53 @@
+"""
+Real-time analysis endpoints for GolfCoach Pro API.
+
+Exposes debugging data for real-time sessions running on this node.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.core.config import settings
+from app.core.dependencies import get_current_active_user
+from app.services.realtime_instrumentation import get_session_trace
+from app.services.principal_cache import Principal
+
+
+router = APIRouter(prefix="/realtime", tags=["Real-Time"])
+
+
+@router.get("/sessions/{session_id}/trace")
+async def get_realtime_session_trace(
+    session_id: str,
+    current_user: Principal = Depends(get_current_active_user),
+) -> dict:
+    """
+    Retrieve per-stage latency trace of a real-time session (debug only).
+
+    Sessions are pinned to one worker, so the trace is only available on the
+    node running the session.
+
+    Args:
+        session_id: Real-time session ID
+        current_user: Current authenticated user
+
+    Returns:
+        Recent per-frame stage timings in milliseconds
+
+    Raises:
+        HTTPException 403: User can only access their own sessions
+        HTTPException 404: Debug mode is off or session not running on this node
+    """
+    trace = get_session_trace(session_id) if settings.DEBUG else None
+    if trace is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session trace not found",
+        )
+
+    if trace.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only access your own sessions",
+        )
+
+    return trace.to_dict()
@@ -4,16 +4,28 @@ Swing upload and retrieval endpoints.
 
 from __future__ import annotations
 
+import json
 from itertools import count
 from pathlib import Path
+from typing import AsyncIterator, Optional
 from uuid import uuid4
 
-from fastapi import APIRouter, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, Header, HTTPException, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.dependencies import get_current_active_user, get_read_db
+from app.core.response_cache import CachedRoute, cache_response
+from app.schemas.swing import SwingAnalysisRequest
+from app.services.ai_coach import ai_coach
+from app.services.analysis_stream import analysis_streams, format_sse
+from app.services.principal_cache import Principal
+from app.services.stats_service import user_stats
 from app.services.storage_service import storage_service
 
 
-router = APIRouter(prefix="/swings", tags=["Swings"])
+router = APIRouter(prefix="/swings", tags=["Swings"], route_class=CachedRoute)
 
 _swing_id_counter = count(1)
 _swing_store: dict[int, dict[str, str]] = {}
@@ -77,7 +89,7 @@ async def get_swing_video(swing_id: int, expiry_seconds: int = 3600) -> dict:
         )
 
     try:
-        video_url = storage_service.generate_signed_url(
+        video_url = await storage_service.get_signed_url(
             swing["object_key"], expiry_seconds
         )
     except Exception as exc:
@@ -91,3 +103,199 @@ async def get_swing_video(swing_id: int, expiry_seconds: int = 3600) -> dict:
         "video_url": video_url,
         "object_key": swing["object_key"],
     }
+
+
+def _get_swing(swing_id: int) -> dict[str, str]:
+    swing = _swing_store.get(swing_id)
+    if not swing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Swing not found",
+        )
+    return swing
+
+
+async def _user_context(db: AsyncSession, user: Principal, request: SwingAnalysisRequest) -> dict:
+    profile = user.profile
+    context = {
+        "user_id": user.id,
+        "tier": user.subscription_tier or "free",
+        "name": user.full_name or "Golfer",
+        "handicap": float(user.handicap) if user.handicap is not None else None,
+        "club": request.club or "Unknown",
+        "intended_shape": request.intended_shape or "Straight",
+        "conditions": request.conditions or "Range practice",
+    }
+    if profile:
+        context["primary_miss"] = profile.primary_miss or "Unknown"
+        context["current_goal"] = ", ".join(profile.goals or []) or "Improve overall game"
+        context["limitations"] = ", ".join(profile.physical_limitations or []) or "None noted"
+    # Lets the prompt compare the swing with the golfer's usual one
+    context["baselines"] = await user_stats.baselines(db, user.id)
+    context["recent_swings"] = await analysis_streams.recent_results(db, user.id)
+    return context
+
+
+async def _analysis_events(swing_id: int, cursor: Optional[str]) -> AsyncIterator[str]:
+    async for event_id, event, data in analysis_streams.events(str(swing_id), cursor):
+        yield format_sse(event_id, event, data)
+
+
+async def _analysis_response(
+    swing_id: int, user: Principal, cursor: Optional[str]
+) -> StreamingResponse:
+    stored = await analysis_streams.get_result(str(swing_id))
+    if stored is not None:
+        if stored["user_id"] != user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You can only access your own analyses",
+            )
+
+        async def events() -> AsyncIterator[str]:
+            yield format_sse("result", "result", json.dumps(stored["analysis"]))
+
+        body = events()
+    else:
+        body = _analysis_events(swing_id, cursor)
+
+    return StreamingResponse(
+        body,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/{swing_id}/analysis/stream")
+async def stream_swing_analysis(
+    swing_id: int,
+    request: SwingAnalysisRequest,
+    current_user: Principal = Depends(get_current_active_user),
+    last_event_id: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+) -> StreamingResponse:
+    """
+    Analyze a swing, streaming coaching feedback as Server-Sent Events.
+
+    Emits "delta" events with model output as it is generated, then a
+    "result" event with the structured analysis (or an "error" event). When
+    the daily AI budget is exhausted the analysis may instead be queued for
+    batch processing, announced by a "deferred" event with the job ID; its
+    result becomes the swing's analysis and is appended to the stream as a
+    "result" event (or an "error" event if the job fails), which the resume
+    endpoint waits for when called with the ID of the "deferred" event;
+    repeating the request meanwhile returns the same job. Generation runs
+    independently of the connection; repeating the request or calling the
+    resume endpoint with the last received event ID continues the same
+    analysis.
+
+    Args:
+        swing_id: ID of the swing
+        request: Pose data and detected faults of the swing
+        current_user: Current authenticated user
+        last_event_id: ID of the last event received before a disconnect
+        db: Database session (baselines and recent analyses of the user)
+
+    Returns:
+        text/event-stream response
+
+    Raises:
+        HTTPException 403: Analysis belongs to another user
+        HTTPException 404: Swing not found
+    """
+    _get_swing(swing_id)
+
+    owner = await analysis_streams.get_owner(str(swing_id))
+    if owner is not None and owner != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only access your own analyses",
+        )
+
+    if owner is None and await analysis_streams.get_result(str(swing_id)) is None:
+        events = ai_coach.stream_swing_analysis(
+            [],
+            [frame.model_dump() for frame in request.pose_data],
+            await _user_context(db, current_user, request),
+            request.faults,
+            swing_id=swing_id,
+        )
+        await analysis_streams.start(str(swing_id), current_user.id, events)
+
+    return await _analysis_response(swing_id, current_user, last_event_id)
+
+
+@router.get("/{swing_id}/analysis/stream")
+async def resume_swing_analysis_stream(
+    swing_id: int,
+    cursor: Optional[str] = None,
+    current_user: Principal = Depends(get_current_active_user),
+    last_event_id: Optional[str] = Header(None),
+) -> StreamingResponse:
+    """
+    Resume a streaming swing analysis after a disconnect.
+
+    Resuming from a "deferred" event waits for the result of the batch job.
+
+    Args:
+        swing_id: ID of the swing
+        cursor: ID of the last event received (alternative to Last-Event-ID)
+        current_user: Current authenticated user
+        last_event_id: ID of the last event received (sent by EventSource)
+
+    Returns:
+        text/event-stream response with the events after the cursor
+
+    Raises:
+        HTTPException 403: Analysis belongs to another user
+        HTTPException 404: No analysis has been started for the swing
+    """
+    owner = await analysis_streams.get_owner(str(swing_id))
+    if owner is None and await analysis_streams.get_result(str(swing_id)) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Analysis not found",
+        )
+    if owner is not None and owner != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only access your own analyses",
+        )
+
+    return await _analysis_response(swing_id, current_user, cursor or last_event_id)
+
+
+@router.get("/{swing_id}/analysis")
+@cache_response(settings.CACHE_TTL_LONG)
+async def get_swing_analysis(
+    swing_id: int,
+    current_user: Principal = Depends(get_current_active_user),
+) -> dict:
+    """
+    Get the completed AI coaching analysis of a swing.
+
+    A completed analysis does not change, so it is cached with an ETag.
+
+    Args:
+        swing_id: ID of the swing
+        current_user: Current authenticated user
+
+    Returns:
+        Structured analysis
+
+    Raises:
+        HTTPException 403: Analysis belongs to another user
+        HTTPException 404: Analysis not found or still in progress
+    """
+    stored = await analysis_streams.get_result(str(swing_id))
+    if stored is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Analysis not found",
+        )
+    if stored["user_id"] != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only access your own analyses",
+        )
+    return stored["analysis"]
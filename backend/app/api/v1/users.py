@@ -5,25 +5,31 @@ Handles user profile retrieval and updates.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.database import get_db
-from app.core.dependencies import get_current_active_user
-from app.models.user import User
+from app.core.dependencies import get_current_active_user, get_read_db
+from app.core.response_cache import CachedRoute, cache_response
 from app.schemas.user import UserResponse, UserUpdate, UserStats
+from app.services.principal_cache import Principal
+from app.services.stats_service import user_stats
 from app.services.user_service import UserService
 
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/users", tags=["Users"], route_class=CachedRoute)
 
 
 @router.get("/me", response_model=UserResponse)
+@cache_response(settings.CACHE_TTL_SHORT, tags=("user:{user}:profile",))
 async def get_current_user_profile(
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> UserResponse:
     """
     Retrieve authenticated user's profile.
 
+    Cached per user with an ETag until the profile changes.
+
     Args:
         current_user: Current authenticated user
 
@@ -36,8 +42,8 @@ async def get_current_user_profile(
 @router.patch("/me", response_model=UserResponse)
 async def update_current_user_profile(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
 ) -> UserResponse:
     """
     Update authenticated user's profile.
@@ -49,26 +55,42 @@ async def update_current_user_profile(
 
     Returns:
         Updated user profile
+
+    Raises:
+        HTTPException 404: User not found
     """
-    updated_user = UserService.update_user(db, current_user, user_update)
+    # The principal is a read-only snapshot; load the user to change it
+    user = await UserService.get_user_by_id(db, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+
+    updated_user = await UserService.update_user(db, user, user_update)
     return updated_user
 
 
 @router.get("/{user_id}/stats", response_model=UserStats)
+@cache_response(settings.CACHE_TTL_MEDIUM, tags=("user:{user}:stats",))
 async def get_user_statistics(
     user_id: int,
     period: str = "month",
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db),
 ) -> UserStats:
     """
     Retrieve user's golf statistics.
 
+    Served from the user's statistics rollups, so the cost does not depend
+    on how many swings the user has analyzed, preferably on a read replica.
+    Responses are cached with an ETag until the user's next analysis.
+
     Args:
         user_id: User ID
         period: Statistics period (week, month, year, all)
         current_user: Current authenticated user
-        db: Database session
+        db: Read-only database session
 
     Returns:
         User statistics
@@ -91,21 +113,4 @@ async def get_user_statistics(
             detail="Invalid period. Must be one of: week, month, year, all",
         )
 
-    # TODO: Implement actual statistics calculation
-    # For now, return mock data
-    return UserStats(
-        user_id=user_id,
-        period=period,
-        swings_analyzed=0,
-        average_score=0.0,
-        improvement_trend="stable",
-        most_common_issues=[],
-        biomechanics_avg={
-            "spine_angle": 0.0,
-            "hip_rotation": 0.0,
-            "shoulder_turn": 0.0,
-            "x_factor": 0.0,
-        },
-        drills_completed=0,
-        practice_sessions=0,
-    )
+    return UserStats(**await user_stats.get_stats(db, user_id, period))
@@ -36,11 +36,27 @@ class Settings(BaseSettings):
         description="Secret key for JWT signing",
     )
 
+    # Password hashing (bcrypt in a process pool per node; hashes with fewer
+    # rounds are upgraded on login)
+    BCRYPT_ROUNDS: int = Field(default=12)
+    PASSWORD_HASH_WORKERS: int = Field(default=2)
+    PASSWORD_HASH_MAX_QUEUE: int = Field(default=64)  # waiting for a worker; more get 503
+
     # JWT Settings
     JWT_ALGORITHM: str = Field(default="HS256")
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=15)
     JWT_REFRESH_TOKEN_EXPIRE_DAYS: int = Field(default=7)
 
+    # Refresh token revocation (jti sets in Redis, Bloom filter per node)
+    AUTH_REVOCATION_SYNC_INTERVAL_SECONDS: float = Field(default=30.0)
+    AUTH_REVOCATION_FILTER_CAPACITY: int = Field(default=100000)
+    AUTH_REVOCATION_FILTER_ERROR_RATE: float = Field(default=0.001)
+
+    # Authenticated principal cache (in-process tier; the Redis tier uses CACHE_TTL_SHORT)
+    AUTH_PRINCIPAL_LOCAL_TTL_SECONDS: float = Field(default=30.0)
+    AUTH_PRINCIPAL_LOCAL_MAX_ENTRIES: int = Field(default=10000)
+    AUTH_PRINCIPAL_TOMBSTONE_SECONDS: int = Field(default=10)  # refills blocked after a change
+
     # Database (PostgreSQL + TimescaleDB)
     POSTGRES_HOST: str = Field(default="localhost")
     POSTGRES_PORT: int = Field(default=5432)
@@ -51,6 +67,25 @@ class Settings(BaseSettings):
     # Connection pool settings
     DB_POOL_SIZE: int = Field(default=20)
     DB_MAX_OVERFLOW: int = Field(default=40)
+    DB_STATEMENT_CACHE_SIZE: int = Field(
+        default=500, description="Prepared statements cached per connection, 0 behind PgBouncer"
+    )
+
+    # Read replicas (comma-separated postgresql+asyncpg:// URLs; empty reads from the primary)
+    DB_REPLICA_URLS: str = Field(default="")
+    DB_REPLICA_MAX_LAG_SECONDS: float = Field(default=5.0)
+    DB_REPLICA_CHECK_INTERVAL_SECONDS: float = Field(default=1.0)
+
+    # Per-request database instrumentation (X-DB-* response headers in debug)
+    DB_INSTRUMENTATION_ENABLED: bool = Field(default=True)
+    DB_N_PLUS_ONE_THRESHOLD: int = Field(
+        default=5, description="Runs of one statement per request that flag an N+1 pattern"
+    )
+
+    @property
+    def DB_REPLICA_URLS_LIST(self) -> List[str]:
+        """Parse replica URLs from comma-separated string."""
+        return [url.strip() for url in self.DB_REPLICA_URLS.split(",") if url.strip()]
 
     @property
     def DATABASE_URL(self) -> str:
@@ -81,11 +116,35 @@ class Settings(BaseSettings):
             return f"redis://:{self.REDIS_PASSWORD}@{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
         return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
 
+    # Redis connection pool (one per node, shared by all Redis users)
+    REDIS_POOL_MAX_CONNECTIONS: int = Field(default=200)
+    REDIS_BLOCKING_POOL_MAX_CONNECTIONS: int = Field(
+        default=500, description="Blocking readers: SSE stream XREADs and pub/sub listeners"
+    )
+    REDIS_POOL_TIMEOUT_SECONDS: float = Field(
+        default=5.0, description="Wait for a free pooled connection before failing"
+    )
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = Field(
+        default=30.0, description="Must exceed the longest blocking read (SSE XREAD, 15 s)"
+    )
+    REDIS_CONNECT_TIMEOUT_SECONDS: float = Field(default=2.0)
+    REDIS_HEALTH_CHECK_INTERVAL_SECONDS: int = Field(default=30)
+    REDIS_RETRY_ATTEMPTS: int = Field(default=3)
+
     # Cache TTL (seconds)
     CACHE_TTL_SHORT: int = Field(default=300)  # 5 minutes
     CACHE_TTL_MEDIUM: int = Field(default=3600)  # 1 hour
     CACHE_TTL_LONG: int = Field(default=86400)  # 24 hours
 
+    # Response cache of read endpoints (in-process tier; the Redis tier uses each route's TTL)
+    RESPONSE_CACHE_ENABLED: bool = Field(default=True)
+    RESPONSE_CACHE_LOCAL_TTL_SECONDS: float = Field(default=10.0)
+    RESPONSE_CACHE_LOCAL_MAX_ENTRIES: int = Field(default=10000)
+
+    # Request coalescing (single-flight) across nodes: Redis lock expiry and wait
+    SINGLEFLIGHT_LOCK_TIMEOUT_SECONDS: float = Field(default=30.0)
+    SINGLEFLIGHT_LOCK_WAIT_SECONDS: float = Field(default=10.0)
+
     # MinIO (Object Storage)
     MINIO_ENDPOINT: str = Field(default="localhost:9000")
     MINIO_ACCESS_KEY: str = Field(default="minioadmin")
@@ -114,6 +173,54 @@ class Settings(BaseSettings):
 
     # AI Cost limits
     AI_DAILY_BUDGET: float = Field(default=100.00)
+    AI_FALLBACK_MODEL: str = Field(
+        default="claude-haiku-4-5-20251001", description="Cheaper model used as the budget runs low"
+    )
+    AI_BUDGET_DOWNGRADE_AT: float = Field(
+        default=0.8, description="Share of the budget or quota after which the fallback is used"
+    )
+    AI_FREE_DAILY_QUOTA: float = Field(default=0.50)  # USD per user per day
+    AI_PRO_DAILY_QUOTA: float = Field(default=5.00)
+    AI_ELITE_DAILY_QUOTA: float = Field(default=20.00)
+
+    # AI prompt building
+    AI_PROMPT_TOKEN_BUDGET: int = Field(default=400)  # analysis prompt text, excl. system/images
+    AI_PROMPT_MAX_FAULTS: int = Field(default=3)
+
+    # AI similar-swing analysis cache
+    AI_CACHE_ENABLED: bool = Field(default=True)
+    AI_CACHE_MAX_DISTANCE: float = Field(
+        default=1.5, description="Max fingerprint distance (quantization steps), 0=exact only"
+    )
+    AI_CACHE_TTL_SECONDS: int = Field(default=30 * 24 * 60 * 60)  # 30 days
+    AI_CACHE_MAX_BUCKET_ENTRIES: int = Field(default=500)
+
+    # AI client: connection pool, concurrency, pacing, retries and hedging
+    AI_HTTP_MAX_CONNECTIONS: int = Field(default=32)
+    AI_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = Field(default=16)
+    AI_REQUEST_TIMEOUT_SECONDS: float = Field(default=120.0)
+    AI_CLUSTER_CONCURRENCY: int = Field(default=64)  # in-flight calls across all nodes
+    AI_REQUESTS_PER_MINUTE: int = Field(default=50)  # per process
+    AI_INPUT_TOKENS_PER_MINUTE: int = Field(default=40000)  # per process
+    AI_MAX_RETRIES: int = Field(default=3)
+    AI_RETRY_BASE_SECONDS: float = Field(default=0.5)
+    AI_RETRY_MAX_SECONDS: float = Field(default=8.0)
+    AI_HEDGE_AFTER_SECONDS: float = Field(default=0.0, description="0=no hedged requests")
+
+    # AI concurrency lanes and batched (non-urgent) jobs
+    AI_INTERACTIVE_CONCURRENCY: int = Field(default=16)
+    AI_BATCH_ENABLED: bool = Field(default=False)
+    AI_BATCH_BACKEND: str = Field(default="anthropic", description="anthropic or local")
+    AI_BATCH_LOCAL_CONCURRENCY: int = Field(default=2)
+    AI_BATCH_MAX_REQUESTS: int = Field(default=1000)
+    AI_BATCH_FLUSH_INTERVAL_SECONDS: float = Field(default=300.0)
+    AI_BATCH_POLL_INTERVAL_SECONDS: float = Field(default=30.0)
+    AI_BATCH_RESULT_TTL_SECONDS: int = Field(default=7 * 24 * 60 * 60)  # 7 days
+    AI_BATCH_CLAIM_TIMEOUT_SECONDS: int = Field(default=3600)  # take over stalled batches
+
+    # AI analysis streaming (SSE)
+    AI_STREAM_TTL_SECONDS: int = Field(default=3600)  # resume window
+    AI_STREAM_FLUSH_INTERVAL_SECONDS: float = Field(default=0.05)
 
     # MediaPipe Configuration
     MEDIAPIPE_MODEL_COMPLEXITY: int = Field(
@@ -162,6 +269,10 @@ class Settings(BaseSettings):
     RATE_LIMIT_FREE: int = Field(default=60)
     RATE_LIMIT_PRO: int = Field(default=120)
     RATE_LIMIT_ELITE: int = Field(default=300)
+    # Requests charged for a swing upload or streamed analysis
+    RATE_LIMIT_EXPENSIVE_COST: int = Field(default=10)
+    # Clients whose allowance each node mirrors locally
+    RATE_LIMIT_LOCAL_MAX_KEYS: int = Field(default=100000)
 
     # Email (Optional - for notifications)
     SMTP_HOST: str = Field(default="smtp.gmail.com")
@@ -197,6 +308,20 @@ class Settings(BaseSettings):
     FEATURE_COACH_PORTAL: bool = Field(default=False)
     FEATURE_INTEGRATIONS: bool = Field(default=False)
 
+    # Real-time session routing
+    REALTIME_WORKER_VNODES: int = Field(default=64)
+    REALTIME_SESSION_TTL_SECONDS: int = Field(default=3600)
+
+    # Real-time frame persistence (write-behind buffer per node)
+    FRAME_BUFFER_CAPACITY: int = Field(default=20000)  # frames per buffer half
+    FRAME_FLUSH_ROWS: int = Field(default=5000)
+    FRAME_FLUSH_INTERVAL_SECONDS: float = Field(default=2.0)
+
+    # Bulk ingestion (COPY on PostgreSQL, multi-row INSERT elsewhere)
+    BULK_INGEST_BATCH_ROWS: int = Field(default=10000)
+    BULK_INGEST_MAX_RETRIES: int = Field(default=3)
+    BULK_INGEST_RETRY_BACKOFF_SECONDS: float = Field(default=0.2)
+
     # Development
     RELOAD: bool = Field(default=True)
     SQL_ECHO: bool = Field(default=False)
@@ -1,14 +1,30 @@
 """
 Database connection and session management for GolfCoach Pro.
 
-Sets up SQLAlchemy engine and session factory.
+Request handlers use the async engine (asyncpg) so queries never block the
+event loop. The sync engine remains for schema creation and for work that
+already runs off the event loop in worker threads. Read-only endpoints may
+be served from replicas (see app.core.replicas). Every engine reports
+per-request statement counts and timings (see app.core.db_instrumentation).
 """
 
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import sessionmaker
+from typing import AsyncGenerator
 
 from app.core.config import settings
+from app.core.db_instrumentation import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    instrument_engine,
+)
 
 
 # Create SQLAlchemy engine
@@ -18,26 +34,62 @@ engine = create_engine(
     pool_size=settings.DB_POOL_SIZE,
     max_overflow=settings.DB_MAX_OVERFLOW,
     echo=settings.SQL_ECHO,
+    poolclass=InstrumentedQueuePool,
 )
+instrument_engine(engine)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
-def get_db() -> Generator[Session, None, None]:
+def make_async_engine(url: str) -> AsyncEngine:
+    """
+    Create an async engine with the application's pool settings.
+
+    asyncpg prepares each statement once per connection and SQLAlchemy
+    caches the prepared statements, so repeated queries skip parsing and
+    planning on the server.
+
+    Args:
+        url: Database URL (postgresql+asyncpg://...)
+
+    Returns:
+        Async engine, instrumented per request
+    """
+    async_engine = create_async_engine(
+        make_url(url).update_query_dict(
+            {"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)}
+        ),
+        pool_pre_ping=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        echo=settings.SQL_ECHO,
+        connect_args={"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+        poolclass=InstrumentedAsyncQueuePool,
+    )
+    instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+
+# Create async engine
+async_engine = make_async_engine(settings.ASYNC_DATABASE_URL)
+
+# Create async session factory; objects stay usable after commit, since
+# attributes cannot be lazily reloaded outside an await
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
-    Dependency for getting database session.
+    Dependency for getting an async database session.
 
     Yields:
         Database session
 
     Usage:
         @app.get("/")
-        def endpoint(db: Session = Depends(get_db)):
+        async def endpoint(db: AsyncSession = Depends(get_db)):
             ...
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,209 @@
+"""
+Per-request database instrumentation.
+
+SQLAlchemy event hooks record, for the request being served, how many
+statements it ran, how long they took and how long it waited for a pool
+connection. The numbers live in a context variable set by
+DBInstrumentationMiddleware, so concurrent requests never mix. Per request:
+
+- metrics by route (statement count, DB time, pool wait);
+- X-DB-* response headers in debug mode;
+- a warning when one statement runs DB_N_PLUS_ONE_THRESHOLD times or
+  more, the signature of an N+1 query pattern (a lazy load or a query per
+  item of a list).
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import Counter as StatementCounter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+
+logger = logging.getLogger(__name__)
+
+# Statements longer than this are truncated in N+1 warnings
+_STATEMENT_LOG_CHARS = 200
+
+statements_per_request = registry.histogram(
+    "golfcoach_db_statements_per_request",
+    "SQL statements run per HTTP request",
+    labelnames=("route",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+db_time = registry.histogram(
+    "golfcoach_db_time_seconds",
+    "Time per HTTP request spent executing SQL statements",
+    labelnames=("route",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+pool_wait = registry.histogram(
+    "golfcoach_db_pool_wait_seconds",
+    "Time per HTTP request spent waiting for pool connections",
+    labelnames=("route",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+n_plus_one = registry.counter(
+    "golfcoach_db_n_plus_one_total",
+    "HTTP requests repeating a statement at least DB_N_PLUS_ONE_THRESHOLD times",
+    labelnames=("route",),
+)
+
+
+@dataclass
+class RequestDBStats:
+    """Database work done on behalf of one request."""
+
+    statements: int = 0
+    db_seconds: float = 0.0
+    pool_wait_seconds: float = 0.0
+    statement_counts: StatementCounter = field(default_factory=StatementCounter)
+
+    def most_repeated(self) -> Optional[Tuple[str, int]]:
+        """
+        Get the statement run most often.
+
+        Returns:
+            Statement and its count, or None if no statement ran
+        """
+        common = self.statement_counts.most_common(1)
+        return common[0] if common else None
+
+
+_request_stats: ContextVar[Optional[RequestDBStats]] = ContextVar("request_db_stats", default=None)
+
+
+def current_stats() -> Optional[RequestDBStats]:
+    """
+    Get the database stats of the request being served.
+
+    Returns:
+        Stats, or None outside an instrumented request
+    """
+    return _request_stats.get()
+
+
+class _TimedCheckoutMixin:
+    """Adds connection checkout wait to the current request's stats."""
+
+    def _do_get(self) -> Any:
+        stats = _request_stats.get()
+        if stats is None:
+            return super()._do_get()
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            stats.pool_wait_seconds += time.perf_counter() - start
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    """QueuePool measuring checkout wait."""
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    """Async-adapted QueuePool measuring checkout wait."""
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _request_stats.get() is not None:
+        context._instrumentation_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _request_stats.get()
+    start = getattr(context, "_instrumentation_start", None)
+    if stats is None or start is None:
+        return
+    stats.statements += 1
+    stats.db_seconds += time.perf_counter() - start
+    stats.statement_counts[statement] += 1
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Record statements run on an engine in the current request's stats.
+
+    Checkout wait is recorded by the engine's pool when it is an
+    InstrumentedQueuePool or InstrumentedAsyncQueuePool.
+
+    Args:
+        engine: Sync engine (AsyncEngine.sync_engine for async engines)
+    """
+    if not settings.DB_INSTRUMENTATION_ENABLED:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class DBInstrumentationMiddleware:
+    """ASGI middleware collecting database stats for each HTTP request."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        expose_headers: bool = settings.DEBUG,
+        n_plus_one_threshold: int = settings.DB_N_PLUS_ONE_THRESHOLD,
+    ) -> None:
+        self.app = app
+        self.expose_headers = expose_headers
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDBStats()
+        token = _request_stats.set(stats)
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start" and self.expose_headers:
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-db-statements", str(stats.statements).encode()),
+                    (b"x-db-time-ms", f"{stats.db_seconds * 1000:.2f}".encode()),
+                    (b"x-db-pool-wait-ms", f"{stats.pool_wait_seconds * 1000:.2f}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _request_stats.reset(token)
+            self._report(scope, stats)
+
+    def _report(self, scope: Scope, stats: RequestDBStats) -> None:
+        # Route template, so metrics are not labelled per ID
+        route = getattr(scope.get("route"), "path", "unmatched")
+        statements_per_request.observe(stats.statements, route=route)
+        if not stats.statements:
+            return
+        db_time.observe(stats.db_seconds, route=route)
+        pool_wait.observe(stats.pool_wait_seconds, route=route)
+
+        repeated = stats.most_repeated()
+        if repeated and repeated[1] >= self.n_plus_one_threshold:
+            statement, count = repeated
+            n_plus_one.inc(route=route)
+            logger.warning(
+                f"Possible N+1 query on {scope['method']} {route}: statement ran {count} "
+                f"times ({stats.statements} statements in total): "
+                f"{' '.join(statement.split())[:_STATEMENT_LOG_CHARS]}"
+            )
+        logger.debug(
+            f"{scope['method']} {route}: {stats.statements} statements, "
+            f"{stats.db_seconds * 1000:.1f} ms in database, "
+            f"{stats.pool_wait_seconds * 1000:.1f} ms waiting for connections"
+        )
@@ -4,16 +4,17 @@ FastAPI dependencies for GolfCoach Pro.
 Includes database session, authentication, and other common dependencies.
 """
 
-from typing import Generator, Optional
+from typing import AsyncGenerator, Generator, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-import redis
+from sqlalchemy.ext.asyncio import AsyncSession
+import redis.asyncio as aioredis
 
 from app.core.database import get_db
+from app.core.redis_pool import redis_client
+from app.core.replicas import replica_router
 from app.core.security import get_user_id_from_token
-from app.core.config import settings
-from app.models.user import User
+from app.services.principal_cache import Principal, principal_cache
 
 
 # HTTP Bearer security scheme
@@ -25,14 +26,14 @@ security = HTTPBearer()
 # ============================================
 
 
-def get_redis() -> redis.Redis:
+async def get_redis() -> aioredis.Redis:
     """
-    Get Redis connection.
+    Get the shared Redis client.
 
     Returns:
-        Redis client instance
+        Async Redis client on the node's connection pool
     """
-    return redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return redis_client
 
 
 # ============================================
@@ -42,17 +43,20 @@ def get_redis() -> redis.Redis:
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
+    db: AsyncSession = Depends(get_db),
+) -> Principal:
     """
     Get current authenticated user from JWT token.
 
+    The user is resolved through the principal cache, so most requests do
+    not touch the database.
+
     Args:
         credentials: HTTP Bearer token credentials
-        db: Database session
+        db: Database session, only used on a cache miss
 
     Returns:
-        Current authenticated user
+        Read-only principal of the current authenticated user
 
     Raises:
         HTTPException: If token is invalid or user not found
@@ -62,8 +66,8 @@ async def get_current_user(
     # Extract user ID from token
     user_id = get_user_id_from_token(token)
 
-    # Get user from database
-    user = db.query(User).filter(User.id == user_id).first()
+    # Get user from the principal cache (database on a miss)
+    user = await principal_cache.get(db, user_id)
 
     if user is None:
         raise HTTPException(
@@ -76,8 +80,8 @@ async def get_current_user(
 
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     """
     Get current active user (can be extended with active status check).
 
@@ -108,8 +112,8 @@ async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(
         HTTPBearer(auto_error=False)
     ),
-    db: Session = Depends(get_db),
-) -> Optional[User]:
+    db: AsyncSession = Depends(get_db),
+) -> Optional[Principal]:
     """
     Get current user if authenticated, otherwise None.
 
@@ -128,7 +132,38 @@ async def get_current_user_optional(
     try:
         token = credentials.credentials
         user_id = get_user_id_from_token(token)
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await principal_cache.get(db, user_id)
         return user
     except HTTPException:
         return None
+
+
+# ============================================
+# Read-only Database Sessions
+# ============================================
+
+
+async def get_read_db(
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[Principal] = Depends(get_current_user_optional),
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency for a database session of a read-only endpoint.
+
+    Served from a read replica when one is within the allowed replication
+    lag and has replayed the current user's latest write, otherwise from
+    the primary.
+
+    Args:
+        db: Primary database session, used when no replica qualifies
+        current_user: Current user if authenticated
+
+    Yields:
+        Database session
+    """
+    session_factory = await replica_router.reader(current_user.id if current_user else None)
+    if session_factory is None:
+        yield db
+        return
+    async with session_factory() as replica_db:
+        yield replica_db
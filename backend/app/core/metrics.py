@@ -0,0 +1,273 @@
+"""
+In-process metrics for GolfCoach Pro.
+
+Counters and histograms with preallocated buckets, rendered in the
+Prometheus text exposition format at /metrics when METRICS_ENABLED.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+
+# Latency buckets in seconds, from 0.25 ms up to 10 s
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.00025,
+    0.0005,
+    0.001,
+    0.002,
+    0.004,
+    0.008,
+    0.016,
+    0.032,
+    0.064,
+    0.128,
+    0.256,
+    0.512,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for labelled metric families."""
+
+    type_name = ""
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _child(self, labels: Dict[str, str]) -> object:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(key, self._new_series())
+        return series
+
+    def _new_series(self) -> object:
+        raise NotImplementedError
+
+    def _render_series(self, values: Tuple[str, ...], series: object) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """Render this metric family in Prometheus text format."""
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for values, series in sorted(self._series.items()):
+            lines.extend(self._render_series(values, series))
+        return lines
+
+
+class _CounterSeries:
+    __slots__ = ("value", "lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self.lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    type_name = "counter"
+
+    def labels(self, **labels: str) -> _CounterSeries:
+        """Get the series for a label set (cache it on hot paths)."""
+        return self._child(labels)  # type: ignore[return-value]
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increment the counter."""
+        self.labels(**labels).inc(amount)
+
+    def _new_series(self) -> _CounterSeries:
+        return _CounterSeries()
+
+    def _render_series(self, values: Tuple[str, ...], series: object) -> List[str]:
+        assert isinstance(series, _CounterSeries)
+        labels = _format_labels(self.labelnames, values)
+        return [f"{self.name}{labels} {_format_value(series.value)}"]
+
+
+class _GaugeSeries:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def labels(self, **labels: str) -> _GaugeSeries:
+        """Get the series for a label set."""
+        return self._child(labels)  # type: ignore[return-value]
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the gauge value."""
+        self.labels(**labels).set(value)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increase the gauge value."""
+        self.labels(**labels).inc(amount)
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        """Decrease the gauge value."""
+        self.labels(**labels).dec(amount)
+
+    def _new_series(self) -> _GaugeSeries:
+        return _GaugeSeries()
+
+    def _render_series(self, values: Tuple[str, ...], series: object) -> List[str]:
+        assert isinstance(series, _GaugeSeries)
+        labels = _format_labels(self.labelnames, values)
+        return [f"{self.name}{labels} {_format_value(series.value)}"]
+
+
+class _HistogramSeries:
+    __slots__ = ("bounds", "counts", "total", "count", "lock")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        # One slot per bucket plus the +Inf overflow slot, allocated once
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+
+
+class Histogram(_Metric):
+    """Histogram with fixed, preallocated buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def labels(self, **labels: str) -> _HistogramSeries:
+        """Get the series for a label set (cache it on hot paths)."""
+        return self._child(labels)  # type: ignore[return-value]
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record an observation."""
+        self.labels(**labels).observe(value)
+
+    def _new_series(self) -> _HistogramSeries:
+        return _HistogramSeries(self.buckets)
+
+    def _render_series(self, values: Tuple[str, ...], series: object) -> List[str]:
+        assert isinstance(series, _HistogramSeries)
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), series.counts, strict=True):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(series.total)}")
+        lines.append(f"{self.name}_count{labels} {series.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Registry of all metric families exported by this process."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Get or create a counter."""
+        return self._register(Counter(name, description, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Get or create a gauge."""
+        return self._register(Gauge(name, description, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Get or create a histogram."""
+        return self._register(  # type: ignore[return-value]
+            Histogram(name, description, labelnames, buckets)
+        )
+
+    def render(self) -> str:
+        """Render every registered metric in Prometheus text format."""
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} already registered as {existing.type_name}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+
+# Global metrics registry
+registry = MetricsRegistry()
@@ -0,0 +1,141 @@
+"""
+Password hashing off the event loop.
+
+A bcrypt hash or check takes a few hundred milliseconds of CPU at the
+default cost. Run inline in a request handler it stalls every other request
+on the worker, so a burst of logins would raise latency everywhere. The
+services instead await PasswordHasher, which runs bcrypt in a process pool
+of PASSWORD_HASH_WORKERS processes per node:
+
+- at most PASSWORD_HASH_MAX_QUEUE calls wait for a free worker; further
+  calls are rejected with 503 and Retry-After instead of queueing without
+  bound, so a login storm sheds load rather than growing latency;
+- the pool is started on application startup (lazily elsewhere) and shut
+  down on application shutdown;
+- checks also report a new hash when the stored one was made with stale
+  parameters (fewer than BCRYPT_ROUNDS rounds), so hashes are upgraded
+  transparently on login.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.security import hash_password, verify_and_update_password
+
+
+logger = logging.getLogger(__name__)
+
+duration = registry.histogram(
+    "golfcoach_password_hash_duration_seconds",
+    "Time to hash or check a password, including waiting for a worker",
+    labelnames=("operation",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+pending_calls = registry.gauge(
+    "golfcoach_password_hash_pending", "Password hash calls running or waiting for a worker"
+)
+rejected_total = registry.counter(
+    "golfcoach_password_hash_rejected_total",
+    "Password hash calls rejected because the queue was full",
+    labelnames=("operation",),
+)
+
+
+class PasswordHasher:
+    """Bounded process pool for bcrypt."""
+
+    def __init__(
+        self,
+        max_workers: int = settings.PASSWORD_HASH_WORKERS,
+        max_queue: int = settings.PASSWORD_HASH_MAX_QUEUE,
+    ) -> None:
+        self._max_workers = max_workers
+        self._max_pending = max_workers + max_queue
+        self._pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        """Create the process pool (workers are spawned as calls arrive)."""
+        if self._executor is None:
+            # Spawned, not forked: the event loop, sockets and threads of
+            # the parent are not inherited
+            self._executor = ProcessPoolExecutor(
+                self._max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+
+    def shutdown(self) -> None:
+        """Stop the workers, dropping calls still waiting for one."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password.
+
+        Args:
+            password: Plain text password
+
+        Returns:
+            Hashed password
+
+        Raises:
+            HTTPException 503: Too many calls waiting for a worker
+        """
+        return await self._run("hash", hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Check a password, rehashing it if its hash uses stale parameters.
+
+        Args:
+            password: Plain text password
+            hashed_password: Stored hash
+
+        Returns:
+            Whether the password matches, and the hash to store instead of
+            the current one if it should be upgraded
+
+        Raises:
+            HTTPException 503: Too many calls waiting for a worker
+        """
+        return await self._run("verify", verify_and_update_password, password, hashed_password)
+
+    async def _run(self, operation: str, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self._max_pending:
+            rejected_total.inc(operation=operation)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-ins in progress, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+        self.start()
+        self._pending += 1
+        pending_calls.set(self._pending)
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); the next call starts a new pool
+            logger.error("Password hashing pool broken, restarting it")
+            self._executor = None
+            raise
+        finally:
+            self._pending -= 1
+            pending_calls.set(self._pending)
+            duration.observe(time.perf_counter() - start, operation=operation)
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,319 @@
+"""
+Tiered, distributed API rate limiting.
+
+Every API request is charged against a per-client allowance shared by all
+nodes: authenticated users are limited per user at their subscription
+tier's RATE_LIMIT_* requests per minute, anonymous clients per IP address at
+RATE_LIMIT_DEFAULT. Expensive endpoints (swing upload, streamed analysis)
+cost RATE_LIMIT_EXPENSIVE_COST requests each.
+
+Allowances follow the generic cell rate algorithm (GCRA): a client may burst
+up to its per-minute limit, then one request per 1/limit minutes. The whole
+check is one Lua script, so it is atomic and costs one Redis round trip.
+
+Each node mirrors the allowances it has seen in a local bucket running the
+same algorithm. A node only sees part of a client's traffic, so a request
+the local bucket rejects would be rejected by Redis too: bursts from abusive
+clients, and requests after a rejection until the retry time, are answered
+without Redis. If Redis is unavailable the local bucket alone decides.
+
+Responses carry RateLimit-Limit, RateLimit-Remaining, RateLimit-Reset and
+RateLimit-Policy headers (IETF RateLimit header fields draft); rejected
+requests get 429 with Retry-After.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Mapping, Optional, Sequence, Tuple
+
+import redis.asyncio as aioredis
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from redis.exceptions import NoScriptError
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.redis_pool import redis_client
+from app.core.security import get_user_id_from_token
+from app.services.principal_cache import principal_cache
+
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_KEY_PREFIX = "ratelimit:"
+
+# Allowances are per minute
+WINDOW_SECONDS = 60
+
+# KEYS[1] holds the client's theoretical arrival time (TAT) in ms: when its
+# allowance will be full again. ARGV: ms per request, burst (requests),
+# cost (requests). Returns {allowed, TAT - now (ms), retry after (ms)}.
+# Redis time is used so every node charges against the same clock.
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local tat = math.max(tonumber(redis.call('GET', KEYS[1])) or now, now)
+local new_tat = tat + cost * interval
+local retry_after = new_tat - burst * interval - now
+if retry_after > 0 then
+    return {0, math.ceil(tat - now), math.ceil(retry_after)}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return {1, math.ceil(new_tat - now), 0}
+"""
+GCRA_SCRIPT_SHA = hashlib.sha1(GCRA_SCRIPT.encode()).hexdigest()
+
+decisions_total = registry.counter(
+    "golfcoach_rate_limit_decisions_total",
+    "Rate limit checks by tier, outcome and what decided them",
+    labelnames=("tier", "decision", "source"),
+)
+
+# (method, path) patterns of endpoints charged RATE_LIMIT_EXPENSIVE_COST
+EXPENSIVE_ROUTES: Tuple[Tuple[str, re.Pattern], ...] = (
+    ("POST", re.compile(r"^/api/v1/swings/upload/?$")),
+    ("POST", re.compile(r"^/api/v1/swings/[^/]+/analysis/stream/?$")),
+)
+
+
+def gcra(
+    tat: float, now: float, interval: float, burst: int, cost: int
+) -> Tuple[bool, float, float]:
+    """
+    Charge a request against a GCRA allowance.
+
+    Args:
+        tat: Theoretical arrival time stored for the client (ms)
+        now: Current time (ms)
+        interval: Time per request at the sustained rate (ms)
+        burst: Requests allowed at once
+        cost: Requests this one counts as
+
+    Returns:
+        Whether it is allowed, the new TAT, and ms until it would be allowed
+    """
+    tat = max(tat, now)
+    new_tat = tat + cost * interval
+    retry_after = new_tat - burst * interval - now
+    if retry_after > 0:
+        return False, tat, retry_after
+    return True, new_tat, 0.0
+
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    """Outcome of a rate limit check."""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float  # seconds until the allowance is full again
+    retry_after: float  # seconds until the request would be allowed
+
+    def headers(self) -> List[Tuple[bytes, bytes]]:
+        """
+        Get the RateLimit-* response headers.
+
+        Returns:
+            Raw ASGI headers, with Retry-After when rejected
+        """
+        headers = [
+            (b"ratelimit-limit", str(self.limit).encode()),
+            (b"ratelimit-remaining", str(self.remaining).encode()),
+            (b"ratelimit-reset", str(math.ceil(self.reset_after)).encode()),
+            (b"ratelimit-policy", f"{self.limit};w={WINDOW_SECONDS}".encode()),
+        ]
+        if not self.allowed:
+            headers.append((b"retry-after", str(max(1, math.ceil(self.retry_after))).encode()))
+        return headers
+
+
+class RateLimiter:
+    """GCRA allowances in Redis, fronted by per-node local buckets."""
+
+    def __init__(
+        self,
+        redis_client: Optional[aioredis.Redis],
+        limits: Optional[Mapping[str, int]] = None,
+        local_max_keys: int = settings.RATE_LIMIT_LOCAL_MAX_KEYS,
+    ) -> None:
+        self._redis = redis_client
+        self.limits = (
+            limits
+            if limits is not None
+            else {
+                "default": settings.RATE_LIMIT_DEFAULT,
+                "free": settings.RATE_LIMIT_FREE,
+                "pro": settings.RATE_LIMIT_PRO,
+                "elite": settings.RATE_LIMIT_ELITE,
+            }
+        )
+        self._local_max = local_max_keys
+        # Client key -> TAT on the local monotonic clock (ms)
+        self._local: OrderedDict[str, float] = OrderedDict()
+
+    def limit_for(self, tier: Optional[str]) -> int:
+        """
+        Get the per-minute limit of a tier.
+
+        Args:
+            tier: Subscription tier, None for the default limit
+
+        Returns:
+            Requests per minute
+        """
+        return self.limits.get(tier or "default", self.limits["default"])
+
+    async def check(self, client: str, tier: Optional[str], cost: int = 1) -> RateLimitDecision:
+        """
+        Charge a request to a client's allowance.
+
+        Args:
+            client: Client identity, e.g. "user:42" or "ip:203.0.113.7"
+            tier: Subscription tier the limit is taken from
+            cost: Requests this one counts as
+
+        Returns:
+            Decision, with the client's remaining allowance
+        """
+        limit = self.limit_for(tier)
+        interval = WINDOW_SECONDS * 1000 / limit
+        key = f"{RATE_LIMIT_KEY_PREFIX}{client}"
+        now = time.monotonic() * 1000
+
+        allowed, tat, retry_after = gcra(self._local.get(key, now), now, interval, limit, cost)
+        source = "local"
+        if allowed and self._redis is not None:
+            try:
+                allowed, offset, retry_after = await self._run_script(key, interval, limit, cost)
+                allowed = bool(allowed)
+                # Mirror the shared allowance on the local clock
+                tat = now + offset
+                source = "redis"
+            except aioredis.RedisError as exc:
+                logger.warning(f"Rate limiter falling back to local buckets: {exc}")
+                source = "fallback"
+        self._set_local(key, tat)
+
+        decisions_total.inc(
+            tier=tier or "default", decision="allow" if allowed else "deny", source=source
+        )
+        return RateLimitDecision(
+            allowed=allowed,
+            limit=limit,
+            remaining=max(0, math.floor((limit * interval - (tat - now)) / interval)),
+            # Whole ms, so float noise does not round the headers up a second
+            reset_after=round(tat - now) / 1000,
+            retry_after=round(retry_after) / 1000,
+        )
+
+    def reset(self) -> None:
+        """Forget all local allowances."""
+        self._local.clear()
+
+    async def _run_script(self, *args: object) -> List[int]:
+        # EVALSHA, loading the script on the first call per Redis server
+        try:
+            return await self._redis.evalsha(GCRA_SCRIPT_SHA, 1, *args)
+        except NoScriptError:
+            return await self._redis.eval(GCRA_SCRIPT, 1, *args)
+
+    def _set_local(self, key: str, tat: float) -> None:
+        # An evicted client is checked against Redis again, so eviction
+        # never lets a throttled client through
+        self._local[key] = tat
+        self._local.move_to_end(key)
+        while len(self._local) > self._local_max:
+            self._local.popitem(last=False)
+
+
+class RateLimitMiddleware:
+    """ASGI middleware enforcing per-client rate limits on API requests."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: Optional[RateLimiter] = None,
+        path_prefix: str = "/api/",
+        exempt_prefixes: Sequence[str] = ("/api/v1/health",),
+        expensive_cost: int = settings.RATE_LIMIT_EXPENSIVE_COST,
+    ) -> None:
+        self.app = app
+        self.limiter = limiter
+        self.path_prefix = path_prefix
+        self.exempt_prefixes = tuple(exempt_prefixes)
+        self.expensive_cost = expensive_cost
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = scope.get("path", "")
+        if (
+            scope["type"] != "http"
+            or not path.startswith(self.path_prefix)
+            or path.startswith(self.exempt_prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        client, tier = self._identify(scope)
+        limiter = self.limiter or rate_limiter
+        decision = await limiter.check(client, tier, self._cost(scope))
+        headers = decision.headers()
+
+        if not decision.allowed:
+            response = JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={
+                    "error": "rate_limited",
+                    "message": "Too many requests, retry later",
+                    "retry_after": max(1, math.ceil(decision.retry_after)),
+                },
+            )
+            response.raw_headers.extend(headers)
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), *headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    def _identify(self, scope: Scope) -> Tuple[str, Optional[str]]:
+        """Get the client identity and tier: the user for valid tokens, else the IP."""
+        authorization = dict(scope.get("headers", [])).get(b"authorization", b"").decode()
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and token:
+            try:
+                user_id = get_user_id_from_token(token)
+            except HTTPException:
+                user_id = None
+            if user_id is not None:
+                # No I/O here: until the request has cached the principal,
+                # the user gets the default limit
+                principal = principal_cache.peek(user_id)
+                tier = (principal.subscription_tier or "free") if principal else None
+                return f"user:{user_id}", tier
+        host = scope["client"][0] if scope.get("client") else "unknown"
+        return f"ip:{host}", None
+
+    def _cost(self, scope: Scope) -> int:
+        method, path = scope["method"], scope["path"]
+        for route_method, pattern in EXPENSIVE_ROUTES:
+            if method == route_method and pattern.match(path):
+                return self.expensive_cost
+        return 1
+
+
+rate_limiter = RateLimiter(redis_client)
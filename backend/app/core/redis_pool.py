@@ -0,0 +1,126 @@
+"""
+Shared async Redis client for GolfCoach Pro.
+
+Every Redis user on a node (request handlers through the get_redis
+dependency, and the service singletons) shares one connection pool, so
+requests reuse open connections instead of connecting per call:
+
+- the pool holds at most REDIS_POOL_MAX_CONNECTIONS connections; callers
+  wait up to REDIS_POOL_TIMEOUT_SECONDS for a free one instead of failing;
+- idle connections are checked with PING before reuse once they have been
+  idle for REDIS_HEALTH_CHECK_INTERVAL_SECONDS, and commands failing to
+  connect or on a dropped connection are retried on a new one with
+  exponential backoff. Timeouts are not retried: the command may have run
+  (INCRBY, RPUSH, EVAL are not idempotent);
+- the application opens the pools on startup and closes them on shutdown
+  (connections belong to the event loop that opened them).
+
+Blocking reads (SSE stream XREADs, pub/sub listeners) hold a connection
+while they wait, so they use a separate pool of up to
+REDIS_BLOCKING_POOL_MAX_CONNECTIONS connections (blocking_redis_client):
+open streams cannot starve the commands of other requests. The socket
+timeout exceeds their block time.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, List, Optional, Sequence, Tuple
+
+import redis.asyncio as aioredis
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+def create_redis_pool(
+    url: str = settings.REDIS_URL,
+    max_connections: int = settings.REDIS_POOL_MAX_CONNECTIONS,
+) -> aioredis.BlockingConnectionPool:
+    """
+    Create a connection pool with the application's sizing and health settings.
+
+    Args:
+        url: Redis URL
+        max_connections: Maximum number of open connections
+
+    Returns:
+        Connection pool decoding responses to str
+    """
+    return aioredis.BlockingConnectionPool.from_url(
+        url,
+        decode_responses=True,
+        max_connections=max_connections,
+        timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+        socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT_SECONDS,
+        socket_keepalive=True,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL_SECONDS,
+        retry=Retry(
+            ExponentialBackoff(cap=1.0),
+            settings.REDIS_RETRY_ATTEMPTS,
+            supported_errors=(RedisConnectionError,),
+        ),
+        retry_on_error=[RedisConnectionError],
+    )
+
+
+# Connections are opened on first use
+redis_pool = create_redis_pool()
+redis_client = aioredis.Redis(connection_pool=redis_pool)
+
+# For blocking reads only (XREAD BLOCK, pub/sub)
+blocking_redis_pool = create_redis_pool(
+    max_connections=settings.REDIS_BLOCKING_POOL_MAX_CONNECTIONS
+)
+blocking_redis_client = aioredis.Redis(connection_pool=blocking_redis_pool)
+
+
+async def open_redis() -> None:
+    """
+    Open the first pooled connection on application startup.
+
+    An unreachable Redis is logged, not raised: Redis-backed features
+    degrade on their own and the pool reconnects once Redis is back.
+    """
+    try:
+        await redis_client.ping()
+        logger.info("Redis connection pool ready")
+    except aioredis.RedisError as exc:
+        logger.warning(f"Redis unavailable on startup: {exc}")
+
+
+async def close_redis() -> None:
+    """Close all pooled connections on application shutdown."""
+    await redis_pool.disconnect()
+    await blocking_redis_pool.disconnect()
+
+
+async def run_pipeline(
+    commands: Sequence[Tuple[Any, ...]],
+    client: Optional[aioredis.Redis] = None,
+    transaction: bool = False,
+) -> List[Any]:
+    """
+    Send several commands in one round trip.
+
+    Args:
+        commands: Commands as (name, *args), e.g. ("setex", key, 60, "1")
+        client: Redis client, defaults to the shared client
+        transaction: Wrap the commands in MULTI/EXEC
+
+    Returns:
+        Command results, in order
+
+    Usage:
+        hits, ttl = await run_pipeline([("incr", key), ("ttl", key)])
+    """
+    async with (client or redis_client).pipeline(transaction=transaction) as pipe:
+        for name, *args in commands:
+            getattr(pipe, name)(*args)
+        return await pipe.execute()
@@ -0,0 +1,236 @@
+"""
+Read-replica routing.
+
+Read-only endpoints take their session from get_read_db, which serves them
+from a streaming replica when one is close enough to the primary, and from
+the primary otherwise:
+
+- a monitor measures each replica's replication lag; replicas whose lag
+  is unknown or above DB_REPLICA_MAX_LAG_SECONDS, or that are not
+  streaming WAL from the primary, are not read from;
+- healthy replicas are used round robin;
+- read-your-writes: services record the time of a user's writes in Redis,
+  and that user's reads stay on the primary until a replica has replayed
+  past the write, so users always see their own changes, on any node.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import redis.asyncio as aioredis
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import make_async_engine
+from app.core.metrics import registry
+from app.core.redis_pool import redis_client
+
+
+logger = logging.getLogger(__name__)
+
+LAST_WRITE_KEY_PREFIX = "db:last_write:"
+
+# Seconds a replica has applied everything the primary committed before;
+# 0 when it has replayed all WAL it received (an idle primary sends none),
+# NULL when it is not streaming (it then receives nothing to compare).
+# Reading the receiver status requires pg_read_all_stats.
+REPLICATION_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming')
+            THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+replica_lag = registry.gauge(
+    "golfcoach_db_replica_lag_seconds",
+    "Replication lag of read replicas",
+    labelnames=("replica",),
+)
+reads_total = registry.counter(
+    "golfcoach_db_reads_total",
+    "Read-only sessions by the database serving them",
+    labelnames=("target",),
+)
+
+LagProbe = Callable[[AsyncSession], Awaitable[float]]
+
+
+class ReplicationStopped(Exception):
+    """A replica is not receiving WAL, so its lag cannot be measured."""
+
+
+async def replication_lag(db: AsyncSession) -> float:
+    """
+    Measure a replica's replication lag.
+
+    Args:
+        db: Session on the replica
+
+    Returns:
+        Lag in seconds
+
+    Raises:
+        ReplicationStopped: The replica is not streaming from the primary
+    """
+    lag = (await db.execute(REPLICATION_LAG_QUERY)).scalar_one()
+    if lag is None:
+        raise ReplicationStopped("WAL receiver is not streaming")
+    return float(lag)
+
+
+@dataclass
+class Replica:
+    """A read replica and its last measured lag."""
+
+    name: str
+    session_factory: async_sessionmaker
+    lag: Optional[float] = None
+    checked_at: float = 0.0
+
+    @property
+    def fresh_as_of(self) -> float:
+        """Time up to which the replica has replayed the primary's commits."""
+        return self.checked_at - self.lag if self.lag is not None else 0.0
+
+
+class ReplicaRouter:
+    """Chooses the database serving read-only sessions."""
+
+    def __init__(
+        self,
+        replicas: Sequence[Tuple[str, async_sessionmaker]],
+        redis_client: Optional[aioredis.Redis],
+        max_lag_seconds: float = settings.DB_REPLICA_MAX_LAG_SECONDS,
+        check_interval_seconds: float = settings.DB_REPLICA_CHECK_INTERVAL_SECONDS,
+        probe: LagProbe = replication_lag,
+    ) -> None:
+        self._replicas = [Replica(name, factory) for name, factory in replicas]
+        self._redis = redis_client
+        self._max_lag = max_lag_seconds
+        self._check_interval = check_interval_seconds
+        self._probe = probe
+        self._next = itertools.count()
+        # Lag measured longer ago than this is no longer trusted
+        self._stale_after = 3 * check_interval_seconds
+        # A write older than this is visible on every healthy replica
+        self._write_ttl = math.ceil(max_lag_seconds + self._stale_after)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any replicas are configured."""
+        return bool(self._replicas)
+
+    async def reader(self, user_id: Optional[int] = None) -> Optional[async_sessionmaker]:
+        """
+        Choose the replica to serve a read-only session.
+
+        Args:
+            user_id: User the session reads for, to see their own writes
+
+        Returns:
+            Session factory of the replica, or None to read from the primary
+        """
+        now = time.time()
+        healthy = [
+            replica
+            for replica in self._replicas
+            if replica.lag is not None
+            and replica.lag <= self._max_lag
+            and now - replica.checked_at <= self._stale_after
+        ]
+        if healthy and user_id is not None:
+            last_write = await self._last_write(user_id)
+            healthy = [replica for replica in healthy if replica.fresh_as_of >= last_write]
+
+        if not healthy:
+            reads_total.inc(target="primary")
+            return None
+        reads_total.inc(target="replica")
+        return healthy[next(self._next) % len(healthy)].session_factory
+
+    async def mark_write(self, user_id: int) -> None:
+        """
+        Record that a user's data changed on the primary.
+
+        Call after committing, so the user's reads stay on the primary
+        until replicas have caught up.
+
+        Args:
+            user_id: User whose data changed
+        """
+        if not self._replicas or self._redis is None:
+            return
+        try:
+            await self._redis.set(
+                f"{LAST_WRITE_KEY_PREFIX}{user_id}", repr(time.time()), ex=self._write_ttl
+            )
+        except aioredis.RedisError as exc:
+            logger.warning(f"Failed to record write of user {user_id}: {exc}")
+
+    async def check(self) -> None:
+        """Measure the lag of every replica; unreachable replicas are marked unknown."""
+        for replica in self._replicas:
+            started = time.time()
+            try:
+                async with replica.session_factory() as db:
+                    replica.lag = await asyncio.wait_for(self._probe(db), self._stale_after)
+                replica.checked_at = started
+                replica_lag.set(replica.lag, replica=replica.name)
+            except Exception as exc:
+                logger.warning(f"Replica {replica.name} unavailable: {exc}")
+                replica.lag = None
+
+    async def monitor(self) -> None:
+        """Measure replica lag every check interval until cancelled."""
+        while True:
+            await self.check()
+            await asyncio.sleep(self._check_interval)
+
+    def status(self) -> Dict[str, Optional[float]]:
+        """
+        Get the last measured lag of each replica.
+
+        Returns:
+            Lag in seconds by replica, None if unknown
+        """
+        return {replica.name: replica.lag for replica in self._replicas}
+
+    async def _last_write(self, user_id: int) -> float:
+        if self._redis is None:
+            return 0.0
+        try:
+            value = await self._redis.get(f"{LAST_WRITE_KEY_PREFIX}{user_id}")
+        except aioredis.RedisError as exc:
+            logger.warning(f"Failed to read last write of user {user_id}: {exc}")
+            # Without it, only the primary is known to have the user's writes
+            return math.inf
+        return float(value) if value else 0.0
+
+
+def _replica_factories(urls: List[str]) -> List[Tuple[str, async_sessionmaker]]:
+    return [
+        (
+            f"{make_url(url).host}:{make_url(url).port or 5432}",
+            async_sessionmaker(make_async_engine(url), autoflush=False, expire_on_commit=False),
+        )
+        for url in urls
+    ]
+
+
+replica_router = ReplicaRouter(
+    _replica_factories(settings.DB_REPLICA_URLS_LIST),
+    redis_client,
+)
@@ -0,0 +1,469 @@
+"""
+Response cache with ETags for authenticated read endpoints.
+
+GET endpoints opt in with the cache_response decorator on a router using
+CachedRoute. Their 200 JSON responses are cached per user and URL (path and
+query parameters) through two tiers:
+
+1. an in-process TTL LRU (no I/O);
+2. Redis, shared by all nodes (one round trip).
+
+A cached response is served straight from the verified access token, before
+any dependency runs: no principal lookup, no database session. Every
+response carries a strong ETag of its body, and a request whose
+If-None-Match matches it gets an empty 304, so clients re-polling unchanged
+data transfer nothing.
+
+Entries carry tags, the caller's "user:<id>" tag included. Write paths
+invalidate tags, which deletes the tagged entries in Redis and, through a
+pub/sub event, on every node. The short local TTL bounds staleness if an
+event is missed. Each tag has a generation that invalidation bumps; a
+response computed before an invalidation of one of its tags is not cached.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Sequence, Set, Tuple, TypeVar
+from urllib.parse import urlencode
+
+import redis.asyncio as aioredis
+from fastapi import HTTPException, Request, Response, status
+from fastapi.routing import APIRoute
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.redis_pool import blocking_redis_client, redis_client, run_pipeline
+from app.core.security import get_user_id_from_token
+
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_KEY_PREFIX = "cache:response:"
+TAG_KEY_PREFIX = "cache:response_tag:"
+GENERATION_KEY_PREFIX = "cache:response_generation:"
+
+# KEYS[1] response key, then the generation key and the tag set of each
+# tag; ARGV: TTL, response, tag set TTL, then the generation of each tag
+# read before the response was computed. Caches the response unless a tag
+# has been invalidated since.
+SET_SCRIPT = """
+local tags = (#KEYS - 1) / 2
+for i = 1, tags do
+    if (redis.call('GET', KEYS[1 + i]) or '0') ~= ARGV[3 + i] then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[1])
+for i = 1, tags do
+    redis.call('SADD', KEYS[1 + tags + i], KEYS[1])
+    redis.call('EXPIRE', KEYS[1 + tags + i], ARGV[3])
+end
+return 1
+"""
+
+# KEYS: the generation key of each tag, then the tag set of each tag; ARGV:
+# generation TTL. Bumps the generations and deletes the tagged responses and
+# the tag sets.
+INVALIDATE_SCRIPT = """
+local tags = #KEYS / 2
+for i = 1, tags do
+    redis.call('INCR', KEYS[i])
+    redis.call('EXPIRE', KEYS[i], ARGV[1])
+    local keys = redis.call('SMEMBERS', KEYS[tags + i])
+    for first = 1, #keys, 1000 do
+        redis.call('DEL', unpack(keys, first, math.min(first + 999, #keys)))
+    end
+    redis.call('DEL', KEYS[tags + i])
+end
+return 1
+"""
+
+# Redis channel announcing invalidated tags to other nodes
+INVALIDATIONS_CHANNEL = "events:response_cache_invalidated"
+
+# Cache-Control of cached responses: per user, revalidated on every use
+CACHE_CONTROL = "private, no-cache"
+
+requests_total = registry.counter(
+    "golfcoach_response_cache_requests_total",
+    "Cached endpoint requests by route and the tier that served them",
+    labelnames=("route", "source"),
+)
+not_modified_total = registry.counter(
+    "golfcoach_response_cache_not_modified_total",
+    "Cached endpoint requests answered 304 Not Modified",
+    labelnames=("route",),
+)
+
+Endpoint = TypeVar("Endpoint", bound=Callable[..., Any])
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """How an endpoint's responses are cached."""
+
+    ttl_seconds: int
+    tags: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """A cached 200 response."""
+
+    body: bytes
+    media_type: str
+    etag: str
+    tags: Tuple[str, ...]
+
+    def to_json(self) -> str:
+        """Serialize for the Redis tier."""
+        return json.dumps(
+            {
+                "body": self.body.decode(),
+                "media_type": self.media_type,
+                "etag": self.etag,
+                "tags": self.tags,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "CachedResponse":
+        """Deserialize from the Redis tier."""
+        fields: Dict[str, Any] = json.loads(data)
+        return cls(
+            body=fields["body"].encode(),
+            media_type=fields["media_type"],
+            etag=fields["etag"],
+            tags=tuple(fields["tags"]),
+        )
+
+
+def cache_response(
+    ttl_seconds: int = settings.CACHE_TTL_SHORT, tags: Sequence[str] = ()
+) -> Callable[[Endpoint], Endpoint]:
+    """
+    Cache the responses of a GET endpoint on a router using CachedRoute.
+
+    Args:
+        ttl_seconds: Time a response is cached for
+        tags: Tags to invalidate the responses by, formatted with the path
+            parameters and the caller's ID as {user}
+
+    Returns:
+        Decorator marking the endpoint, which is otherwise unchanged
+
+    Usage:
+        @router.get("/{user_id}/stats")
+        @cache_response(settings.CACHE_TTL_MEDIUM, tags=("user:{user}:stats",))
+        async def get_user_statistics(user_id: int, ...): ...
+    """
+
+    def decorate(endpoint: Endpoint) -> Endpoint:
+        endpoint.__response_cache__ = CachePolicy(ttl_seconds, tuple(tags))
+        return endpoint
+
+    return decorate
+
+
+def etag_of(body: bytes) -> str:
+    """
+    Get the strong ETag of a response body.
+
+    Args:
+        body: Response body
+
+    Returns:
+        Quoted entity tag
+    """
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag (weak comparison, RFC 9110).
+
+    Args:
+        if_none_match: If-None-Match header value
+        etag: Current entity tag
+
+    Returns:
+        True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+class ResponseCache:
+    """Two-tier (in-process LRU, Redis) cache of endpoint responses."""
+
+    def __init__(
+        self,
+        redis_client: Optional[aioredis.Redis],
+        local_ttl_seconds: float = settings.RESPONSE_CACHE_LOCAL_TTL_SECONDS,
+        local_max_entries: int = settings.RESPONSE_CACHE_LOCAL_MAX_ENTRIES,
+        blocking_client: Optional[aioredis.Redis] = None,
+    ) -> None:
+        self._redis = redis_client
+        # Blocking reads hold a connection while they wait
+        self._blocking_redis = blocking_client if blocking_client is not None else redis_client
+        self._local_ttl = local_ttl_seconds
+        self._local_max = local_max_entries
+        self._local: OrderedDict[str, Tuple[float, CachedResponse]] = OrderedDict()
+        self._local_tags: Dict[str, Set[str]] = {}
+
+    async def get(self, key: str) -> Tuple[Optional[CachedResponse], str]:
+        """
+        Get a cached response.
+
+        Redis errors count as misses.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Response or None, and the tier that answered ("local", "redis"
+            or "miss")
+        """
+        entry = self._local.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._local.move_to_end(key)
+                return entry[1], "local"
+            self._drop_local(key)
+
+        if self._redis is None:
+            return None, "miss"
+        try:
+            data = await self._redis.get(key)
+        except aioredis.RedisError as exc:
+            logger.warning(f"Response cache unavailable: {exc}")
+            return None, "miss"
+        if not data:
+            return None, "miss"
+        cached = CachedResponse.from_json(data)
+        self._set_local(key, cached, self._local_ttl)
+        return cached, "redis"
+
+    async def generations(self, tags: Sequence[str]) -> Optional[Tuple[str, ...]]:
+        """
+        Get the generations of tags, read before computing a response.
+
+        Args:
+            tags: Tags of the response
+
+        Returns:
+            Generation of each tag, or None if Redis is unavailable
+        """
+        if self._redis is None:
+            return None
+        try:
+            values = await self._redis.mget([f"{GENERATION_KEY_PREFIX}{tag}" for tag in tags])
+        except aioredis.RedisError as exc:
+            logger.warning(f"Response cache unavailable: {exc}")
+            return None
+        return tuple(value or "0" for value in values)
+
+    async def set(
+        self,
+        key: str,
+        cached: CachedResponse,
+        ttl_seconds: int,
+        generations: Optional[Sequence[str]],
+    ) -> None:
+        """
+        Cache a response on this node and in Redis.
+
+        The response is dropped if one of its tags was invalidated after its
+        generations were read.
+
+        Args:
+            key: Cache key
+            cached: Response
+            ttl_seconds: Time the response is cached for
+            generations: Generations of the response's tags from generations(),
+                None to only cache it on this node
+        """
+        if self._redis is not None and generations is not None:
+            tags = cached.tags
+            try:
+                stored = await self._redis.eval(
+                    SET_SCRIPT,
+                    1 + 2 * len(tags),
+                    key,
+                    *(f"{GENERATION_KEY_PREFIX}{tag}" for tag in tags),
+                    *(f"{TAG_KEY_PREFIX}{tag}" for tag in tags),
+                    ttl_seconds,
+                    cached.to_json(),
+                    # Tag sets outlive every entry they index
+                    settings.CACHE_TTL_LONG,
+                    *generations,
+                )
+            except aioredis.RedisError as exc:
+                logger.warning(f"Failed to cache response {key}: {exc}")
+            else:
+                if not stored:
+                    # Stale: computed before an invalidation
+                    return
+        self._set_local(key, cached, min(self._local_ttl, ttl_seconds))
+
+    async def invalidate(self, *tags: str) -> None:
+        """
+        Drop the responses carrying any of the tags, on every node.
+
+        Failures are logged and swallowed: a missed invalidation is bounded
+        by the entries' TTL.
+
+        Args:
+            tags: Tags to invalidate
+        """
+        self.evict(*tags)
+        if self._redis is None:
+            return
+        keys = [
+            *(f"{GENERATION_KEY_PREFIX}{tag}" for tag in tags),
+            *(f"{TAG_KEY_PREFIX}{tag}" for tag in tags),
+        ]
+        try:
+            await run_pipeline(
+                [
+                    # Generations outlive any response computation in flight
+                    ("eval", INVALIDATE_SCRIPT, len(keys), *keys, settings.CACHE_TTL_LONG),
+                    *(("publish", INVALIDATIONS_CHANNEL, tag) for tag in tags),
+                ],
+                client=self._redis,
+            )
+        except aioredis.RedisError as exc:
+            logger.warning(f"Failed to invalidate cached responses tagged {tags}: {exc}")
+
+    def evict(self, *tags: str) -> None:
+        """
+        Drop the responses carrying any of the tags from the in-process tier.
+
+        Args:
+            tags: Tags to evict
+        """
+        for tag in tags:
+            for key in self._local_tags.pop(tag, ()):
+                self._drop_local(key)
+
+    def clear(self) -> None:
+        """Drop all responses from the in-process tier."""
+        self._local.clear()
+        self._local_tags.clear()
+
+    async def listen(self) -> None:
+        """Evict local responses on invalidation events until cancelled."""
+        if self._redis is None:
+            return
+        while True:
+            try:
+                pubsub = self._blocking_redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(INVALIDATIONS_CHANNEL)
+                try:
+                    async for message in pubsub.listen():
+                        self.evict(message["data"])
+                finally:
+                    await pubsub.aclose()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(f"Response cache listener disconnected: {exc}")
+                # Events may have been missed while disconnected
+                self.clear()
+                await asyncio.sleep(5)
+
+    def _set_local(self, key: str, cached: CachedResponse, ttl_seconds: float) -> None:
+        self._drop_local(key)
+        self._local[key] = (time.monotonic() + ttl_seconds, cached)
+        for tag in cached.tags:
+            self._local_tags.setdefault(tag, set()).add(key)
+        while len(self._local) > self._local_max:
+            self._drop_local(next(iter(self._local)))
+
+    def _drop_local(self, key: str) -> None:
+        entry = self._local.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[1].tags:
+            keys = self._local_tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._local_tags[tag]
+
+
+response_cache = ResponseCache(redis_client, blocking_client=blocking_redis_client)
+
+
+class CachedRoute(APIRoute):
+    """APIRoute serving endpoints marked with cache_response from the response cache."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        policy: Optional[CachePolicy] = getattr(self.endpoint, "__response_cache__", None)
+        if policy is None or not settings.RESPONSE_CACHE_ENABLED:
+            return handler
+        route = self.path
+
+        async def cached_handler(request: Request) -> Response:
+            if request.method != "GET":
+                return await handler(request)
+            user_id = _caller_id(request)
+            if user_id is None:
+                # Unauthenticated: the endpoint rejects it
+                return await handler(request)
+
+            query = urlencode(sorted(request.query_params.multi_items()))
+            key = f"{RESPONSE_KEY_PREFIX}{user_id}:{request.url.path}?{query}"
+            if_none_match = request.headers.get("if-none-match")
+
+            cached, source = await response_cache.get(key)
+            requests_total.inc(route=route, source=source)
+            if cached is None:
+                tags = (
+                    f"user:{user_id}",
+                    *(tag.format(user=user_id, **request.path_params) for tag in policy.tags),
+                )
+                generations = await response_cache.generations(tags)
+                response = await handler(request)
+                body = getattr(response, "body", None)
+                if response.status_code != status.HTTP_200_OK or not body:
+                    return response
+                media_type = response.headers.get("content-type", "application/json")
+                cached = CachedResponse(
+                    body=body, media_type=media_type, etag=etag_of(body), tags=tags
+                )
+                await response_cache.set(key, cached, policy.ttl_seconds, generations)
+            else:
+                response = None
+
+            headers = {"ETag": cached.etag, "Cache-Control": CACHE_CONTROL}
+            if etag_matches(if_none_match, cached.etag):
+                not_modified_total.inc(route=route)
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+            if response is None:
+                return Response(content=cached.body, media_type=cached.media_type, headers=headers)
+            response.headers.update(headers)
+            return response
+
+        return cached_handler
+
+
+def _caller_id(request: Request) -> Optional[int]:
+    """Get the user ID of a valid bearer token, without I/O."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return get_user_id_from_token(token)
+    except HTTPException:
+        return None
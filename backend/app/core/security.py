@@ -4,8 +4,9 @@ Security utilities for GolfCoach Pro.
 Handles password hashing, JWT token creation/validation, and OAuth2.
 """
 
+import secrets
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
@@ -14,8 +15,10 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.core.config import settings
 
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing context; hashes with fewer rounds need an update
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
 
 # HTTP Bearer authentication
 bearer_scheme = HTTPBearer()
@@ -25,6 +28,9 @@ bearer_scheme = HTTPBearer()
 # Password Hashing
 # ============================================
 
+# These block for the whole bcrypt computation; async code awaits
+# app.core.password_hashing.password_hasher, which runs them in worker processes
+
 
 def hash_password(password: str) -> str:
     """
@@ -53,11 +59,38 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and rehash it if its hash uses stale parameters.
+
+    Args:
+        plain_password: Plain text password to verify
+        hashed_password: Hashed password to compare against
+
+    Returns:
+        Whether the password matches, and its new hash if the stored one
+        should be replaced
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 # ============================================
 # JWT Token Management
 # ============================================
 
 
+def new_token_id() -> str:
+    """
+    Generate a token ID (jti claim) that revocations refer to.
+
+    Returns:
+        72 random bits, URL-safe base64 encoded (12 characters)
+    """
+    return secrets.token_urlsafe(9)
+
+
 def create_access_token(
     data: Dict[str, Any], expires_delta: Optional[timedelta] = None
 ) -> str:
@@ -80,7 +113,7 @@ def create_access_token(
             minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES
         )
 
-    to_encode.update({"exp": expire, "type": "access"})
+    to_encode.update({"exp": expire, "type": "access", "jti": new_token_id()})
     encoded_jwt = jwt.encode(
         to_encode, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM
     )
@@ -107,7 +140,7 @@ def create_refresh_token(
     else:
         expire = datetime.utcnow() + timedelta(days=settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS)
 
-    to_encode.update({"exp": expire, "type": "refresh"})
+    to_encode.update({"exp": expire, "type": "refresh", "jti": new_token_id()})
     encoded_jwt = jwt.encode(
         to_encode, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM
     )
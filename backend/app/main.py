@@ -6,15 +6,30 @@ Initializes the FastAPI app, middleware, and routes.
 
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import SQLAlchemyError
+import asyncio
 import logging
 
 from app.core.config import settings
 from app.core.database import engine
+from app.core.db_instrumentation import DBInstrumentationMiddleware
+from app.core.metrics import registry
+from app.core.password_hashing import password_hasher
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.redis_pool import close_redis, open_redis
+from app.core.replicas import replica_router
+from app.core.response_cache import response_cache
 from app.models.user import Base
 from app.api.v1 import api_router
+from app.services import ai_coach  # noqa: F401  (registers batch job handlers)
+from app.services.ai_client import ai_client
+from app.services.ai_jobs import ai_job_scheduler
+from app.services.frame_persistence import frame_buffer
+from app.services.principal_cache import principal_cache
+from app.services.session_context import session_contexts
+from app.services.token_revocation import token_revocations
 
 
 # Configure logging
@@ -42,6 +57,15 @@ app = FastAPI(
 )
 
 
+# ============================================
+# Rate Limiting Middleware
+# ============================================
+
+# Added first, so it runs inside CORS and 429 responses carry CORS headers
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
+
 # ============================================
 # CORS Middleware
 # ============================================
@@ -52,9 +76,26 @@ app.add_middleware(
     allow_credentials=settings.CORS_ALLOW_CREDENTIALS,
     allow_methods=settings.CORS_ALLOW_METHODS.split(","),
     allow_headers=settings.CORS_ALLOW_HEADERS.split(","),
+    expose_headers=[
+        "RateLimit-Limit",
+        "RateLimit-Remaining",
+        "RateLimit-Reset",
+        "RateLimit-Policy",
+        "Retry-After",
+        "ETag",
+    ]
+    + (["X-DB-Statements", "X-DB-Time-Ms", "X-DB-Pool-Wait-Ms"] if settings.DEBUG else []),
 )
 
 
+# ============================================
+# Database Instrumentation Middleware
+# ============================================
+
+if settings.DB_INSTRUMENTATION_ENABLED:
+    app.add_middleware(DBInstrumentationMiddleware)
+
+
 # ============================================
 # Exception Handlers
 # ============================================
@@ -174,6 +215,30 @@ async def startup_event() -> None:
     logger.info(f"Debug mode: {settings.DEBUG}")
     logger.info(f"API documentation: {settings.API_BASE_URL}/docs")
 
+    await open_redis()
+
+    # bcrypt runs in worker processes, off the event loop
+    password_hasher.start()
+
+    # Evict cached principals changed on other nodes
+    app.state.principal_listener = asyncio.create_task(principal_cache.listen())
+
+    # Evict cached responses invalidated on other nodes
+    app.state.response_cache_listener = asyncio.create_task(response_cache.listen())
+
+    # Keep the local filter of revoked refresh tokens in sync
+    app.state.revocation_listener = asyncio.create_task(token_revocations.listen())
+
+    if replica_router.enabled:
+        app.state.replica_monitor = asyncio.create_task(replica_router.monitor())
+
+    if settings.FEATURE_REAL_TIME_MODE:
+        app.state.profile_event_listener = asyncio.create_task(session_contexts.listen())
+        frame_buffer.start()
+
+    if settings.AI_BATCH_ENABLED:
+        ai_job_scheduler.start()
+
 
 @app.on_event("shutdown")
 async def shutdown_event() -> None:
@@ -184,6 +249,29 @@ async def shutdown_event() -> None:
     """
     logger.info(f"Shutting down {settings.APP_NAME}")
 
+    for name in (
+        "profile_event_listener",
+        "principal_listener",
+        "response_cache_listener",
+        "revocation_listener",
+        "replica_monitor",
+    ):
+        listener = getattr(app.state, name, None)
+        if listener is not None:
+            listener.cancel()
+
+    # Persist buffered real-time frames before exiting
+    await frame_buffer.close()
+
+    # Queued and submitted AI jobs stay in Redis for the next start
+    await ai_job_scheduler.close()
+    await ai_client.aclose()
+
+    password_hasher.shutdown()
+
+    # Last, after everything that may still write to Redis
+    await close_redis()
+
 
 # ============================================
 # Health Check
@@ -201,6 +289,25 @@ async def simple_health_check() -> dict:
     return {"status": "healthy"}
 
 
+# ============================================
+# Metrics
+# ============================================
+
+if settings.METRICS_ENABLED:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics() -> PlainTextResponse:
+        """
+        Prometheus metrics for this node.
+
+        Returns:
+            Metrics in Prometheus text exposition format
+        """
+        return PlainTextResponse(
+            registry.render(), media_type="text/plain; version=0.0.4"
+        )
+
+
 if __name__ == "__main__":
     import uvicorn
 
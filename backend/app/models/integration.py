@@ -0,0 +1,33 @@
+"""
+SQLAlchemy models for data imported from launch monitors and simulators.
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, JSON
+
+from app.models.user import Base
+
+
+class IntegrationShot(Base):
+    """
+    A shot reported by a third-party device (launch monitor, simulator).
+
+    Stored in the integration_shots TimescaleDB hypertable, partitioned on
+    recorded_at.
+    """
+
+    __tablename__ = "integration_shots"
+    __table_args__ = (
+        # Per-user history across sources without visiting the table
+        Index(
+            "ix_integration_shots_user_recorded_at",
+            "user_id",
+            "recorded_at",
+            postgresql_include=["source", "swing_id"],
+        ),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    source = Column(String(50), primary_key=True)  # e.g. "trackman", "gcquad"
+    recorded_at = Column(DateTime(timezone=True), primary_key=True)
+    swing_id = Column(Integer, nullable=True)
+    shot_data = Column(JSON, nullable=False)  # ball speed, launch angle, spin, ...
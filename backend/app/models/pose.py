@@ -0,0 +1,31 @@
+"""
+SQLAlchemy models for pose time-series data.
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, JSON
+
+from app.models.user import Base
+
+
+class PoseKeypoint(Base):
+    """
+    Per-frame pose landmarks and biomechanics metrics.
+
+    Stored in the pose_keypoints TimescaleDB hypertable, partitioned on
+    recorded_at.
+    """
+
+    __tablename__ = "pose_keypoints"
+    __table_args__ = (
+        # Frames of one swing, in order
+        Index("ix_pose_keypoints_swing_frame", "swing_id", "frame_number"),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    recorded_at = Column(DateTime(timezone=True), primary_key=True)
+    frame_number = Column(Integer, primary_key=True)
+    swing_id = Column(Integer, nullable=True)
+    session_id = Column(String(64), nullable=True)
+    timestamp_ms = Column(Integer, nullable=False)
+    keypoints = Column(JSON, nullable=False)  # 33 landmarks x (x, y, z, visibility)
+    metrics = Column(JSON, nullable=True)
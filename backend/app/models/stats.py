@@ -0,0 +1,43 @@
+"""
+SQLAlchemy models for incrementally maintained swing statistics.
+"""
+
+from sqlalchemy import JSON, Column, Date, DateTime, Float, ForeignKey, Integer
+from sqlalchemy.sql import func
+
+from app.models.user import Base
+
+
+class SwingStatsColumns:
+    """Running sums shared by the daily and all-time rollups."""
+
+    swings_analyzed = Column(Integer, nullable=False, default=0)
+    scored_swings = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0.0)
+    issue_counts = Column(JSON, nullable=False, default=dict)  # fault -> swings
+    metric_sums = Column(JSON, nullable=False, default=dict)  # "phase.metric" -> sum
+    metric_counts = Column(JSON, nullable=False, default=dict)  # "phase.metric" -> samples
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
+
+
+class SwingStatsDaily(SwingStatsColumns, Base):
+    """
+    Per-user, per-day (UTC) rollup of analyzed swings.
+
+    Updated as each analysis completes, so statistics over a period read at
+    most one row per day of the period.
+    """
+
+    __tablename__ = "swing_stats_daily"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+
+
+class SwingStatsTotal(SwingStatsColumns, Base):
+    """Per-user all-time rollup of analyzed swings."""
+
+    __tablename__ = "swing_stats_totals"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    practice_days = Column(Integer, nullable=False, default=0)
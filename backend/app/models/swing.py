@@ -0,0 +1,68 @@
+"""
+SQLAlchemy models for recorded swings and their analyses.
+"""
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Identity,
+    Index,
+    Integer,
+    String,
+    Text,
+    JSON,
+    func,
+)
+
+from app.models.user import Base
+
+
+class Swing(Base):
+    """
+    A recorded swing video and its processing state.
+
+    Stored in the swings TimescaleDB hypertable, partitioned on recorded_at;
+    the primary key includes the partitioning column.
+    """
+
+    __tablename__ = "swings"
+    __table_args__ = (
+        # Per-user history in time order without visiting the table
+        Index(
+            "ix_swings_user_recorded_at",
+            "user_id",
+            "recorded_at",
+            postgresql_include=["status", "club_type"],
+        ),
+    )
+
+    id = Column(Integer, Identity(), primary_key=True)
+    recorded_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    club_type = Column(String(50), nullable=True)
+    intended_shape = Column(String(20), nullable=True)
+    video_url = Column(Text, nullable=True)
+    thumbnail_url = Column(Text, nullable=True)
+    duration_ms = Column(Integer, nullable=True)
+    status = Column(String(20), nullable=False, default="PROCESSING")
+    swing_metadata = Column("metadata", JSON, nullable=True)
+
+
+class SwingAnalysis(Base):
+    """
+    Completed AI coaching analysis of a swing.
+
+    Written once when the analysis completes and never changed; Redis only
+    caches it. swings has a composite primary key (it is a hypertable), so
+    swing_id carries no foreign key.
+    """
+
+    __tablename__ = "swing_analyses"
+
+    swing_id = Column(Integer, primary_key=True)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    analysis = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
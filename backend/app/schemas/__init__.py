@@ -21,6 +21,7 @@ from app.schemas.user import (
     BiometricsAverage,
     LogoutRequest,
 )
+from app.schemas.swing import SwingAnalysisRequest, SwingFrameData
 
 __all__ = [
     "UserBase",
@@ -40,4 +41,6 @@ __all__ = [
     "IssueFrequency",
     "BiometricsAverage",
     "LogoutRequest",
+    "SwingAnalysisRequest",
+    "SwingFrameData",
 ]
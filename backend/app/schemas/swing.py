@@ -0,0 +1,24 @@
+"""
+Pydantic schemas for swing analysis API requests.
+"""
+
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+
+
+class SwingFrameData(BaseModel):
+    """Pose data and biomechanics of one analyzed frame."""
+
+    frame_number: int = Field(..., ge=0)
+    phase: Optional[str] = None
+    metrics: Dict[str, float] = Field(default_factory=dict)
+
+
+class SwingAnalysisRequest(BaseModel):
+    """Schema for requesting an AI coaching analysis of a swing."""
+
+    pose_data: List[SwingFrameData] = Field(..., min_length=1)
+    faults: List[str] = Field(default_factory=list)
+    club: Optional[str] = None
+    intended_shape: Optional[str] = None
+    conditions: Optional[str] = None
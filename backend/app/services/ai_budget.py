@@ -0,0 +1,419 @@
+"""
+Daily AI spend accounting and admission control.
+
+Every model call is priced from its token usage and added atomically to
+per-day totals in Redis: overall, per user tier and per user. Before an
+interactive call, its worst-case cost (estimated input plus max_tokens of
+output) is reserved against AI_DAILY_BUDGET and the user's tier quota, so
+concurrent calls can never overspend; the reservation is settled with the
+actual usage once the call completes.
+
+As spend approaches a limit, work degrades in a fixed order instead of
+failing at random:
+
+1. allow: the requested model is used;
+2. downgrade: past AI_BUDGET_DOWNGRADE_AT of the budget or quota, or when
+   the requested model no longer fits, the cheaper AI_FALLBACK_MODEL is used;
+3. defer: when nothing fits, the work is queued for the batch scheduler,
+   which holds the queue until the next day's budget;
+4. reject: work that cannot be deferred is refused.
+
+Spend, tokens and admissions are exported as metrics, so spend velocity is
+rate(golfcoach_ai_spend_usd_total[5m]).
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.redis_pool import redis_client
+
+
+logger = logging.getLogger(__name__)
+
+SPEND_KEY_PREFIX = "ai:spend:"
+
+# Rough token estimate for pacing and cost reservations
+CHARS_PER_TOKEN = 4
+
+# Costs are kept in Redis as integer micro-dollars so HINCRBY stays exact
+MICRODOLLARS = 1_000_000
+
+# USD per million (input, output) tokens, matched by model ID prefix
+MODEL_PRICING: Mapping[str, Tuple[float, float]] = {
+    "claude-opus-4-5": (5.0, 25.0),
+    "claude-opus-4": (15.0, 75.0),
+    "claude-sonnet-4": (3.0, 15.0),
+    "claude-haiku-4-5": (1.0, 5.0),
+    "claude-3-7-sonnet": (3.0, 15.0),
+    "claude-3-5-sonnet": (3.0, 15.0),
+    "claude-3-5-haiku": (0.8, 4.0),
+    "claude-3-haiku": (0.25, 1.25),
+}
+# Unknown models are priced like the most expensive one
+DEFAULT_PRICING = (15.0, 75.0)
+
+# Message Batches are billed at half the interactive price
+BATCH_DISCOUNT = 0.5
+
+# Spend of the previous day is kept for reporting
+SPEND_TTL_SECONDS = 2 * 24 * 60 * 60
+
+spend_total = registry.counter(
+    "golfcoach_ai_spend_usd_total", "AI spend in USD", labelnames=("tier", "model")
+)
+tokens_total = registry.counter(
+    "golfcoach_ai_tokens_total", "AI tokens used", labelnames=("tier", "direction")
+)
+admissions_total = registry.counter(
+    "golfcoach_ai_admissions_total",
+    "AI calls by admission decision",
+    labelnames=("tier", "action"),
+)
+budget_used = registry.gauge(
+    "golfcoach_ai_budget_used_ratio", "Share of today's AI budget spent or reserved"
+)
+budget_projected = registry.gauge(
+    "golfcoach_ai_budget_projected_ratio",
+    "Share of today's AI budget projected to be spent at the current velocity",
+)
+
+
+def estimate_input_tokens(params: Mapping[str, Any]) -> int:
+    """
+    Estimate the input tokens of a Messages API request.
+
+    Args:
+        params: Messages API parameters
+
+    Returns:
+        Estimated input tokens
+    """
+    size = len(str(params.get("system", "")))
+    for message in params.get("messages", ()):
+        content = message.get("content", "")
+        if isinstance(content, str):
+            size += len(content)
+            continue
+        for block in content:
+            if block.get("type") == "text":
+                size += len(block.get("text", ""))
+            elif block.get("type") == "image":
+                size += 1600 * CHARS_PER_TOKEN  # ~1.6k tokens per image
+    return max(size // CHARS_PER_TOKEN, 1)
+
+
+def price(model: str, input_tokens: int, output_tokens: int, batch: bool = False) -> float:
+    """
+    Price a model call.
+
+    Args:
+        model: Model ID
+        input_tokens: Input tokens
+        output_tokens: Output tokens
+        batch: Whether the call ran through the Message Batches API
+
+    Returns:
+        Cost in USD
+    """
+    input_price, output_price = next(
+        (
+            pricing
+            for prefix, pricing in sorted(MODEL_PRICING.items(), key=lambda item: -len(item[0]))
+            if model.startswith(prefix)
+        ),
+        DEFAULT_PRICING,
+    )
+    cost = (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+    return cost * BATCH_DISCOUNT if batch else cost
+
+
+@dataclass(frozen=True)
+class BudgetAccount:
+    """Who a model call is billed to."""
+
+    user_id: Optional[int] = None
+    tier: str = "system"
+
+
+SYSTEM_ACCOUNT = BudgetAccount()
+
+
+@dataclass(frozen=True)
+class Admission:
+    """Admission decision for a model call."""
+
+    action: str  # "allow", "downgrade", "defer" or "reject"
+    model: str
+    account: BudgetAccount
+    reserved: int = 0  # micro-dollars
+    day: str = ""
+
+    @property
+    def admitted(self) -> bool:
+        """Whether the call may go ahead (with `model`)."""
+        return self.action in ("allow", "downgrade")
+
+
+class AIBudgetExceeded(Exception):
+    """Raised when a model call does not fit today's budget or the user's quota."""
+
+
+class AIBudget:
+    """Redis-backed daily AI spend accounting and admission control."""
+
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        daily_budget: float = settings.AI_DAILY_BUDGET,
+        tier_quotas: Optional[Mapping[str, float]] = None,
+        downgrade_at: float = settings.AI_BUDGET_DOWNGRADE_AT,
+        fallback_model: Optional[str] = settings.AI_FALLBACK_MODEL,
+    ) -> None:
+        self._redis = redis_client
+        self.daily_budget = daily_budget
+        self.tier_quotas = (
+            tier_quotas
+            if tier_quotas is not None
+            else {
+                "free": settings.AI_FREE_DAILY_QUOTA,
+                "pro": settings.AI_PRO_DAILY_QUOTA,
+                "elite": settings.AI_ELITE_DAILY_QUOTA,
+            }
+        )
+        self.downgrade_at = downgrade_at
+        self.fallback_model = fallback_model or None
+
+    async def admit(
+        self,
+        account: BudgetAccount,
+        params: Mapping[str, Any],
+        deferrable: bool = False,
+        batch: bool = False,
+    ) -> Admission:
+        """
+        Decide whether and with which model a call may run, reserving its cost.
+
+        Fails open (allows the call unreserved) if Redis is unavailable.
+
+        Args:
+            account: Account the call is billed to
+            params: Messages API parameters
+            deferrable: Whether the work can be queued for batch processing
+                instead of being rejected
+            batch: Whether the call runs through the Message Batches API,
+                so its cost is reserved at the batch discount
+
+        Returns:
+            Admission decision; admitted calls must be settled with record()
+            or release()
+        """
+        day = self._day()
+        model = params["model"]
+        try:
+            spent, user_spent = await self._committed(day, account)
+            share = spent / max(self._micro(self.daily_budget), 1)
+            quota = self.tier_quotas.get(account.tier)
+            if quota is not None and account.user_id is not None:
+                share = max(share, user_spent / max(self._micro(quota), 1))
+            self._update_gauges(spent)
+
+            candidates = [model]
+            if self.fallback_model and self.fallback_model != model:
+                if share >= self.downgrade_at:
+                    candidates = [self.fallback_model]
+                else:
+                    candidates.append(self.fallback_model)
+
+            for candidate in candidates:
+                cost = self._micro(self._estimate_cost(candidate, params, batch))
+                if await self._reserve(day, account, cost):
+                    action = "allow" if candidate == model else "downgrade"
+                    admissions_total.inc(tier=account.tier, action=action)
+                    return Admission(action, candidate, account, cost, day)
+        except aioredis.RedisError as exc:
+            logger.warning(f"AI budget unavailable, admitting unreserved: {exc}")
+            admissions_total.inc(tier=account.tier, action="allow")
+            return Admission("allow", model, account, 0, day)
+
+        action = "defer" if deferrable else "reject"
+        admissions_total.inc(tier=account.tier, action=action)
+        return Admission(action, model, account, 0, day)
+
+    async def record(
+        self,
+        account: BudgetAccount,
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        admission: Optional[Admission] = None,
+        batch: bool = False,
+    ) -> float:
+        """
+        Add the usage of a completed call to today's totals.
+
+        Args:
+            account: Account the call is billed to
+            model: Model that served the call
+            input_tokens: Input tokens used
+            output_tokens: Output tokens used
+            admission: Admission of the call, whose reservation is released
+            batch: Whether the call ran through the Message Batches API
+
+        Returns:
+            Cost in USD
+        """
+        cost = price(model, input_tokens, output_tokens, batch)
+        micro = self._micro(cost)
+        day = self._day()
+        spend_total.inc(cost, tier=account.tier, model=model)
+        tokens_total.inc(input_tokens, tier=account.tier, direction="input")
+        tokens_total.inc(output_tokens, tier=account.tier, direction="output")
+
+        async with self._redis.pipeline(transaction=True) as pipe:
+            for key in self._keys(day, account):
+                pipe.hincrby(key, "spent", micro)
+                pipe.hincrby(key, "input_tokens", input_tokens)
+                pipe.hincrby(key, "output_tokens", output_tokens)
+                pipe.hincrby(key, "calls", 1)
+                pipe.expire(key, SPEND_TTL_SECONDS)
+            if admission is not None and admission.reserved:
+                for key in self._limit_keys(admission.day, admission.account):
+                    pipe.hincrby(key, "reserved", -admission.reserved)
+            await pipe.execute()
+
+        spent, _ = await self._committed(day, account)
+        self._update_gauges(spent)
+        return cost
+
+    async def release(self, admission: Optional[Admission]) -> None:
+        """
+        Release the reservation of a call that failed or was not made.
+
+        Args:
+            admission: Admission of the call
+        """
+        if admission is None or not admission.reserved:
+            return
+        async with self._redis.pipeline(transaction=True) as pipe:
+            for key in self._limit_keys(admission.day, admission.account):
+                pipe.hincrby(key, "reserved", -admission.reserved)
+            await pipe.execute()
+
+    async def exhausted(self) -> bool:
+        """
+        Whether today's budget is fully spent or reserved.
+
+        Returns:
+            True if no further spend fits the budget
+        """
+        spent, _ = await self._committed(self._day(), SYSTEM_ACCOUNT)
+        return spent >= self._micro(self.daily_budget)
+
+    async def usage(self, day: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Get the spend totals of a day, overall and per tier.
+
+        Args:
+            day: UTC date (YYYY-MM-DD), defaults to today
+
+        Returns:
+            "total" and tier name -> spent_usd, reserved_usd, input_tokens,
+            output_tokens and calls
+        """
+        day = day or self._day()
+        prefix = f"{SPEND_KEY_PREFIX}{day}"
+        keys = {"total": prefix, **{tier: f"{prefix}:tier:{tier}" for tier in self.tier_quotas}}
+        usage = {}
+        for name, key in keys.items():
+            values = {
+                field: int(value) for field, value in (await self._redis.hgetall(key)).items()
+            }
+            usage[name] = {
+                "spent_usd": values.get("spent", 0) / MICRODOLLARS,
+                "reserved_usd": values.get("reserved", 0) / MICRODOLLARS,
+                "input_tokens": values.get("input_tokens", 0),
+                "output_tokens": values.get("output_tokens", 0),
+                "calls": values.get("calls", 0),
+            }
+        return usage
+
+    async def _committed(self, day: str, account: BudgetAccount) -> Tuple[int, int]:
+        """Spent plus reserved micro-dollars of the day, overall and for the user."""
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.hmget(f"{SPEND_KEY_PREFIX}{day}", "spent", "reserved")
+            pipe.hmget(self._user_key(day, account), "spent", "reserved")
+            total, user = await pipe.execute()
+        return (
+            sum(int(value or 0) for value in total),
+            sum(int(value or 0) for value in user),
+        )
+
+    async def _reserve(self, day: str, account: BudgetAccount, cost: int) -> bool:
+        """Atomically reserve `cost`, undoing it if a limit would be exceeded."""
+        keys = self._limit_keys(day, account)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            for key in keys:
+                pipe.hincrby(key, "reserved", cost)
+                pipe.hget(key, "spent")
+                pipe.expire(key, SPEND_TTL_SECONDS)
+            results = await pipe.execute()
+
+        limits = [self._micro(self.daily_budget)]
+        quota = self.tier_quotas.get(account.tier)
+        if quota is not None and len(keys) > 1:
+            limits.append(self._micro(quota))
+        fits = all(
+            int(results[index * 3]) + int(results[index * 3 + 1] or 0) <= limit
+            for index, limit in enumerate(limits)
+        )
+        if not fits:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                for key in keys:
+                    pipe.hincrby(key, "reserved", -cost)
+                await pipe.execute()
+        return fits
+
+    def _estimate_cost(self, model: str, params: Mapping[str, Any], batch: bool = False) -> float:
+        """Worst-case cost of a call: estimated input and max_tokens of output."""
+        output_tokens = params.get("max_tokens", settings.CLAUDE_MAX_TOKENS)
+        return price(model, estimate_input_tokens(params), output_tokens, batch)
+
+    def _keys(self, day: str, account: BudgetAccount) -> Tuple[str, ...]:
+        """Keys whose totals a call is added to: overall, tier and user."""
+        tier_key = f"{SPEND_KEY_PREFIX}{day}:tier:{account.tier}"
+        return (f"{SPEND_KEY_PREFIX}{day}", tier_key) + self._limit_keys(day, account)[1:]
+
+    def _limit_keys(self, day: str, account: BudgetAccount) -> Tuple[str, ...]:
+        """Keys whose totals are limited: overall and, for users, the user's."""
+        total_key = f"{SPEND_KEY_PREFIX}{day}"
+        if account.user_id is None:
+            return (total_key,)
+        return (total_key, self._user_key(day, account))
+
+    def _user_key(self, day: str, account: BudgetAccount) -> str:
+        return f"{SPEND_KEY_PREFIX}{day}:user:{account.user_id}"
+
+    def _update_gauges(self, spent: int) -> None:
+        used = spent / max(self._micro(self.daily_budget), 1)
+        budget_used.set(used)
+        elapsed = (time.time() % 86400) / 86400
+        budget_projected.set(used / max(elapsed, 1 / 24))
+
+    @staticmethod
+    def _micro(usd: float) -> int:
+        return int(round(usd * MICRODOLLARS))
+
+    @staticmethod
+    def _day() -> str:
+        return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+ai_budget = AIBudget(redis_client)
@@ -0,0 +1,512 @@
+"""
+Shared async client for the Anthropic API.
+
+All model calls in a process go through one AIClient, which:
+
+- reuses a pooled HTTP/TLS connection pool instead of a client per request;
+- bounds concurrency per lane in the process ("interactive" for user-facing
+  calls, "batch" for background work) and cluster-wide with a Redis lease
+  semaphore, so peak traffic queues instead of turning into 429 storms;
+- paces requests and input tokens with token buckets sized below the
+  provider rate limits, and pauses them when the provider returns
+  retry-after;
+- retries rate limits, overloads, 5xx and connection errors with
+  exponential backoff and full jitter;
+- optionally hedges non-streaming calls: if a call has not finished after
+  AI_HEDGE_AFTER_SECONDS a second one is started and the first response
+  wins; the losing call is billed by the provider, so it is charged too;
+- records the token usage and cost of every completed call in the daily AI
+  budget, settling the reservation made when the call was admitted.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import anthropic
+import httpx
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.redis_pool import redis_client
+from app.services.ai_budget import (
+    SYSTEM_ACCOUNT,
+    AIBudget,
+    Admission,
+    ai_budget,
+    estimate_input_tokens,
+)
+
+
+logger = logging.getLogger(__name__)
+
+SEMAPHORE_KEY = "ai:semaphore"
+
+RETRYABLE_ERRORS = (
+    anthropic.RateLimitError,
+    anthropic.InternalServerError,
+    anthropic.APIConnectionError,
+)
+
+requests_total = registry.counter(
+    "golfcoach_ai_requests_total", "Model API calls by outcome", labelnames=("lane", "outcome")
+)
+request_duration = registry.histogram(
+    "golfcoach_ai_request_duration_seconds",
+    "Model API call latency, including admission and retries",
+    labelnames=("lane",),
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 60.0, 120.0),
+)
+admission_wait = registry.histogram(
+    "golfcoach_ai_admission_wait_seconds",
+    "Time model calls wait for concurrency slots and rate-limit tokens",
+    labelnames=("lane",),
+)
+retries_total = registry.counter(
+    "golfcoach_ai_retries_total", "Retried model API calls", labelnames=("reason",)
+)
+hedges_total = registry.counter(
+    "golfcoach_ai_hedges_total", "Hedged model API calls", labelnames=("winner",)
+)
+inflight = registry.gauge(
+    "golfcoach_ai_inflight_requests", "Model API calls in flight", labelnames=("lane",)
+)
+
+
+class TokenBucket:
+    """Async token bucket for pacing against a per-minute limit."""
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else max(per_minute / 6.0, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """
+        Wait until `amount` tokens are available and take them.
+
+        Requests larger than the bucket capacity are admitted once the
+        bucket is full, so they can never wait forever.
+
+        Args:
+            amount: Tokens to take
+        """
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stop admitting requests for a while (provider asked to back off).
+
+        Args:
+            seconds: Pause duration
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+
+class RedisSemaphore:
+    """
+    Cluster-wide counting semaphore with expiring leases.
+
+    Leases are members of a sorted set scored by acquisition time; a lease
+    is held if it ranks below the limit once expired leases are pruned, so
+    slots of crashed processes are reclaimed after lease_seconds.
+    """
+
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        limit: int,
+        key: str = SEMAPHORE_KEY,
+        lease_seconds: float = 300.0,
+        poll_seconds: float = 0.05,
+    ) -> None:
+        self._redis = redis_client
+        self.limit = limit
+        self._key = key
+        self._lease_seconds = lease_seconds
+        self._poll_seconds = poll_seconds
+
+    async def try_acquire(self) -> Optional[str]:
+        """
+        Try to take a slot.
+
+        Returns:
+            Lease ID, or None if all slots are taken
+        """
+        lease = uuid.uuid4().hex
+        now = time.time()
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(self._key, "-inf", now - self._lease_seconds)
+            pipe.zadd(self._key, {lease: now})
+            pipe.zrank(self._key, lease)
+            pipe.expire(self._key, int(self._lease_seconds))
+            _, _, rank, _ = await pipe.execute()
+        if rank is not None and rank < self.limit:
+            return lease
+        await self._redis.zrem(self._key, lease)
+        return None
+
+    async def acquire(self) -> Optional[str]:
+        """
+        Wait for a slot.
+
+        Fails open (returns None without waiting) if Redis is unavailable,
+        leaving only the per-process limits in force.
+
+        Returns:
+            Lease ID to release, or None if no lease was taken
+        """
+        delay = self._poll_seconds
+        while True:
+            try:
+                lease = await self.try_acquire()
+            except aioredis.RedisError as exc:
+                logger.warning(f"AI cluster semaphore unavailable: {exc}")
+                return None
+            if lease is not None:
+                return lease
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, 1.0)
+
+    async def release(self, lease: Optional[str]) -> None:
+        """
+        Give back a slot.
+
+        Args:
+            lease: Lease ID returned by acquire
+        """
+        if lease is None:
+            return
+        try:
+            await self._redis.zrem(self._key, lease)
+        except aioredis.RedisError as exc:
+            logger.warning(f"Failed to release AI semaphore lease: {exc}")
+
+
+class AIClient:
+    """Pooled, concurrency-limited, paced Anthropic API client."""
+
+    def __init__(
+        self,
+        redis_client: Optional[aioredis.Redis] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        base_url: Optional[str] = None,
+        lane_limits: Optional[Dict[str, int]] = None,
+        cluster_concurrency: int = settings.AI_CLUSTER_CONCURRENCY,
+        requests_per_minute: float = settings.AI_REQUESTS_PER_MINUTE,
+        input_tokens_per_minute: float = settings.AI_INPUT_TOKENS_PER_MINUTE,
+        max_retries: int = settings.AI_MAX_RETRIES,
+        retry_base_seconds: float = settings.AI_RETRY_BASE_SECONDS,
+        retry_max_seconds: float = settings.AI_RETRY_MAX_SECONDS,
+        hedge_after_seconds: float = settings.AI_HEDGE_AFTER_SECONDS,
+        budget: Optional[AIBudget] = None,
+    ) -> None:
+        self._http_client = http_client
+        self._base_url = base_url
+        self._client: Optional[anthropic.AsyncAnthropic] = None
+        lane_limits = lane_limits or {
+            "interactive": settings.AI_INTERACTIVE_CONCURRENCY,
+            "batch": settings.AI_BATCH_LOCAL_CONCURRENCY,
+        }
+        self._lanes = {lane: asyncio.Semaphore(limit) for lane, limit in lane_limits.items()}
+        self._cluster = (
+            RedisSemaphore(redis_client, cluster_concurrency) if redis_client is not None else None
+        )
+        self._requests = TokenBucket(requests_per_minute)
+        self._input_tokens = TokenBucket(input_tokens_per_minute)
+        self._max_retries = max_retries
+        self._retry_base = retry_base_seconds
+        self._retry_max = retry_max_seconds
+        self.hedge_after = hedge_after_seconds
+        self.budget = budget
+
+    @property
+    def client(self) -> anthropic.AsyncAnthropic:
+        """Underlying SDK client on the shared connection pool, created on first use."""
+        if self._client is None:
+            http_client = self._http_client or httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.AI_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.AI_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=60.0,
+                ),
+                timeout=httpx.Timeout(settings.AI_REQUEST_TIMEOUT_SECONDS, connect=10.0),
+            )
+            self._client = anthropic.AsyncAnthropic(
+                api_key=settings.ANTHROPIC_API_KEY,
+                base_url=self._base_url,
+                http_client=http_client,
+                max_retries=0,  # retried here, with pacing and jitter
+            )
+        return self._client
+
+    async def create_message(
+        self,
+        lane: str = "interactive",
+        hedge: Optional[bool] = None,
+        admission: Optional[Admission] = None,
+        **params: Any,
+    ) -> anthropic.types.Message:
+        """
+        Create a message.
+
+        Args:
+            lane: Concurrency lane ("interactive" or "batch")
+            hedge: Whether to hedge the call, defaults to hedging
+                interactive calls when AI_HEDGE_AFTER_SECONDS is set
+            admission: Budget admission of the call; calls without one are
+                billed to the system account
+            **params: Messages API parameters
+
+        Returns:
+            Model response
+
+        Raises:
+            anthropic.APIError: If the call fails after retries
+        """
+        if hedge is None:
+            hedge = lane == "interactive"
+        start = time.monotonic()
+        try:
+            if hedge and self.hedge_after > 0:
+                message = await self._hedged(lane, params, admission)
+            else:
+                message = await self._with_retries(lane, params)
+        except Exception:
+            requests_total.inc(lane=lane, outcome="error")
+            await self._release(admission)
+            raise
+        finally:
+            request_duration.observe(time.monotonic() - start, lane=lane)
+        requests_total.inc(lane=lane, outcome="success")
+        await self._record(admission, message)
+        return message
+
+    async def stream_text(
+        self, lane: str = "interactive", admission: Optional[Admission] = None, **params: Any
+    ) -> AsyncIterator[str]:
+        """
+        Stream the text of a message as it is generated.
+
+        Failures before the first output are retried; later failures are
+        raised, since the caller has already consumed part of the output.
+
+        Args:
+            lane: Concurrency lane ("interactive" or "batch")
+            admission: Budget admission of the call; calls without one are
+                billed to the system account
+            **params: Messages API parameters
+
+        Yields:
+            Text deltas
+
+        Raises:
+            anthropic.APIError: If the call fails
+        """
+        start = time.monotonic()
+        attempt = 0
+        outcome = "cancelled"
+        try:
+            while True:
+                received = False
+                try:
+                    async with self._admit(lane, params):
+                        async with self.client.messages.stream(**params) as stream:
+                            async for text in stream.text_stream:
+                                received = True
+                                yield text
+                            message = await stream.get_final_message()
+                    outcome = "success"
+                    await self._record(admission, message)
+                    return
+                except RETRYABLE_ERRORS as exc:
+                    if received or attempt >= self._max_retries:
+                        raise
+                    await self._backoff(attempt, exc)
+                    attempt += 1
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            if outcome != "success":
+                await self._release(admission)
+            requests_total.inc(lane=lane, outcome=outcome)
+            request_duration.observe(time.monotonic() - start, lane=lane)
+
+    async def aclose(self) -> None:
+        """Close the connection pool."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    @asynccontextmanager
+    async def _admit(self, lane: str, params: Dict[str, Any]) -> AsyncIterator[None]:
+        """Hold a lane slot and a cluster slot, and take rate-limit tokens."""
+        start = time.monotonic()
+        async with self._lanes[lane]:
+            lease = await self._cluster.acquire() if self._cluster is not None else None
+            try:
+                await self._requests.acquire()
+                await self._input_tokens.acquire(estimate_input_tokens(params))
+                admission_wait.observe(time.monotonic() - start, lane=lane)
+                inflight.inc(lane=lane)
+                try:
+                    yield
+                finally:
+                    inflight.dec(lane=lane)
+            finally:
+                if self._cluster is not None:
+                    await self._cluster.release(lease)
+
+    async def _attempt(self, lane: str, params: Dict[str, Any]) -> anthropic.types.Message:
+        async with self._admit(lane, params):
+            return await self.client.messages.create(**params)
+
+    async def _with_retries(self, lane: str, params: Dict[str, Any]) -> anthropic.types.Message:
+        attempt = 0
+        while True:
+            try:
+                return await self._attempt(lane, params)
+            except RETRYABLE_ERRORS as exc:
+                if attempt >= self._max_retries:
+                    raise
+                await self._backoff(attempt, exc)
+                attempt += 1
+
+    async def _hedged(
+        self, lane: str, params: Dict[str, Any], admission: Optional[Admission] = None
+    ) -> anthropic.types.Message:
+        primary = asyncio.create_task(self._with_retries(lane, params))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        if done:
+            return primary.result()
+
+        hedge = asyncio.create_task(self._with_retries(lane, params))
+        tasks = {primary, hedge}
+        try:
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        hedges_total.inc(winner="primary" if task is primary else "hedge")
+                        await self._record_loser(
+                            admission, task.result(), hedge if task is primary else primary
+                        )
+                        return task.result()
+            # Both failed; surface the primary's error
+            return primary.result()
+        finally:
+            for task in (primary, hedge):
+                if not task.done():
+                    task.cancel()
+
+    async def _backoff(self, attempt: int, exc: Exception) -> None:
+        """Sleep before a retry, honoring retry-after from the provider."""
+        retry_after = None
+        if isinstance(exc, anthropic.APIStatusError):
+            header = exc.response.headers.get("retry-after")
+            try:
+                retry_after = float(header) if header is not None else None
+            except ValueError:
+                retry_after = None
+
+        if isinstance(exc, anthropic.RateLimitError):
+            reason = "rate_limited"
+            # Everyone in this process backs off, not just this call
+            pause = retry_after if retry_after is not None else self._retry_base
+            self._requests.pause(pause)
+        elif isinstance(exc, anthropic.APIConnectionError):
+            reason = "connection"
+        else:
+            reason = "server_error"
+        retries_total.inc(reason=reason)
+
+        delay = random.uniform(0, min(self._retry_max, self._retry_base * 2**attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        await asyncio.sleep(delay)
+
+    async def _record(
+        self, admission: Optional[Admission], message: anthropic.types.Message
+    ) -> None:
+        """Add the usage of a completed call to the budget."""
+        if self.budget is None:
+            return
+        try:
+            await self.budget.record(
+                admission.account if admission is not None else SYSTEM_ACCOUNT,
+                message.model,
+                message.usage.input_tokens,
+                message.usage.output_tokens,
+                admission,
+            )
+        except aioredis.RedisError as exc:
+            logger.warning(f"Failed to record AI usage: {exc}")
+
+    async def _record_loser(
+        self,
+        admission: Optional[Admission],
+        winner: anthropic.types.Message,
+        loser: asyncio.Task,
+    ) -> None:
+        """Charge the losing call of a hedge, outside the winner's reservation."""
+        if self.budget is None:
+            return
+        if not loser.done():
+            # Cancelled mid-generation: charged like the winner, which had
+            # the same input and produced a complete response
+            message = winner
+        elif not loser.cancelled() and loser.exception() is None:
+            message = loser.result()
+        else:
+            # Failed calls are not billed
+            return
+        try:
+            await self.budget.record(
+                admission.account if admission is not None else SYSTEM_ACCOUNT,
+                message.model,
+                message.usage.input_tokens,
+                message.usage.output_tokens,
+            )
+        except aioredis.RedisError as exc:
+            logger.warning(f"Failed to record AI usage of a hedged call: {exc}")
+
+    async def _release(self, admission: Optional[Admission]) -> None:
+        """Release the budget reservation of a failed call."""
+        if self.budget is None:
+            return
+        try:
+            await self.budget.release(admission)
+        except aioredis.RedisError as exc:
+            logger.warning(f"Failed to release AI budget reservation: {exc}")
+
+
+ai_client = AIClient(
+    redis_client, budget=ai_budget
+)
@@ -0,0 +1,545 @@
+"""
+AI coaching service.
+
+Produces structured coaching feedback for a swing with Claude. Analyses are
+served from the similar-swing cache when a close enough swing has already
+been analyzed, and the model is only called on a miss. Model calls are
+admitted against the daily AI budget: they may be routed to the fallback
+model, deferred to the batch scheduler or refused as the budget runs out.
+A swing has at most one deferred analysis queued; its result is stored as
+the swing's analysis and ends the swing's analysis stream (with an error
+if the job fails). Completed analyses are added to the user's statistics
+rollups.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import re
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.redis_pool import redis_client
+from app.services.ai_budget import Admission, AIBudget, AIBudgetExceeded, BudgetAccount, ai_budget
+from app.services.ai_client import AIClient, ai_client
+from app.services.ai_jobs import AIJob, AIJobScheduler, ai_job_scheduler
+from app.services.analysis_cache import KEY_PHASES, SimilarSwingCache, SwingFingerprint
+from app.services.analysis_stream import analysis_streams
+from app.services.prompt_builder import prompt_builder
+from app.services.stats_service import UserStatsService, user_stats
+
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever prompts or the output format change, so cached analyses
+# produced with an older prompt are no longer served.
+PROMPT_VERSION = "2"
+
+analysis_duration = registry.histogram(
+    "golfcoach_ai_analysis_duration_seconds",
+    "Coaching analysis latency",
+    labelnames=("source",),
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 60.0),
+)
+
+
+class AIParsingError(Exception):
+    """Raised when the model response is not valid analysis JSON."""
+
+
+class AICoachService:
+    """Service for AI coaching analyses."""
+
+    def __init__(
+        self,
+        cache: Optional[SimilarSwingCache] = None,
+        ai: AIClient = ai_client,
+        budget: Optional[AIBudget] = ai_budget,
+        scheduler: Optional[AIJobScheduler] = ai_job_scheduler,
+        stats: Optional[UserStatsService] = user_stats,
+    ) -> None:
+        self.cache = cache
+        self.ai = ai
+        self.budget = budget
+        self.scheduler = scheduler
+        self.stats = stats
+        self.model = settings.CLAUDE_MODEL
+
+    async def analyze_swing(
+        self,
+        frames: List[bytes],
+        pose_data: List[Dict],
+        user_context: Dict,
+        faults: Sequence[str] = (),
+        swing_id: Optional[int] = None,
+    ) -> Dict:
+        """
+        Analyze a golf swing.
+
+        Args:
+            frames: Key frame images (JPEG bytes)
+            pose_data: Per-frame pose data with "phase" and "metrics"
+            user_context: User profile (handicap, goals, history)
+            faults: Faults detected by the rule engine
+            swing_id: Swing the analysis is stored for if it is deferred
+
+        Returns:
+            Structured analysis with coaching feedback; analyses served from
+            the cache carry a "cache" entry describing the match. When the
+            budget is exhausted and batching is enabled, {"status":
+            "deferred", "job_id": ...} for the queued analysis instead,
+            also while an analysis of the swing is already queued
+
+        Raises:
+            AIParsingError: If the model response cannot be parsed
+            AIBudgetExceeded: If the budget is exhausted and the analysis
+                cannot be deferred
+        """
+        start = time.monotonic()
+        biomechanics = self._calculate_biomechanics(pose_data)
+
+        fingerprint, cached = await self._lookup(biomechanics, faults, user_context)
+        if cached is not None:
+            analysis_duration.observe(time.monotonic() - start, source="cache")
+            await self._record(user_context.get("user_id"), cached, biomechanics, faults)
+            return cached
+
+        if self._mock_enabled:
+            analysis = self._mock_analysis(faults)
+            source = "mock"
+        else:
+            job_id = await self._queued_job(swing_id)
+            if job_id is not None:
+                return {"status": "deferred", "job_id": job_id}
+            params = self._request_params(frames, biomechanics, user_context, faults)
+            admission = await self._admit(params, user_context)
+            if not admission.admitted:
+                job_id = await self._defer(params, biomechanics, user_context, faults, swing_id)
+                analysis_duration.observe(time.monotonic() - start, source="deferred")
+                return {"status": "deferred", "job_id": job_id}
+            response = await self.ai.create_message(admission=admission, **params)
+            analysis = self._parse_response(response.content[0].text)
+            source = "model"
+
+        await self._store(fingerprint, analysis, biomechanics)
+        analysis_duration.observe(time.monotonic() - start, source=source)
+        await self._record(user_context.get("user_id"), analysis, biomechanics, faults)
+        return analysis
+
+    async def stream_swing_analysis(
+        self,
+        frames: List[bytes],
+        pose_data: List[Dict],
+        user_context: Dict,
+        faults: Sequence[str] = (),
+        swing_id: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Analyze a golf swing, yielding model output as it is generated.
+
+        Args:
+            frames: Key frame images (JPEG bytes)
+            pose_data: Per-frame pose data with "phase" and "metrics"
+            user_context: User profile (handicap, goals, history)
+            faults: Faults detected by the rule engine
+            swing_id: Swing the analysis is stored for if it is deferred
+
+        Yields:
+            ("delta", text) for each chunk of model output, then
+            ("result", analysis) once the full response is parsed; cache
+            hits only yield the result. When the budget is exhausted and
+            batching is enabled, or an analysis of the swing is already
+            queued, only ("deferred", {"job_id": ...})
+
+        Raises:
+            AIParsingError: If the model response cannot be parsed
+            AIBudgetExceeded: If the budget is exhausted and the analysis
+                cannot be deferred
+        """
+        start = time.monotonic()
+        biomechanics = self._calculate_biomechanics(pose_data)
+
+        fingerprint, cached = await self._lookup(biomechanics, faults, user_context)
+        if cached is not None:
+            analysis_duration.observe(time.monotonic() - start, source="cache")
+            await self._record(user_context.get("user_id"), cached, biomechanics, faults)
+            yield "result", cached
+            return
+
+        chunks: List[str] = []
+        if self._mock_enabled:
+            source = "mock"
+            text = json.dumps(self._mock_analysis(faults))
+            for offset in range(0, len(text), 64):
+                chunks.append(text[offset : offset + 64])
+                yield "delta", chunks[-1]
+        else:
+            source = "model"
+            job_id = await self._queued_job(swing_id)
+            if job_id is not None:
+                yield "deferred", {"job_id": job_id}
+                return
+            params = self._request_params(frames, biomechanics, user_context, faults)
+            admission = await self._admit(params, user_context)
+            if not admission.admitted:
+                job_id = await self._defer(params, biomechanics, user_context, faults, swing_id)
+                analysis_duration.observe(time.monotonic() - start, source="deferred")
+                yield "deferred", {"job_id": job_id}
+                return
+            async for text in self.ai.stream_text(admission=admission, **params):
+                chunks.append(text)
+                yield "delta", text
+
+        analysis = self._parse_response("".join(chunks))
+        await self._store(fingerprint, analysis, biomechanics)
+        analysis_duration.observe(time.monotonic() - start, source=source)
+        await self._record(user_context.get("user_id"), analysis, biomechanics, faults)
+        yield "result", analysis
+
+    async def enqueue_analysis(
+        self,
+        scheduler: AIJobScheduler,
+        frames: List[bytes],
+        pose_data: List[Dict],
+        user_context: Dict,
+        faults: Sequence[str] = (),
+        kind: str = "reanalysis",
+    ) -> str:
+        """
+        Queue a non-urgent analysis for the next batch.
+
+        The result is cached like an interactive analysis and stored as the
+        job result.
+
+        Args:
+            scheduler: AI job scheduler
+            frames: Key frame images (JPEG bytes)
+            pose_data: Per-frame pose data with "phase" and "metrics"
+            user_context: User profile (handicap, goals, history)
+            faults: Faults detected by the rule engine
+            kind: Job kind ("reanalysis" or "rescore")
+
+        Returns:
+            Job ID
+        """
+        biomechanics = self._calculate_biomechanics(pose_data)
+        params = self._request_params(frames, biomechanics, user_context, faults)
+        return await self._enqueue(scheduler, params, biomechanics, user_context, faults, kind)
+
+    async def handle_batch_result(self, job: AIJob, text: str) -> Dict:
+        """
+        Parse and cache the response to a batched analysis.
+
+        Analyses deferred from interactive requests are also added to the
+        user's statistics, and analyses of a swing are stored as its
+        analysis and end its analysis stream.
+
+        Args:
+            job: Completed analysis job
+            text: Model response text
+
+        Returns:
+            Analysis
+
+        Raises:
+            AIParsingError: If the response cannot be parsed
+        """
+        analysis = self._parse_response(text)
+        biomechanics = job.metadata.get("biomechanics", {})
+        fingerprint = None
+        if self.cache is not None and settings.AI_CACHE_ENABLED:
+            fingerprint = SwingFingerprint(
+                biomechanics,
+                job.metadata.get("faults", ()),
+                job.metadata.get("handicap"),
+                PROMPT_VERSION,
+            )
+        await self._store(fingerprint, analysis, biomechanics)
+        user_id = job.metadata.get("user_id")
+        swing_id = job.metadata.get("swing_id")
+        if swing_id is not None and user_id is not None:
+            await analysis_streams.publish_result(str(swing_id), user_id, analysis)
+        if job.metadata.get("interactive"):
+            await self._record(user_id, analysis, biomechanics, job.metadata.get("faults", ()))
+        return analysis
+
+    async def handle_batch_failure(self, job: AIJob, error: Optional[str]) -> None:
+        """
+        End the analysis stream of a swing whose batched analysis failed.
+
+        Args:
+            job: Failed analysis job
+            error: Error of the last attempt
+        """
+        swing_id = job.metadata.get("swing_id")
+        if swing_id is not None:
+            await analysis_streams.publish_error(str(swing_id), error or "Analysis failed")
+
+    @property
+    def _mock_enabled(self) -> bool:
+        return settings.MOCK_AI_IN_TESTS and settings.APP_ENV == "test"
+
+    async def _admit(self, params: Dict, user_context: Dict) -> Admission:
+        """Admit a model call against the budget, switching to the admitted model."""
+        account = BudgetAccount(user_context.get("user_id"), user_context.get("tier") or "free")
+        if self.budget is None:
+            return Admission("allow", params["model"], account)
+
+        deferrable = settings.AI_BATCH_ENABLED and self.scheduler is not None
+        admission = await self.budget.admit(account, params, deferrable=deferrable)
+        if admission.action == "reject":
+            raise AIBudgetExceeded("Daily AI analysis budget reached, please try again tomorrow")
+        params["model"] = admission.model
+        return admission
+
+    async def _defer(
+        self,
+        params: Dict,
+        biomechanics: Dict[str, Dict[str, float]],
+        user_context: Dict,
+        faults: Sequence[str],
+        swing_id: Optional[int],
+    ) -> str:
+        """Queue an analysis that did not fit the budget for the batch scheduler."""
+        return await self._enqueue(
+            self.scheduler, params, biomechanics, user_context, faults, "reanalysis", True, swing_id
+        )
+
+    async def _queued_job(self, swing_id: Optional[int]) -> Optional[str]:
+        """Get the deferred analysis of a swing still waiting for its batch."""
+        if swing_id is None or self.scheduler is None or not settings.AI_BATCH_ENABLED:
+            return None
+        return await self.scheduler.unfinished_job(f"analysis:{swing_id}")
+
+    async def _enqueue(
+        self,
+        scheduler: AIJobScheduler,
+        params: Dict,
+        biomechanics: Dict[str, Dict[str, float]],
+        user_context: Dict,
+        faults: Sequence[str],
+        kind: str,
+        interactive: bool = False,
+        swing_id: Optional[int] = None,
+    ) -> str:
+        job = AIJob(
+            kind=kind,
+            params=params,
+            metadata={
+                "biomechanics": biomechanics,
+                "faults": list(faults),
+                "handicap": user_context.get("handicap"),
+                "user_id": user_context.get("user_id"),
+                "tier": user_context.get("tier"),
+                "interactive": interactive,
+                "swing_id": swing_id,
+            },
+        )
+        dedupe_key = f"analysis:{swing_id}" if swing_id is not None else None
+        return await scheduler.enqueue(job, dedupe_key)
+
+    async def _record(
+        self,
+        user_id: Optional[int],
+        analysis: Dict,
+        biomechanics: Dict[str, Dict[str, float]],
+        faults: Sequence[str],
+    ) -> None:
+        """Add a completed analysis to the user's statistics."""
+        if self.stats is not None and user_id is not None:
+            await self.stats.record_analysis(user_id, analysis, biomechanics, faults)
+
+    async def _lookup(
+        self,
+        biomechanics: Dict[str, Dict[str, float]],
+        faults: Sequence[str],
+        user_context: Dict,
+    ) -> Tuple[Optional[SwingFingerprint], Optional[Dict]]:
+        """Look up a cached analysis for the swing."""
+        if self.cache is None or not settings.AI_CACHE_ENABLED:
+            return None, None
+
+        fingerprint = SwingFingerprint(
+            biomechanics, faults, user_context.get("handicap"), PROMPT_VERSION
+        )
+        hit = await self.cache.lookup(fingerprint)
+        if hit is None:
+            return fingerprint, None
+
+        analysis = hit.analysis
+        # Measurements always describe this swing, even when the coaching
+        # text comes from a similar one.
+        analysis["biomechanics"] = biomechanics
+        analysis["cache"] = {"match": "exact" if hit.exact else "similar", "distance": hit.distance}
+        return fingerprint, analysis
+
+    async def _store(
+        self,
+        fingerprint: Optional[SwingFingerprint],
+        analysis: Dict,
+        biomechanics: Dict[str, Dict[str, float]],
+    ) -> None:
+        """Attach measurements to a fresh analysis and cache it."""
+        analysis["biomechanics"] = biomechanics
+        if fingerprint is not None:
+            await self.cache.store(fingerprint, analysis)
+
+    def _request_params(
+        self,
+        frames: List[bytes],
+        biomechanics: Dict[str, Dict[str, float]],
+        user_context: Dict,
+        faults: Sequence[str],
+    ) -> Dict:
+        """Build Messages API parameters for an analysis."""
+        content = [
+            {
+                "type": "text",
+                "text": self._build_analysis_prompt(biomechanics, user_context, faults),
+            },
+            *[
+                {
+                    "type": "image",
+                    "source": {
+                        "type": "base64",
+                        "media_type": "image/jpeg",
+                        "data": base64.b64encode(frame).decode(),
+                    },
+                }
+                for frame in frames
+            ],
+        ]
+        return {
+            "model": self.model,
+            "max_tokens": settings.CLAUDE_MAX_TOKENS,
+            "temperature": settings.CLAUDE_TEMPERATURE,
+            "system": self._build_system_prompt(user_context),
+            "messages": [{"role": "user", "content": content}],
+        }
+
+    def _calculate_biomechanics(self, pose_data: List[Dict]) -> Dict[str, Dict[str, float]]:
+        """Get the metrics of the first frame of each key phase."""
+        biomechanics: Dict[str, Dict[str, float]] = {}
+        for frame in pose_data:
+            phase = frame.get("phase")
+            if phase in KEY_PHASES and phase not in biomechanics:
+                biomechanics[phase] = dict(frame.get("metrics") or {})
+        return biomechanics
+
+    def _build_system_prompt(self, user_context: Dict) -> str:
+        """Build personalized system prompt."""
+        return f"""You are a PGA Master Professional with 30 years of experience
+coaching tour players.
+
+GOLFER PROFILE:
+- Name: {user_context.get('name', 'Golfer')}
+- Handicap: {user_context.get('handicap', 'Unknown')}
+- Primary miss: {user_context.get('primary_miss', 'Unknown')}
+- Current goal: {user_context.get('current_goal', 'Improve overall game')}
+- Physical limitations: {user_context.get('limitations', 'None noted')}
+- Learning style: {user_context.get('learning_style', 'visual')}
+
+YOUR TASK:
+Provide professional, actionable coaching feedback as if you were coaching
+this golfer one-on-one. Be specific, encouraging, and prioritize the most
+impactful changes.
+
+OUTPUT FORMAT:
+Return a JSON object with the following structure:
+{{
+  "swing_phases": [
+    {{
+      "phase": "address|takeaway|backswing|transition|downswing|impact|follow_through|finish",
+      "frame_number": int,
+      "observations": ["list of technical observations"],
+      "quality_score": float (0-10)
+    }}
+  ],
+  "technical_analysis": {{
+    "positives": ["list of things done well"],
+    "issues": [
+      {{
+        "issue": "description of the problem",
+        "severity": "critical|major|minor",
+        "impact": "how this affects ball flight",
+        "biomechanical_cause": "root cause"
+      }}
+    ]
+  }},
+  "recommendations": [
+    {{
+      "priority": int (1-5, 1=highest),
+      "change": "what to change",
+      "why": "why this matters",
+      "how": "how to practice this",
+      "drill_id": int | null,
+      "expected_improvement": "what will improve"
+    }}
+  ],
+  "overall_feedback": "2-3 sentence summary",
+  "coaching_cues": ["list of feel-based swing thoughts"]
+}}"""
+
+    def _build_analysis_prompt(
+        self,
+        biomechanics: Dict[str, Dict[str, float]],
+        user_context: Dict,
+        faults: Sequence[str],
+    ) -> str:
+        """Build analysis request prompt within the prompt token budget."""
+        prompt = prompt_builder.build(
+            biomechanics, faults, user_context, user_context.get("baselines")
+        )
+        return prompt.text
+
+    def _parse_response(self, response_text: str) -> Dict:
+        """Parse the model's JSON response."""
+        try:
+            # Extract JSON from response (may be wrapped in markdown)
+            json_match = re.search(r"```json\s*(\{.*\})\s*```", response_text, re.DOTALL)
+            if json_match:
+                return json.loads(json_match.group(1))
+            return json.loads(response_text)
+        except json.JSONDecodeError as exc:
+            # The response may quote the golfer's profile, so it is only
+            # logged in full at debug level
+            logger.error(f"Failed to parse AI response ({len(response_text)} chars): {exc}")
+            logger.debug(f"Unparseable AI response: {response_text}")
+            raise AIParsingError("Could not parse AI response") from exc
+
+    def _mock_analysis(self, faults: Sequence[str]) -> Dict:
+        """Deterministic analysis used instead of the model in tests."""
+        return {
+            "swing_phases": [],
+            "technical_analysis": {
+                "positives": ["Balanced finish"],
+                "issues": [
+                    {
+                        "issue": fault,
+                        "severity": "major",
+                        "impact": "Inconsistent ball flight",
+                        "biomechanical_cause": fault,
+                    }
+                    for fault in sorted(set(faults))
+                ],
+            },
+            "recommendations": [],
+            "overall_feedback": "Mock analysis.",
+            "coaching_cues": [],
+        }
+
+
+ai_coach = AICoachService(
+    cache=SimilarSwingCache(redis_client)
+)
+ai_job_scheduler.register_handler(
+    "reanalysis", ai_coach.handle_batch_result, on_failure=ai_coach.handle_batch_failure
+)
+ai_job_scheduler.register_handler(
+    "rescore", ai_coach.handle_batch_result, on_failure=ai_coach.handle_batch_failure
+)
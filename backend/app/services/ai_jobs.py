@@ -0,0 +1,551 @@
+"""
+Batched AI jobs for non-urgent analysis work.
+
+Nightly reanalysis, trend summaries and re-scoring after prompt upgrades do
+not need interactive latency. Instead of competing with live traffic for
+rate limits, they are queued in Redis and submitted together through a batch
+interface: Anthropic Message Batches (half the price of interactive calls)
+or, for development, a local stand-in that works through the batch on the
+AI client's small "batch" concurrency lane. The scheduler polls submitted batches and fans
+each result out to the handler registered for the job kind. The cost of
+each job is reserved against the daily AI budget when its batch is
+submitted; jobs that do not fit the budget, or their user's quota, stay
+queued for a later batch.
+
+A scheduler claims an ended batch by moving its record from the submitted
+batches to the claimed ones, and deletes it only once every result has been
+stored, so a scheduler stopping mid-batch does not lose it: claims older
+than AI_BATCH_CLAIM_TIMEOUT_SECONDS are taken over by another scheduler.
+Local batches run in the process that submitted them, so other nodes leave
+them alone until they are that old.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Protocol, Tuple
+
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.redis_pool import redis_client
+from app.services.ai_budget import SYSTEM_ACCOUNT, AIBudget, Admission, BudgetAccount, ai_budget
+from app.services.ai_client import AIClient, ai_client
+
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "ai:jobs:pending"
+BATCHES_KEY = "ai:jobs:batches"
+CLAIMED_KEY = "ai:jobs:batches:claimed"
+RESULT_KEY_PREFIX = "ai:jobs:result:"
+DEDUPE_KEY_PREFIX = "ai:jobs:dedupe:"
+
+# KEYS[1] source hash, KEYS[2] destination hash; ARGV: field, value read,
+# new value. Moves the field if it still holds the value read, so exactly
+# one scheduler claims a batch.
+CLAIM_SCRIPT = """
+if redis.call('HGET', KEYS[1], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('HDEL', KEYS[1], ARGV[1])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[3])
+return 1
+"""
+
+jobs_total = registry.counter(
+    "golfcoach_ai_jobs_total", "Batched AI jobs by outcome", labelnames=("kind", "status")
+)
+pending_jobs = registry.gauge(
+    "golfcoach_ai_jobs_pending", "Batched AI jobs waiting to be submitted"
+)
+batch_turnaround = registry.histogram(
+    "golfcoach_ai_batch_turnaround_seconds",
+    "Time from batch submission to results",
+    buckets=(60.0, 300.0, 900.0, 1800.0, 3600.0, 7200.0, 14400.0, 43200.0, 86400.0),
+)
+
+# (job, response text) -> result to store
+JobHandler = Callable[["AIJob", str], Awaitable[Optional[dict]]]
+# (job, error) called once a job has failed for good
+FailureHandler = Callable[["AIJob", Optional[str]], Awaitable[None]]
+
+
+@dataclass
+class AIJob:
+    """A non-urgent model request."""
+
+    kind: str
+    params: dict  # Messages API parameters (model, max_tokens, system, messages, ...)
+    metadata: dict = field(default_factory=dict)
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.time)
+    # Budget reservation made when the job was submitted (micro-dollars)
+    reserved: int = 0
+    reserved_day: str = ""
+
+    def to_json(self) -> str:
+        """Serialize for the Redis queue."""
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, data: str) -> "AIJob":
+        """Deserialize from the Redis queue."""
+        return cls(**json.loads(data))
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    """Outcome of one job in a batch."""
+
+    job_id: str
+    succeeded: bool
+    text: Optional[str] = None
+    error: Optional[str] = None
+    # Usage billed through the batch API; None when already recorded by the AI client
+    model: Optional[str] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+class BatchBackend(Protocol):
+    """Interface for submitting batches of model requests."""
+
+    # Whether requests are billed at the Message Batches discount
+    batch_pricing: bool
+
+    async def submit(self, requests: List[Tuple[str, dict]]) -> str:
+        """Submit (job ID, params) pairs and return the batch ID."""
+
+    def owns(self, batch_id: str) -> bool:
+        """Whether this process can follow a batch until it ends."""
+
+    async def is_ended(self, batch_id: str) -> bool:
+        """Whether processing of a batch has finished."""
+
+    def results(self, batch_id: str) -> AsyncIterator[BatchResult]:
+        """Iterate over the results of an ended batch."""
+
+
+class AnthropicBatchBackend:
+    """Batch backend using the Anthropic Message Batches API."""
+
+    batch_pricing = True
+
+    def __init__(self, ai: AIClient = ai_client) -> None:
+        self._ai = ai
+
+    async def submit(self, requests: List[Tuple[str, dict]]) -> str:
+        batch = await self._ai.client.beta.messages.batches.create(
+            requests=[{"custom_id": job_id, "params": params} for job_id, params in requests]
+        )
+        return batch.id
+
+    def owns(self, batch_id: str) -> bool:
+        # Batches live in the API, so any node can follow them
+        return True
+
+    async def is_ended(self, batch_id: str) -> bool:
+        batch = await self._ai.client.beta.messages.batches.retrieve(batch_id)
+        return batch.processing_status == "ended"
+
+    async def results(self, batch_id: str) -> AsyncIterator[BatchResult]:
+        async for entry in await self._ai.client.beta.messages.batches.results(batch_id):
+            result = entry.result
+            if result.type == "succeeded":
+                message = result.message
+                yield BatchResult(
+                    entry.custom_id,
+                    True,
+                    text=message.content[0].text,
+                    model=message.model,
+                    input_tokens=message.usage.input_tokens,
+                    output_tokens=message.usage.output_tokens,
+                )
+            else:
+                error = getattr(result, "error", None)
+                yield BatchResult(entry.custom_id, False, error=str(error or result.type))
+
+
+class LocalBatchBackend:
+    """
+    In-process stand-in for the batch API.
+
+    Requests are sent as individual calls on the AI client's batch lane, so
+    they never take interactive capacity. Batches only live as long as the
+    process, and their IDs carry the process's node ID.
+    """
+
+    # Billed as interactive calls, by the AI client
+    batch_pricing = False
+
+    def __init__(
+        self,
+        call: Optional[Callable[[dict], Awaitable[str]]] = None,
+        ai: AIClient = ai_client,
+    ) -> None:
+        self._call = call or self._create_message
+        self._ai = ai
+        self._batches: Dict[str, asyncio.Future] = {}
+        self.node_id = uuid.uuid4().hex[:12]
+
+    async def submit(self, requests: List[Tuple[str, dict]]) -> str:
+        batch_id = f"local_{self.node_id}_{uuid.uuid4().hex}"
+        self._batches[batch_id] = asyncio.gather(
+            *(self._run(job_id, params) for job_id, params in requests)
+        )
+        return batch_id
+
+    def owns(self, batch_id: str) -> bool:
+        return batch_id.startswith(f"local_{self.node_id}_")
+
+    async def is_ended(self, batch_id: str) -> bool:
+        # Batches of other processes, or already collected, have no results here
+        task = self._batches.get(batch_id)
+        return task is None or task.done()
+
+    async def results(self, batch_id: str) -> AsyncIterator[BatchResult]:
+        task = self._batches.pop(batch_id, None)
+        if task is None:
+            return
+        for result in await task:
+            yield result
+
+    async def _run(self, job_id: str, params: dict) -> BatchResult:
+        try:
+            return BatchResult(job_id, True, text=await self._call(params))
+        except Exception as exc:
+            return BatchResult(job_id, False, error=str(exc))
+
+    async def _create_message(self, params: dict) -> str:
+        response = await self._ai.create_message(lane="batch", **params)
+        return response.content[0].text
+
+
+class AIJobScheduler:
+    """Accumulates non-urgent AI jobs and runs them through a batch backend."""
+
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        backend: BatchBackend,
+        max_batch_size: int = settings.AI_BATCH_MAX_REQUESTS,
+        flush_interval_seconds: float = settings.AI_BATCH_FLUSH_INTERVAL_SECONDS,
+        poll_interval_seconds: float = settings.AI_BATCH_POLL_INTERVAL_SECONDS,
+        max_attempts: int = 3,
+        budget: Optional[AIBudget] = None,
+        claim_timeout_seconds: float = settings.AI_BATCH_CLAIM_TIMEOUT_SECONDS,
+    ) -> None:
+        self._redis = redis_client
+        self.backend = backend
+        self.budget = budget
+        self._max_batch_size = max_batch_size
+        self._flush_interval = flush_interval_seconds
+        self._poll_interval = poll_interval_seconds
+        self._max_attempts = max_attempts
+        self._claim_timeout = claim_timeout_seconds
+        self._handlers: Dict[str, JobHandler] = {}
+        self._failure_handlers: Dict[str, FailureHandler] = {}
+        self._last_submit = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+    def register_handler(
+        self, kind: str, handler: JobHandler, on_failure: Optional[FailureHandler] = None
+    ) -> None:
+        """
+        Register the handler that stores results of a job kind.
+
+        Args:
+            kind: Job kind
+            handler: Coroutine called with the job and the response text;
+                its return value is stored as the job result
+            on_failure: Coroutine called with the job and the error once a
+                job has run out of attempts or its handler failed
+        """
+        self._handlers[kind] = handler
+        if on_failure is not None:
+            self._failure_handlers[kind] = on_failure
+
+    async def enqueue(self, job: AIJob, dedupe_key: Optional[str] = None) -> str:
+        """
+        Queue a job for the next batch.
+
+        Args:
+            job: Job to queue
+            dedupe_key: Identity of the work; while a job with the same key
+                is unfinished, it is returned instead of queueing another
+
+        Returns:
+            Job ID (of the unfinished job with the same key, if any)
+        """
+        if dedupe_key is not None:
+            existing = await self.unfinished_job(dedupe_key)
+            if existing is not None:
+                jobs_total.inc(kind=job.kind, status="deduplicated")
+                return existing
+            await self._redis.set(
+                f"{DEDUPE_KEY_PREFIX}{dedupe_key}",
+                job.job_id,
+                ex=settings.AI_BATCH_RESULT_TTL_SECONDS,
+            )
+        await self._redis.rpush(PENDING_KEY, job.to_json())
+        jobs_total.inc(kind=job.kind, status="enqueued")
+        return job.job_id
+
+    async def unfinished_job(self, dedupe_key: str) -> Optional[str]:
+        """
+        Find the queued or running job of a piece of work.
+
+        Args:
+            dedupe_key: Identity the job was queued with
+
+        Returns:
+            Job ID, or None if no job is queued or running for it
+        """
+        job_id = await self._redis.get(f"{DEDUPE_KEY_PREFIX}{dedupe_key}")
+        if job_id is None or await self.get_result(job_id) is not None:
+            return None
+        return job_id
+
+    async def get_result(self, job_id: str) -> Optional[dict]:
+        """
+        Get the stored outcome of a job.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            {"status": "succeeded"|"failed", ...}, or None if not finished
+        """
+        data = await self._redis.get(f"{RESULT_KEY_PREFIX}{job_id}")
+        return json.loads(data) if data else None
+
+    async def submit_pending(self) -> Optional[str]:
+        """
+        Submit up to max_batch_size queued jobs as one batch.
+
+        The cost of each job is reserved against the AI budget (possibly
+        with the fallback model); jobs that do not fit go back to the end of
+        the queue.
+
+        Returns:
+            Batch ID, or None if no queued job fits the AI budget
+        """
+        if self.budget is not None and await self.budget.exhausted():
+            return None
+
+        entries = await self._redis.lpop(PENDING_KEY, self._max_batch_size)
+        if not entries:
+            return None
+
+        admitted: List[Tuple[str, AIJob]] = []
+        held = []
+        for entry in entries:
+            job = AIJob.from_json(entry)
+            if await self._reserve(job):
+                admitted.append((entry, job))
+            else:
+                held.append(entry)
+        if held:
+            await self._redis.rpush(PENDING_KEY, *held)
+        if not admitted:
+            return None
+
+        jobs = [job for _, job in admitted]
+        try:
+            batch_id = await self.backend.submit([(job.job_id, job.params) for job in jobs])
+        except Exception:
+            logger.exception(f"Failed to submit batch of {len(jobs)} AI jobs")
+            for job in jobs:
+                await self._release(job)
+            await self._redis.lpush(PENDING_KEY, *reversed([entry for entry, _ in admitted]))
+            return None
+
+        record = {"submitted_at": time.time(), "jobs": [asdict(job) for job in jobs]}
+        await self._redis.hset(BATCHES_KEY, batch_id, json.dumps(record))
+        self._last_submit = time.monotonic()
+        return batch_id
+
+    async def poll(self) -> int:
+        """
+        Collect the results of ended batches.
+
+        Returns:
+            Number of jobs completed
+        """
+        completed = 0
+        now = time.time()
+        for batch_id, data in (await self._redis.hgetall(BATCHES_KEY)).items():
+            record = json.loads(data)
+            # Another node's local batch is only taken over once its
+            # submitter has had ample time to collect it
+            orphaned = now - record["submitted_at"] >= self._claim_timeout
+            if not (self.backend.owns(batch_id) or orphaned):
+                continue
+            if not await self.backend.is_ended(batch_id):
+                continue
+            if await self._claim(BATCHES_KEY, batch_id, data, now):
+                batch_turnaround.observe(now - record["submitted_at"])
+                completed += await self._collect(batch_id, record)
+
+        # Batches whose scheduler stopped before storing all results
+        for batch_id, data in (await self._redis.hgetall(CLAIMED_KEY)).items():
+            record = json.loads(data)
+            if now - record["claimed_at"] < self._claim_timeout:
+                continue
+            if await self._claim(CLAIMED_KEY, batch_id, data, now):
+                logger.warning(f"Taking over AI batch {batch_id} claimed by a stopped scheduler")
+                completed += await self._collect(batch_id, record, resumed=True)
+        return completed
+
+    async def run(self) -> None:
+        """Submit and poll batches until cancelled."""
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            try:
+                queued = await self._redis.llen(PENDING_KEY)
+                pending_jobs.set(queued)
+                flush_due = time.monotonic() - self._last_submit >= self._flush_interval
+                while queued >= self._max_batch_size or (queued and flush_due):
+                    if await self.submit_pending() is None:
+                        break
+                    queued = await self._redis.llen(PENDING_KEY)
+                    flush_due = False
+                await self.poll()
+            except Exception:
+                logger.exception("AI job scheduler tick failed")
+
+    def start(self) -> None:
+        """Start the scheduler on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def close(self) -> None:
+        """Stop the scheduler; queued and submitted jobs stay in Redis."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _claim(self, key: str, batch_id: str, data: str, now: float) -> bool:
+        claimed = json.dumps({**json.loads(data), "claimed_at": now})
+        return bool(
+            await self._redis.eval(CLAIM_SCRIPT, 2, key, CLAIMED_KEY, batch_id, data, claimed)
+        )
+
+    async def _collect(self, batch_id: str, record: dict, resumed: bool = False) -> int:
+        """Complete every job of a claimed batch, then release the claim."""
+        completed = 0
+        jobs = {job["job_id"]: AIJob(**job) for job in record["jobs"]}
+        async for result in self.backend.results(batch_id):
+            job = jobs.pop(result.job_id, None)
+            if job is not None and not (resumed and await self.get_result(job.job_id)):
+                await self._complete(job, result)
+                completed += 1
+        # Jobs the backend returned no result for are retried
+        for job in jobs.values():
+            if not (resumed and await self.get_result(job.job_id)):
+                await self._complete(job, BatchResult(job.job_id, False, error="missing"))
+        await self._redis.hdel(CLAIMED_KEY, batch_id)
+        return completed
+
+    async def _complete(self, job: AIJob, result: BatchResult) -> None:
+        if not result.succeeded:
+            await self._release(job)
+            job.attempts += 1
+            if job.attempts < self._max_attempts:
+                await self._redis.rpush(PENDING_KEY, job.to_json())
+                jobs_total.inc(kind=job.kind, status="retried")
+                return
+            logger.warning(f"AI job {job.job_id} ({job.kind}) failed: {result.error}")
+            await self._fail(job, result.error)
+            return
+
+        if self.budget is not None and result.model is not None:
+            await self.budget.record(
+                self._account(job),
+                result.model,
+                result.input_tokens,
+                result.output_tokens,
+                admission=self._admission(job),
+                batch=True,
+            )
+        else:
+            # Usage already recorded by the AI client
+            await self._release(job)
+
+        handler = self._handlers.get(job.kind)
+        try:
+            stored = await handler(job, result.text) if handler else {"text": result.text}
+        except Exception as exc:
+            logger.exception(f"Handler for AI job {job.job_id} ({job.kind}) failed")
+            await self._fail(job, str(exc))
+            return
+
+        await self._store(job, {"status": "succeeded", "result": stored})
+        jobs_total.inc(kind=job.kind, status="succeeded")
+
+    async def _fail(self, job: AIJob, error: Optional[str]) -> None:
+        await self._store(job, {"status": "failed", "error": error})
+        jobs_total.inc(kind=job.kind, status="failed")
+        on_failure = self._failure_handlers.get(job.kind)
+        if on_failure is not None:
+            try:
+                await on_failure(job, error)
+            except Exception:
+                logger.exception(f"Failure handler for AI job {job.job_id} ({job.kind}) failed")
+
+    async def _reserve(self, job: AIJob) -> bool:
+        """Reserve the cost of a job, switching it to the admitted model."""
+        if self.budget is None:
+            return True
+        admission = await self.budget.admit(
+            self._account(job), job.params, deferrable=True, batch=self.backend.batch_pricing
+        )
+        if not admission.admitted:
+            return False
+        job.params["model"] = admission.model
+        job.reserved, job.reserved_day = admission.reserved, admission.day
+        return True
+
+    async def _release(self, job: AIJob) -> None:
+        """Release the reservation of a job that did not complete or was billed elsewhere."""
+        if self.budget is not None and job.reserved:
+            await self.budget.release(self._admission(job))
+        job.reserved = 0
+
+    def _admission(self, job: AIJob) -> Admission:
+        return Admission(
+            "allow", job.params["model"], self._account(job), job.reserved, job.reserved_day
+        )
+
+    @staticmethod
+    def _account(job: AIJob) -> BudgetAccount:
+        user_id = job.metadata.get("user_id")
+        if user_id is None:
+            return SYSTEM_ACCOUNT
+        return BudgetAccount(user_id, job.metadata.get("tier") or "free")
+
+    async def _store(self, job: AIJob, outcome: dict) -> None:
+        await self._redis.setex(
+            f"{RESULT_KEY_PREFIX}{job.job_id}",
+            settings.AI_BATCH_RESULT_TTL_SECONDS,
+            json.dumps(outcome),
+        )
+
+
+ai_job_scheduler = AIJobScheduler(
+    redis_client,
+    AnthropicBatchBackend() if settings.AI_BATCH_BACKEND == "anthropic" else LocalBatchBackend(),
+    budget=ai_budget,
+)
@@ -0,0 +1,241 @@
+"""
+Similarity-keyed cache for AI coaching analyses.
+
+Many amateur swings share near-identical fault profiles, so a coaching
+analysis can be reused for a close match instead of calling the model.
+Swings are fingerprinted by their quantized key-phase biomechanics, their
+detected faults, the golfer's handicap band and the prompt version. An exact
+fingerprint match is served directly; otherwise the closest fingerprint in the
+same bucket (same faults, handicap band and prompt version) is served if it
+is within AI_CACHE_MAX_DISTANCE quantization steps. Swings without any
+key-phase metrics are not cached, as they cannot be told apart.
+
+The cache is an optimization: when Redis is unavailable lookups miss and
+stores are skipped, so coaching falls back to the model.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Iterable, Mapping, Optional
+
+import numpy as np
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.services.error_detector import BIOMECHANICS_METRICS
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = "cache:similar_swings:"
+INDEX_KEY_PREFIX = "cache:similar_swings:index:"
+
+# Swing positions the fingerprint is taken from
+KEY_PHASES = ("address", "top_of_backswing", "impact")
+
+# Quantization step per metric (degrees, or cm for sway)
+QUANTIZATION_STEPS: Mapping[str, float] = {
+    "spine_angle": 2.0,
+    "spine_angle_loss": 2.0,
+    "hip_rotation": 5.0,
+    "shoulder_turn": 5.0,
+    "x_factor": 5.0,
+    "shoulder_plane_angle": 2.0,
+    "head_sway_cm": 2.0,
+    "lead_arm_angle": 5.0,
+    "knee_flex": 5.0,
+}
+
+# Upper bounds of handicap bands; golfers in one band get comparable coaching
+HANDICAP_BANDS = (5.0, 10.0, 18.0, 28.0)
+
+cache_requests = registry.counter(
+    "golfcoach_ai_cache_requests_total",
+    "Similar-swing analysis cache lookups",
+    labelnames=("result",),
+)
+cache_lookup_duration = registry.histogram(
+    "golfcoach_ai_cache_lookup_duration_seconds", "Similar-swing analysis cache lookup latency"
+)
+
+
+def handicap_band(handicap: Optional[float]) -> str:
+    """
+    Get the handicap band of a golfer.
+
+    Args:
+        handicap: Handicap index, or None if unknown
+
+    Returns:
+        Band label (e.g. "band2"), "unknown" if no handicap
+    """
+    if handicap is None:
+        return "unknown"
+    for index, upper in enumerate(HANDICAP_BANDS):
+        if handicap < upper:
+            return f"band{index}"
+    return f"band{len(HANDICAP_BANDS)}"
+
+
+def _digest(value: str) -> str:
+    return hashlib.blake2b(value.encode(), digest_size=12).hexdigest()
+
+
+class SwingFingerprint:
+    """Quantized description of a swing used as a cache key."""
+
+    def __init__(
+        self,
+        biomechanics: Mapping[str, Mapping[str, float]],
+        faults: Iterable[str],
+        handicap: Optional[float],
+        prompt_version: str,
+    ) -> None:
+        """
+        Args:
+            biomechanics: Key phase -> metric name -> value
+            faults: Detected fault identifiers
+            handicap: Golfer's handicap
+            prompt_version: Version of the prompt the analysis was produced with
+        """
+        values = []
+        present = []
+        for phase in KEY_PHASES:
+            phase_metrics = biomechanics.get(phase, {})
+            for metric in BIOMECHANICS_METRICS:
+                value = phase_metrics.get(metric)
+                present.append(value is not None)
+                values.append(0.0 if value is None else round(value / QUANTIZATION_STEPS[metric]))
+
+        self.vector = np.array(values, dtype=np.float32)
+        # Without metrics every swing would quantize to the same vector
+        self.measured = any(present)
+        presence = "".join("1" if flag else "0" for flag in present)
+        fault_set = ",".join(sorted(set(faults)))
+        self.bucket = (
+            f"{prompt_version}:{handicap_band(handicap)}:{_digest(fault_set + '|' + presence)}"
+        )
+        self.digest = _digest(self.vector.tobytes().hex())
+
+    @property
+    def key(self) -> str:
+        """Redis key of the analysis cached for this exact fingerprint."""
+        return f"{CACHE_KEY_PREFIX}{self.bucket}:{self.digest}"
+
+    @property
+    def index_key(self) -> str:
+        """Redis key of the bucket's fingerprint index."""
+        return f"{INDEX_KEY_PREFIX}{self.bucket}"
+
+
+@dataclass(frozen=True)
+class CacheHit:
+    """Cached analysis served for a fingerprint."""
+
+    analysis: dict
+    distance: float
+
+    @property
+    def exact(self) -> bool:
+        """Whether the cached analysis is for an identical fingerprint."""
+        return self.distance == 0.0
+
+
+class SimilarSwingCache:
+    """Redis-backed cache of coaching analyses keyed by swing similarity."""
+
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        max_distance: float = settings.AI_CACHE_MAX_DISTANCE,
+        ttl_seconds: int = settings.AI_CACHE_TTL_SECONDS,
+        max_bucket_entries: int = settings.AI_CACHE_MAX_BUCKET_ENTRIES,
+    ) -> None:
+        self._redis = redis_client
+        self.max_distance = max_distance
+        self._ttl = ttl_seconds
+        self._max_bucket_entries = max_bucket_entries
+
+    async def lookup(self, fingerprint: SwingFingerprint) -> Optional[CacheHit]:
+        """
+        Find a cached analysis for an identical or close swing.
+
+        Args:
+            fingerprint: Fingerprint of the swing being analyzed
+
+        Returns:
+            Cache hit, or None if no close enough analysis is cached, the
+            swing has no metrics or Redis is unavailable
+        """
+        if not fingerprint.measured:
+            cache_requests.inc(result="unmeasured")
+            return None
+
+        start = time.monotonic()
+        try:
+            cached = await self._redis.get(fingerprint.key)
+            if cached is not None:
+                cache_requests.inc(result="exact")
+                return CacheHit(json.loads(cached), 0.0)
+
+            hit = await self._nearest(fingerprint) if self.max_distance > 0 else None
+            cache_requests.inc(result="similar" if hit else "miss")
+            return hit
+        except aioredis.RedisError as exc:
+            logger.warning(f"Similar-swing cache unavailable: {exc}")
+            cache_requests.inc(result="error")
+            return None
+        finally:
+            cache_lookup_duration.observe(time.monotonic() - start)
+
+    async def store(self, fingerprint: SwingFingerprint, analysis: dict) -> None:
+        """
+        Cache an analysis produced by the model.
+
+        Analyses of swings without metrics are not cached.
+
+        Args:
+            fingerprint: Fingerprint of the analyzed swing
+            analysis: Analysis to cache
+        """
+        if not fingerprint.measured:
+            return
+        try:
+            await self._redis.setex(fingerprint.key, self._ttl, json.dumps(analysis))
+            if await self._redis.hlen(fingerprint.index_key) < self._max_bucket_entries:
+                await self._redis.hset(
+                    fingerprint.index_key,
+                    fingerprint.digest,
+                    json.dumps(fingerprint.vector.tolist()),
+                )
+                await self._redis.expire(fingerprint.index_key, self._ttl)
+        except aioredis.RedisError as exc:
+            logger.warning(f"Failed to cache analysis: {exc}")
+
+    async def _nearest(self, fingerprint: SwingFingerprint) -> Optional[CacheHit]:
+        index = await self._redis.hgetall(fingerprint.index_key)
+        if not index:
+            return None
+
+        digests = list(index)
+        vectors = np.array([json.loads(index[digest]) for digest in digests], dtype=np.float32)
+        distances = np.linalg.norm(vectors - fingerprint.vector, axis=1)
+
+        for position in np.argsort(distances):
+            distance = float(distances[position])
+            if distance > self.max_distance:
+                break
+            digest = digests[position]
+            cached = await self._redis.get(f"{CACHE_KEY_PREFIX}{fingerprint.bucket}:{digest}")
+            if cached is not None:
+                return CacheHit(json.loads(cached), distance)
+            # The analysis expired before its index entry
+            await self._redis.hdel(fingerprint.index_key, digest)
+
+        return None
@@ -0,0 +1,357 @@
+"""
+Resumable streaming of coaching analyses.
+
+Model output is generated by a background task that is detached from the
+client connection and appended to a Redis stream per swing. Clients tail the
+stream as Server-Sent Events; every event carries its stream entry ID, so a
+client that disconnects resumes from its last received ID (Last-Event-ID)
+on any node, and the model call is never repeated or cut short. The parsed
+analysis is stored in the database when generation completes; Redis caches
+it for CACHE_TTL_LONG, and it is read back from the database after that.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+import redis.asyncio as aioredis
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import registry
+from app.core.redis_pool import blocking_redis_client, redis_client, run_pipeline
+from app.models.swing import SwingAnalysis
+from app.services.stats_service import analysis_score
+from app.utils.singleflight import SingleFlight
+
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY_PREFIX = "analysis:stream:"
+OWNER_KEY_PREFIX = "analysis:owner:"
+RESULT_KEY_PREFIX = "analysis:result:"
+
+# Completed analyses summarized in the prompt of the next one
+RECENT_ANALYSES = 5
+
+# Events that end a stream
+TERMINAL_EVENTS = ("result", "deferred", "error")
+
+first_delta_latency = registry.histogram(
+    "golfcoach_ai_stream_first_delta_seconds",
+    "Time from analysis start to the first streamed model output",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0),
+)
+
+# (entry ID, event, data); entry ID None is a keep-alive
+StreamEvent = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+def format_sse(event_id: Optional[str], event: Optional[str], data: Optional[str]) -> str:
+    """
+    Format one Server-Sent Event.
+
+    Args:
+        event_id: Event ID (stream entry ID), None for a keep-alive comment
+        event: Event name
+        data: Event data
+
+    Returns:
+        Encoded event
+    """
+    if event_id is None:
+        return ": keep-alive\n\n"
+    lines = [f"id: {event_id}", f"event: {event}"]
+    lines += [f"data: {line}" for line in (data or "").split("\n")]
+    return "\n".join(lines) + "\n\n"
+
+
+class AnalysisStreamService:
+    """Produces and tails resumable analysis streams in Redis."""
+
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        ttl_seconds: int = settings.AI_STREAM_TTL_SECONDS,
+        deferred_ttl_seconds: int = settings.AI_BATCH_RESULT_TTL_SECONDS,
+        flush_interval_seconds: float = settings.AI_STREAM_FLUSH_INTERVAL_SECONDS,
+        block_ms: int = 15000,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        blocking_client: Optional[aioredis.Redis] = None,
+    ) -> None:
+        self._redis = redis_client
+        # Blocking reads hold a connection while they wait
+        self._blocking_redis = blocking_client if blocking_client is not None else redis_client
+        self._session_factory = session_factory
+        self._ttl = ttl_seconds
+        self._deferred_ttl = deferred_ttl_seconds
+        self._flush_interval = flush_interval_seconds
+        self._block_ms = block_ms
+        self._tasks: Set[asyncio.Task] = set()
+        self._result_fetches = SingleFlight("analysis_result")
+
+    async def start(
+        self, key: str, user_id: int, events: AsyncGenerator[Tuple[str, Any], None]
+    ) -> bool:
+        """
+        Start generating an analysis stream unless one already exists.
+
+        Args:
+            key: Stream key (e.g. swing ID)
+            user_id: Owner of the analysis
+            events: ("delta", text) / ("result", analysis) events to publish
+
+        Returns:
+            True if generation was started, False if the stream already exists
+        """
+        started = await self._redis.set(
+            f"{OWNER_KEY_PREFIX}{key}", str(user_id), nx=True, ex=self._ttl
+        )
+        if not started:
+            await events.aclose()
+            return False
+
+        # Drop the events of a previous failed attempt
+        await self._redis.delete(f"{STREAM_KEY_PREFIX}{key}")
+        task = asyncio.create_task(self._produce(key, user_id, events))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def get_owner(self, key: str) -> Optional[int]:
+        """
+        Get the owner of a stream.
+
+        Args:
+            key: Stream key
+
+        Returns:
+            User ID, or None if no stream exists
+        """
+        owner = await self._redis.get(f"{OWNER_KEY_PREFIX}{key}")
+        return int(owner) if owner is not None else None
+
+    async def get_result(self, key: str) -> Optional[dict]:
+        """
+        Get the persisted result of a completed stream.
+
+        Concurrent fetches of the same result share one read and one parse,
+        and get the same (read-only) dict.
+
+        Args:
+            key: Stream key (swing ID)
+
+        Returns:
+            {"user_id": ..., "analysis": ...}, or None if not completed
+        """
+        return await self._result_fetches.do(key, lambda: self._fetch_result(key))
+
+    async def save_result(self, key: str, user_id: int, analysis: dict) -> None:
+        """
+        Persist the result of a completed analysis and cache it.
+
+        Analyses do not change once completed, so a result already stored
+        for the swing is kept.
+
+        Args:
+            key: Stream key (swing ID)
+            user_id: Owner of the analysis
+            analysis: Structured analysis
+        """
+        try:
+            async with self._session_factory() as db:
+                dialect = db.get_bind().dialect.name
+                insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+                await db.execute(
+                    insert(SwingAnalysis)
+                    .values(swing_id=int(key), user_id=user_id, analysis=analysis)
+                    .on_conflict_do_nothing()
+                )
+                await db.commit()
+        except (SQLAlchemyError, OSError) as exc:
+            # Still served from Redis until the cached copy expires
+            logger.error(f"Failed to store analysis {key}: {exc}")
+        await self._cache_result(key, {"user_id": user_id, "analysis": analysis})
+
+    async def publish_result(self, key: str, user_id: int, analysis: dict) -> None:
+        """
+        Persist an analysis completed outside its stream and end the stream with it.
+
+        Used for analyses deferred to the batch scheduler, whose stream
+        ended with a "deferred" event; clients resuming after that event
+        receive the result.
+
+        Args:
+            key: Stream key (swing ID)
+            user_id: Owner of the analysis
+            analysis: Structured analysis
+        """
+        await self.save_result(key, user_id, analysis)
+        await self._append(f"{STREAM_KEY_PREFIX}{key}", "result", json.dumps(analysis))
+        await self._redis.expire(f"{OWNER_KEY_PREFIX}{key}", self._ttl)
+
+    async def publish_error(self, key: str, detail: str) -> None:
+        """
+        End the stream of a deferred analysis whose batch job failed.
+
+        Clients resuming after the "deferred" event receive an "error"
+        event, and the analysis can be started again.
+
+        Args:
+            key: Stream key (swing ID)
+            detail: Error message
+        """
+        await self._append(f"{STREAM_KEY_PREFIX}{key}", "error", json.dumps({"detail": detail}))
+        await self._redis.delete(f"{OWNER_KEY_PREFIX}{key}")
+
+    async def recent_results(
+        self, db: AsyncSession, user_id: int, limit: int = RECENT_ANALYSES
+    ) -> List[Dict]:
+        """
+        Summarize a user's latest completed analyses for the coaching prompt.
+
+        Args:
+            db: Database session
+            user_id: User ID
+            limit: Maximum number of analyses
+
+        Returns:
+            {"date", "score", "faults"} of each analysis, newest first
+        """
+        query = (
+            select(SwingAnalysis)
+            .where(SwingAnalysis.user_id == user_id)
+            .order_by(SwingAnalysis.created_at.desc(), SwingAnalysis.swing_id.desc())
+            .limit(limit)
+        )
+        summaries = []
+        for row in (await db.execute(query)).scalars():
+            score = analysis_score(row.analysis)
+            issues = (row.analysis.get("technical_analysis") or {}).get("issues") or []
+            summaries.append(
+                {
+                    "date": row.created_at.date().isoformat(),
+                    "score": round(score, 1) if score is not None else None,
+                    "faults": [issue["issue"] for issue in issues if issue.get("issue")],
+                }
+            )
+        return summaries
+
+    async def _fetch_result(self, key: str) -> Optional[dict]:
+        try:
+            data = await self._redis.get(f"{RESULT_KEY_PREFIX}{key}")
+        except aioredis.RedisError as exc:
+            logger.warning(f"Analysis result cache unavailable: {exc}")
+            data = None
+        if data:
+            return json.loads(data)
+
+        async with self._session_factory() as db:
+            row = await db.get(SwingAnalysis, int(key))
+        if row is None:
+            return None
+        result = {"user_id": row.user_id, "analysis": row.analysis}
+        await self._cache_result(key, result)
+        return result
+
+    async def _cache_result(self, key: str, result: dict) -> None:
+        try:
+            await self._redis.set(
+                f"{RESULT_KEY_PREFIX}{key}", json.dumps(result), ex=settings.CACHE_TTL_LONG
+            )
+        except aioredis.RedisError as exc:
+            logger.warning(f"Failed to cache analysis {key}: {exc}")
+
+    async def events(self, key: str, cursor: Optional[str] = None) -> AsyncIterator[StreamEvent]:
+        """
+        Tail a stream from a cursor until its terminal event.
+
+        A deferred analysis ends its stream twice: tailing stops at the
+        "deferred" event, and tailing from that event waits for the
+        "result" (or "error") of the batch job.
+
+        Args:
+            key: Stream key
+            cursor: Last received entry ID, None to start from the beginning
+
+        Yields:
+            (entry ID, event, data); (None, None, None) while waiting
+        """
+        stream = f"{STREAM_KEY_PREFIX}{key}"
+        cursor = cursor or "0-0"
+        while True:
+            response = await self._blocking_redis.xread(
+                {stream: cursor}, count=100, block=self._block_ms
+            )
+            if not response:
+                yield None, None, None
+                continue
+
+            for entry_id, fields in response[0][1]:
+                cursor = entry_id
+                yield entry_id, fields["event"], fields["data"]
+                if fields["event"] in TERMINAL_EVENTS:
+                    return
+
+    async def _produce(
+        self, key: str, user_id: int, events: AsyncGenerator[Tuple[str, Any], None]
+    ) -> None:
+        stream = f"{STREAM_KEY_PREFIX}{key}"
+        start = time.monotonic()
+        pending = []
+        last_flush = 0.0  # the first output is flushed immediately
+        first = True
+        try:
+            async for event, payload in events:
+                if event == "delta":
+                    if first:
+                        first_delta_latency.observe(time.monotonic() - start)
+                        first = False
+                    pending.append(payload)
+                    # Coalesce tokens to bound the number of stream entries
+                    if time.monotonic() - last_flush >= self._flush_interval:
+                        await self._append(stream, "delta", "".join(pending))
+                        pending.clear()
+                        last_flush = time.monotonic()
+                    continue
+
+                if pending:
+                    await self._append(stream, "delta", "".join(pending))
+                    pending.clear()
+                if event == "deferred":
+                    # Queued for batch processing; the stream stays resumable
+                    # (and is not restarted) until the batch job publishes
+                    await self._append(
+                        stream, "deferred", json.dumps(payload), ttl=self._deferred_ttl
+                    )
+                    await self._redis.expire(f"{OWNER_KEY_PREFIX}{key}", self._deferred_ttl)
+                    return
+                await self.save_result(key, user_id, payload)
+                await self._append(stream, "result", json.dumps(payload))
+        except Exception as exc:
+            logger.exception(f"Streaming analysis {key} failed")
+            await self._append(stream, "error", json.dumps({"detail": str(exc)}))
+            # Allow the analysis to be retried
+            await self._redis.delete(f"{OWNER_KEY_PREFIX}{key}")
+
+    async def _append(self, stream: str, event: str, data: str, ttl: Optional[int] = None) -> None:
+        # One round trip per event
+        await run_pipeline(
+            [
+                ("xadd", stream, {"event": event, "data": data}),
+                ("expire", stream, ttl or self._ttl),
+            ],
+            client=self._redis,
+        )
+
+
+analysis_streams = AnalysisStreamService(redis_client, blocking_client=blocking_redis_client)
@@ -0,0 +1,181 @@
+"""
+Bulk ingestion of time-series rows.
+
+Pose keypoints and integration shots arrive thousands of rows at a time, so
+they bypass the ORM: callers hand over columnar data, which is written in
+batches of BULK_INGEST_BATCH_ROWS rows with
+
+- COPY ... FROM STDIN (FORMAT binary) on PostgreSQL, through asyncpg;
+- batched executemany INSERTs on other databases (SQLite in tests).
+
+Batches failing with a transient error (lost connection, serialization
+failure, deadlock) are retried with exponential backoff.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Callable, List, Mapping, Sequence, Tuple, Union
+
+import asyncpg
+from sqlalchemy import JSON, Table, insert
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.core.config import settings
+from app.core.database import async_engine
+from app.core.metrics import registry
+
+
+logger = logging.getLogger(__name__)
+
+Columns = Mapping[str, Sequence[Any]]
+
+TRANSIENT_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    OperationalError,
+    InterfaceError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.exceptions.ConnectionDoesNotExistError,
+    asyncpg.exceptions.SerializationError,
+    asyncpg.exceptions.DeadlockDetectedError,
+)
+
+rows_ingested = registry.counter(
+    "golfcoach_bulk_ingest_rows_total",
+    "Rows written by bulk ingestion",
+    labelnames=("table", "method"),
+)
+ingest_duration = registry.histogram(
+    "golfcoach_bulk_ingest_duration_seconds",
+    "Bulk ingestion latency per write",
+    labelnames=("table",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+ingest_throughput = registry.gauge(
+    "golfcoach_bulk_ingest_rows_per_second",
+    "Throughput of the last bulk ingestion write",
+    labelnames=("table",),
+)
+ingest_retries = registry.counter(
+    "golfcoach_bulk_ingest_retries_total",
+    "Bulk ingestion batches retried after a transient error",
+    labelnames=("table",),
+)
+
+
+class BulkIngester:
+    """Writes columnar data with COPY, or multi-row INSERTs as a fallback."""
+
+    def __init__(
+        self,
+        engine: AsyncEngine = async_engine,
+        batch_rows: int = settings.BULK_INGEST_BATCH_ROWS,
+        max_retries: int = settings.BULK_INGEST_MAX_RETRIES,
+        retry_backoff_seconds: float = settings.BULK_INGEST_RETRY_BACKOFF_SECONDS,
+    ) -> None:
+        self._engine = engine
+        self._batch_rows = batch_rows
+        self._max_retries = max_retries
+        self._retry_backoff = retry_backoff_seconds
+
+    @property
+    def method(self) -> str:
+        """Write method used on the engine's database ("copy" or "insert")."""
+        return "copy" if self._engine.dialect.name == "postgresql" else "insert"
+
+    async def write(self, table: Table, columns: Union[Columns, Callable[[], Columns]]) -> int:
+        """
+        Write rows given as columns of equal length.
+
+        Each batch is written in its own transaction, so a failure loses at
+        most the failing batch and the batches after it.
+
+        Args:
+            table: Target table
+            columns: Values by column name (Python objects; JSON columns
+                take the objects to serialize), or a function building them,
+                which is called off the event loop
+
+        Returns:
+            Number of rows written
+
+        Raises:
+            Exception: The last error of a batch that failed on every
+                attempt, or a non-transient error
+        """
+        start = time.monotonic()
+        # Building rows is CPU bound; keep it off the event loop
+        names, rows = await asyncio.to_thread(self._rows, table, columns)
+        if not rows:
+            return 0
+
+        for offset in range(0, len(rows), self._batch_rows):
+            await self._write_batch(table, names, rows[offset : offset + self._batch_rows])
+
+        elapsed = time.monotonic() - start
+        rows_ingested.inc(len(rows), table=table.name, method=self.method)
+        ingest_duration.observe(elapsed, table=table.name)
+        if elapsed > 0:
+            ingest_throughput.set(len(rows) / elapsed, table=table.name)
+        return len(rows)
+
+    def _rows(
+        self, table: Table, columns: Union[Columns, Callable[[], Columns]]
+    ) -> Tuple[List[str], List[Tuple]]:
+        if callable(columns):
+            columns = columns()
+        names = list(columns)
+        values = []
+        for name in names:
+            column = columns[name]
+            if self.method == "copy" and isinstance(table.c[name].type, JSON):
+                # asyncpg takes JSON as text
+                column = [json.dumps(value) if value is not None else None for value in column]
+            values.append(column)
+        return names, list(zip(*values, strict=True))
+
+    async def _write_batch(self, table: Table, names: List[str], rows: List[Tuple]) -> None:
+        attempt = 0
+        while True:
+            try:
+                if self.method == "copy":
+                    await self._copy(table, names, rows)
+                else:
+                    async with self._engine.begin() as conn:
+                        await self._insert(conn, table, names, rows)
+                return
+            except TRANSIENT_ERRORS as exc:
+                if attempt >= self._max_retries:
+                    raise
+                delay = self._retry_backoff * 2**attempt
+                attempt += 1
+                ingest_retries.inc(table=table.name)
+                logger.warning(
+                    f"Bulk write of {len(rows)} rows to {table.name} failed ({exc}), "
+                    f"retrying in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+
+    async def _copy(self, table: Table, names: List[str], rows: List[Tuple]) -> None:
+        async with self._engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            # A single COPY is atomic on its own
+            await raw.driver_connection.copy_records_to_table(
+                table.name, records=rows, columns=names, schema_name=table.schema
+            )
+
+    @staticmethod
+    async def _insert(
+        conn: AsyncConnection, table: Table, names: List[str], rows: List[Tuple]
+    ) -> None:
+        # executemany of one cached statement; SQLAlchemy batches it into
+        # multi-row VALUES where the driver benefits
+        await conn.execute(insert(table), [dict(zip(names, row, strict=True)) for row in rows])
+
+
+bulk_ingester = BulkIngester()
@@ -0,0 +1,347 @@
+"""
+Swing fault detection for GolfCoach Pro.
+
+Fault rules are thresholds on biomechanics metrics for a swing phase. A rule
+library is compiled once per session into NumPy threshold arrays,
+personalized for the golfer (dominant hand, physical limitations). Every rule
+is then evaluated in a single vectorized operation per frame, or per whole
+swing for batch analysis, so the per-frame cost stays flat as the library
+grows.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+
+class SwingPhase(str, Enum):
+    """Phases of a golf swing."""
+
+    ADDRESS = "ADDRESS"
+    BACKSWING = "BACKSWING"
+    TRANSITION = "TRANSITION"
+    DOWNSWING = "DOWNSWING"
+    IMPACT = "IMPACT"
+    FINISH = "FINISH"
+
+
+PHASES: tuple[SwingPhase, ...] = tuple(SwingPhase)
+_PHASE_INDEX = {phase: index for index, phase in enumerate(PHASES)}
+
+# Metric layout of a biomechanics vector (angles in degrees, sway in cm).
+# Rotation and plane metrics are signed for a right-handed golfer.
+BIOMECHANICS_METRICS: tuple[str, ...] = (
+    "spine_angle",
+    "spine_angle_loss",
+    "hip_rotation",
+    "shoulder_turn",
+    "x_factor",
+    "shoulder_plane_angle",
+    "head_sway_cm",
+    "lead_arm_angle",
+    "knee_flex",
+)
+_METRIC_INDEX = {metric: index for index, metric in enumerate(BIOMECHANICS_METRICS)}
+
+SEVERITY_WEIGHTS = {"minor": 1, "major": 2, "critical": 3}
+
+
+@dataclass(frozen=True)
+class FaultRule:
+    """
+    A swing fault detected when a metric leaves its allowed range in a phase.
+
+    Attributes:
+        error: Fault identifier (e.g. "early_extension")
+        phase: Phase the rule applies to
+        metric: Biomechanics metric the rule checks
+        min_value: Fault if the metric is below this value
+        max_value: Fault if the metric is above this value
+        severity: "minor", "major" or "critical"
+        confidence: Detection confidence reported with the fault
+        handed: Metric is signed by handedness and mirrored for left-handers
+        tolerances: Physical limitation -> amount the allowed range is widened
+    """
+
+    error: str
+    phase: SwingPhase
+    metric: str
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+    severity: str = "minor"
+    confidence: float = 0.8
+    handed: bool = False
+    tolerances: Mapping[str, float] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class ErrorDetection:
+    """A detected swing fault."""
+
+    error: str
+    severity: str
+    confidence: float
+    phase: SwingPhase
+    data: Dict[str, float]
+
+
+DEFAULT_FAULT_RULES: tuple[FaultRule, ...] = (
+    FaultRule(
+        "poor_posture_at_address",
+        SwingPhase.ADDRESS,
+        "spine_angle",
+        min_value=25.0,
+        max_value=50.0,
+        severity="minor",
+        confidence=0.85,
+        tolerances={"back_pain": 10.0},
+    ),
+    FaultRule(
+        "excessive_knee_flex",
+        SwingPhase.ADDRESS,
+        "knee_flex",
+        max_value=40.0,
+        severity="minor",
+        confidence=0.75,
+        tolerances={"knee_injury": 10.0},
+    ),
+    FaultRule(
+        "restricted_shoulder_turn",
+        SwingPhase.BACKSWING,
+        "shoulder_turn",
+        min_value=80.0,
+        severity="major",
+        confidence=0.85,
+        handed=True,
+        tolerances={"limited_shoulder_mobility": 20.0, "back_pain": 10.0},
+    ),
+    FaultRule(
+        "insufficient_hip_turn",
+        SwingPhase.BACKSWING,
+        "hip_rotation",
+        min_value=30.0,
+        severity="minor",
+        confidence=0.8,
+        handed=True,
+        tolerances={"limited_hip_mobility": 15.0},
+    ),
+    FaultRule(
+        "low_x_factor",
+        SwingPhase.BACKSWING,
+        "x_factor",
+        min_value=35.0,
+        severity="minor",
+        confidence=0.7,
+        handed=True,
+        tolerances={"limited_shoulder_mobility": 10.0, "limited_hip_mobility": 5.0},
+    ),
+    FaultRule(
+        "sway",
+        SwingPhase.BACKSWING,
+        "head_sway_cm",
+        max_value=10.0,
+        severity="major",
+        confidence=0.8,
+    ),
+    FaultRule(
+        "over_the_top",
+        SwingPhase.DOWNSWING,
+        "shoulder_plane_angle",
+        max_value=5.0,
+        severity="major",
+        confidence=0.88,
+        handed=True,
+    ),
+    FaultRule(
+        "early_extension",
+        SwingPhase.IMPACT,
+        "spine_angle_loss",
+        max_value=8.0,
+        severity="major",
+        confidence=0.95,
+        tolerances={"back_pain": 4.0},
+    ),
+    FaultRule(
+        "chicken_wing",
+        SwingPhase.FINISH,
+        "lead_arm_angle",
+        min_value=150.0,
+        severity="minor",
+        confidence=0.75,
+        tolerances={"elbow_injury": 15.0},
+    ),
+)
+
+
+def metrics_vector(metrics: Mapping[str, float]) -> np.ndarray:
+    """
+    Pack biomechanics metrics into the vector layout used by compiled rules.
+
+    Missing metrics are NaN, which never trigger a rule.
+
+    Args:
+        metrics: Metric name -> value
+
+    Returns:
+        Vector ordered by BIOMECHANICS_METRICS
+    """
+    vector = np.full(len(BIOMECHANICS_METRICS), np.nan)
+    for name, value in metrics.items():
+        index = _METRIC_INDEX.get(name)
+        if index is not None and value is not None:
+            vector[index] = value
+    return vector
+
+
+class CompiledRuleSet:
+    """Fault rules compiled into threshold arrays for one golfer."""
+
+    def __init__(
+        self,
+        rules: Sequence[FaultRule],
+        dominant_hand: Optional[str] = None,
+        physical_limitations: Iterable[str] = (),
+    ) -> None:
+        limitations = set(physical_limitations or ())
+        mirror = dominant_hand == "left"
+
+        self.rules = tuple(rules)
+        count = len(self.rules)
+        self._metric_index = np.empty(count, dtype=np.intp)
+        self._phase_index = np.empty(count, dtype=np.intp)
+        self._lower = np.empty(count)
+        self._upper = np.empty(count)
+
+        for position, rule in enumerate(self.rules):
+            if rule.metric not in _METRIC_INDEX:
+                raise ValueError(f"Unknown biomechanics metric: {rule.metric}")
+
+            lower = -np.inf if rule.min_value is None else rule.min_value
+            upper = np.inf if rule.max_value is None else rule.max_value
+            slack = sum(
+                amount
+                for limitation, amount in rule.tolerances.items()
+                if limitation in limitations
+            )
+            lower, upper = lower - slack, upper + slack
+            if mirror and rule.handed:
+                lower, upper = -upper, -lower
+
+            self._metric_index[position] = _METRIC_INDEX[rule.metric]
+            self._phase_index[position] = _PHASE_INDEX[rule.phase]
+            self._lower[position] = lower
+            self._upper[position] = upper
+
+        self._severity = np.array([SEVERITY_WEIGHTS.get(r.severity, 0) for r in self.rules])
+        self._confidence = np.array([r.confidence for r in self.rules])
+        self._phase_masks = {
+            phase: self._phase_index == index for phase, index in _PHASE_INDEX.items()
+        }
+
+    def check(self, phase: SwingPhase, metrics: np.ndarray) -> List[ErrorDetection]:
+        """
+        Evaluate every rule against one frame.
+
+        Args:
+            phase: Current swing phase
+            metrics: Metrics vector from metrics_vector()
+
+        Returns:
+            Detected faults, most severe first
+        """
+        values = metrics[self._metric_index]
+        violated = self._phase_masks[phase] & ((values < self._lower) | (values > self._upper))
+        hits = np.flatnonzero(violated)
+        return self._detections(hits, values[hits], phase)
+
+    def check_swing(
+        self, phases: Sequence[SwingPhase], metrics: np.ndarray
+    ) -> List[ErrorDetection]:
+        """
+        Evaluate every rule against a whole swing in one pass.
+
+        Each fault is reported once, at its worst violation.
+
+        Args:
+            phases: Phase of each frame
+            metrics: Frames x metrics matrix of metrics vectors
+
+        Returns:
+            Detected faults, most severe first
+        """
+        if len(phases) == 0:
+            return []
+
+        frame_phases = np.fromiter((_PHASE_INDEX[p] for p in phases), dtype=np.intp)
+        values = metrics[:, self._metric_index]
+        with np.errstate(invalid="ignore"):
+            overshoot = np.fmax(self._lower - values, values - self._upper)
+        in_phase = frame_phases[:, None] == self._phase_index[None, :]
+        overshoot = np.where(in_phase & (overshoot > 0), overshoot, -np.inf)
+
+        worst_frame = overshoot.argmax(axis=0)
+        hits = np.flatnonzero(np.isfinite(overshoot.max(axis=0)))
+        frames = worst_frame[hits]
+        return self._detections(hits, values[frames, hits], None, frames)
+
+    def _detections(
+        self,
+        hits: np.ndarray,
+        values: np.ndarray,
+        phase: Optional[SwingPhase],
+        frames: Optional[np.ndarray] = None,
+    ) -> List[ErrorDetection]:
+        if hits.size == 0:
+            return []
+
+        order = np.lexsort((-self._confidence[hits], -self._severity[hits]))
+        detections = []
+        for position in order:
+            rule = self.rules[hits[position]]
+            index = hits[position]
+            value = float(values[position])
+            threshold = self._lower[index] if value < self._lower[index] else self._upper[index]
+            data = {rule.metric: value, "threshold": float(threshold)}
+            if frames is not None:
+                data["frame"] = int(frames[position])
+            detections.append(
+                ErrorDetection(
+                    error=rule.error,
+                    severity=rule.severity,
+                    confidence=rule.confidence,
+                    phase=phase or rule.phase,
+                    data=data,
+                )
+            )
+        return detections
+
+
+class ErrorDetector:
+    """Compiles the fault library for each golfer's session."""
+
+    def __init__(self, rules: Sequence[FaultRule] = DEFAULT_FAULT_RULES) -> None:
+        self.rules = tuple(rules)
+
+    def compile(
+        self,
+        dominant_hand: Optional[str] = None,
+        physical_limitations: Iterable[str] = (),
+    ) -> CompiledRuleSet:
+        """
+        Compile the fault library for a golfer.
+
+        Args:
+            dominant_hand: "left" or "right" (None is treated as right)
+            physical_limitations: Limitations from the user's profile
+
+        Returns:
+            Compiled rule set to evaluate frames and swings with
+        """
+        return CompiledRuleSet(self.rules, dominant_hand, physical_limitations)
+
+
+error_detector = ErrorDetector()
@@ -0,0 +1,279 @@
+"""
+Write-behind persistence of real-time frames.
+
+Real-time sessions append per-frame landmarks and metrics to a per-node
+buffer of preallocated columnar arrays. A background task flushes the buffer
+to the pose_keypoints hypertable through bulk ingestion (COPY) when it
+reaches FRAME_FLUSH_ROWS or every FRAME_FLUSH_INTERVAL_SECONDS, and on
+disconnect or shutdown. Frames of processed (uploaded) swings are written
+directly with persist_swing_frames. The buffer has two halves and is
+bounded: appends never wait on the database, and frames are dropped (and
+counted) if the database falls so far behind that both halves are full.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.models.pose import PoseKeypoint
+from app.services.bulk_ingest import BulkIngester, bulk_ingester
+from app.services.error_detector import BIOMECHANICS_METRICS
+
+
+logger = logging.getLogger(__name__)
+
+LANDMARK_COUNT = 33
+LANDMARK_FIELDS = 4  # x, y, z, visibility
+
+rows_persisted = registry.counter(
+    "golfcoach_frame_rows_persisted_total", "Real-time frames written to pose_keypoints"
+)
+rows_dropped = registry.counter(
+    "golfcoach_frame_rows_dropped_total",
+    "Real-time frames dropped by the write-behind buffer",
+    labelnames=("reason",),
+)
+flush_duration = registry.histogram(
+    "golfcoach_frame_flush_duration_seconds", "Write-behind frame buffer flush latency"
+)
+
+
+class FrameBatch:
+    """Preallocated columnar arrays for a batch of frames."""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.size = 0
+        self.user_id = np.zeros(capacity, dtype=np.int64)
+        self.swing_id = np.full(capacity, -1, dtype=np.int64)
+        self.session_id = np.empty(capacity, dtype=object)
+        self.frame_number = np.zeros(capacity, dtype=np.int32)
+        self.timestamp_ms = np.zeros(capacity, dtype=np.int32)
+        self.recorded_at = np.zeros(capacity, dtype=np.float64)
+        self.keypoints = np.zeros((capacity, LANDMARK_COUNT, LANDMARK_FIELDS), dtype=np.float32)
+        self.metrics = np.full((capacity, len(BIOMECHANICS_METRICS)), np.nan, dtype=np.float32)
+
+    @property
+    def full(self) -> bool:
+        """Whether the batch has no room left."""
+        return self.size >= self.capacity
+
+    def columns(self) -> Dict[str, List]:
+        """Materialize the batch as pose_keypoints columns for bulk ingestion."""
+        n = self.size
+        metrics = self.metrics[:n]
+        present = ~np.isnan(metrics)
+        return {
+            "user_id": self.user_id[:n].tolist(),
+            "swing_id": [
+                swing_id if swing_id >= 0 else None for swing_id in self.swing_id[:n].tolist()
+            ],
+            "session_id": self.session_id[:n].tolist(),
+            "frame_number": self.frame_number[:n].tolist(),
+            "timestamp_ms": self.timestamp_ms[:n].tolist(),
+            "recorded_at": [
+                datetime.fromtimestamp(seconds, tz=timezone.utc)
+                for seconds in self.recorded_at[:n].tolist()
+            ],
+            "keypoints": self.keypoints[:n].tolist(),
+            "metrics": [
+                {
+                    name: value
+                    for name, value, ok in zip(BIOMECHANICS_METRICS, row, mask, strict=True)
+                    if ok
+                }
+                for row, mask in zip(metrics.tolist(), present.tolist(), strict=True)
+            ],
+        }
+
+    def clear(self) -> None:
+        """Reset the batch for reuse without reallocating."""
+        self.session_id[: self.size] = None
+        self.metrics[: self.size] = np.nan
+        self.swing_id[: self.size] = -1
+        self.size = 0
+
+
+class FrameWriteBehindBuffer:
+    """Per-node write-behind buffer for real-time frames."""
+
+    def __init__(
+        self,
+        capacity: int = settings.FRAME_BUFFER_CAPACITY,
+        flush_rows: int = settings.FRAME_FLUSH_ROWS,
+        flush_interval_seconds: float = settings.FRAME_FLUSH_INTERVAL_SECONDS,
+        ingester: BulkIngester = bulk_ingester,
+    ) -> None:
+        self._active = FrameBatch(capacity)
+        self._spare = FrameBatch(capacity)
+        self._flush_rows = min(flush_rows, capacity)
+        self._flush_interval = flush_interval_seconds
+        self._ingester = ingester
+        self._flush_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        """Frames waiting to be flushed."""
+        return self._active.size
+
+    def append(
+        self,
+        user_id: int,
+        session_id: Optional[str],
+        frame_number: int,
+        timestamp_ms: int,
+        keypoints: np.ndarray,
+        metrics: Optional[np.ndarray] = None,
+        swing_id: Optional[int] = None,
+        recorded_at: Optional[float] = None,
+    ) -> bool:
+        """
+        Buffer one frame (never blocks on the database).
+
+        Args:
+            user_id: Owner of the frame
+            session_id: Real-time session ID
+            frame_number: Frame index within the session
+            timestamp_ms: Frame timestamp relative to the session start
+            keypoints: 33 x 4 landmark array
+            metrics: Biomechanics vector in BIOMECHANICS_METRICS layout
+            swing_id: Swing the frame belongs to, once detected
+            recorded_at: Capture time (epoch seconds), defaults to now
+
+        Returns:
+            True if buffered, False if dropped because the buffer is full
+        """
+        batch = self._active
+        if batch.full:
+            rows_dropped.inc(reason="buffer_full")
+            return False
+
+        i = batch.size
+        batch.user_id[i] = user_id
+        batch.session_id[i] = session_id
+        batch.frame_number[i] = frame_number
+        batch.timestamp_ms[i] = timestamp_ms
+        batch.recorded_at[i] = time.time() if recorded_at is None else recorded_at
+        batch.keypoints[i] = keypoints
+        if metrics is not None:
+            batch.metrics[i] = metrics
+        if swing_id is not None:
+            batch.swing_id[i] = swing_id
+        batch.size += 1
+
+        if batch.size >= self._flush_rows:
+            self._wake.set()
+        return True
+
+    async def flush(self) -> int:
+        """
+        Write all buffered frames.
+
+        Appends go to the spare half while the full half is written.
+
+        Returns:
+            Number of frames written
+        """
+        async with self._flush_lock:
+            if self._active.size == 0:
+                return 0
+
+            batch, self._active, self._spare = self._active, self._spare, self._active
+            count = batch.size
+            start = time.monotonic()
+            try:
+                await self._ingester.write(PoseKeypoint.__table__, batch.columns)
+            except Exception:
+                logger.exception(f"Failed to persist {count} real-time frames")
+                rows_dropped.inc(count, reason="write_failed")
+                return 0
+            finally:
+                batch.clear()
+                flush_duration.observe(time.monotonic() - start)
+
+            rows_persisted.inc(count)
+            return count
+
+    async def run(self) -> None:
+        """Flush on size or time thresholds until cancelled."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        """Start the background flush task on the running event loop."""
+        if self._task is None:
+            self._flush_lock = asyncio.Lock()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self.run())
+
+    async def close(self) -> None:
+        """Stop the background task and flush what is left."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+async def persist_swing_frames(
+    user_id: int,
+    swing_id: int,
+    timestamps_ms: np.ndarray,
+    keypoints: np.ndarray,
+    metrics: Optional[np.ndarray] = None,
+    recorded_at: Optional[float] = None,
+    ingester: BulkIngester = bulk_ingester,
+) -> int:
+    """
+    Write all frames of a processed swing in one bulk ingestion.
+
+    Args:
+        user_id: Owner of the swing
+        swing_id: Swing ID
+        timestamps_ms: Frame timestamps relative to the swing start (n)
+        keypoints: Landmarks (n x 33 x 4)
+        metrics: Biomechanics vectors in BIOMECHANICS_METRICS layout (n x m)
+        recorded_at: Capture time of the first frame (epoch seconds),
+            defaults to now
+        ingester: Bulk ingester
+
+    Returns:
+        Number of frames written
+    """
+    count = len(timestamps_ms)
+    batch = FrameBatch(count)
+    batch.size = count
+    batch.user_id[:] = user_id
+    batch.swing_id[:] = swing_id
+    batch.frame_number[:] = np.arange(count)
+    batch.timestamp_ms[:] = timestamps_ms
+    start = time.time() if recorded_at is None else recorded_at
+    batch.recorded_at[:] = start + np.asarray(timestamps_ms, dtype=np.float64) / 1000
+    batch.keypoints[:] = keypoints
+    if metrics is not None:
+        batch.metrics[:] = metrics
+
+    written = await ingester.write(PoseKeypoint.__table__, batch.columns)
+    rows_persisted.inc(written)
+    return written
+
+
+frame_buffer = FrameWriteBehindBuffer()
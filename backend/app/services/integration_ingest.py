@@ -0,0 +1,51 @@
+"""
+Ingestion of shots reported by launch monitors and simulators.
+"""
+
+from datetime import timezone
+from typing import Any, Dict, Sequence
+
+from app.models.integration import IntegrationShot
+from app.services.bulk_ingest import BulkIngester, bulk_ingester
+
+
+async def ingest_integration_shots(
+    user_id: int,
+    source: str,
+    shots: Sequence[Dict[str, Any]],
+    ingester: BulkIngester = bulk_ingester,
+) -> int:
+    """
+    Store a device's shot export in one bulk ingestion.
+
+    Args:
+        user_id: Owner of the shots
+        source: Device or service the shots come from
+        shots: Shots with a "recorded_at" datetime (naive values are UTC),
+            an optional "swing_id" and the device's measurements
+        ingester: Bulk ingester
+
+    Returns:
+        Number of shots written
+    """
+    recorded_at = [shot["recorded_at"] for shot in shots]
+    return await ingester.write(
+        IntegrationShot.__table__,
+        {
+            "user_id": [user_id] * len(shots),
+            "source": [source] * len(shots),
+            "recorded_at": [
+                value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+                for value in recorded_at
+            ],
+            "swing_id": [shot.get("swing_id") for shot in shots],
+            "shot_data": [
+                {
+                    key: value
+                    for key, value in shot.items()
+                    if key not in ("recorded_at", "swing_id")
+                }
+                for shot in shots
+            ],
+        },
+    )
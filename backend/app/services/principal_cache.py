@@ -0,0 +1,329 @@
+"""
+Authenticated-principal cache.
+
+Authenticated requests only need a read-only view of the caller, so instead
+of loading the user row on every request, get_current_user resolves an
+immutable Principal through two cache tiers:
+
+1. an in-process TTL LRU (no I/O);
+2. Redis, shared by all nodes (one round trip, no database);
+
+and only loads from the database on a miss in both. When a user or profile
+changes, UserService replaces the Redis entry with a short-lived tombstone
+and evicts the local one, and the user/profile change event it publishes
+evicts the entry on every other node. Loads only fill Redis if the key is
+absent, so a load that read the row before the change cannot cache it
+afterwards; while the tombstone lives, lookups are served from the
+database. The short local TTL bounds staleness if an event is missed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Tuple
+
+import redis.asyncio as aioredis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.redis_pool import blocking_redis_client, redis_client
+from app.models.user import User
+
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_KEY_PREFIX = "principal:"
+
+# Redis value of an invalidated principal, blocking refills
+TOMBSTONE = "invalidated"
+
+# Redis channel announcing user/profile changes to other nodes
+PROFILE_EVENTS_CHANNEL = "events:user_profile_updated"
+
+lookups_total = registry.counter(
+    "golfcoach_auth_principal_lookups_total",
+    "Authenticated principal lookups by tier that served them",
+    labelnames=("source",),
+)
+
+
+def _parse_date(value: str) -> date:
+    # Round-trips both date and datetime columns
+    return datetime.fromisoformat(value) if "T" in value else date.fromisoformat(value)
+
+
+@dataclass(frozen=True)
+class PrincipalProfile:
+    """Read-only profile of an authenticated user."""
+
+    date_of_birth: Optional[date]
+    height_cm: Optional[int]
+    weight_kg: Optional[int]
+    dominant_hand: Optional[str]
+    primary_miss: Optional[str]
+    goals: Tuple[str, ...]
+    physical_limitations: Tuple[str, ...]
+    updated_at: datetime
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    Read-only view of an authenticated user.
+
+    Attribute-compatible with User for reads (and UserResponse), so
+    endpoints can use it without a database session. Load the User to make
+    changes.
+    """
+
+    id: int
+    email: str
+    full_name: Optional[str]
+    handicap: Optional[float]
+    subscription_tier: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    profile: Optional[PrincipalProfile] = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        """
+        Snapshot a user with their profile loaded.
+
+        Args:
+            user: User
+
+        Returns:
+            Principal
+        """
+        profile = user.profile
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            handicap=float(user.handicap) if user.handicap is not None else None,
+            # users.subscription_tier (revision 005_subscription_tier); None
+            # (free tier) while the User model does not map the column
+            subscription_tier=getattr(user, "subscription_tier", None),
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+            profile=(
+                PrincipalProfile(
+                    date_of_birth=profile.date_of_birth,
+                    height_cm=profile.height_cm,
+                    weight_kg=profile.weight_kg,
+                    dominant_hand=profile.dominant_hand,
+                    primary_miss=profile.primary_miss,
+                    goals=tuple(profile.goals or ()),
+                    physical_limitations=tuple(profile.physical_limitations or ()),
+                    updated_at=profile.updated_at,
+                )
+                if profile is not None
+                else None
+            ),
+        )
+
+    def to_json(self) -> str:
+        """Serialize for the Redis tier."""
+        return json.dumps(asdict(self), default=lambda value: value.isoformat())
+
+    @classmethod
+    def from_json(cls, data: str) -> "Principal":
+        """Deserialize from the Redis tier."""
+        fields: Dict[str, Any] = json.loads(data)
+        profile = fields.pop("profile")
+        if profile is not None:
+            dob = profile["date_of_birth"]
+            profile = PrincipalProfile(
+                **{
+                    **profile,
+                    "date_of_birth": _parse_date(dob) if dob else None,
+                    "goals": tuple(profile["goals"]),
+                    "physical_limitations": tuple(profile["physical_limitations"]),
+                    "updated_at": datetime.fromisoformat(profile["updated_at"]),
+                }
+            )
+        return cls(
+            **{
+                **fields,
+                "created_at": datetime.fromisoformat(fields["created_at"]),
+                "updated_at": datetime.fromisoformat(fields["updated_at"]),
+                "profile": profile,
+            }
+        )
+
+
+class PrincipalCache:
+    """Two-tier (in-process LRU, Redis) cache of authenticated principals."""
+
+    def __init__(
+        self,
+        redis_client: Optional[aioredis.Redis],
+        ttl_seconds: int = settings.CACHE_TTL_SHORT,
+        local_ttl_seconds: float = settings.AUTH_PRINCIPAL_LOCAL_TTL_SECONDS,
+        local_max_entries: int = settings.AUTH_PRINCIPAL_LOCAL_MAX_ENTRIES,
+        tombstone_seconds: int = settings.AUTH_PRINCIPAL_TOMBSTONE_SECONDS,
+        blocking_client: Optional[aioredis.Redis] = None,
+    ) -> None:
+        self._redis = redis_client
+        # Blocking reads hold a connection while they wait
+        self._blocking_redis = blocking_client if blocking_client is not None else redis_client
+        self._ttl = ttl_seconds
+        self._tombstone_ttl = tombstone_seconds
+        self._local_ttl = local_ttl_seconds
+        self._local_max = local_max_entries
+        self._local: OrderedDict[int, Tuple[float, Principal]] = OrderedDict()
+
+    async def get(self, db: AsyncSession, user_id: int) -> Optional[Principal]:
+        """
+        Get the principal of a user.
+
+        Redis errors fall through to the database.
+
+        Args:
+            db: Database session, only used on a miss
+            user_id: User ID
+
+        Returns:
+            Principal, or None if the user does not exist
+        """
+        entry = self._local.get(user_id)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._local.move_to_end(user_id)
+                lookups_total.inc(source="local")
+                return entry[1]
+            del self._local[user_id]
+
+        principal = await self._get_shared(user_id)
+        if principal is not None:
+            lookups_total.inc(source="redis")
+        else:
+            query = select(User).options(joinedload(User.profile)).where(User.id == user_id)
+            user = (await db.execute(query)).scalar_one_or_none()
+            lookups_total.inc(source="database")
+            if user is None:
+                return None
+            principal = Principal.from_user(user)
+            if not await self._set_shared(principal):
+                # Invalidated meanwhile, the row read may predate the change
+                return principal
+
+        self._set_local(principal)
+        return principal
+
+    def peek(self, user_id: int) -> Optional[Principal]:
+        """
+        Get a user's principal from the in-process tier only, without I/O.
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Principal, or None if it is not cached on this node
+        """
+        entry = self._local.get(user_id)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    async def invalidate(self, user_id: int) -> None:
+        """
+        Drop a user's cached principal on this node and in Redis.
+
+        The Redis entry is replaced with a tombstone, so that loads still in
+        flight do not cache the previous version. Other nodes evict their
+        local copy on the user/profile change event.
+
+        Args:
+            user_id: User ID
+        """
+        self.evict(user_id)
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(
+                f"{PRINCIPAL_KEY_PREFIX}{user_id}", TOMBSTONE, ex=self._tombstone_ttl
+            )
+        except aioredis.RedisError as exc:
+            logger.warning(f"Failed to invalidate cached principal of user {user_id}: {exc}")
+
+    def clear(self) -> None:
+        """Drop all principals from the in-process tier."""
+        self._local.clear()
+
+    def evict(self, user_id: int) -> None:
+        """
+        Drop a user's principal from the in-process tier.
+
+        Args:
+            user_id: User ID
+        """
+        self._local.pop(user_id, None)
+
+    async def listen(self) -> None:
+        """Evict local principals on user/profile change events until cancelled."""
+        if self._redis is None:
+            return
+        while True:
+            try:
+                pubsub = self._blocking_redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(PROFILE_EVENTS_CHANNEL)
+                try:
+                    async for message in pubsub.listen():
+                        self.evict(int(message["data"]))
+                finally:
+                    await pubsub.aclose()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(f"Principal cache listener disconnected: {exc}")
+                # Events may have been missed while disconnected
+                self.clear()
+                await asyncio.sleep(5)
+
+    async def _get_shared(self, user_id: int) -> Optional[Principal]:
+        if self._redis is None:
+            return None
+        try:
+            data = await self._redis.get(f"{PRINCIPAL_KEY_PREFIX}{user_id}")
+        except aioredis.RedisError as exc:
+            logger.warning(f"Principal cache unavailable: {exc}")
+            return None
+        if not data or data == TOMBSTONE:
+            return None
+        return Principal.from_json(data)
+
+    async def _set_shared(self, principal: Principal) -> bool:
+        # False if the principal was invalidated (tombstone present)
+        if self._redis is None:
+            return True
+        try:
+            stored = await self._redis.set(
+                f"{PRINCIPAL_KEY_PREFIX}{principal.id}",
+                principal.to_json(),
+                ex=self._ttl,
+                nx=True,
+            )
+        except aioredis.RedisError as exc:
+            logger.warning(f"Failed to cache principal of user {principal.id}: {exc}")
+            return True
+        return bool(stored)
+
+    def _set_local(self, principal: Principal) -> None:
+        self._local[principal.id] = (time.monotonic() + self._local_ttl, principal)
+        self._local.move_to_end(principal.id)
+        while len(self._local) > self._local_max:
+            self._local.popitem(last=False)
+
+
+principal_cache = PrincipalCache(redis_client, blocking_client=blocking_redis_client)
@@ -0,0 +1,218 @@
+"""
+Token-budgeted prompt building for swing analyses.
+
+Instead of sending per-frame landmarks or every metric, a swing is
+compressed into prompt items: the top detected faults, key-phase metric
+snapshots, deltas against the golfer's baseline and recent history. Items
+are ranked by how much they tell the coach (faults first, then the metrics
+behind them, then the largest deviations from baseline) and added until the
+token budget is reached, so the prompt degrades gracefully instead of
+overflowing.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.services.ai_budget import CHARS_PER_TOKEN
+from app.services.analysis_cache import KEY_PHASES, QUANTIZATION_STEPS
+from app.services.error_detector import DEFAULT_FAULT_RULES, SEVERITY_WEIGHTS, ErrorDetection
+
+
+# Metric each fault rule checks
+FAULT_METRICS: Mapping[str, str] = {rule.error: rule.metric for rule in DEFAULT_FAULT_RULES}
+
+# Section order in the rendered prompt
+SECTIONS = ("faults", "snapshot", "baseline", "history")
+SECTION_TITLES = {
+    "faults": "DETECTED FAULTS (most important first):",
+    "snapshot": "KEY POSITIONS (degrees, sway in cm):",
+    "baseline": "VS GOLFER'S BASELINE:",
+    "history": "RECENT SWINGS:",
+}
+
+prompt_tokens = registry.histogram(
+    "golfcoach_ai_prompt_tokens",
+    "Estimated tokens of built analysis prompts",
+    buckets=(100, 200, 300, 400, 600, 800, 1200, 2000, 4000, 8000),
+)
+
+Fault = Union[str, ErrorDetection]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of prompt text.
+
+    Args:
+        text: Prompt text
+
+    Returns:
+        Estimated tokens
+    """
+    return max(len(text) // CHARS_PER_TOKEN, 1)
+
+
+@dataclass(frozen=True)
+class PromptItem:
+    """One candidate line or value of a prompt section."""
+
+    section: str
+    priority: float
+    text: str
+    phase: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class SwingPrompt:
+    """A built analysis prompt."""
+
+    text: str
+    estimated_tokens: int
+    included: Tuple[PromptItem, ...]
+    dropped: Tuple[PromptItem, ...]
+
+
+class PromptBuilder:
+    """Builds compact swing analysis prompts under a token budget."""
+
+    def __init__(
+        self,
+        token_budget: int = settings.AI_PROMPT_TOKEN_BUDGET,
+        max_faults: int = settings.AI_PROMPT_MAX_FAULTS,
+    ) -> None:
+        self.token_budget = token_budget
+        self.max_faults = max_faults
+
+    def build(
+        self,
+        biomechanics: Mapping[str, Mapping[str, float]],
+        faults: Sequence[Fault] = (),
+        user_context: Optional[Mapping] = None,
+        baselines: Optional[Mapping[str, float]] = None,
+    ) -> SwingPrompt:
+        """
+        Build the analysis prompt of a swing.
+
+        Args:
+            biomechanics: Key phase -> metric name -> value
+            faults: Detected faults (identifiers or detections)
+            user_context: Swing context (club, intended_shape, conditions,
+                recent_swings)
+            baselines: Golfer's baseline values keyed "phase.metric"
+
+        Returns:
+            Prompt text with its estimated size and the items kept/dropped
+        """
+        user_context = user_context or {}
+        header = self._header(user_context)
+        items = self._items(biomechanics, faults, user_context, baselines or {})
+
+        included: List[PromptItem] = []
+        dropped: List[PromptItem] = []
+        text = self._render(header, included)
+        for item in sorted(items, key=lambda candidate: -candidate.priority):
+            candidate = self._render(header, included + [item])
+            if estimate_tokens(candidate) <= self.token_budget:
+                included.append(item)
+                text = candidate
+            else:
+                dropped.append(item)
+
+        tokens = estimate_tokens(text)
+        prompt_tokens.observe(tokens)
+        return SwingPrompt(text, tokens, tuple(included), tuple(dropped))
+
+    def _header(self, user_context: Mapping) -> str:
+        return (
+            "Analyze this golf swing and reply in the JSON format from the system prompt.\n"
+            f"Club: {user_context.get('club', 'Unknown')}; "
+            f"shape: {user_context.get('intended_shape', 'Straight')}; "
+            f"conditions: {user_context.get('conditions', 'Range practice')}"
+        )
+
+    def _items(
+        self,
+        biomechanics: Mapping[str, Mapping[str, float]],
+        faults: Sequence[Fault],
+        user_context: Mapping,
+        baselines: Mapping[str, float],
+    ) -> List[PromptItem]:
+        items: List[PromptItem] = []
+
+        ranked = self._rank_faults(faults)[: self.max_faults]
+        fault_metrics = {FAULT_METRICS.get(name) for name, _ in ranked}
+        for index, (name, severity) in enumerate(ranked):
+            label = f"- {name}" + (f" ({severity})" if severity else "")
+            items.append(PromptItem("faults", 100 - index, label))
+
+        for phase in KEY_PHASES:
+            for metric, value in biomechanics.get(phase, {}).items():
+                priority = 80 if metric in fault_metrics else 40
+                items.append(PromptItem("snapshot", priority, f"{metric} {value:.0f}", phase))
+
+                baseline = baselines.get(f"{phase}.{metric}")
+                if baseline is None:
+                    continue
+                delta = value - baseline
+                steps = abs(delta) / QUANTIZATION_STEPS.get(metric, 1.0)
+                if steps >= 1.0:
+                    items.append(
+                        PromptItem(
+                            "baseline",
+                            60 + min(steps, 10.0),
+                            f"{phase} {metric} {delta:+.0f}",
+                        )
+                    )
+
+        for index, swing in enumerate(user_context.get("recent_swings", ())[:5]):
+            items.append(PromptItem("history", 20 - index, f"- {self._summarize_swing(swing)}"))
+
+        return items
+
+    def _rank_faults(self, faults: Sequence[Fault]) -> List[Tuple[str, Optional[str]]]:
+        """Deduplicate faults, most severe and confident first."""
+        scored: Dict[str, Tuple[float, Optional[str]]] = {}
+        for order, fault in enumerate(faults):
+            if isinstance(fault, ErrorDetection):
+                score = SEVERITY_WEIGHTS.get(fault.severity, 0) * fault.confidence
+                name, severity = fault.error, fault.severity
+            else:
+                # Plain identifiers keep their given order
+                score, name, severity = -order, fault, None
+            if name not in scored or score > scored[name][0]:
+                scored[name] = (score, severity)
+        ranked = sorted(scored.items(), key=lambda entry: -entry[1][0])
+        return [(name, severity) for name, (_, severity) in ranked]
+
+    def _summarize_swing(self, swing: Mapping) -> str:
+        parts = [str(swing.get("date", "recent"))]
+        if swing.get("score") is not None:
+            parts.append(f"score {swing['score']}")
+        if swing.get("faults"):
+            parts.append("faults " + ", ".join(swing["faults"][:3]))
+        return "; ".join(parts)
+
+    def _render(self, header: str, items: Sequence[PromptItem]) -> str:
+        lines = [header]
+        for section in SECTIONS:
+            section_items = [item for item in items if item.section == section]
+            if not section_items:
+                continue
+            lines.append(SECTION_TITLES[section])
+            if section == "snapshot":
+                for phase in KEY_PHASES:
+                    values = [item.text for item in section_items if item.phase == phase]
+                    if values:
+                        lines.append(f"- {phase}: " + ", ".join(values))
+            elif section == "baseline":
+                lines.append("- " + ", ".join(item.text for item in section_items))
+            else:
+                lines.extend(item.text for item in section_items)
+        return "\n".join(lines)
+
+
+prompt_builder = PromptBuilder()
@@ -0,0 +1,202 @@
+"""
+Per-stage latency instrumentation for the real-time analysis pipeline.
+
+Each frame goes through five stages with budgets from REAL_TIME_ANALYSIS.md
+(pose 8 ms, biomechanics 2 ms, phase 1 ms, errors 3 ms, cue 2 ms) inside a
+16 ms frame budget. FrameTimer measures every stage with monotonic_ns,
+feeds node-level Prometheus histograms and keeps a short per-session trace
+that can be fetched on demand for debugging.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional, Tuple
+
+from app.core.metrics import registry
+
+
+STAGES: Tuple[str, ...] = ("pose", "biomechanics", "phase", "errors", "cue")
+
+STAGE_BUDGETS_MS: Dict[str, float] = {
+    "pose": 8.0,
+    "biomechanics": 2.0,
+    "phase": 1.0,
+    "errors": 3.0,
+    "cue": 2.0,
+}
+
+FRAME_BUDGET_MS = 16.0
+
+# Frames kept per session trace (5 seconds at 60 FPS)
+TRACE_MAX_FRAMES = 300
+
+# Stage buckets in seconds, dense around the per-stage budgets
+_STAGE_BUCKETS = (
+    0.0005,
+    0.001,
+    0.002,
+    0.003,
+    0.004,
+    0.006,
+    0.008,
+    0.012,
+    0.016,
+    0.024,
+    0.032,
+    0.064,
+)
+
+stage_duration = registry.histogram(
+    "golfcoach_realtime_stage_duration_seconds",
+    "Real-time pipeline stage latency",
+    labelnames=("stage",),
+    buckets=_STAGE_BUCKETS,
+)
+frame_duration = registry.histogram(
+    "golfcoach_realtime_frame_duration_seconds",
+    "Real-time end-to-end frame processing latency",
+    buckets=_STAGE_BUCKETS,
+)
+budget_overruns = registry.counter(
+    "golfcoach_realtime_budget_overruns_total",
+    "Frames where a stage (or the whole frame) exceeded its latency budget",
+    labelnames=("stage",),
+)
+
+# Resolve label children once so the per-frame path is a plain method call
+_stage_series = [stage_duration.labels(stage=stage) for stage in STAGES]
+_stage_overruns = [budget_overruns.labels(stage=stage) for stage in STAGES]
+_frame_overruns = budget_overruns.labels(stage="frame")
+_stage_budget_ns = [int(STAGE_BUDGETS_MS[stage] * 1_000_000) for stage in STAGES]
+_frame_budget_ns = int(FRAME_BUDGET_MS * 1_000_000)
+_stage_index = {stage: index for index, stage in enumerate(STAGES)}
+
+
+@dataclass
+class SessionTrace:
+    """Recent per-frame stage timings for one real-time session."""
+
+    session_id: str
+    user_id: int
+    frames: Deque[Tuple[int, int, Tuple[int, ...]]] = field(
+        default_factory=lambda: deque(maxlen=TRACE_MAX_FRAMES)
+    )
+    frame_count: int = 0
+
+    def to_dict(self) -> dict:
+        """Serialize the trace with timings in milliseconds."""
+        return {
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "frame_count": self.frame_count,
+            "frame_budget_ms": FRAME_BUDGET_MS,
+            "stage_budgets_ms": STAGE_BUDGETS_MS,
+            "frames": [
+                {
+                    "frame": frame_number,
+                    "total_ms": total_ns / 1_000_000,
+                    "stages_ms": {
+                        stage: stage_ns / 1_000_000
+                        for stage, stage_ns in zip(STAGES, stages_ns, strict=True)
+                    },
+                }
+                for frame_number, total_ns, stages_ns in self.frames
+            ],
+        }
+
+
+class _StageTimer:
+    __slots__ = ("_frame", "_index", "_start")
+
+    def __init__(self, frame: "FrameTimer", index: int) -> None:
+        self._frame = frame
+        self._index = index
+        self._start = 0
+
+    def __enter__(self) -> None:
+        self._start = time.monotonic_ns()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._frame.stage_ns[self._index] += time.monotonic_ns() - self._start
+
+
+class FrameTimer:
+    """
+    Times the stages of a single frame.
+
+    Usage:
+        timer = FrameTimer(trace)
+        with timer.stage("pose"):
+            pose = detector.process(frame)
+        ...
+        timer.finish()
+    """
+
+    __slots__ = ("trace", "stage_ns", "_start")
+
+    def __init__(self, trace: Optional[SessionTrace] = None) -> None:
+        self.trace = trace
+        self.stage_ns = [0] * len(STAGES)
+        self._start = time.monotonic_ns()
+
+    def stage(self, name: str) -> _StageTimer:
+        """Context manager timing one pipeline stage."""
+        return _StageTimer(self, _stage_index[name])
+
+    def finish(self) -> int:
+        """
+        Record the frame's timings.
+
+        Returns:
+            Total frame processing time in nanoseconds
+        """
+        total_ns = time.monotonic_ns() - self._start
+
+        for index, elapsed_ns in enumerate(self.stage_ns):
+            if elapsed_ns:
+                _stage_series[index].observe(elapsed_ns / 1_000_000_000)
+                if elapsed_ns > _stage_budget_ns[index]:
+                    _stage_overruns[index].inc()
+        frame_duration.observe(total_ns / 1_000_000_000)
+        if total_ns > _frame_budget_ns:
+            _frame_overruns.inc()
+
+        if self.trace is not None:
+            self.trace.frame_count += 1
+            self.trace.frames.append((self.trace.frame_count, total_ns, tuple(self.stage_ns)))
+
+        return total_ns
+
+
+# Traces for sessions running on this node
+_session_traces: Dict[str, SessionTrace] = {}
+
+
+def start_session_trace(session_id: str, user_id: int) -> SessionTrace:
+    """
+    Start tracing a real-time session on this node.
+
+    Args:
+        session_id: Real-time session ID
+        user_id: Owner of the session
+
+    Returns:
+        Session trace to pass to each FrameTimer
+    """
+    trace = SessionTrace(session_id=session_id, user_id=user_id)
+    _session_traces[session_id] = trace
+    return trace
+
+
+def get_session_trace(session_id: str) -> Optional[SessionTrace]:
+    """Get the trace of a session running on this node."""
+    return _session_traces.get(session_id)
+
+
+def end_session_trace(session_id: str) -> None:
+    """Drop a session's trace when its stream stops."""
+    _session_traces.pop(session_id, None)
+
@@ -0,0 +1,183 @@
+"""
+Session-scoped user context for real-time analysis.
+
+The user, profile fields, metric baselines and compiled fault rules a
+real-time session needs are loaded once when the stream starts and pinned in
+memory for the life of the session, so the per-frame path does no I/O.
+Pinned contexts are refreshed in the background when a profile change event
+is published.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Mapping, Optional, Set, Tuple
+
+import redis.asyncio as aioredis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.core.redis_pool import blocking_redis_client, redis_client
+from app.services.error_detector import CompiledRuleSet, error_detector
+from app.services.stats_service import user_stats
+from app.services.user_service import PROFILE_EVENTS_CHANNEL, UserService
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SessionContext:
+    """Immutable snapshot of everything real-time analysis needs about a user."""
+
+    user_id: int
+    handicap: Optional[float]
+    dominant_hand: Optional[str]
+    primary_miss: Optional[str]
+    goals: Tuple[str, ...]
+    physical_limitations: Tuple[str, ...]
+    baselines: Mapping[str, float]
+    rules: CompiledRuleSet
+    loaded_at: float = field(default_factory=time.time)
+
+
+class SessionContextStore:
+    """Per-node store of pinned session contexts."""
+
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        blocking_client: Optional[aioredis.Redis] = None,
+    ) -> None:
+        self._redis = redis_client
+        # Blocking reads hold a connection while they wait
+        self._blocking_redis = blocking_client if blocking_client is not None else redis_client
+        self._session_factory = session_factory
+        self._contexts: Dict[int, SessionContext] = {}
+        self._sessions: Dict[int, Set[str]] = {}
+        self._refreshes: Set[asyncio.Task] = set()
+
+    async def open(self, session_id: str, user_id: int) -> SessionContext:
+        """
+        Load and pin a user's context at stream start.
+
+        Sessions of the same user share one pinned context.
+
+        Args:
+            session_id: Real-time session ID
+            user_id: User starting the session
+
+        Returns:
+            Pinned session context
+
+        Raises:
+            LookupError: If the user does not exist
+        """
+        context = self._contexts.get(user_id)
+        if context is None:
+            context = await self._load(user_id)
+            self._contexts[user_id] = context
+        self._sessions.setdefault(user_id, set()).add(session_id)
+        return context
+
+    def get(self, user_id: int) -> Optional[SessionContext]:
+        """
+        Get a pinned context (per-frame path, no I/O).
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Pinned context, or None if the user has no open session
+        """
+        return self._contexts.get(user_id)
+
+    def close(self, session_id: str, user_id: int) -> None:
+        """
+        Unpin a session; the context is dropped with the user's last session.
+
+        Args:
+            session_id: Real-time session ID
+            user_id: Owner of the session
+        """
+        sessions = self._sessions.get(user_id)
+        if sessions is None:
+            return
+        sessions.discard(session_id)
+        if not sessions:
+            del self._sessions[user_id]
+            self._contexts.pop(user_id, None)
+
+    async def refresh(self, user_id: int) -> None:
+        """
+        Reload a pinned context after a profile change.
+
+        The new snapshot replaces the old one atomically; frames in flight
+        keep using the snapshot they already hold.
+
+        Args:
+            user_id: User whose profile changed
+        """
+        if user_id not in self._contexts:
+            return
+        try:
+            context = await self._load(user_id)
+        except LookupError:
+            return
+        if user_id in self._sessions:
+            self._contexts[user_id] = context
+
+    async def listen(self) -> None:
+        """Refresh pinned contexts on profile change events until cancelled."""
+        while True:
+            try:
+                pubsub = self._blocking_redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(PROFILE_EVENTS_CHANNEL)
+                try:
+                    async for message in pubsub.listen():
+                        user_id = int(message["data"])
+                        if user_id in self._contexts:
+                            task = asyncio.create_task(self.refresh(user_id))
+                            self._refreshes.add(task)
+                            task.add_done_callback(self._refreshed)
+                finally:
+                    await pubsub.aclose()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(f"Profile event listener disconnected: {exc}")
+                await asyncio.sleep(5)
+
+    def _refreshed(self, task: asyncio.Task) -> None:
+        self._refreshes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            # The session keeps its previous snapshot
+            logger.warning(f"Failed to refresh session context: {task.exception()}")
+
+    async def _load(self, user_id: int) -> SessionContext:
+        async with self._session_factory() as db:
+            user = await UserService.get_user_by_id(db, user_id)
+            if user is None:
+                raise LookupError(f"User {user_id} not found")
+
+            profile = user.profile
+            dominant_hand = profile.dominant_hand if profile else None
+            limitations = tuple(profile.physical_limitations or ()) if profile else ()
+
+            return SessionContext(
+                user_id=user.id,
+                handicap=float(user.handicap) if user.handicap is not None else None,
+                dominant_hand=dominant_hand,
+                primary_miss=profile.primary_miss if profile else None,
+                goals=tuple(profile.goals or ()) if profile else (),
+                physical_limitations=limitations,
+                baselines=await user_stats.baselines(db, user.id),
+                rules=error_detector.compile(dominant_hand, limitations),
+            )
+
+
+session_contexts = SessionContextStore(redis_client, blocking_client=blocking_redis_client)
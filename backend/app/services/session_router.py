@@ -0,0 +1,234 @@
+"""
+Session router for real-time analysis workers.
+
+Real-time sessions keep per-session state (swing buffers, user context, pose
+trackers), so every frame of a session must reach the same analysis worker.
+Sessions are placed on workers with a consistent hash ring and the assignment
+is recorded in Redis, so any API node routes a session to the same worker and
+draining a worker only moves that worker's sessions.
+"""
+
+from __future__ import annotations
+
+import bisect
+import hashlib
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+from app.core.redis_pool import redis_client
+
+
+WORKERS_KEY = "realtime:workers"
+DRAINING_KEY = "realtime:workers:draining"
+SESSION_KEY_PREFIX = "realtime:session:"
+WORKER_SESSIONS_KEY_PREFIX = "realtime:worker_sessions:"
+
+
+def _hash(value: str) -> int:
+    """Hash a string onto the 64-bit ring space."""
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes."""
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 64) -> None:
+        self._vnodes = vnodes
+        self._nodes: set[str] = set()
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        for node in nodes:
+            self._nodes.add(node)
+        self._rebuild()
+
+    @property
+    def nodes(self) -> frozenset[str]:
+        """Nodes currently on the ring."""
+        return frozenset(self._nodes)
+
+    def add(self, node: str) -> None:
+        """Add a node to the ring."""
+        if node not in self._nodes:
+            self._nodes.add(node)
+            self._rebuild()
+
+    def remove(self, node: str) -> None:
+        """Remove a node from the ring."""
+        if node in self._nodes:
+            self._nodes.discard(node)
+            self._rebuild()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get the node owning a key.
+
+        Args:
+            key: Key to place on the ring
+
+        Returns:
+            Owning node, or None if the ring is empty
+        """
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+    def _rebuild(self) -> None:
+        ring = sorted(
+            (_hash(f"{node}#{replica}"), node)
+            for node in self._nodes
+            for replica in range(self._vnodes)
+        )
+        self._points = [point for point, _ in ring]
+        self._owners = [node for _, node in ring]
+
+
+@dataclass(frozen=True)
+class WorkerAssignment:
+    """Worker a real-time session is pinned to."""
+
+    session_id: str
+    worker_id: str
+    address: str
+
+
+@dataclass(frozen=True)
+class SessionHandoff:
+    """Session moved off a draining worker."""
+
+    session_id: str
+    from_worker: str
+    to_worker: Optional[str]
+
+
+class SessionRouter:
+    """Sticky, consistent-hash routing of real-time sessions to workers."""
+
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        vnodes: int = settings.REALTIME_WORKER_VNODES,
+        session_ttl_seconds: int = settings.REALTIME_SESSION_TTL_SECONDS,
+    ) -> None:
+        self._redis = redis_client
+        self._vnodes = vnodes
+        self._session_ttl = session_ttl_seconds
+        self._ring = HashRing(vnodes=vnodes)
+
+    async def register_worker(self, worker_id: str, address: str) -> None:
+        """
+        Register an analysis worker and make it eligible for new sessions.
+
+        Args:
+            worker_id: Unique worker identifier (e.g. "node-a/3")
+            address: Frame transport address (unix socket path or host:port)
+        """
+        await self._redis.hset(WORKERS_KEY, worker_id, address)
+        await self._redis.srem(DRAINING_KEY, worker_id)
+
+    async def assign(self, session_id: str) -> WorkerAssignment:
+        """
+        Get the worker for a session, assigning one on first use.
+
+        An existing assignment is kept as long as its worker is live and not
+        draining, so sessions stay sticky when workers join the pool.
+
+        Args:
+            session_id: Real-time session ID
+
+        Returns:
+            Worker assignment
+
+        Raises:
+            RuntimeError: If no worker is available
+        """
+        workers = await self._redis.hgetall(WORKERS_KEY)
+        ring = await self._active_ring(workers)
+        session_key = f"{SESSION_KEY_PREFIX}{session_id}"
+
+        current = await self._redis.get(session_key)
+        if current is not None and current in ring.nodes:
+            await self._redis.expire(session_key, self._session_ttl)
+            return WorkerAssignment(session_id, current, workers[current])
+
+        worker_id = ring.get(session_id)
+        if worker_id is None:
+            raise RuntimeError("No real-time analysis workers available")
+
+        await self._move_session(session_id, current, worker_id)
+        return WorkerAssignment(session_id, worker_id, workers[worker_id])
+
+    async def release(self, session_id: str) -> None:
+        """
+        Forget a session's assignment once its stream has stopped.
+
+        Args:
+            session_id: Real-time session ID
+        """
+        session_key = f"{SESSION_KEY_PREFIX}{session_id}"
+        worker_id = await self._redis.get(session_key)
+        await self._redis.delete(session_key)
+        if worker_id is not None:
+            await self._redis.srem(f"{WORKER_SESSIONS_KEY_PREFIX}{worker_id}", session_id)
+
+    async def drain(self, worker_id: str) -> List[SessionHandoff]:
+        """
+        Stop routing to a worker and reassign its sessions.
+
+        The draining worker uses the returned handoffs to forward each
+        session's state to its new owner before shutting down.
+
+        Args:
+            worker_id: Worker to drain
+
+        Returns:
+            Handoffs for every session the worker owned
+        """
+        await self._redis.sadd(DRAINING_KEY, worker_id)
+        ring = await self._active_ring(await self._redis.hgetall(WORKERS_KEY))
+
+        handoffs = []
+        sessions = await self._redis.smembers(f"{WORKER_SESSIONS_KEY_PREFIX}{worker_id}")
+        for session_id in sorted(sessions):
+            new_worker = ring.get(session_id)
+            if new_worker is None:
+                await self.release(session_id)
+            else:
+                await self._move_session(session_id, worker_id, new_worker)
+            handoffs.append(SessionHandoff(session_id, worker_id, new_worker))
+
+        return handoffs
+
+    async def deregister_worker(self, worker_id: str) -> None:
+        """
+        Remove a drained worker from the pool.
+
+        Args:
+            worker_id: Worker to remove
+        """
+        await self._redis.hdel(WORKERS_KEY, worker_id)
+        await self._redis.srem(DRAINING_KEY, worker_id)
+        await self._redis.delete(f"{WORKER_SESSIONS_KEY_PREFIX}{worker_id}")
+
+    async def _active_ring(self, workers: dict[str, str]) -> HashRing:
+        draining = await self._redis.smembers(DRAINING_KEY)
+        active = set(workers) - set(draining)
+        if active != self._ring.nodes:
+            self._ring = HashRing(active, vnodes=self._vnodes)
+        return self._ring
+
+    async def _move_session(
+        self, session_id: str, from_worker: Optional[str], to_worker: str
+    ) -> None:
+        await self._redis.set(
+            f"{SESSION_KEY_PREFIX}{session_id}", to_worker, ex=self._session_ttl
+        )
+        await self._redis.sadd(f"{WORKER_SESSIONS_KEY_PREFIX}{to_worker}", session_id)
+        if from_worker is not None and from_worker != to_worker:
+            await self._redis.srem(f"{WORKER_SESSIONS_KEY_PREFIX}{from_worker}", session_id)
+
+
+session_router = SessionRouter(redis_client)
@@ -0,0 +1,421 @@
+"""
+User statistics engine.
+
+Statistics are served from rollups maintained as each analysis completes
+rather than by scanning a user's analyses: a per-day row and an all-time row
+per user hold running counts and sums. A week, month or year reads at most
+one row per day of the period and "all" reads the all-time row, so the cost
+of a request does not grow with the user's history. Computed statistics are
+cached in Redis for CACHE_TTL_MEDIUM and invalidated when a new analysis is
+recorded; concurrent misses for the same statistics are computed once, and
+statistics computed before an invalidation are not cached.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, Mapping, Optional, Sequence
+
+import redis.asyncio as aioredis
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import registry
+from app.core.redis_pool import redis_client, run_pipeline
+from app.core.replicas import replica_router
+from app.core.response_cache import response_cache
+from app.models.stats import SwingStatsColumns, SwingStatsDaily, SwingStatsTotal
+from app.utils.singleflight import SingleFlight
+
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY_PREFIX = "stats:"
+
+# KEYS[1] statistics, KEYS[2] the user's statistics generation; ARGV:
+# generation read before computing, TTL, statistics. Caches the statistics
+# unless they have been invalidated since.
+CACHE_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[3], 'EX', ARGV[2])
+return 1
+"""
+
+# Days covered by each period; "all" reads the all-time rollup
+PERIOD_DAYS: Mapping[str, Optional[int]] = {"week": 7, "month": 30, "year": 365, "all": None}
+
+# Recent days compared to assess the trend of all-time statistics
+ALL_TIME_TREND_DAYS = 90
+
+# Change in average score (0-10) between the halves of a period that
+# counts as improving or regressing
+TREND_THRESHOLD = 0.25
+
+MOST_COMMON_ISSUES = 5
+
+# Metrics reported in UserStats.biomechanics_avg
+AVERAGED_METRICS = ("spine_angle", "hip_rotation", "shoulder_turn", "x_factor")
+
+stats_requests = registry.counter(
+    "golfcoach_user_stats_requests_total",
+    "User statistics requests by result",
+    labelnames=("result",),
+)
+
+
+class _Rollup:
+    """Sums of several rollup rows."""
+
+    def __init__(self, rows: Iterable[SwingStatsColumns] = ()) -> None:
+        self.swings_analyzed = 0
+        self.scored_swings = 0
+        self.score_sum = 0.0
+        self.issue_counts: Counter = Counter()
+        self.metric_sums: Counter = Counter()
+        self.metric_counts: Counter = Counter()
+        for row in rows:
+            self.add(row)
+
+    def add(self, row: SwingStatsColumns) -> None:
+        self.swings_analyzed += row.swings_analyzed
+        self.scored_swings += row.scored_swings
+        self.score_sum += row.score_sum
+        self.issue_counts.update(row.issue_counts or {})
+        self.metric_sums.update(row.metric_sums or {})
+        self.metric_counts.update(row.metric_counts or {})
+
+    @property
+    def average_score(self) -> Optional[float]:
+        return self.score_sum / self.scored_swings if self.scored_swings else None
+
+    def metric_average(self, metric: str) -> float:
+        """Average of a metric over all phases it was measured in."""
+        keys = [key for key in self.metric_counts if key.rsplit(".", 1)[-1] == metric]
+        count = sum(self.metric_counts[key] for key in keys)
+        return sum(self.metric_sums[key] for key in keys) / count if count else 0.0
+
+
+def analysis_score(analysis: Mapping) -> Optional[float]:
+    """
+    Overall score of an analysis: the mean quality score of its phases.
+
+    Args:
+        analysis: Structured coaching analysis
+
+    Returns:
+        Score (0-10), or None if the analysis scores no phases
+    """
+    scores = [
+        float(phase["quality_score"])
+        for phase in analysis.get("swing_phases") or []
+        if isinstance(phase.get("quality_score"), (int, float))
+    ]
+    return sum(scores) / len(scores) if scores else None
+
+
+def improvement_trend(earlier: Optional[float], later: Optional[float]) -> str:
+    """
+    Classify the change in average score between two halves of a period.
+
+    Args:
+        earlier: Average score of the earlier half, None if unscored
+        later: Average score of the later half, None if unscored
+
+    Returns:
+        "improving", "regressing" or "stable"
+    """
+    if earlier is None or later is None:
+        return "stable"
+    if later - earlier >= TREND_THRESHOLD:
+        return "improving"
+    if earlier - later >= TREND_THRESHOLD:
+        return "regressing"
+    return "stable"
+
+
+class UserStatsService:
+    """Maintains swing statistics rollups and serves user statistics."""
+
+    def __init__(
+        self,
+        redis_client: Optional[aioredis.Redis],
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        ttl_seconds: int = settings.CACHE_TTL_MEDIUM,
+    ) -> None:
+        self._redis = redis_client
+        self._session_factory = session_factory
+        self._ttl = ttl_seconds
+        self._computations = SingleFlight("user_stats")
+
+    async def record_analysis(
+        self,
+        user_id: int,
+        analysis: Mapping,
+        biomechanics: Mapping[str, Mapping[str, float]],
+        faults: Sequence[str] = (),
+        analyzed_at: Optional[datetime] = None,
+    ) -> None:
+        """
+        Add a completed analysis to the user's rollups.
+
+        Failures are logged rather than raised, so statistics never fail an
+        analysis.
+
+        Args:
+            user_id: User ID
+            analysis: Structured coaching analysis
+            biomechanics: Key-phase metrics of the swing, by phase
+            faults: Faults detected by the rule engine
+            analyzed_at: Completion time (defaults to now)
+        """
+        day = (analyzed_at or datetime.now(timezone.utc)).astimezone(timezone.utc).date()
+        score = analysis_score(analysis)
+        metrics = {
+            f"{phase}.{metric}": float(value)
+            for phase, phase_metrics in biomechanics.items()
+            for metric, value in phase_metrics.items()
+            if isinstance(value, (int, float))
+        }
+
+        try:
+            async with self._session_factory() as db:
+                # Lock the daily row before the all-time row, in the same
+                # order in every transaction
+                daily, new_day = await self._lock_row(db, SwingStatsDaily, user_id=user_id, day=day)
+                total, _ = await self._lock_row(db, SwingStatsTotal, user_id=user_id)
+                for row in (daily, total):
+                    self._apply(row, score, set(faults), metrics)
+                if new_day:
+                    total.practice_days += 1
+                await db.commit()
+        except (SQLAlchemyError, OSError) as exc:
+            logger.warning(f"Failed to record statistics of user {user_id}: {exc}")
+            return
+
+        # Keep the user's statistics on the primary until replicas catch up
+        await replica_router.mark_write(user_id)
+        await self.invalidate(user_id)
+
+    async def get_stats(
+        self, db: AsyncSession, user_id: int, period: str, today: Optional[date] = None
+    ) -> Dict:
+        """
+        Get a user's statistics for a period.
+
+        Concurrent misses for the same statistics, on any node, are computed
+        once (e.g. every device of a user refreshing after an analysis). The
+        shared computation outlives any one caller's request, so it reads in
+        a session of its own (from a replica when one qualifies).
+
+        Args:
+            db: Database session, only used for statistics up to a given day
+            user_id: User ID
+            period: "week", "month", "year" or "all"
+            today: Last day of the period (defaults to today, UTC)
+
+        Returns:
+            Statistics matching the UserStats schema
+        """
+        if today is not None:
+            stats_requests.inc(result="miss")
+            return await self._compute(db, user_id, period, today)
+
+        key = f"{STATS_KEY_PREFIX}{user_id}:{period}"
+        stats = await self._get_cached(key)
+        if stats is not None:
+            return stats
+        return await self._computations.do(
+            key, lambda: self._compute_and_cache(user_id, period, key), self._redis
+        )
+
+    async def baselines(self, db: AsyncSession, user_id: int) -> Dict[str, float]:
+        """
+        Get a user's all-time average of each key-phase metric.
+
+        Args:
+            db: Database session
+            user_id: User ID
+
+        Returns:
+            Baseline values keyed "phase.metric"
+        """
+        total = await db.get(SwingStatsTotal, user_id)
+        if total is None:
+            return {}
+        return {
+            key: total.metric_sums[key] / count
+            for key, count in (total.metric_counts or {}).items()
+            if count
+        }
+
+    async def invalidate(self, user_id: int) -> None:
+        """
+        Drop a user's cached statistics and statistics responses.
+
+        Args:
+            user_id: User ID
+        """
+        if self._redis is not None:
+            generation_key = self._generation_key(user_id)
+            try:
+                await run_pipeline(
+                    [
+                        ("incr", generation_key),
+                        ("expire", generation_key, self._ttl),
+                        ("delete", *(f"{STATS_KEY_PREFIX}{user_id}:{p}" for p in PERIOD_DAYS)),
+                    ],
+                    client=self._redis,
+                    transaction=True,
+                )
+            except aioredis.RedisError as exc:
+                logger.warning(f"Failed to invalidate statistics of user {user_id}: {exc}")
+        # After the statistics, so responses are not rebuilt from stale ones
+        await response_cache.invalidate(f"user:{user_id}:stats")
+
+    async def _get_cached(self, key: str) -> Optional[Dict]:
+        if self._redis is None:
+            return None
+        try:
+            cached = await self._redis.get(key)
+        except aioredis.RedisError as exc:
+            logger.warning(f"Statistics cache unavailable: {exc}")
+            return None
+        if not cached:
+            return None
+        stats_requests.inc(result="hit")
+        return json.loads(cached)
+
+    async def _get_generation(self, user_id: int) -> Optional[str]:
+        if self._redis is None:
+            return None
+        try:
+            return await self._redis.get(self._generation_key(user_id)) or "0"
+        except aioredis.RedisError as exc:
+            logger.warning(f"Statistics cache unavailable: {exc}")
+            return None
+
+    @staticmethod
+    def _generation_key(user_id: int) -> str:
+        return f"{STATS_KEY_PREFIX}{user_id}:generation"
+
+    async def _compute_and_cache(self, user_id: int, period: str, key: str) -> Dict:
+        # Another node may have computed them while this one waited for the lock
+        stats = await self._get_cached(key)
+        if stats is not None:
+            return stats
+
+        stats_requests.inc(result="miss")
+        # Read before computing: an analysis recorded meanwhile bumps it
+        generation = await self._get_generation(user_id)
+        session_factory = await replica_router.reader(user_id) or self._session_factory
+        async with session_factory() as db:
+            stats = await self._compute(db, user_id, period, datetime.now(timezone.utc).date())
+        if generation is not None:
+            try:
+                await self._redis.eval(
+                    CACHE_SCRIPT,
+                    2,
+                    key,
+                    self._generation_key(user_id),
+                    generation,
+                    self._ttl,
+                    json.dumps(stats),
+                )
+            except aioredis.RedisError as exc:
+                logger.warning(f"Failed to cache statistics of user {user_id}: {exc}")
+        return stats
+
+    async def _compute(self, db: AsyncSession, user_id: int, period: str, today: date) -> Dict:
+        days = PERIOD_DAYS[period]
+        trend_days = days or ALL_TIME_TREND_DAYS
+        start = today - timedelta(days=trend_days - 1)
+        midpoint = start + timedelta(days=trend_days // 2)
+
+        query = select(SwingStatsDaily).where(
+            SwingStatsDaily.user_id == user_id,
+            SwingStatsDaily.day >= start,
+            SwingStatsDaily.day <= today,
+        )
+        daily = (await db.execute(query)).scalars().all()
+        earlier = _Rollup(row for row in daily if row.day < midpoint)
+        later = _Rollup(row for row in daily if row.day >= midpoint)
+
+        if days is None:
+            total = await db.get(SwingStatsTotal, user_id)
+            rollup = _Rollup([total] if total is not None else [])
+            practice_sessions = total.practice_days if total is not None else 0
+        else:
+            rollup = _Rollup(daily)
+            practice_sessions = sum(1 for row in daily if row.swings_analyzed)
+
+        swings = rollup.swings_analyzed
+        return {
+            "user_id": user_id,
+            "period": period,
+            "swings_analyzed": swings,
+            "average_score": round(rollup.average_score or 0.0, 1),
+            "improvement_trend": improvement_trend(earlier.average_score, later.average_score),
+            "most_common_issues": [
+                {"issue": issue, "count": count, "percentage": round(100 * count / swings, 1)}
+                for issue, count in rollup.issue_counts.most_common(MOST_COMMON_ISSUES)
+            ],
+            "biomechanics_avg": {
+                metric: round(rollup.metric_average(metric), 1) for metric in AVERAGED_METRICS
+            },
+            # Drill completion is not tracked yet
+            "drills_completed": 0,
+            "practice_sessions": practice_sessions,
+        }
+
+    @staticmethod
+    async def _lock_row(db: AsyncSession, model: type, **key) -> tuple:
+        """Create a rollup row if missing and lock it; returns (row, created)."""
+        insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        result = await db.execute(insert(model).values(**key).on_conflict_do_nothing())
+        query = (
+            select(model)
+            .filter_by(**key)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        row = (await db.execute(query)).scalar_one()
+        return row, result.rowcount == 1
+
+    @staticmethod
+    def _apply(
+        row: SwingStatsColumns,
+        score: Optional[float],
+        faults: Iterable[str],
+        metrics: Mapping[str, float],
+    ) -> None:
+        """Add one analysis to a rollup row."""
+        row.swings_analyzed += 1
+        if score is not None:
+            row.scored_swings += 1
+            row.score_sum += score
+        # JSON columns are replaced, not mutated in place, to be saved
+        issue_counts = dict(row.issue_counts or {})
+        for fault in faults:
+            issue_counts[fault] = issue_counts.get(fault, 0) + 1
+        row.issue_counts = issue_counts
+        metric_sums = dict(row.metric_sums or {})
+        metric_counts = dict(row.metric_counts or {})
+        for key, value in metrics.items():
+            metric_sums[key] = metric_sums.get(key, 0.0) + value
+            metric_counts[key] = metric_counts.get(key, 0) + 1
+        row.metric_sums = metric_sums
+        row.metric_counts = metric_counts
+        row.updated_at = datetime.now(timezone.utc)
+
+
+user_stats = UserStatsService(redis_client)
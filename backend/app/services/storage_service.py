@@ -4,12 +4,14 @@ Storage service for handling MinIO object storage operations.
 
 from __future__ import annotations
 
+import asyncio
 from datetime import timedelta
 from typing import BinaryIO
 
 from minio import Minio
 
 from app.core.config import settings
+from app.utils.singleflight import SingleFlight
 
 
 class StorageService:
@@ -24,6 +26,7 @@ class StorageService:
         )
         self._bucket_name = settings.MINIO_BUCKET_NAME
         self._bucket_checked = False
+        self._signing = SingleFlight("signed_url")
         self._ensure_bucket_exists()
 
     def _ensure_bucket_exists(self) -> None:
@@ -78,5 +81,24 @@ class StorageService:
             expires=timedelta(seconds=expiry_seconds),
         )
 
+    async def get_signed_url(self, object_key: str, expiry_seconds: int) -> str:
+        """
+        Generate a presigned URL for an object without blocking the event loop.
+
+        Concurrent requests for the same object and expiry share one
+        signature (and the bucket lookups before it).
+
+        Args:
+            object_key: Object key in the bucket
+            expiry_seconds: URL expiration time in seconds
+
+        Returns:
+            Presigned URL string
+        """
+        return await self._signing.do(
+            f"{object_key}:{expiry_seconds}",
+            lambda: asyncio.to_thread(self.generate_signed_url, object_key, expiry_seconds),
+        )
+
 
 storage_service = StorageService()
@@ -0,0 +1,235 @@
+"""
+Revocation of refresh tokens.
+
+Tokens carry a short random ID (jti). Revoking a token adds its jti to a
+Redis set bucketed by the day the token expires, so a revoked token costs
+a few dozen bytes instead of a key holding the whole JWT, and whole
+buckets expire once their tokens have.
+
+Every node keeps a Bloom filter of the revoked jtis. It is rebuilt from
+Redis every AUTH_REVOCATION_SYNC_INTERVAL_SECONDS and receives new
+revocations over pub/sub in between, so most checks of non-revoked tokens
+never reach Redis; only filter hits are confirmed there. While the filter
+cannot be trusted (listener disconnected, sync overdue), every check goes
+to Redis.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.redis_pool import blocking_redis_client, redis_client, run_pipeline
+from app.utils.bloom import BloomFilter
+
+
+logger = logging.getLogger(__name__)
+
+REVOKED_KEY_PREFIX = "auth:revoked:"
+REVOCATIONS_CHANNEL = "auth:revocations"
+# Revocations of tokens issued without a jti (before jtis were introduced)
+LEGACY_KEY_PREFIX = "blacklist:"
+
+DAY_SECONDS = 86400
+
+checks_total = registry.counter(
+    "golfcoach_token_revocation_checks_total",
+    "Refresh token revocation checks by how they were answered",
+    labelnames=("source",),
+)
+
+
+def token_id(token: str, payload: Dict[str, Any]) -> str:
+    """
+    Get the ID a token is revoked by.
+
+    Args:
+        token: Encoded JWT
+        payload: Decoded payload of the token
+
+    Returns:
+        The token's jti, or a hash of the token if it has none
+    """
+    return payload.get("jti") or hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+class TokenRevocationStore:
+    """Revoked token IDs in Redis, fronted by a per-node Bloom filter."""
+
+    def __init__(
+        self,
+        redis_client: Optional[aioredis.Redis],
+        sync_interval_seconds: float = settings.AUTH_REVOCATION_SYNC_INTERVAL_SECONDS,
+        filter_capacity: int = settings.AUTH_REVOCATION_FILTER_CAPACITY,
+        filter_error_rate: float = settings.AUTH_REVOCATION_FILTER_ERROR_RATE,
+        retention_days: int = settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS,
+        blocking_client: Optional[aioredis.Redis] = None,
+    ) -> None:
+        self._redis = redis_client
+        # Blocking reads hold a connection while they wait
+        self._blocking_redis = blocking_client if blocking_client is not None else redis_client
+        self._sync_interval = sync_interval_seconds
+        self._capacity = filter_capacity
+        self._error_rate = filter_error_rate
+        self._retention_days = retention_days
+        self._filter = BloomFilter(filter_capacity, filter_error_rate)
+        self._synced_at: Optional[float] = None
+        self._subscribed = False
+        # A filter that missed a sync may be missing revocations
+        self._stale_after = 3 * sync_interval_seconds
+
+    @property
+    def filter_trusted(self) -> bool:
+        """Whether a filter miss proves a token is not revoked."""
+        return (
+            self._subscribed
+            and self._synced_at is not None
+            and time.monotonic() - self._synced_at <= self._stale_after
+        )
+
+    async def revoke(self, jti: str, expires_at: int) -> None:
+        """
+        Revoke a token until it expires, on every node.
+
+        Args:
+            jti: Token ID
+            expires_at: Token expiry (epoch seconds)
+        """
+        self._filter.add(jti)
+        if self._redis is None:
+            return
+        key = self._bucket_key(expires_at)
+        await run_pipeline(
+            [
+                ("sadd", key, jti),
+                # The bucket outlives every token expiring on its day
+                ("expireat", key, (expires_at // DAY_SECONDS + 1) * DAY_SECONDS + 60),
+                ("publish", REVOCATIONS_CHANNEL, jti),
+            ],
+            client=self._redis,
+            transaction=True,
+        )
+
+    async def is_revoked(self, jti: str, expires_at: int) -> bool:
+        """
+        Check whether a token has been revoked.
+
+        Without Redis the filter alone answers, so a false positive
+        rejects a valid token.
+
+        Args:
+            jti: Token ID
+            expires_at: Token expiry (epoch seconds)
+
+        Returns:
+            True if the token has been revoked
+
+        Raises:
+            RedisError: If Redis has to be asked and is unavailable
+        """
+        if self._redis is None:
+            return jti in self._filter
+        if self.filter_trusted and jti not in self._filter:
+            checks_total.inc(source="filter")
+            return False
+        checks_total.inc(source="redis")
+        return bool(await self._redis.sismember(self._bucket_key(expires_at), jti))
+
+    async def revoke_token(self, token: str, payload: Dict[str, Any]) -> None:
+        """
+        Revoke an encoded token.
+
+        Args:
+            token: Encoded JWT
+            payload: Decoded payload of the token
+        """
+        await self.revoke(token_id(token, payload), int(payload["exp"]))
+
+    async def is_token_revoked(self, token: str, payload: Dict[str, Any]) -> bool:
+        """
+        Check whether an encoded token has been revoked.
+
+        Args:
+            token: Encoded JWT
+            payload: Decoded payload of the token
+
+        Returns:
+            True if the token has been revoked
+
+        Raises:
+            RedisError: If Redis has to be asked and is unavailable
+        """
+        if await self.is_revoked(token_id(token, payload), int(payload["exp"])):
+            return True
+        if "jti" in payload or self._redis is None:
+            return False
+        # Tokens issued before jtis were revoked under their full text;
+        # the check goes away once those tokens have expired
+        return bool(await self._redis.get(f"{LEGACY_KEY_PREFIX}{token}"))
+
+    async def sync(self) -> None:
+        """Rebuild the filter from the revocations stored in Redis."""
+        if self._redis is None:
+            return
+        today = int(time.time()) // DAY_SECONDS
+        buckets = await run_pipeline(
+            [
+                ("smembers", f"{REVOKED_KEY_PREFIX}{day}")
+                for day in range(today, today + self._retention_days + 2)
+            ],
+            client=self._redis,
+        )
+        revoked: List[str] = [jti for bucket in buckets for jti in bucket]
+        self._filter = BloomFilter.from_items(
+            revoked, max(self._capacity, len(revoked)), self._error_rate
+        )
+        self._synced_at = time.monotonic()
+
+    async def listen(self) -> None:
+        """Keep the filter in sync with revocations on all nodes until cancelled."""
+        if self._redis is None:
+            return
+        while True:
+            try:
+                pubsub = self._blocking_redis.pubsub(ignore_subscribe_messages=True)
+                # Subscribe before syncing, so no revocation falls in between
+                await pubsub.subscribe(REVOCATIONS_CHANNEL)
+                try:
+                    await self.sync()
+                    self._subscribed = True
+                    while True:
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True, timeout=self._sync_interval
+                        )
+                        if message is not None:
+                            self._filter.add(message["data"])
+                        if time.monotonic() - self._synced_at >= self._sync_interval:
+                            await self.sync()
+                finally:
+                    self._subscribed = False
+                    await pubsub.aclose()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(f"Token revocation listener disconnected: {exc}")
+                await asyncio.sleep(5)
+
+    def reset(self) -> None:
+        """Forget all local revocation state (the filter is untrusted until the next sync)."""
+        self._filter = BloomFilter(self._capacity, self._error_rate)
+        self._synced_at = None
+        self._subscribed = False
+
+    @staticmethod
+    def _bucket_key(expires_at: int) -> str:
+        return f"{REVOKED_KEY_PREFIX}{expires_at // DAY_SECONDS}"
+
+
+token_revocations = TokenRevocationStore(redis_client, blocking_client=blocking_redis_client)
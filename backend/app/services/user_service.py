@@ -2,39 +2,60 @@
 User service with business logic for user operations.
 
 Handles user CRUD, authentication, profile management, etc.
+
+Every user is returned with the profile joined in the same query: response
+models serialize the profile, and it cannot be lazily loaded in async code.
 """
 
+import logging
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
+import redis.asyncio as aioredis
 
 from app.models.user import User, UserProfile
 from app.schemas.user import UserCreate, UserUpdate, UserProfileUpdate
-from app.core.security import hash_password, verify_password, generate_tokens
+from app.core.password_hashing import password_hasher
+from app.core.security import generate_tokens
+from app.core.redis_pool import redis_client
+from app.core.replicas import replica_router
+from app.core.response_cache import response_cache
+from app.services.principal_cache import PROFILE_EVENTS_CHANNEL, principal_cache
+
+
+logger = logging.getLogger(__name__)
 
 
 class UserService:
     """Service class for user-related operations."""
 
     @staticmethod
-    def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
+    async def get_user_by_id(
+        db: AsyncSession, user_id: int, refresh: bool = False
+    ) -> Optional[User]:
         """
-        Get user by ID.
+        Get user by ID, with the profile joined.
 
         Args:
             db: Database session
             user_id: User ID
+            refresh: Reload the user even if it is already in the session
 
         Returns:
             User if found, None otherwise
         """
-        return db.query(User).filter(User.id == user_id).first()
+        query = select(User).options(joinedload(User.profile)).where(User.id == user_id)
+        if refresh:
+            query = query.execution_options(populate_existing=True)
+        return (await db.execute(query)).scalar_one_or_none()
 
     @staticmethod
-    def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
         """
-        Get user by email.
+        Get user by email, with the profile joined.
 
         Args:
             db: Database session
@@ -43,12 +64,16 @@ class UserService:
         Returns:
             User if found, None otherwise
         """
-        return db.query(User).filter(User.email == email).first()
+        query = select(User).options(joinedload(User.profile)).where(User.email == email)
+        return (await db.execute(query)).scalar_one_or_none()
 
     @staticmethod
-    def create_user(db: Session, user_data: UserCreate) -> User:
+    async def create_user(db: AsyncSession, user_data: UserCreate) -> User:
         """
-        Create a new user.
+        Create a new user with an empty profile, in one transaction.
+
+        Server-generated columns are returned by the INSERTs, so the new
+        user is not queried again.
 
         Args:
             db: Database session
@@ -60,48 +85,38 @@ class UserService:
         Raises:
             HTTPException: If email already exists
         """
-        # Check if email already exists
-        existing_user = UserService.get_user_by_email(db, user_data.email)
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Email already registered",
-            )
-
-        # Hash password
-        hashed_password = hash_password(user_data.password)
+        # Hash password (in the hashing pool, off the event loop)
+        hashed_password = await password_hasher.hash(user_data.password)
 
-        # Create user
+        # Create user with empty profile; a duplicate email violates the
+        # unique constraint
         db_user = User(
             email=user_data.email,
             password_hash=hashed_password,
             full_name=user_data.full_name,
+            profile=UserProfile(),
         )
 
         try:
             db.add(db_user)
-            db.commit()
-            db.refresh(db_user)
+            await db.commit()
         except IntegrityError as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="Email already registered",
             ) from e
 
-        # Create empty profile
-        db_profile = UserProfile(user_id=db_user.id)
-        db.add(db_profile)
-        db.commit()
-        db.refresh(db_user)
-
         return db_user
 
     @staticmethod
-    def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+    async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
         """
         Authenticate user with email and password.
 
+        A password hash made with stale parameters is replaced with a
+        current one on success.
+
         Args:
             db: Database session
             email: User email
@@ -109,18 +124,33 @@ class UserService:
 
         Returns:
             User if authentication successful, None otherwise
+
+        Raises:
+            HTTPException 503: Password hashing pool overloaded
         """
-        user = UserService.get_user_by_email(db, email)
+        user = await UserService.get_user_by_email(db, email)
         if not user:
             return None
 
-        if not verify_password(password, user.password_hash):
+        valid, new_hash = await password_hasher.verify(password, user.password_hash)
+        if not valid:
             return None
 
+        if new_hash is not None:
+            # Not through the loaded user, whose updated_at would expire
+            await db.execute(
+                update(User)
+                .where(User.id == user.id)
+                .values(password_hash=new_hash)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            logger.info(f"Upgraded password hash of user {user.id}")
+
         return user
 
     @staticmethod
-    def update_user(db: Session, user: User, user_update: UserUpdate) -> User:
+    async def update_user(db: AsyncSession, user: User, user_update: UserUpdate) -> User:
         """
         Update user information.
 
@@ -164,12 +194,34 @@ class UserService:
             if profile_update.physical_limitations is not None:
                 profile.physical_limitations = profile_update.physical_limitations
 
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        user = await UserService.get_user_by_id(db, user.id, refresh=True)
+
+        await replica_router.mark_write(user.id)
+        await principal_cache.invalidate(user.id)
+        await response_cache.invalidate(f"user:{user.id}:profile")
+        await UserService.publish_profile_changed(user.id)
         return user
 
     @staticmethod
-    def delete_user(db: Session, user: User) -> None:
+    async def publish_profile_changed(user_id: int) -> None:
+        """
+        Announce a user/profile change so pinned session contexts refresh
+        and cached principals are evicted on every node.
+
+        Failures are logged and swallowed: a missed event only delays the
+        refresh until the user's next real-time session.
+
+        Args:
+            user_id: User whose profile changed
+        """
+        try:
+            await redis_client.publish(PROFILE_EVENTS_CHANNEL, str(user_id))
+        except aioredis.RedisError as exc:
+            logger.warning(f"Failed to publish profile change for user {user_id}: {exc}")
+
+    @staticmethod
+    async def delete_user(db: AsyncSession, user: User) -> None:
         """
         Delete a user.
 
@@ -177,11 +229,16 @@ class UserService:
             db: Database session
             user: User to delete
         """
-        db.delete(user)
-        db.commit()
+        await db.delete(user)
+        await db.commit()
+
+        await principal_cache.invalidate(user.id)
+        # Every cached response of the user
+        await response_cache.invalidate(f"user:{user.id}")
+        await UserService.publish_profile_changed(user.id)
 
     @staticmethod
-    def register_user(db: Session, user_data: UserCreate) -> dict:
+    async def register_user(db: AsyncSession, user_data: UserCreate) -> dict:
         """
         Register a new user and generate tokens.
 
@@ -192,7 +249,7 @@ class UserService:
         Returns:
             Dictionary with user and tokens
         """
-        user = UserService.create_user(db, user_data)
+        user = await UserService.create_user(db, user_data)
         tokens = generate_tokens(user.id)
 
         return {
@@ -201,7 +258,7 @@ class UserService:
         }
 
     @staticmethod
-    def login_user(db: Session, email: str, password: str) -> dict:
+    async def login_user(db: AsyncSession, email: str, password: str) -> dict:
         """
         Login user and generate tokens.
 
@@ -216,7 +273,7 @@ class UserService:
         Raises:
             HTTPException: If credentials are invalid
         """
-        user = UserService.authenticate_user(db, email, password)
+        user = await UserService.authenticate_user(db, email, password)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,65 @@
+"""
+Bloom filter for fast negative membership checks.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+from typing import Iterable, Iterator
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter of strings.
+
+    Membership tests never give false negatives; false positives occur at
+    about `error_rate` while at most `capacity` items have been added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    @classmethod
+    def from_items(cls, items: Iterable[str], capacity: int, error_rate: float) -> BloomFilter:
+        """
+        Build a filter holding the given items.
+
+        Args:
+            items: Items to add
+            capacity: Expected number of items
+            error_rate: False positive rate at capacity
+
+        Returns:
+            Filter
+        """
+        bloom = cls(capacity, error_rate)
+        for item in items:
+            bloom.add(item)
+        return bloom
+
+    def add(self, item: str) -> None:
+        """
+        Add an item.
+
+        Args:
+            item: Item to add
+        """
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item)
+        )
+
+    def _positions(self, item: str) -> Iterator[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
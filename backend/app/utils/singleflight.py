@@ -0,0 +1,138 @@
+"""
+Request coalescing (single-flight) for identical concurrent async calls.
+
+When several callers ask for the same thing at once, e.g. the phone, watch
+and coach all fetching a just-completed analysis, only the first call
+(the leader) runs; the others await its result or exception. The work runs
+in its own task, so it completes even if the leader's request is
+cancelled, and later callers start a new flight once it has finished.
+
+Flights are merged within a process. Passing a Redis client extends them
+across nodes: the leader on each node takes a Redis lock for the key
+before running, so one node does the work while the others wait for the
+lock. The result is not handed across nodes, so the call should first look
+in a cache shared by the nodes, where a node that waited finds it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import redis.asyncio as aioredis
+from redis.exceptions import LockError
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY_PREFIX = "singleflight:"
+
+T = TypeVar("T")
+
+calls_total = registry.counter(
+    "golfcoach_singleflight_calls_total",
+    "Coalescable calls by group and whether they ran or joined a call in flight",
+    labelnames=("group", "role"),
+)
+lock_waits_total = registry.counter(
+    "golfcoach_singleflight_lock_waits_total",
+    "Cross-node locks taken by leaders, by group and outcome",
+    labelnames=("group", "outcome"),
+)
+
+
+class SingleFlight:
+    """
+    Merges concurrent calls with the same key into one.
+
+    Usage:
+        flight = SingleFlight("user_stats")
+        stats = await flight.do(f"{user_id}:{period}", lambda: compute(user_id, period))
+    """
+
+    def __init__(
+        self,
+        group: str,
+        lock_timeout_seconds: float = settings.SINGLEFLIGHT_LOCK_TIMEOUT_SECONDS,
+        lock_wait_seconds: float = settings.SINGLEFLIGHT_LOCK_WAIT_SECONDS,
+    ) -> None:
+        self.group = group
+        self._lock_timeout = lock_timeout_seconds
+        self._lock_wait = lock_wait_seconds
+        self._flights: Dict[str, asyncio.Task] = {}
+
+    @property
+    def in_flight(self) -> int:
+        """Number of calls currently running."""
+        return len(self._flights)
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        redis_client: Optional[aioredis.Redis] = None,
+    ) -> T:
+        """
+        Run a call, or join the identical call already in flight.
+
+        Args:
+            key: Identity of the call; calls with equal keys must be interchangeable
+            fn: Call to run if none is in flight
+            redis_client: Redis client to also merge the call across nodes
+
+        Returns:
+            Result of the call (shared by every caller, so treat it as read-only)
+
+        Raises:
+            Exception: Whatever the call raised, to every caller
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(self._run(key, fn, redis_client))
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._land(key, done))
+            calls_total.inc(group=self.group, role="leader")
+        else:
+            calls_total.inc(group=self.group, role="coalesced")
+        # A cancelled caller stops waiting without cancelling the others' call
+        return await asyncio.shield(flight)
+
+    async def _run(
+        self, key: str, fn: Callable[[], Awaitable[T]], redis_client: Optional[aioredis.Redis]
+    ) -> T:
+        if redis_client is None:
+            return await fn()
+
+        lock = redis_client.lock(
+            f"{LOCK_KEY_PREFIX}{self.group}:{key}",
+            timeout=self._lock_timeout,
+            sleep=0.02,
+            blocking_timeout=self._lock_wait,
+        )
+        try:
+            acquired = await lock.acquire()
+        except aioredis.RedisError as exc:
+            logger.warning(f"Single-flight lock unavailable for {self.group} {key}: {exc}")
+            acquired = False
+        # Without the lock (waited too long, Redis down) the call runs anyway
+        lock_waits_total.inc(group=self.group, outcome="acquired" if acquired else "skipped")
+        try:
+            return await fn()
+        finally:
+            if acquired:
+                try:
+                    await lock.release()
+                except (LockError, aioredis.RedisError) as exc:
+                    # Expires on its own after the lock timeout
+                    logger.warning(f"Failed to release single-flight lock {key}: {exc}")
+
+    def _land(self, key: str, flight: asyncio.Task) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            # Retrieved here too, in case every caller was cancelled
+            flight.exception()
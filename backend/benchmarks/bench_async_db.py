@@ -0,0 +1,114 @@
+"""
+Benchmark: sync vs async database access from async request handlers.
+
+Runs concurrent "requests" that each load a user with their profile, the
+query behind every authenticated endpoint, through:
+
+- sync: a blocking Session used inside the coroutine, as the handlers did
+  before, which stalls the event loop for the duration of every query;
+- async: an AsyncSession on asyncpg, which yields to other requests while
+  waiting on the database.
+
+Reports throughput, request latency and the worst event loop stall seen by
+a heartbeat task. Needs the PostgreSQL database from docker-compose;
+--server-latency-ms adds pg_sleep to each request to model a remote
+database.
+
+Usage:
+    python -m benchmarks.bench_async_db [--requests 2000] [--concurrency 50]
+        [--server-latency-ms 2] [--user-id 1]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, List
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import joinedload
+
+from app.core.database import AsyncSessionLocal, SessionLocal, async_engine, engine
+from app.models.user import User
+from app.services.user_service import UserService
+
+
+async def _sync_request(user_id: int, latency: float) -> None:
+    db = SessionLocal()
+    try:
+        db.query(User).options(joinedload(User.profile)).filter(User.id == user_id).first()
+        if latency:
+            db.execute(text("SELECT pg_sleep(:seconds)"), {"seconds": latency})
+    finally:
+        db.close()
+
+
+async def _async_request(user_id: int, latency: float) -> None:
+    async with AsyncSessionLocal() as db:
+        await UserService.get_user_by_id(db, user_id)
+        if latency:
+            await db.execute(text("SELECT pg_sleep(:seconds)"), {"seconds": latency})
+
+
+async def _heartbeat(stalls: List[float], interval: float = 0.001) -> None:
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - start - interval)
+
+
+async def _run(
+    request: Callable[[int, float], Awaitable[None]],
+    requests: int,
+    concurrency: int,
+    user_id: int,
+    latency: float,
+) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    stalls: List[float] = []
+
+    async def one() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await request(user_id, latency)
+            latencies.append(time.perf_counter() - start)
+
+    heartbeat = asyncio.create_task(_heartbeat(stalls))
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    heartbeat.cancel()
+
+    print(
+        f"{request.__name__.strip('_').split('_')[0]:<8}"
+        f"{requests / elapsed:10.0f} req/s"
+        f"{np.percentile(latencies, 50) * 1e3:10.2f} ms p50"
+        f"{np.percentile(latencies, 95) * 1e3:10.2f} ms p95"
+        f"{max(stalls, default=0.0) * 1e3:10.2f} ms max loop stall"
+    )
+
+
+async def main(requests: int, concurrency: int, latency_ms: float, user_id: int) -> None:
+    latency = latency_ms / 1000
+    print(f"requests: {requests}, concurrency: {concurrency}, server latency: {latency_ms} ms")
+    # Warm up both pools (and the prepared statement caches)
+    await _run(_sync_request, concurrency, concurrency, user_id, 0.0)
+    await _run(_async_request, concurrency, concurrency, user_id, 0.0)
+    print()
+
+    await _run(_sync_request, requests, concurrency, user_id, latency)
+    await _run(_async_request, requests, concurrency, user_id, latency)
+
+    await async_engine.dispose()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--server-latency-ms", type=float, default=2.0)
+    parser.add_argument("--user-id", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.server_latency_ms, args.user_id))
@@ -0,0 +1,94 @@
+"""
+Benchmark: persisting the frames of a processed swing.
+
+Compares adding one ORM object per frame against bulk ingestion (multi-row
+INSERT on SQLite, COPY on PostgreSQL) for swings of increasing length.
+
+Usage:
+    python -m benchmarks.bench_bulk_ingest [--url postgresql+asyncpg://...] [--swings 5]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from app.models.pose import PoseKeypoint
+from app.models.user import Base, User
+from app.services.bulk_ingest import BulkIngester
+from app.services.frame_persistence import persist_swing_frames
+
+FRAME_COUNTS = (120, 480, 1800)  # 2 s at 60 fps, 2 s at 240 fps, 30 s at 60 fps
+USER_ID = 1
+
+
+async def _orm(engine: AsyncEngine, swing_id: int, keypoints: np.ndarray) -> None:
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    start = time.time()
+    async with factory() as db:
+        for frame, landmarks in enumerate(keypoints):
+            db.add(
+                PoseKeypoint(
+                    user_id=USER_ID,
+                    swing_id=swing_id,
+                    recorded_at=datetime.fromtimestamp(start + frame / 60, tz=timezone.utc),
+                    frame_number=frame,
+                    timestamp_ms=frame * 16,
+                    keypoints=landmarks.tolist(),
+                    metrics={},
+                )
+            )
+        await db.commit()
+
+
+async def _bulk(engine: AsyncEngine, swing_id: int, keypoints: np.ndarray) -> None:
+    await persist_swing_frames(
+        USER_ID,
+        swing_id,
+        np.arange(len(keypoints)) * 16,
+        keypoints,
+        ingester=BulkIngester(engine),
+    )
+
+
+async def main(url: str, swings: int) -> None:
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(delete(PoseKeypoint))
+    async with async_sessionmaker(engine)() as db:
+        if await db.get(User, USER_ID) is None:
+            db.add(User(id=USER_ID, email="bench@example.com", password_hash="x"))
+            await db.commit()
+
+    print(f"{'frames':>8}{'orm':>14}{'bulk':>14}{'speedup':>10}")
+    swing_id = 0
+    for frames in FRAME_COUNTS:
+        keypoints = np.random.default_rng(0).random((frames, 33, 4), dtype=np.float32)
+        timings = []
+        for persist in (_orm, _bulk):
+            start = time.perf_counter()
+            for _ in range(swings):
+                swing_id += 1
+                await persist(engine, swing_id, keypoints)
+            timings.append((time.perf_counter() - start) / swings)
+        print(
+            f"{frames:>8}{timings[0] * 1e3:>11.1f} ms{timings[1] * 1e3:>11.1f} ms"
+            f"{timings[0] / timings[1]:>9.1f}x"
+        )
+
+    async with engine.begin() as conn:
+        await conn.execute(delete(PoseKeypoint))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="sqlite+aiosqlite:////tmp/bench_bulk_ingest.db")
+    parser.add_argument("--swings", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.swings))
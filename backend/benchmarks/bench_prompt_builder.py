@@ -0,0 +1,169 @@
+"""
+Benchmark: analysis prompt size and content.
+
+Compares, over synthetic fixture swings, the estimated prompt tokens of
+sending every frame's metrics, the previous key-phase JSON prompt and the
+token-budgeted prompt builder at several budgets. Quality proxies are the
+share of detected faults, of the metrics behind them and of notable baseline
+deviations that made it into the prompt.
+
+Usage:
+    python -m benchmarks.bench_prompt_builder [--swings 200] [--frames 90]
+"""
+
+import argparse
+import json
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.services.analysis_cache import QUANTIZATION_STEPS
+from app.services.error_detector import (
+    BIOMECHANICS_METRICS,
+    PHASES,
+    SwingPhase,
+    error_detector,
+    metrics_vector,
+)
+from app.services.prompt_builder import FAULT_METRICS, PromptBuilder, estimate_tokens
+
+# Typical metric values of a swing (degrees, sway in cm)
+TYPICAL = {
+    "spine_angle": 34.0,
+    "spine_angle_loss": 6.0,
+    "hip_rotation": 42.0,
+    "shoulder_turn": 88.0,
+    "x_factor": 44.0,
+    "shoulder_plane_angle": 30.0,
+    "head_sway_cm": 3.0,
+    "lead_arm_angle": 168.0,
+    "knee_flex": 25.0,
+}
+SPREAD = {metric: QUANTIZATION_STEPS[metric] * 3 for metric in BIOMECHANICS_METRICS}
+
+CONTEXT = {
+    "club": "7 iron",
+    "intended_shape": "Draw",
+    "recent_swings": [
+        {"date": f"2026-10-{day:02d}", "score": 70 + day, "faults": ["early_extension"]}
+        for day in range(1, 6)
+    ],
+}
+
+
+def _fixture_swing(rng: np.random.Generator, frames: int) -> Tuple[List[Dict], List[SwingPhase]]:
+    phases = [
+        PHASES[min(index * len(PHASES) // frames, len(PHASES) - 1)] for index in range(frames)
+    ]
+    pose_data = []
+    for index, phase in enumerate(phases):
+        metrics = {
+            metric: round(float(rng.normal(TYPICAL[metric], SPREAD[metric])), 2)
+            for metric in BIOMECHANICS_METRICS
+        }
+        pose_data.append({"frame_number": index, "phase": phase.value, "metrics": metrics})
+    return pose_data, phases
+
+
+def _key_phases(pose_data: List[Dict]) -> Dict[str, Dict[str, float]]:
+    address = next(frame for frame in pose_data if frame["phase"] == SwingPhase.ADDRESS.value)
+    top = [frame for frame in pose_data if frame["phase"] == SwingPhase.BACKSWING.value][-1]
+    impact = next(frame for frame in pose_data if frame["phase"] == SwingPhase.IMPACT.value)
+    return {
+        "address": address["metrics"],
+        "top_of_backswing": top["metrics"],
+        "impact": impact["metrics"],
+    }
+
+
+def _previous_prompt(pose_data: List[Dict], biomechanics: Dict) -> str:
+    return f"""Analyze this golf swing sequence. I've provided {len(pose_data)} frames
+from the swing, along with pose estimation data.
+
+BIOMECHANICAL MEASUREMENTS:
+{json.dumps(biomechanics, indent=2)}
+
+SWING CONTEXT:
+- Club: {CONTEXT['club']}
+- Intended shot shape: {CONTEXT['intended_shape']}
+- Conditions: Range practice
+
+Please analyze this swing and provide detailed coaching feedback following
+the JSON format specified in the system prompt."""
+
+
+def _coverage(found: int, total: int) -> float:
+    return 1.0 if total == 0 else found / total
+
+
+def main(swings: int, frames: int) -> None:
+    rng = np.random.default_rng(7)
+    rules = error_detector.compile()
+    budgets = (200, 400, 800)
+    tokens: Dict[str, List[int]] = {"per-frame": [], "previous": []}
+    quality: Dict[int, List[Tuple[float, float, float]]] = {budget: [] for budget in budgets}
+
+    for _ in range(swings):
+        pose_data, phases = _fixture_swing(rng, frames)
+        biomechanics = _key_phases(pose_data)
+        matrix = np.stack([metrics_vector(frame["metrics"]) for frame in pose_data])
+        faults = rules.check_swing(phases, matrix)
+        baselines = {
+            f"{phase}.{metric}": TYPICAL[metric]
+            for phase, metrics in biomechanics.items()
+            for metric in metrics
+        }
+        notable = {
+            key
+            for key, baseline in baselines.items()
+            if abs(biomechanics[key.split(".")[0]][key.split(".")[1]] - baseline)
+            >= QUANTIZATION_STEPS[key.split(".")[1]]
+        }
+
+        tokens["per-frame"].append(estimate_tokens(json.dumps(pose_data)))
+        tokens["previous"].append(estimate_tokens(_previous_prompt(pose_data, biomechanics)))
+
+        for budget in budgets:
+            prompt = PromptBuilder(token_budget=budget).build(
+                biomechanics, faults, CONTEXT, baselines
+            )
+            tokens.setdefault(f"builder@{budget}", []).append(prompt.estimated_tokens)
+
+            expected = {detection.error for detection in faults[: PromptBuilder().max_faults]}
+            kept = {
+                item.text[2:].split(" (")[0] for item in prompt.included if item.section == "faults"
+            }
+            evidence = {FAULT_METRICS[name] for name in expected}
+            shown = {
+                item.text.split(" ")[0] for item in prompt.included if item.section == "snapshot"
+            }
+            deltas = {
+                ".".join(item.text.split(" ")[:2])
+                for item in prompt.included
+                if item.section == "baseline"
+            }
+            quality[budget].append(
+                (
+                    _coverage(len(expected & kept), len(expected)),
+                    _coverage(len(evidence & shown), len(evidence)),
+                    _coverage(len(notable & deltas), len(notable)),
+                )
+            )
+
+    print(f"swings: {swings}, frames per swing: {frames}")
+    print(f"{'prompt':<16}{'mean tokens':>12}{'p95 tokens':>12}")
+    for name, values in tokens.items():
+        print(f"{name:<16}{np.mean(values):12.0f}{np.percentile(values, 95):12.0f}")
+
+    print(f"\n{'budget':<16}{'faults':>10}{'evidence':>10}{'deltas':>10}")
+    for budget, rows in quality.items():
+        faults_kept, evidence_kept, deltas_kept = np.mean(rows, axis=0)
+        print(f"{budget:<16}{faults_kept:10.0%}{evidence_kept:10.0%}{deltas_kept:10.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--swings", type=int, default=200)
+    parser.add_argument("--frames", type=int, default=90)
+    args = parser.parse_args()
+    main(args.swings, args.frames)
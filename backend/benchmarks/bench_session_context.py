@@ -0,0 +1,65 @@
+"""
+Benchmark: per-frame user context lookup.
+
+Compares loading the user context from the database on every frame (the
+original real-time design) with reading the pinned session context.
+
+Usage:
+    python -m benchmarks.bench_session_context [--frames 600]
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.models.user import Base, User, UserProfile
+from app.services.session_context import SessionContextStore
+
+
+async def _setup_database() -> async_sessionmaker:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async with factory() as db:
+        user = User(
+            email="bench@example.com", password_hash="x", full_name="Bench", handicap=12.0
+        )
+        user.profile = UserProfile(dominant_hand="right", physical_limitations=["back_pain"])
+        db.add(user)
+        await db.commit()
+    return factory
+
+
+async def main(frames: int) -> None:
+    factory = await _setup_database()
+    store = SessionContextStore(redis_client=None, session_factory=factory)  # type: ignore[arg-type]
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        await store._load(1)
+    per_frame_load = (time.perf_counter() - start) / frames
+
+    await store.open("bench-session", 1)
+    start = time.perf_counter()
+    for _ in range(frames):
+        store.get(1)
+    per_frame_pinned = (time.perf_counter() - start) / frames
+
+    print(f"frames:                 {frames}")
+    print(f"load per frame:         {per_frame_load * 1e6:10.2f} us")
+    print(f"pinned lookup:          {per_frame_pinned * 1e6:10.2f} us")
+    print(
+        f"60 FPS budget used:     {per_frame_load / (1 / 60) * 100:6.2f}% vs "
+        f"{per_frame_pinned / (1 / 60) * 100:6.4f}%"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=600)
+    asyncio.run(main(parser.parse_args().frames))
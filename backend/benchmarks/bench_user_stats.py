@@ -0,0 +1,90 @@
+"""
+Benchmark: user statistics latency versus history size.
+
+Seeds users whose histories span an increasing number of years of daily
+practice and times uncached statistics requests for every period. Served
+from the rollups, latency depends on the period, not on how many swings the
+user has analyzed.
+
+Usage:
+    python -m benchmarks.bench_user_stats [--requests 200] [--swings-per-day 20]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.models.stats import SwingStatsDaily, SwingStatsTotal
+from app.models.user import Base, User
+from app.services.stats_service import PERIOD_DAYS, UserStatsService
+
+HISTORY_YEARS = (1, 5, 20)
+TODAY = date(2026, 10, 19)
+
+
+def _rollup(swings: int) -> dict:
+    return {
+        "swings_analyzed": swings,
+        "scored_swings": swings,
+        "score_sum": 7.0 * swings,
+        "issue_counts": {"early_extension": swings // 2, "sway": swings // 4},
+        "metric_sums": {"top_of_backswing.x_factor": 45.0 * swings},
+        "metric_counts": {"top_of_backswing.x_factor": swings},
+    }
+
+
+async def _setup_database(swings_per_day: int) -> async_sessionmaker:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async with factory() as db:
+        for user_id, years in enumerate(HISTORY_YEARS, start=1):
+            days = 365 * years
+            db.add(User(id=user_id, email=f"bench{user_id}@example.com", password_hash="x"))
+            db.add_all(
+                SwingStatsDaily(
+                    user_id=user_id, day=TODAY - timedelta(days=day), **_rollup(swings_per_day)
+                )
+                for day in range(days)
+            )
+            db.add(
+                SwingStatsTotal(
+                    user_id=user_id, practice_days=days, **_rollup(swings_per_day * days)
+                )
+            )
+        await db.commit()
+    return factory
+
+
+async def main(requests: int, swings_per_day: int) -> None:
+    factory = await _setup_database(swings_per_day)
+    stats = UserStatsService(redis_client=None, session_factory=factory)
+
+    print(f"{'history':<24}" + "".join(f"{period:>12}" for period in PERIOD_DAYS))
+    for user_id, years in enumerate(HISTORY_YEARS, start=1):
+        latencies = []
+        for period in PERIOD_DAYS:
+            async with factory() as db:
+                start = time.perf_counter()
+                for _ in range(requests):
+                    await stats.get_stats(db, user_id, period, TODAY)
+                latencies.append((time.perf_counter() - start) / requests)
+        swings = 365 * years * swings_per_day
+        print(
+            f"{f'{years} y, {swings} swings':<24}"
+            + "".join(f"{latency * 1e3:9.2f} ms" for latency in latencies)
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--swings-per-day", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.swings_per_day))
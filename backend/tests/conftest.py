@@ -5,32 +5,99 @@ Provides database, client, and user fixtures for testing.
 """
 
 import pytest
-from typing import Generator
+from functools import partial
+from typing import AsyncGenerator, Callable, ContextManager, Generator
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
 from app.main import app
 from app.core.database import get_db
 from app.core.config import settings
+from app.core.db_instrumentation import instrument_engine
+from app.core.rate_limit import rate_limiter
+from app.core.response_cache import response_cache
 from app.models.user import Base, User, UserProfile
 from app.core.security import hash_password
+from app.services.analysis_stream import analysis_streams
+from app.services.principal_cache import principal_cache
+from app.services.stats_service import user_stats
+from tests.query_count import QueryCounter, assert_max_queries
 
 
-# Create in-memory SQLite database for testing
-SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///:memory:"
+@pytest.fixture(scope="session")
+def database_path(tmp_path_factory: pytest.TempPathFactory) -> str:
+    """
+    SQLite database file shared by the sync test session and the app's
+    async sessions (an in-memory database is private to one connection).
+
+    Returns:
+        Database file path
+    """
+    return str(tmp_path_factory.mktemp("db") / "test.db")
+
+
+@pytest.fixture(scope="session")
+def engine(database_path: str) -> Engine:
+    """
+    Sync engine for fixtures and assertions.
+
+    Returns:
+        SQLAlchemy engine
+    """
+    return create_engine(
+        f"sqlite:///{database_path}",
+        connect_args={"check_same_thread": False},
+        poolclass=NullPool,
+    )
+
+
+@pytest.fixture(scope="session")
+def async_engine(database_path: str) -> AsyncEngine:
+    """
+    Async engine used by the app under test.
+
+    Connections are not pooled, since each TestClient runs its own event loop.
+
+    Returns:
+        SQLAlchemy async engine, instrumented like the app's engines
+    """
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}", poolclass=NullPool)
+    instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+
+@pytest.fixture(scope="session")
+def async_session_factory(async_engine: AsyncEngine) -> async_sessionmaker:
+    """
+    Async session factory used by the app under test.
+
+    Returns:
+        Async session factory
+    """
+    return async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
-engine = create_engine(
-    SQLALCHEMY_TEST_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="function")
+def max_queries(async_engine: AsyncEngine) -> Callable[[int], ContextManager[QueryCounter]]:
+    """
+    Statement budget for the app under test.
+
+    Usage:
+        with max_queries(2):
+            client.post(...)
+
+    Returns:
+        Context manager failing the test if the app runs more statements
+    """
+    return partial(assert_max_queries, async_engine.sync_engine)
 
 
 @pytest.fixture(scope="function")
-def db() -> Generator[Session, None, None]:
+def db(engine: Engine) -> Generator[Session, None, None]:
     """
     Create a fresh database for each test.
 
@@ -39,6 +106,7 @@ def db() -> Generator[Session, None, None]:
     """
     # Create tables
     Base.metadata.create_all(bind=engine)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
     # Create session
     session = TestingSessionLocal()
@@ -52,24 +120,41 @@ def db() -> Generator[Session, None, None]:
 
 
 @pytest.fixture(scope="function")
-def client(db: Session) -> Generator[TestClient, None, None]:
+def client(
+    db: Session,
+    async_session_factory: async_sessionmaker,
+    monkeypatch: pytest.MonkeyPatch,
+) -> Generator[TestClient, None, None]:
     """
     Create a test client with database dependency override.
 
+    The principal, statistics and response caches are bypassed, since user IDs are
+    reused by every test database, and statistics and analyses are recorded in
+    the test database. Rate limits start afresh and are kept locally.
+
     Args:
         db: Test database session
+        async_session_factory: Async session factory on the test database
+        monkeypatch: Pytest monkeypatch fixture
 
     Yields:
         FastAPI test client
     """
 
-    def override_get_db() -> Generator[Session, None, None]:
-        try:
-            yield db
-        finally:
-            pass
+    async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
+        async with async_session_factory() as session:
+            yield session
 
     app.dependency_overrides[get_db] = override_get_db
+    monkeypatch.setattr(principal_cache, "_redis", None)
+    principal_cache.clear()
+    monkeypatch.setattr(user_stats, "_redis", None)
+    monkeypatch.setattr(user_stats, "_session_factory", async_session_factory)
+    monkeypatch.setattr(analysis_streams, "_session_factory", async_session_factory)
+    monkeypatch.setattr(rate_limiter, "_redis", None)
+    rate_limiter.reset()
+    monkeypatch.setattr(response_cache, "_redis", None)
+    response_cache.clear()
 
     with TestClient(app) as test_client:
         yield test_client
@@ -0,0 +1,120 @@
+"""
+Local fake of the Anthropic Messages API for tests.
+
+Serves /v1/messages (plain and streaming) through an httpx mock transport,
+so the real SDK and AIClient code paths run without network access.
+Responses can be scripted to fail with a status code or to be slow.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import deque
+from dataclasses import dataclass, field
+
+import httpx
+
+
+@dataclass
+class ScriptedResponse:
+    status_code: int = 200
+    text: str = "ok"
+    delay: float = 0.0
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+class FakeAnthropicServer:
+    def __init__(self, default_text: str = "ok") -> None:
+        self.default_text = default_text
+        self.script: deque[ScriptedResponse] = deque()
+        self.requests: list[dict] = []
+        self.inflight = 0
+        self.max_inflight = 0
+
+    @property
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def http_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=self.transport)
+
+    def respond(self, *responses: ScriptedResponse) -> None:
+        self.script.extend(responses)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        self.requests.append(body)
+        scripted = (
+            self.script.popleft() if self.script else ScriptedResponse(text=self.default_text)
+        )
+
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        try:
+            await asyncio.sleep(scripted.delay)
+        finally:
+            self.inflight -= 1
+
+        if scripted.status_code != 200:
+            error_type = "rate_limit_error" if scripted.status_code == 429 else "api_error"
+            return httpx.Response(
+                scripted.status_code,
+                headers=scripted.headers,
+                json={"type": "error", "error": {"type": error_type, "message": "scripted"}},
+            )
+
+        if body.get("stream"):
+            return httpx.Response(
+                200,
+                headers={"content-type": "text/event-stream"},
+                content=self._stream_body(body, scripted.text),
+            )
+        return httpx.Response(200, json=self._message(body, scripted.text))
+
+    def _message(self, body: dict, text: str) -> dict:
+        return {
+            "id": f"msg_{len(self.requests)}",
+            "type": "message",
+            "role": "assistant",
+            "model": body["model"],
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": 10, "output_tokens": len(text.split())},
+        }
+
+    def _stream_body(self, body: dict, text: str) -> bytes:
+        message = self._message(body, "")
+        message["content"] = []
+        events = [
+            ("message_start", {"type": "message_start", "message": message}),
+            (
+                "content_block_start",
+                {
+                    "type": "content_block_start",
+                    "index": 0,
+                    "content_block": {"type": "text", "text": ""},
+                },
+            ),
+        ]
+        for word in text.split(" "):
+            delta = {"type": "text_delta", "text": word + " "}
+            events.append(
+                ("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": delta})
+            )
+        events += [
+            ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+            (
+                "message_delta",
+                {
+                    "type": "message_delta",
+                    "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                    "usage": {"output_tokens": len(text.split())},
+                },
+            ),
+            ("message_stop", {"type": "message_stop"}),
+        ]
+        return "".join(
+            f"event: {name}\ndata: {json.dumps(data)}\n\n" for name, data in events
+        ).encode()
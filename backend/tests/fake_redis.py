@@ -0,0 +1,248 @@
+"""
+In-memory fake of the async Redis client for tests.
+
+Implements the commands the services use on plain dicts that tests can
+inspect (strings, hashes, lists, sets, sorted sets, streams), plus
+pipelines, pub/sub and locks. Expirations are recorded, not enforced.
+Commands never yield to the event loop (except an empty XREAD), so a
+pipeline runs back to back like a MULTI/EXEC block.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+from typing import AsyncIterator
+
+
+class FakePipeline:
+    def __init__(self, redis_client: "FakeAsyncRedis") -> None:
+        self._redis = redis_client
+        self._calls: list = []
+
+    async def __aenter__(self) -> "FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs) -> "FakePipeline":
+            self._calls.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> list:
+        return [
+            await getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in self._calls
+        ]
+
+
+class FakePubSub:
+    def __init__(self, redis_client: "FakeAsyncRedis") -> None:
+        self._redis = redis_client
+        self.messages: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, channel: str) -> None:
+        self._redis.subscribers.setdefault(channel, []).append(self)
+
+    async def get_message(
+        self, ignore_subscribe_messages: bool = False, timeout: float = 0.0
+    ) -> dict | None:
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def listen(self) -> AsyncIterator[dict]:
+        while True:
+            yield await self.messages.get()
+
+    async def aclose(self) -> None:
+        for subscribers in self._redis.subscribers.values():
+            if self in subscribers:
+                subscribers.remove(self)
+
+
+class FakeLock:
+    def __init__(self, redis_client: "FakeAsyncRedis", name: str, blocking_timeout: float) -> None:
+        self._redis = redis_client
+        self._name = name
+        self._blocking_timeout = blocking_timeout
+
+    async def acquire(self) -> bool:
+        deadline = asyncio.get_running_loop().time() + self._blocking_timeout
+        while self._name in self._redis.locks:
+            if asyncio.get_running_loop().time() >= deadline:
+                return False
+            await asyncio.sleep(0.001)
+        self._redis.locks.add(self._name)
+        return True
+
+    async def release(self) -> None:
+        self._redis.locks.discard(self._name)
+
+
+class FakeAsyncRedis:
+    def __init__(self) -> None:
+        self.strings: dict[str, str] = {}
+        self.hashes: dict[str, dict[str, str]] = {}
+        self.lists: dict[str, list[str]] = {}
+        self.sets: dict[str, set[str]] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.streams: dict[str, list[tuple[str, dict[str, str]]]] = {}
+        self.ttls: dict[str, int] = {}
+        self.expire_at: dict[str, int] = {}
+        self.subscribers: dict[str, list[FakePubSub]] = {}
+        self.locks: set[str] = set()
+        # Keys read by GET, MGET and SISMEMBER
+        self.lookups = 0
+        self._ids = itertools.count(1)
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> FakePubSub:
+        return FakePubSub(self)
+
+    def lock(self, name: str, timeout: float, sleep: float, blocking_timeout: float) -> FakeLock:
+        return FakeLock(self, name, blocking_timeout)
+
+    # Keys
+
+    async def delete(self, *keys: str) -> int:
+        stores = (self.strings, self.hashes, self.lists, self.sets, self.zsets, self.streams)
+        return sum(store.pop(key, None) is not None for key in keys for store in stores)
+
+    async def expire(self, key: str, seconds: int) -> None:
+        self.ttls[key] = seconds
+
+    async def expireat(self, key: str, when: int) -> None:
+        self.expire_at[key] = when
+
+    # Strings
+
+    async def get(self, key: str) -> str | None:
+        self.lookups += 1
+        return self.strings.get(key)
+
+    async def mget(self, keys: list[str]) -> list[str | None]:
+        self.lookups += len(keys)
+        return [self.strings.get(key) for key in keys]
+
+    async def set(
+        self, key: str, value: str, ex: int | None = None, nx: bool = False
+    ) -> bool | None:
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = value
+        return True
+
+    async def setex(self, key: str, seconds: int, value: str) -> None:
+        self.strings[key] = value
+
+    async def incr(self, key: str) -> int:
+        self.strings[key] = str(int(self.strings.get(key, 0)) + 1)
+        return int(self.strings[key])
+
+    # Hashes
+
+    async def hset(self, key: str, field: str, value: str) -> None:
+        self.hashes.setdefault(key, {})[field] = value
+
+    async def hget(self, key: str, field: str) -> str | None:
+        return self.hashes.get(key, {}).get(field)
+
+    async def hmget(self, key: str, *fields: str) -> list:
+        return [self.hashes.get(key, {}).get(field) for field in fields]
+
+    async def hincrby(self, key: str, field: str, amount: int) -> int:
+        values = self.hashes.setdefault(key, {})
+        values[field] = str(int(values.get(field, 0)) + amount)
+        return int(values[field])
+
+    async def hdel(self, key: str, *fields: str) -> int:
+        values = self.hashes.get(key, {})
+        return sum(values.pop(field, None) is not None for field in fields)
+
+    async def hlen(self, key: str) -> int:
+        return len(self.hashes.get(key, {}))
+
+    async def hgetall(self, key: str) -> dict[str, str]:
+        return dict(self.hashes.get(key, {}))
+
+    # Lists
+
+    async def rpush(self, key: str, *values: str) -> None:
+        self.lists.setdefault(key, []).extend(values)
+
+    async def lpush(self, key: str, *values: str) -> None:
+        for value in values:
+            self.lists.setdefault(key, []).insert(0, value)
+
+    async def lpop(self, key: str, count: int) -> list[str] | None:
+        items = self.lists.get(key, [])
+        popped, self.lists[key] = items[:count], items[count:]
+        return popped or None
+
+    async def llen(self, key: str) -> int:
+        return len(self.lists.get(key, []))
+
+    # Sets
+
+    async def sadd(self, key: str, *members: str) -> int:
+        values = self.sets.setdefault(key, set())
+        added = set(members) - values
+        values.update(members)
+        return len(added)
+
+    async def srem(self, key: str, *members: str) -> None:
+        self.sets.get(key, set()).difference_update(members)
+
+    async def sismember(self, key: str, member: str) -> bool:
+        self.lookups += 1
+        return member in self.sets.get(key, set())
+
+    async def smembers(self, key: str) -> set[str]:
+        return set(self.sets.get(key, set()))
+
+    # Sorted sets
+
+    async def zadd(self, key: str, mapping: dict[str, float]) -> None:
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def zrem(self, key: str, member: str) -> None:
+        self.zsets.get(key, {}).pop(member, None)
+
+    async def zrank(self, key: str, member: str) -> int | None:
+        ordered = sorted(self.zsets.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+        ranks = [name for name, _ in ordered]
+        return ranks.index(member) if member in ranks else None
+
+    async def zremrangebyscore(self, key: str, low: str, high: float) -> None:
+        zset = self.zsets.setdefault(key, {})
+        for member in [member for member, score in zset.items() if score <= high]:
+            del zset[member]
+
+    # Streams
+
+    async def xadd(self, key: str, fields: dict[str, str]) -> str:
+        entry_id = f"{next(self._ids)}-0"
+        self.streams.setdefault(key, []).append((entry_id, fields))
+        return entry_id
+
+    async def xread(self, streams: dict[str, str], count: int, block: int) -> list:
+        key, cursor = next(iter(streams.items()))
+        after = int(cursor.split("-")[0])
+        entries = [entry for entry in self.streams.get(key, []) if int(entry[0][:-2]) > after]
+        if not entries:
+            await asyncio.sleep(0.01)
+            return []
+        return [[key, entries[:count]]]
+
+    # Pub/sub
+
+    async def publish(self, channel: str, message: str) -> None:
+        for subscriber in self.subscribers.get(channel, []):
+            subscriber.messages.put_nowait({"type": "message", "data": message})
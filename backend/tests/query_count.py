@@ -0,0 +1,53 @@
+"""
+SQL statement counting for tests.
+
+Endpoints have a statement budget; asserting it makes lazy loads and extra
+round trips fail tests instead of slipping in unnoticed.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@dataclass
+class QueryCounter:
+    statements: list[str] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def assert_max_queries(engine: Engine, limit: int) -> Iterator[QueryCounter]:
+    """
+    Fail if more than `limit` statements run on the engine inside the block.
+
+    Args:
+        engine: Sync engine (AsyncEngine.sync_engine for async engines)
+        limit: Statement budget
+
+    Yields:
+        Counter of the statements run so far
+    """
+    counter = QueryCounter()
+
+    def count(conn, cursor, statement, parameters, context, executemany) -> None:
+        counter.statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert counter.count <= limit, (
+        f"Expected at most {limit} statements, ran {counter.count}:\n"
+        + "\n".join(counter.statements)
+    )
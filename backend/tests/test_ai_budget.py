@@ -0,0 +1,179 @@
+"""
+Tests for daily AI budget accounting and admission control.
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.services.ai_budget import AIBudget, BudgetAccount, price
+from app.services.ai_client import AIClient
+from app.services.ai_jobs import AIJob, AIJobScheduler, LocalBatchBackend
+from tests.fake_anthropic import FakeAnthropicServer, ScriptedResponse
+from tests.fake_redis import FakeAsyncRedis
+
+
+PARAMS = {
+    "model": "claude-opus-4-5-20251101",
+    "max_tokens": 1000,
+    "messages": [{"role": "user", "content": "Analyze this swing"}],
+}
+USER = BudgetAccount(user_id=1, tier="free")
+
+
+def make_budget(redis_client: FakeAsyncRedis, **overrides) -> AIBudget:
+    options = {
+        "daily_budget": 1.0,
+        "tier_quotas": {"free": 0.5},
+        "downgrade_at": 0.8,
+        "fallback_model": "claude-haiku-4-5-20251001",
+    }
+    options.update(overrides)
+    return AIBudget(redis_client, **options)
+
+
+def test_price_by_model_and_batch_discount() -> None:
+    """Test calls are priced per model, with the batch discount."""
+    assert price("claude-opus-4-5-20251101", 1_000_000, 0) == pytest.approx(5.0)
+    assert price("claude-haiku-4-5-20251001", 0, 1_000_000) == pytest.approx(5.0)
+    assert price("claude-opus-4-5-20251101", 1_000_000, 0, batch=True) == pytest.approx(2.5)
+    assert price("unknown-model", 1_000_000, 0) == pytest.approx(15.0)
+
+
+async def test_record_accumulates_per_day_tier_and_user() -> None:
+    """Test usage is added to the overall, tier and user totals."""
+    budget = make_budget(FakeAsyncRedis())
+
+    cost = await budget.record(USER, "claude-opus-4-5-20251101", 10_000, 2_000)
+    await budget.record(USER, "claude-opus-4-5-20251101", 10_000, 2_000)
+
+    usage = await budget.usage()
+    assert cost == pytest.approx(0.1)
+    assert usage["total"]["spent_usd"] == pytest.approx(0.2)
+    assert usage["free"]["calls"] == 2
+    assert usage["free"]["output_tokens"] == 4_000
+
+
+async def test_admission_degrades_as_budget_runs_out() -> None:
+    """Test calls are allowed, then downgraded, then deferred or rejected."""
+    redis_client = FakeAsyncRedis()
+    budget = make_budget(redis_client, tier_quotas={})
+
+    admission = await budget.admit(USER, PARAMS)
+    assert admission.action == "allow"
+    await budget.release(admission)
+
+    await budget.record(USER, "claude-opus-4-5-20251101", 0, 34_000)  # $0.85
+    admission = await budget.admit(USER, PARAMS)
+    assert admission.action == "downgrade"
+    assert admission.model == "claude-haiku-4-5-20251001"
+    await budget.release(admission)
+
+    await budget.record(USER, "claude-opus-4-5-20251101", 0, 5_900)  # $0.9975
+    assert (await budget.admit(USER, PARAMS, deferrable=True)).action == "defer"
+    assert (await budget.admit(USER, PARAMS)).action == "reject"
+
+
+async def test_user_quota_limits_only_that_user() -> None:
+    """Test a user over their tier quota is downgraded while others are not."""
+    budget = make_budget(FakeAsyncRedis())
+    await budget.record(USER, "claude-opus-4-5-20251101", 0, 17_000)  # $0.425 of $0.50
+
+    assert (await budget.admit(USER, PARAMS)).action == "downgrade"
+    other = BudgetAccount(user_id=2, tier="free")
+    assert (await budget.admit(other, PARAMS)).action == "allow"
+
+
+async def test_reservations_prevent_concurrent_overspend() -> None:
+    """Test concurrent admissions never reserve more than the budget."""
+    budget = make_budget(FakeAsyncRedis(), tier_quotas={}, fallback_model=None)
+    # Each call reserves ~$0.025 (max_tokens of output) against $1.00
+    admissions = await asyncio.gather(*(budget.admit(USER, PARAMS) for _ in range(100)))
+
+    admitted = [admission for admission in admissions if admission.admitted]
+    assert len(admitted) == 39
+    assert sum(admission.reserved for admission in admitted) <= 1_000_000
+
+
+async def test_ai_client_settles_reservation_with_usage() -> None:
+    """Test completed calls record their usage and release the reservation."""
+    redis_client = FakeAsyncRedis()
+    budget = make_budget(redis_client)
+    server = FakeAnthropicServer(default_text="Keep your head still")
+    client = AIClient(
+        http_client=server.http_client(), base_url="http://fake-anthropic", budget=budget
+    )
+
+    admission = await budget.admit(USER, PARAMS)
+    await client.create_message(admission=admission, **PARAMS)
+    admission = await budget.admit(USER, PARAMS)
+    chunks = [chunk async for chunk in client.stream_text(admission=admission, **PARAMS)]
+
+    assert "".join(chunks).strip() == "Keep your head still"
+    usage = await budget.usage()
+    assert usage["free"]["calls"] == 2
+    assert usage["total"]["reserved_usd"] == 0
+    assert usage["total"]["input_tokens"] == 20
+    await client.aclose()
+
+
+async def test_scheduler_holds_jobs_while_budget_exhausted() -> None:
+    """Test queued batch jobs are not submitted once the budget is spent."""
+    redis_client = FakeAsyncRedis()
+    budget = make_budget(redis_client)
+    scheduler = AIJobScheduler(redis_client, LocalBatchBackend(call=None), budget=budget)
+    await scheduler.enqueue(AIJob(kind="rescore", params=PARAMS))
+
+    await budget.record(USER, "claude-opus-4-5-20251101", 0, 40_000)  # $1.00
+
+    assert await scheduler.submit_pending() is None
+    assert len(redis_client.lists["ai:jobs:pending"]) == 1
+
+
+class DiscountedBackend(LocalBatchBackend):
+    batch_pricing = True
+
+
+async def test_scheduler_reserves_batch_costs() -> None:
+    """Test submitted batches reserve their discounted cost and leave the rest queued."""
+    redis_client = FakeAsyncRedis()
+    budget = make_budget(redis_client, tier_quotas={}, fallback_model=None)
+
+    async def call(params: dict) -> str:
+        return "ok"
+
+    scheduler = AIJobScheduler(redis_client, DiscountedBackend(call), budget=budget)
+    for _ in range(100):
+        await scheduler.enqueue(AIJob(kind="rescore", params=dict(PARAMS)))
+
+    assert await scheduler.submit_pending() is not None
+    per_job = round(price(PARAMS["model"], 4, PARAMS["max_tokens"], batch=True) * 1_000_000)
+    admitted = 1_000_000 // per_job
+    usage = await budget.usage()
+    assert usage["total"]["reserved_usd"] == pytest.approx(admitted * per_job / 1_000_000)
+    assert len(redis_client.lists["ai:jobs:pending"]) == 100 - admitted
+    assert await scheduler.submit_pending() is None
+
+
+async def test_losing_hedged_call_is_charged() -> None:
+    """Test the call that loses a hedge is charged as well as the winner."""
+    redis_client = FakeAsyncRedis()
+    budget = make_budget(redis_client)
+    server = FakeAnthropicServer()
+    server.respond(ScriptedResponse(text="slow", delay=1.0), ScriptedResponse(text="fast"))
+    client = AIClient(
+        http_client=server.http_client(),
+        base_url="http://fake-anthropic",
+        budget=budget,
+        hedge_after_seconds=0.05,
+    )
+
+    admission = await budget.admit(USER, PARAMS)
+    await client.create_message(admission=admission, **PARAMS)
+
+    usage = await budget.usage()
+    assert usage["free"]["calls"] == 2
+    assert usage["total"]["reserved_usd"] == 0
+    await client.aclose()
@@ -0,0 +1,140 @@
+"""
+Tests for the pooled AI client.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import anthropic
+import pytest
+
+from app.services.ai_client import AIClient, RedisSemaphore, TokenBucket
+from tests.fake_anthropic import FakeAnthropicServer, ScriptedResponse
+from tests.fake_redis import FakeAsyncRedis
+
+
+PARAMS = {
+    "model": "claude-test",
+    "max_tokens": 64,
+    "messages": [{"role": "user", "content": "Analyze this swing"}],
+}
+
+
+def make_client(server: FakeAnthropicServer, **overrides) -> AIClient:
+    options = {
+        "http_client": server.http_client(),
+        "base_url": "http://fake-anthropic",
+        "requests_per_minute": 6000,
+        "input_tokens_per_minute": 1_000_000,
+        "retry_base_seconds": 0.01,
+        "retry_max_seconds": 0.05,
+        "hedge_after_seconds": 0.0,
+    }
+    options.update(overrides)
+    return AIClient(**options)
+
+
+async def test_create_message() -> None:
+    """Test a message is created through the pooled client."""
+    server = FakeAnthropicServer(default_text="Keep your spine angle.")
+    client = make_client(server)
+
+    message = await client.create_message(**PARAMS)
+
+    assert message.content[0].text == "Keep your spine angle."
+    assert server.requests[0]["model"] == "claude-test"
+    await client.aclose()
+
+
+async def test_retries_rate_limit_with_retry_after() -> None:
+    """Test 429 responses are retried after the provider's retry-after."""
+    server = FakeAnthropicServer()
+    server.respond(ScriptedResponse(status_code=429, headers={"retry-after": "0.1"}))
+    client = make_client(server)
+
+    start = time.monotonic()
+    message = await client.create_message(**PARAMS)
+
+    assert message.content[0].text == "ok"
+    assert len(server.requests) == 2
+    assert time.monotonic() - start >= 0.1
+    await client.aclose()
+
+
+async def test_gives_up_after_max_retries() -> None:
+    """Test persistent overloads are raised after the retry budget."""
+    server = FakeAnthropicServer()
+    server.respond(*[ScriptedResponse(status_code=529) for _ in range(3)])
+    client = make_client(server, max_retries=2)
+
+    with pytest.raises(anthropic.InternalServerError):
+        await client.create_message(**PARAMS)
+    assert len(server.requests) == 3
+    await client.aclose()
+
+
+async def test_lane_limits_concurrency() -> None:
+    """Test a lane never has more calls in flight than its limit."""
+    server = FakeAnthropicServer()
+    server.respond(*[ScriptedResponse(delay=0.02) for _ in range(8)])
+    client = make_client(server, lane_limits={"interactive": 4, "batch": 1})
+
+    await asyncio.gather(*(client.create_message(**PARAMS) for _ in range(6)))
+    assert server.max_inflight == 4
+
+    server.max_inflight = 0
+    await asyncio.gather(*(client.create_message(lane="batch", **PARAMS) for _ in range(2)))
+    assert server.max_inflight == 1
+    await client.aclose()
+
+
+async def test_hedged_request_wins_over_slow_primary() -> None:
+    """Test a hedge is sent when the primary is slow and the faster reply wins."""
+    server = FakeAnthropicServer()
+    server.respond(ScriptedResponse(text="slow", delay=1.0), ScriptedResponse(text="fast"))
+    client = make_client(server, hedge_after_seconds=0.05)
+
+    start = time.monotonic()
+    message = await client.create_message(**PARAMS)
+
+    assert message.content[0].text == "fast"
+    assert time.monotonic() - start < 0.5
+    await client.aclose()
+
+
+async def test_stream_text() -> None:
+    """Test streamed text deltas are yielded as they arrive."""
+    server = FakeAnthropicServer(default_text="Rotate your hips")
+    client = make_client(server)
+
+    chunks = [chunk async for chunk in client.stream_text(**PARAMS)]
+
+    assert "".join(chunks).strip() == "Rotate your hips"
+    assert len(chunks) == 3
+    await client.aclose()
+
+
+async def test_cluster_semaphore_limits_holders() -> None:
+    """Test the Redis semaphore hands out at most `limit` leases."""
+    semaphore = RedisSemaphore(FakeAsyncRedis(), limit=2)
+
+    first = await semaphore.try_acquire()
+    second = await semaphore.try_acquire()
+    assert first and second
+    assert await semaphore.try_acquire() is None
+
+    await semaphore.release(first)
+    assert await semaphore.try_acquire() is not None
+
+
+async def test_token_bucket_paces_requests() -> None:
+    """Test the token bucket delays requests beyond its burst."""
+    bucket = TokenBucket(per_minute=600, burst=2)  # 10 per second
+
+    start = time.monotonic()
+    for _ in range(4):
+        await bucket.acquire()
+
+    assert time.monotonic() - start >= 0.15
@@ -0,0 +1,271 @@
+"""
+Tests for batched AI jobs.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.services.ai_budget import Admission
+from app.services.ai_coach import AICoachService
+from app.services.ai_jobs import (
+    BATCHES_KEY,
+    CLAIM_SCRIPT,
+    CLAIMED_KEY,
+    PENDING_KEY,
+    AIJob,
+    AIJobScheduler,
+    LocalBatchBackend,
+)
+from app.services.analysis_stream import analysis_streams
+from tests.fake_redis import FakeAsyncRedis
+
+
+class ClaimingRedis(FakeAsyncRedis):
+    """Runs the batch claim script's logic."""
+
+    async def eval(self, script: str, numkeys: int, *args: str) -> int:
+        assert script == CLAIM_SCRIPT
+        source, target, field, expected, value = args
+        if self.hashes.get(source, {}).get(field) != expected:
+            return 0
+        del self.hashes[source][field]
+        self.hashes.setdefault(target, {})[field] = value
+        return 1
+
+
+def job(text: str) -> AIJob:
+    return AIJob(kind="trend_summary", params={"messages": [{"role": "user", "content": text}]})
+
+
+async def echo(params: dict) -> str:
+    content = params["messages"][0]["content"]
+    if content == "fail":
+        raise RuntimeError("overloaded")
+    return content.upper()
+
+
+async def drain(scheduler: AIJobScheduler) -> int:
+    """Poll until every submitted batch has been collected."""
+    completed = 0
+    for _ in range(10):
+        await asyncio.sleep(0)
+        completed += await scheduler.poll()
+    return completed
+
+
+@pytest.fixture()
+def scheduler() -> AIJobScheduler:
+    return AIJobScheduler(ClaimingRedis(), LocalBatchBackend(echo), max_batch_size=2)
+
+
+async def test_jobs_are_batched_and_results_stored(scheduler: AIJobScheduler) -> None:
+    """Test queued jobs are submitted in batches and results fanned out."""
+    job_ids = [await scheduler.enqueue(job(text)) for text in ("a", "b", "c")]
+
+    assert await scheduler.submit_pending() is not None
+    assert await scheduler.submit_pending() is not None
+    assert await scheduler.submit_pending() is None
+    assert await drain(scheduler) == 3
+
+    for job_id, text in zip(job_ids, ("A", "B", "C"), strict=True):
+        assert await scheduler.get_result(job_id) == {
+            "status": "succeeded",
+            "result": {"text": text},
+        }
+
+
+async def test_failed_jobs_are_retried_then_marked_failed(scheduler: AIJobScheduler) -> None:
+    """Test failed jobs are requeued until they run out of attempts."""
+    job_id = await scheduler.enqueue(job("fail"))
+
+    for _ in range(3):
+        assert await scheduler.get_result(job_id) is None
+        await scheduler.submit_pending()
+        await drain(scheduler)
+
+    assert await scheduler.get_result(job_id) == {"status": "failed", "error": "overloaded"}
+    assert await scheduler._redis.llen(PENDING_KEY) == 0
+
+
+async def test_registered_handler_stores_result(scheduler: AIJobScheduler) -> None:
+    """Test job results go through the handler registered for their kind."""
+
+    async def handler(completed: AIJob, text: str) -> dict:
+        return {"length": len(text), "user": completed.metadata["user_id"]}
+
+    scheduler.register_handler("trend_summary", handler)
+    queued = job("hello")
+    queued.metadata["user_id"] = 7
+    await scheduler.enqueue(queued)
+
+    await scheduler.submit_pending()
+    await drain(scheduler)
+
+    result = await scheduler.get_result(queued.job_id)
+    assert result["result"] == {"length": 5, "user": 7}
+
+
+async def test_batched_analysis_is_cached(scheduler: AIJobScheduler) -> None:
+    """Test batched analyses are parsed and stored like interactive ones."""
+
+    async def model(params: dict) -> str:
+        return json.dumps({"overall_feedback": "Rotate through."})
+
+    scheduler.backend = LocalBatchBackend(model)
+    service = AICoachService()
+    scheduler.register_handler("reanalysis", service.handle_batch_result)
+    pose_data = [{"frame_number": 0, "phase": "address", "metrics": {"spine_angle": 34.0}}]
+
+    job_id = await service.enqueue_analysis(scheduler, [], pose_data, {"handicap": 12.0})
+    await scheduler.submit_pending()
+    await drain(scheduler)
+
+    result = await scheduler.get_result(job_id)
+    assert result["result"]["overall_feedback"] == "Rotate through."
+    assert result["result"]["biomechanics"] == {"address": {"spine_angle": 34.0}}
+
+
+async def test_other_nodes_leave_local_batches_alone() -> None:
+    """Test only the submitting node collects a local batch, so no call is repeated."""
+    redis_client = ClaimingRedis()
+    calls = []
+
+    async def model(params: dict) -> str:
+        calls.append(params)
+        return await echo(params)
+
+    node_a = AIJobScheduler(redis_client, LocalBatchBackend(model))
+    node_b = AIJobScheduler(redis_client, LocalBatchBackend(model))
+    job_id = await node_a.enqueue(job("a"))
+    await node_a.submit_pending()
+
+    assert await node_b.poll() == 0
+    assert await drain(node_a) == 1
+    assert await node_b.submit_pending() is None
+    assert len(calls) == 1
+    assert (await node_a.get_result(job_id))["status"] == "succeeded"
+    assert redis_client.hashes[BATCHES_KEY] == redis_client.hashes[CLAIMED_KEY] == {}
+
+
+async def test_orphaned_local_batch_is_retried() -> None:
+    """Test a local batch whose node stopped is taken over after the claim timeout."""
+    redis_client = ClaimingRedis()
+    stopped = AIJobScheduler(redis_client, LocalBatchBackend(echo))
+    job_id = await stopped.enqueue(job("a"))
+    await stopped.submit_pending()
+    survivor = AIJobScheduler(redis_client, LocalBatchBackend(echo), claim_timeout_seconds=0)
+
+    await survivor.poll()
+    await survivor.submit_pending()
+    await drain(survivor)
+
+    assert (await survivor.get_result(job_id))["result"] == {"text": "A"}
+
+
+class InterruptedBackend(LocalBatchBackend):
+    """Stops after yielding the first result of a batch."""
+
+    async def results(self, batch_id: str):
+        async for result in super().results(batch_id):
+            yield result
+            raise RuntimeError("worker stopped")
+
+
+async def test_interrupted_collection_is_resumed() -> None:
+    """Test a claimed batch is kept until all its results are stored, then resumed."""
+    redis_client = ClaimingRedis()
+    backend = InterruptedBackend(echo)
+    scheduler = AIJobScheduler(redis_client, backend, claim_timeout_seconds=0)
+    first, second = [await scheduler.enqueue(job(text)) for text in ("a", "b")]
+    batch_id = await scheduler.submit_pending()
+    await backend._batches[batch_id]
+
+    with pytest.raises(RuntimeError):
+        await scheduler.poll()
+    assert batch_id in redis_client.hashes[CLAIMED_KEY]
+
+    scheduler.backend = LocalBatchBackend(echo)
+    await scheduler.poll()
+    await scheduler.submit_pending()
+    await drain(scheduler)
+
+    assert (await scheduler.get_result(first))["result"] == {"text": "A"}
+    assert (await scheduler.get_result(second))["result"] == {"text": "B"}
+    assert redis_client.hashes[CLAIMED_KEY] == {}
+
+
+class ExhaustedBudget:
+    async def admit(self, account, params: dict, deferrable: bool = False, batch: bool = False):
+        return Admission("defer" if deferrable else "reject", params["model"], account)
+
+
+async def test_deferred_swing_analysis_is_queued_once_and_published(
+    scheduler: AIJobScheduler, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test a swing's deferred analysis is queued once and stored for the swing."""
+    monkeypatch.setattr(settings, "MOCK_AI_IN_TESTS", False)
+    monkeypatch.setattr(settings, "AI_BATCH_ENABLED", True)
+    published = []
+
+    async def publish_result(key: str, user_id: int, analysis: dict) -> None:
+        published.append((key, user_id, analysis))
+
+    async def model(params: dict) -> str:
+        return json.dumps({"overall_feedback": "Rotate through."})
+
+    monkeypatch.setattr(analysis_streams, "publish_result", publish_result)
+    scheduler.backend = LocalBatchBackend(model)
+    service = AICoachService(cache=None, budget=ExhaustedBudget(), scheduler=scheduler, stats=None)
+    scheduler.register_handler("reanalysis", service.handle_batch_result)
+    pose_data = [{"frame_number": 0, "phase": "address", "metrics": {"spine_angle": 34.0}}]
+    context = {"user_id": 7, "handicap": 12.0}
+
+    first = await service.analyze_swing([], pose_data, context, swing_id=5)
+    again = [
+        event async for event in service.stream_swing_analysis([], pose_data, context, swing_id=5)
+    ]
+
+    assert first["status"] == "deferred"
+    assert again == [("deferred", {"job_id": first["job_id"]})]
+    assert await scheduler._redis.llen(PENDING_KEY) == 1
+
+    await scheduler.submit_pending()
+    await drain(scheduler)
+
+    assert [(key, user_id) for key, user_id, _ in published] == [("5", 7)]
+    assert published[0][2]["overall_feedback"] == "Rotate through."
+
+
+async def test_failed_deferred_analysis_ends_its_stream(
+    scheduler: AIJobScheduler, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test a deferred analysis whose job fails ends its swing's stream with an error."""
+    monkeypatch.setattr(settings, "MOCK_AI_IN_TESTS", False)
+    monkeypatch.setattr(settings, "AI_BATCH_ENABLED", True)
+    failed = []
+
+    async def publish_error(key: str, detail: str) -> None:
+        failed.append((key, detail))
+
+    async def model(params: dict) -> str:
+        raise RuntimeError("overloaded")
+
+    monkeypatch.setattr(analysis_streams, "publish_error", publish_error)
+    scheduler.backend = LocalBatchBackend(model)
+    service = AICoachService(cache=None, budget=ExhaustedBudget(), scheduler=scheduler, stats=None)
+    scheduler.register_handler(
+        "reanalysis", service.handle_batch_result, on_failure=service.handle_batch_failure
+    )
+    pose_data = [{"frame_number": 0, "phase": "address", "metrics": {"spine_angle": 34.0}}]
+
+    await service.analyze_swing([], pose_data, {"user_id": 7}, swing_id=5)
+    for _ in range(3):
+        await scheduler.submit_pending()
+        await drain(scheduler)
+
+    assert failed == [("5", "overloaded")]
@@ -0,0 +1,199 @@
+"""
+Tests for the similar-swing analysis cache and AI coaching service.
+"""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+from app.services import analysis_cache
+from app.services.ai_coach import PROMPT_VERSION, AICoachService, AIParsingError
+from app.services.analysis_cache import SimilarSwingCache, SwingFingerprint, handicap_band
+from tests.fake_redis import FakeAsyncRedis
+
+
+class FailingRedis:
+    def __getattr__(self, name: str):
+        async def fail(*args, **kwargs):
+            raise aioredis.ConnectionError("Connection refused")
+
+        return fail
+
+
+BIOMECHANICS = {
+    "address": {"spine_angle": 34.0, "knee_flex": 25.0},
+    "top_of_backswing": {"shoulder_turn": 88.0, "hip_rotation": 45.0, "x_factor": 43.0},
+    "impact": {"spine_angle_loss": 9.0, "head_sway_cm": 4.0},
+}
+
+
+def pose_data(biomechanics: dict) -> list[dict]:
+    return [
+        {"frame_number": index, "phase": phase, "metrics": metrics}
+        for index, (phase, metrics) in enumerate(biomechanics.items())
+    ]
+
+
+def fingerprint(biomechanics: dict = BIOMECHANICS, **overrides) -> SwingFingerprint:
+    args = {"faults": ["early_extension"], "handicap": 14.0, "prompt_version": "1"}
+    args.update(overrides)
+    return SwingFingerprint(biomechanics, **args)
+
+
+@pytest.fixture()
+def cache() -> SimilarSwingCache:
+    return SimilarSwingCache(FakeAsyncRedis(), max_distance=1.5)
+
+
+@pytest.fixture()
+def mock_ai(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "APP_ENV", "test")
+    monkeypatch.setattr(settings, "MOCK_AI_IN_TESTS", True)
+
+
+def test_handicap_band() -> None:
+    """Test handicaps are grouped into bands."""
+    assert handicap_band(None) == "unknown"
+    assert handicap_band(2.0) == "band0"
+    assert handicap_band(14.0) == "band2"
+    assert handicap_band(36.0) == "band4"
+
+
+def test_fingerprint_ignores_small_differences() -> None:
+    """Test measurements within a quantization step share a fingerprint."""
+    nudged = {phase: dict(metrics) for phase, metrics in BIOMECHANICS.items()}
+    nudged["top_of_backswing"]["shoulder_turn"] = 89.0
+
+    assert fingerprint(nudged).key == fingerprint().key
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [{"faults": ["over_the_top"]}, {"handicap": 3.0}, {"prompt_version": "2"}],
+)
+def test_fingerprint_bucket(overrides: dict) -> None:
+    """Test faults, handicap band and prompt version partition the cache."""
+    assert fingerprint(**overrides).bucket != fingerprint().bucket
+
+
+async def test_exact_hit(cache: SimilarSwingCache) -> None:
+    """Test an identical fingerprint is served exactly."""
+    before = analysis_cache.cache_requests.labels(result="exact").value
+    await cache.store(fingerprint(), {"overall_feedback": "Stay in posture."})
+
+    hit = await cache.lookup(fingerprint())
+
+    assert hit is not None and hit.exact
+    assert hit.analysis["overall_feedback"] == "Stay in posture."
+    assert analysis_cache.cache_requests.labels(result="exact").value == before + 1
+
+
+async def test_similar_hit_within_distance(cache: SimilarSwingCache) -> None:
+    """Test a close swing is served the nearest cached analysis."""
+    await cache.store(fingerprint(), {"overall_feedback": "Stay in posture."})
+    close = {phase: dict(metrics) for phase, metrics in BIOMECHANICS.items()}
+    close["top_of_backswing"]["shoulder_turn"] = 94.0
+
+    hit = await cache.lookup(fingerprint(close))
+
+    assert hit is not None and not hit.exact
+    assert hit.distance == 1.0
+
+
+async def test_miss_beyond_distance(cache: SimilarSwingCache) -> None:
+    """Test a swing farther than the max distance misses."""
+    await cache.store(fingerprint(), {"overall_feedback": "Stay in posture."})
+    far = {phase: dict(metrics) for phase, metrics in BIOMECHANICS.items()}
+    far["top_of_backswing"]["shoulder_turn"] = 110.0
+
+    assert await cache.lookup(fingerprint(far)) is None
+
+
+async def test_expired_index_entry_is_pruned(cache: SimilarSwingCache) -> None:
+    """Test index entries whose analysis expired are removed."""
+    stored = fingerprint()
+    await cache.store(stored, {"overall_feedback": "Stay in posture."})
+    del cache._redis.strings[stored.key]
+    close = {phase: dict(metrics) for phase, metrics in BIOMECHANICS.items()}
+    close["top_of_backswing"]["shoulder_turn"] = 94.0
+
+    assert await cache.lookup(fingerprint(close)) is None
+    assert cache._redis.hashes[stored.index_key] == {}
+
+
+async def test_swings_without_metrics_are_not_cached(cache: SimilarSwingCache) -> None:
+    """Test swings missing every key-phase metric neither hit nor fill the cache."""
+    unmeasured = fingerprint({})
+    await cache.store(unmeasured, {"overall_feedback": "Stay in posture."})
+
+    assert await cache.lookup(fingerprint({})) is None
+    assert cache._redis.strings == {}
+
+
+async def test_redis_failure_degrades_to_model(mock_ai: None) -> None:
+    """Test coaching still succeeds when the cache's Redis is unavailable."""
+    cache = SimilarSwingCache(FailingRedis())
+    errors = analysis_cache.cache_requests.labels(result="error")
+    before = errors.value
+
+    assert await cache.lookup(fingerprint()) is None
+    await cache.store(fingerprint(), {"overall_feedback": "Stay in posture."})
+    analysis = await AICoachService(cache=cache).analyze_swing(
+        [], pose_data(BIOMECHANICS), {"handicap": 14.0}, ["early_extension"]
+    )
+
+    assert analysis["overall_feedback"] == "Mock analysis."
+    assert errors.value == before + 2
+
+
+async def test_analyze_swing_uses_cache(cache: SimilarSwingCache, mock_ai: None) -> None:
+    """Test a repeated similar swing is served from the cache."""
+    service = AICoachService(cache=cache)
+    context = {"handicap": 14.0}
+
+    first = await service.analyze_swing([], pose_data(BIOMECHANICS), context, ["early_extension"])
+    assert "cache" not in first
+
+    close = {phase: dict(metrics) for phase, metrics in BIOMECHANICS.items()}
+    close["top_of_backswing"]["shoulder_turn"] = 94.0
+    second = await service.analyze_swing([], pose_data(close), context, ["early_extension"])
+
+    assert second["cache"]["match"] == "similar"
+    assert second["biomechanics"]["top_of_backswing"]["shoulder_turn"] == 94.0
+    assert second["overall_feedback"] == first["overall_feedback"]
+
+
+async def test_analyze_swing_prompt_version_invalidates(
+    cache: SimilarSwingCache, mock_ai: None
+) -> None:
+    """Test analyses cached with an older prompt version are not served."""
+    await cache.store(
+        fingerprint(prompt_version=f"{PROMPT_VERSION}-old"), {"overall_feedback": "Old."}
+    )
+    service = AICoachService(cache=cache)
+
+    analysis = await service.analyze_swing(
+        [], pose_data(BIOMECHANICS), {"handicap": 14.0}, ["early_extension"]
+    )
+
+    assert analysis["overall_feedback"] == "Mock analysis."
+
+
+def test_parse_response_strips_markdown() -> None:
+    """Test JSON wrapped in a markdown fence is parsed."""
+    service = AICoachService()
+    assert service._parse_response('```json\n{"overall_feedback": "Good."}\n```') == {
+        "overall_feedback": "Good."
+    }
+
+
+def test_parse_response_error() -> None:
+    """Test an unparseable response raises AIParsingError chained to the JSON error."""
+    with pytest.raises(AIParsingError) as exc_info:
+        AICoachService()._parse_response("Sorry, I cannot help with that.")
+
+    assert isinstance(exc_info.value.__cause__, json.JSONDecodeError)
@@ -0,0 +1,276 @@
+"""
+Tests for streaming swing analyses over Server-Sent Events.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from dataclasses import replace
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.api.v1 import swings
+from app.core.config import settings
+from app.models.stats import SwingStatsTotal
+from app.models.swing import SwingAnalysis
+from app.models.user import User
+from app.services.ai_coach import ai_coach
+from app.services.analysis_stream import AnalysisStreamService, analysis_streams, format_sse
+from app.services.principal_cache import principal_cache
+from tests.fake_redis import FakeAsyncRedis
+
+
+def parse_sse(body: str) -> list[dict]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n") if ": " in line)
+        if "id" in fields:
+            events.append(fields)
+    return events
+
+
+@pytest.fixture()
+def fake_redis(monkeypatch: pytest.MonkeyPatch) -> FakeAsyncRedis:
+    redis_client = FakeAsyncRedis()
+    monkeypatch.setattr(analysis_streams, "_redis", redis_client)
+    monkeypatch.setattr(analysis_streams, "_blocking_redis", redis_client)
+    monkeypatch.setattr(ai_coach, "cache", None)
+    monkeypatch.setattr(settings, "APP_ENV", "test")
+    monkeypatch.setattr(settings, "MOCK_AI_IN_TESTS", True)
+    monkeypatch.setitem(swings._swing_store, 1, {"object_key": "swings/1.mp4", "filename": "1.mp4"})
+    return redis_client
+
+
+ANALYSIS_REQUEST = {
+    "pose_data": [{"frame_number": 0, "phase": "address", "metrics": {"spine_angle": 34.0}}],
+    "faults": ["early_extension"],
+}
+
+
+def test_format_sse_splits_multiline_data() -> None:
+    """Test multi-line data is sent as several data fields."""
+    assert format_sse("1-0", "delta", "a\nb") == "id: 1-0\nevent: delta\ndata: a\ndata: b\n\n"
+    assert format_sse(None, None, None) == ": keep-alive\n\n"
+
+
+def test_stream_emits_deltas_then_result(
+    client: TestClient, auth_headers: dict, fake_redis: FakeAsyncRedis
+) -> None:
+    """Test the stream carries model output followed by the structured result."""
+    response = client.post(
+        "/api/v1/swings/1/analysis/stream", json=ANALYSIS_REQUEST, headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_sse(response.text)
+    assert events[0]["event"] == "delta"
+    assert events[-1]["event"] == "result"
+    streamed = "".join(event["data"] for event in events if event["event"] == "delta")
+    result = json.loads(events[-1]["data"])
+    assert json.loads(streamed)["overall_feedback"] == result["overall_feedback"]
+
+    response = client.get("/api/v1/swings/1/analysis", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["biomechanics"] == {"address": {"spine_angle": 34.0}}
+
+
+def test_completed_analysis_outlives_its_cached_copy(
+    client: TestClient, auth_headers: dict, fake_redis: FakeAsyncRedis, db: Session
+) -> None:
+    """Test a completed analysis is stored in the database and served after Redis expiry."""
+    client.post("/api/v1/swings/1/analysis/stream", json=ANALYSIS_REQUEST, headers=auth_headers)
+    stored = db.get(SwingAnalysis, 1)
+
+    del fake_redis.strings["analysis:result:1"]
+    response = client.get("/api/v1/swings/1/analysis", headers=auth_headers)
+
+    assert stored.analysis["biomechanics"] == {"address": {"spine_angle": 34.0}}
+    assert response.status_code == 200
+    assert response.json() == stored.analysis
+    assert "analysis:result:1" in fake_redis.strings
+
+
+def test_prompt_carries_baselines_and_recent_swings(
+    client: TestClient,
+    auth_headers: dict,
+    fake_redis: FakeAsyncRedis,
+    db: Session,
+    test_user: User,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test an analysis started by the endpoint compares the swing with the golfer's history."""
+    db.add(
+        SwingStatsTotal(
+            user_id=test_user.id,
+            swings_analyzed=1,
+            scored_swings=1,
+            score_sum=6.0,
+            issue_counts={"early_extension": 1},
+            metric_sums={"address.spine_angle": 40.0},
+            metric_counts={"address.spine_angle": 1},
+        )
+    )
+    db.add(
+        SwingAnalysis(
+            swing_id=7,
+            user_id=test_user.id,
+            analysis={
+                "swing_phases": [{"phase": "impact", "quality_score": 6.0}],
+                "technical_analysis": {"issues": [{"issue": "early_extension"}]},
+            },
+        )
+    )
+    db.commit()
+    contexts = []
+    stream = ai_coach.stream_swing_analysis
+
+    def recorded_stream(frames, pose_data, user_context, *args, **kwargs):
+        contexts.append(user_context)
+        return stream(frames, pose_data, user_context, *args, **kwargs)
+
+    monkeypatch.setattr(ai_coach, "stream_swing_analysis", recorded_stream)
+
+    client.post("/api/v1/swings/1/analysis/stream", json=ANALYSIS_REQUEST, headers=auth_headers)
+    prompt = ai_coach._build_analysis_prompt(
+        {"address": {"spine_angle": 34.0}}, contexts[0], ANALYSIS_REQUEST["faults"]
+    )
+
+    assert "VS GOLFER'S BASELINE:\n- address spine_angle -6" in prompt
+    assert "RECENT SWINGS:\n- " in prompt
+    assert "score 6.0; faults early_extension" in prompt
+
+
+def test_analysis_is_budgeted_at_the_users_tier(
+    client: TestClient,
+    auth_headers: dict,
+    fake_redis: FakeAsyncRedis,
+    test_user: User,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test an analysis is admitted against the AI quota of the golfer's subscription tier."""
+    client.get("/api/v1/users/me", headers=auth_headers)
+    principal_cache._set_local(replace(principal_cache.peek(test_user.id), subscription_tier="pro"))
+    contexts = []
+    stream = ai_coach.stream_swing_analysis
+
+    def recorded_stream(frames, pose_data, user_context, *args, **kwargs):
+        contexts.append(user_context)
+        return stream(frames, pose_data, user_context, *args, **kwargs)
+
+    monkeypatch.setattr(ai_coach, "stream_swing_analysis", recorded_stream)
+
+    client.post("/api/v1/swings/1/analysis/stream", json=ANALYSIS_REQUEST, headers=auth_headers)
+
+    assert contexts[0]["tier"] == "pro"
+
+
+def test_resume_from_cursor(
+    client: TestClient, auth_headers: dict, fake_redis: FakeAsyncRedis
+) -> None:
+    """Test resuming only replays events after the cursor."""
+    asyncio.run(fake_redis.set("analysis:owner:1", "1"))
+    for data in ("{", '"a": 1'):
+        asyncio.run(fake_redis.xadd("analysis:stream:1", {"event": "delta", "data": data}))
+    asyncio.run(fake_redis.xadd("analysis:stream:1", {"event": "result", "data": "{}"}))
+
+    response = client.get(
+        "/api/v1/swings/1/analysis/stream",
+        headers={**auth_headers, "Last-Event-ID": "1-0"},
+    )
+
+    assert response.status_code == 200
+    events = parse_sse(response.text)
+    assert [event["id"] for event in events] == ["2-0", "3-0"]
+
+
+def test_resume_deferred_analysis_receives_batch_result(
+    client: TestClient,
+    auth_headers: dict,
+    fake_redis: FakeAsyncRedis,
+    test_user: User,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test resuming from the "deferred" event of an analysis waits for its batch result."""
+
+    async def deferred(*args, **kwargs):
+        yield "deferred", {"job_id": "j"}
+
+    monkeypatch.setattr(ai_coach, "stream_swing_analysis", deferred)
+    response = client.post(
+        "/api/v1/swings/1/analysis/stream", json=ANALYSIS_REQUEST, headers=auth_headers
+    )
+    deferred_event = parse_sse(response.text)[-1]
+    assert deferred_event["event"] == "deferred"
+
+    again = client.post(
+        "/api/v1/swings/1/analysis/stream", json=ANALYSIS_REQUEST, headers=auth_headers
+    )
+    assert parse_sse(again.text) == [deferred_event]
+
+    # The batch job completes while the client is waiting
+    xread = fake_redis.xread
+    published = []
+
+    async def publish_then_xread(streams: dict, count: int, block: int) -> list:
+        if not published:
+            published.append(True)
+            await analysis_streams.publish_result(
+                "1", test_user.id, {"overall_feedback": "Rotate through."}
+            )
+        return await xread(streams, count, block)
+
+    monkeypatch.setattr(fake_redis, "xread", publish_then_xread)
+    response = client.get(
+        "/api/v1/swings/1/analysis/stream",
+        headers={**auth_headers, "Last-Event-ID": deferred_event["id"]},
+    )
+
+    assert response.status_code == 200
+    events = parse_sse(response.text)
+    assert [event["event"] for event in events] == ["result"]
+    assert json.loads(events[0]["data"]) == {"overall_feedback": "Rotate through."}
+
+
+def test_resume_unknown_analysis(
+    client: TestClient, auth_headers: dict, fake_redis: FakeAsyncRedis
+) -> None:
+    """Test resuming an analysis that was never started."""
+    response = client.get("/api/v1/swings/1/analysis/stream", headers=auth_headers)
+    assert response.status_code == 404
+
+
+async def test_failed_generation_emits_error(fake_redis: FakeAsyncRedis) -> None:
+    """Test a failed analysis ends the stream with an error and can be retried."""
+
+    async def events():
+        yield "delta", "{"
+        raise RuntimeError("overloaded")
+
+    stream = AnalysisStreamService(fake_redis)
+    assert await stream.start("7", 1, events())
+    received = [event async for event in stream.events("7")]
+
+    assert [event for _, event, _ in received if event] == ["delta", "error"]
+    assert await stream.get_owner("7") is None
+
+
+async def test_deferred_result_ends_stream(
+    fake_redis: FakeAsyncRedis, async_session_factory: async_sessionmaker, test_user: User
+) -> None:
+    """Test a batch result of a deferred analysis is stored and appended to its stream."""
+    stream = AnalysisStreamService(fake_redis, session_factory=async_session_factory)
+    await fake_redis.xadd("analysis:stream:9", {"event": "deferred", "data": '{"job_id": "j"}'})
+
+    await stream.publish_result("9", test_user.id, {"overall_feedback": "Rotate through."})
+    received = [event async for event in stream.events("9", "1-0")]
+
+    assert [event for _, event, _ in received] == ["result"]
+    assert (await stream.get_result("9")) == {
+        "user_id": test_user.id,
+        "analysis": {"overall_feedback": "Rotate through."},
+    }
@@ -2,33 +2,26 @@
 Tests for authentication endpoints.
 """
 
+from typing import Generator
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
-from app.api.v1 import auth as auth_module
-from app.core.config import settings
+from app.core.security import decode_token
 from app.models.user import User
-
-
-class FakeRedis:
-    def __init__(self) -> None:
-        self.store: dict[str, str] = {}
-        self.ttl: dict[str, int] = {}
-
-    def setex(self, key: str, ttl: int, value: str) -> None:
-        self.store[key] = value
-        self.ttl[key] = ttl
-
-    def get(self, key: str) -> str | None:
-        return self.store.get(key)
+from app.services.token_revocation import REVOKED_KEY_PREFIX, token_revocations
+from tests.fake_redis import FakeAsyncRedis
 
 
 @pytest.fixture()
-def fake_redis(monkeypatch: pytest.MonkeyPatch) -> FakeRedis:
-    fake = FakeRedis()
-    monkeypatch.setattr(auth_module, "get_redis", lambda: fake)
-    return fake
+def fake_redis(monkeypatch: pytest.MonkeyPatch) -> Generator[FakeAsyncRedis, None, None]:
+    fake = FakeAsyncRedis()
+    monkeypatch.setattr(token_revocations, "_redis", fake)
+    monkeypatch.setattr(token_revocations, "_blocking_redis", fake)
+    token_revocations.reset()
+    yield fake
+    token_revocations.reset()
 
 
 def test_register_user(client: TestClient, test_user_data: dict) -> None:
@@ -50,6 +43,17 @@ def test_register_user(client: TestClient, test_user_data: dict) -> None:
     assert "expires_in" in data
 
 
+def test_register_statement_budget(
+    client: TestClient, test_user_data: dict, max_queries
+) -> None:
+    """Test registration creates the user and profile without re-querying."""
+    with max_queries(2):  # INSERT user, INSERT profile
+        response = client.post("/api/v1/auth/register", json=test_user_data)
+
+    assert response.status_code == 201
+    assert response.json()["user"]["profile"]["goals"] == []
+
+
 def test_register_duplicate_email(
     client: TestClient, test_user: User, test_user_data: dict
 ) -> None:
@@ -107,6 +111,18 @@ def test_login_success(client: TestClient, test_user: User) -> None:
     assert data["token_type"] == "bearer"
 
 
+def test_login_statement_budget(client: TestClient, test_user: User, max_queries) -> None:
+    """Test login loads the user and profile in one query."""
+    with max_queries(1):
+        response = client.post(
+            "/api/v1/auth/login",
+            json={"email": "test@example.com", "password": "TestPassword123!"},
+        )
+
+    assert response.status_code == 200
+    assert response.json()["user"]["profile"]["dominant_hand"] == "right"
+
+
 def test_login_wrong_password(client: TestClient, test_user: User) -> None:
     """Test login with wrong password fails."""
     response = client.post(
@@ -125,7 +141,7 @@ def test_login_nonexistent_user(client: TestClient) -> None:
     assert response.status_code == 401
 
 
-def test_refresh_token(client: TestClient, test_user: User, fake_redis: FakeRedis) -> None:
+def test_refresh_token(client: TestClient, test_user: User, fake_redis: FakeAsyncRedis) -> None:
     """Test token refresh."""
     # First, login to get tokens
     login_response = client.post(
@@ -147,7 +163,7 @@ def test_refresh_token(client: TestClient, test_user: User, fake_redis: FakeRedi
     assert "expires_in" in data
 
 
-def test_refresh_token_invalid(client: TestClient, fake_redis: FakeRedis) -> None:
+def test_refresh_token_invalid(client: TestClient, fake_redis: FakeAsyncRedis) -> None:
     """Test token refresh with invalid token fails."""
     response = client.post(
         "/api/v1/auth/refresh", json={"refresh_token": "invalid_token"}
@@ -155,18 +171,16 @@ def test_refresh_token_invalid(client: TestClient, fake_redis: FakeRedis) -> Non
     assert response.status_code == 401
 
 
-def test_refresh_token_rejects_blacklisted(
-    client: TestClient, test_user: User, fake_redis: FakeRedis
+def test_refresh_token_rejects_revoked(
+    client: TestClient, test_user: User, fake_redis: FakeAsyncRedis
 ) -> None:
-    """Test token refresh rejects blacklisted refresh token."""
+    """Test token refresh rejects a refresh token revoked by logout."""
     login_response = client.post(
         "/api/v1/auth/login",
         json={"email": "test@example.com", "password": "TestPassword123!"},
     )
     refresh_token = login_response.json()["refresh_token"]
-
-    ttl_seconds = settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
-    fake_redis.setex(f"blacklist:{refresh_token}", ttl_seconds, "1")
+    client.post("/api/v1/auth/logout", json={"refresh_token": refresh_token})
 
     response = client.post(
         "/api/v1/auth/refresh", json={"refresh_token": refresh_token}
@@ -174,7 +188,7 @@ def test_refresh_token_rejects_blacklisted(
     assert response.status_code == 401
 
 
-def test_logout(client: TestClient, test_user: User, fake_redis: FakeRedis) -> None:
+def test_logout(client: TestClient, test_user: User, fake_redis: FakeAsyncRedis) -> None:
     """Test logout."""
     # First, login to get tokens
     login_response = client.post(
@@ -186,9 +200,17 @@ def test_logout(client: TestClient, test_user: User, fake_redis: FakeRedis) -> N
     # Now logout
     response = client.post("/api/v1/auth/logout", json={"refresh_token": refresh_token})
     assert response.status_code == 204
-    blacklist_key = f"blacklist:{refresh_token}"
-    assert fake_redis.get(blacklist_key) == "1"
-    assert (
-        fake_redis.ttl[blacklist_key]
-        == settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
-    )
+
+    # Revoked by jti, in the bucket of the day the token expires
+    payload = decode_token(refresh_token)
+    bucket_key = f"{REVOKED_KEY_PREFIX}{payload['exp'] // 86400}"
+    assert fake_redis.sets[bucket_key] == {payload["jti"]}
+    assert fake_redis.expire_at[bucket_key] > payload["exp"]
+
+
+def test_logout_ignores_invalid_token(client: TestClient, fake_redis: FakeAsyncRedis) -> None:
+    """Test logout with an unusable token succeeds without storing anything."""
+    response = client.post("/api/v1/auth/logout", json={"refresh_token": "invalid_token"})
+
+    assert response.status_code == 204
+    assert fake_redis.sets == {}
@@ -0,0 +1,33 @@
+"""
+Tests for the Bloom filter.
+"""
+
+from app.utils.bloom import BloomFilter
+
+
+def test_added_items_are_always_found() -> None:
+    """Test the filter has no false negatives."""
+    items = [f"token-{i}" for i in range(5000)]
+    bloom = BloomFilter.from_items(items, capacity=5000, error_rate=0.01)
+
+    assert all(item in bloom for item in items)
+    assert bloom.count == 5000
+
+
+def test_false_positive_rate_at_capacity() -> None:
+    """Test false positives stay near the configured rate at capacity."""
+    bloom = BloomFilter.from_items(
+        (f"revoked-{i}" for i in range(10000)), capacity=10000, error_rate=0.01
+    )
+
+    false_positives = sum(f"valid-{i}" in bloom for i in range(20000))
+
+    assert false_positives / 20000 < 0.02
+
+
+def test_filter_is_sized_from_capacity_and_error_rate() -> None:
+    """Test the bit array and hash count follow the standard sizing."""
+    bloom = BloomFilter(capacity=100000, error_rate=0.001)
+
+    assert 1_400_000 < bloom.size < 1_500_000
+    assert bloom.hash_count == 10
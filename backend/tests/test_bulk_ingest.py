@@ -0,0 +1,150 @@
+"""
+Tests for bulk ingestion of pose keypoints and integration shots.
+"""
+
+import threading
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+import numpy as np
+import pytest
+from sqlalchemy import Table
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.orm import Session
+
+from app.models.integration import IntegrationShot
+from app.models.pose import PoseKeypoint
+from app.models.user import User
+from app.services.bulk_ingest import BulkIngester
+from app.services.error_detector import metrics_vector
+from app.services.frame_persistence import persist_swing_frames
+from app.services.integration_ingest import ingest_integration_shots
+
+
+class FlakyIngester(BulkIngester):
+    """Fails the first `failures` statements with a lost connection."""
+
+    def __init__(self, engine: AsyncEngine, failures: int, **kwargs) -> None:
+        super().__init__(engine, retry_backoff_seconds=0, **kwargs)
+        self.failures = failures
+
+    async def _insert(
+        self, conn: AsyncConnection, table: Table, names: List[str], rows: List[Tuple]
+    ) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise OperationalError("INSERT", {}, Exception("connection lost"))
+        await super()._insert(conn, table, names, rows)
+
+
+def _frames(user_id: int, count: int) -> dict:
+    return {
+        "user_id": [user_id] * count,
+        "recorded_at": [
+            datetime(2026, 10, 19, 12, 0, i, tzinfo=timezone.utc) for i in range(count)
+        ],
+        "frame_number": list(range(count)),
+        "timestamp_ms": [i * 33 for i in range(count)],
+        "keypoints": [[[0.5, 0.5, 0.0, 1.0]] * 33] * count,
+    }
+
+
+async def test_write_batches_rows(async_engine: AsyncEngine, db: Session, test_user: User) -> None:
+    """Test rows are written in batches and JSON columns round-trip."""
+    ingester = BulkIngester(async_engine, batch_rows=4)
+
+    assert ingester.method == "insert"
+    assert await ingester.write(PoseKeypoint.__table__, _frames(test_user.id, 10)) == 10
+
+    rows = db.query(PoseKeypoint).order_by(PoseKeypoint.frame_number).all()
+    assert [row.frame_number for row in rows] == list(range(10))
+    assert rows[9].keypoints[0] == [0.5, 0.5, 0.0, 1.0]
+
+
+async def test_columns_are_built_off_the_event_loop(
+    async_engine: AsyncEngine, db: Session, test_user: User
+) -> None:
+    """Test columns given as a function are materialized in a worker thread."""
+    threads = []
+
+    def columns() -> dict:
+        threads.append(threading.current_thread())
+        return _frames(test_user.id, 3)
+
+    assert await BulkIngester(async_engine).write(PoseKeypoint.__table__, columns) == 3
+    assert threads and threads[0] is not threading.main_thread()
+
+
+async def test_empty_write_is_noop(async_engine: AsyncEngine) -> None:
+    """Test writing no rows runs no statements."""
+    ingester = BulkIngester(async_engine)
+
+    assert await ingester.write(PoseKeypoint.__table__, _frames(1, 0)) == 0
+
+
+async def test_transient_errors_are_retried(
+    async_engine: AsyncEngine, db: Session, test_user: User
+) -> None:
+    """Test a batch failing with a transient error is retried."""
+    ingester = FlakyIngester(async_engine, failures=2, max_retries=3)
+
+    assert await ingester.write(PoseKeypoint.__table__, _frames(test_user.id, 3)) == 3
+    assert db.query(PoseKeypoint).count() == 3
+
+
+async def test_retries_are_bounded(async_engine: AsyncEngine, db: Session, test_user: User) -> None:
+    """Test the error is raised once a batch has failed on every attempt."""
+    ingester = FlakyIngester(async_engine, failures=5, max_retries=2)
+
+    with pytest.raises(OperationalError):
+        await ingester.write(PoseKeypoint.__table__, _frames(test_user.id, 3))
+    assert db.query(PoseKeypoint).count() == 0
+
+
+async def test_persist_swing_frames(
+    async_engine: AsyncEngine, db: Session, test_user: User
+) -> None:
+    """Test all frames of a processed swing are written at once."""
+    count = 120
+    timestamps = np.arange(count) * 33
+    keypoints = np.full((count, 33, 4), 0.25, dtype=np.float32)
+    metrics = np.stack([metrics_vector({"spine_angle": 40.0})] * count)
+
+    written = await persist_swing_frames(
+        test_user.id,
+        7,
+        timestamps,
+        keypoints,
+        metrics,
+        recorded_at=1_790_000_000.0,
+        ingester=BulkIngester(async_engine, batch_rows=50),
+    )
+
+    assert written == count
+    rows = db.query(PoseKeypoint).order_by(PoseKeypoint.frame_number).all()
+    assert len(rows) == count
+    assert {row.swing_id for row in rows} == {7}
+    assert rows[-1].timestamp_ms == 119 * 33
+    assert rows[0].metrics == {"spine_angle": 40.0}
+    assert rows[0].keypoints[0] == [0.25, 0.25, 0.25, 0.25]
+
+
+async def test_ingest_integration_shots(
+    async_engine: AsyncEngine, db: Session, test_user: User
+) -> None:
+    """Test launch monitor shots are stored with their measurements."""
+    shots = [
+        {"recorded_at": datetime(2026, 10, 19, 12, 0, i), "ball_speed": 150.0 + i} for i in range(3)
+    ]
+    shots[0]["swing_id"] = 7
+
+    written = await ingest_integration_shots(
+        test_user.id, "trackman", shots, ingester=BulkIngester(async_engine)
+    )
+
+    assert written == 3
+    rows = db.query(IntegrationShot).order_by(IntegrationShot.recorded_at).all()
+    assert [row.shot_data for row in rows] == [{"ball_speed": 150.0 + i} for i in range(3)]
+    assert rows[0].swing_id == 7
+    assert rows[1].source == "trackman"
@@ -0,0 +1,108 @@
+"""
+Tests for per-request database instrumentation.
+"""
+
+import asyncio
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.db_instrumentation import (
+    DBInstrumentationMiddleware,
+    InstrumentedAsyncQueuePool,
+    current_stats,
+    instrument_engine,
+    n_plus_one,
+)
+
+
+@pytest.fixture()
+def pooled_engine(database_path: str) -> AsyncEngine:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{database_path}",
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=1,
+        max_overflow=0,
+    )
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
+def _app(engine: AsyncEngine, queries: int) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(DBInstrumentationMiddleware, expose_headers=True, n_plus_one_threshold=5)
+
+    @app.get("/items/{item_id}")
+    async def items(item_id: int) -> dict:
+        async with engine.connect() as conn:
+            for i in range(queries):
+                await conn.execute(text("SELECT :i"), {"i": i})
+        return {"item_id": item_id}
+
+    return app
+
+
+def test_headers_report_request_statements(client: TestClient, auth_headers: dict) -> None:
+    """Test debug responses report the statements the request ran."""
+    response = client.get("/api/v1/users/me", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert int(response.headers["X-DB-Statements"]) >= 1
+    assert float(response.headers["X-DB-Time-Ms"]) > 0
+    assert "X-DB-Pool-Wait-Ms" in response.headers
+
+
+def test_repeated_statement_is_flagged(
+    pooled_engine: AsyncEngine, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Test a statement repeated within one request is logged as a possible N+1."""
+    flagged = n_plus_one.labels(route="/items/{item_id}")
+    before = flagged.value
+
+    with TestClient(_app(pooled_engine, queries=6)) as client:
+        with caplog.at_level(logging.WARNING, logger="app.core.db_instrumentation"):
+            response = client.get("/items/1")
+
+    assert response.headers["X-DB-Statements"] == "6"
+    assert flagged.value == before + 1
+    assert "Possible N+1 query on GET /items/{item_id}: statement ran 6 times" in caplog.text
+
+
+def test_distinct_statements_are_not_flagged(
+    pooled_engine: AsyncEngine, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Test requests below the repetition threshold are not flagged."""
+    with TestClient(_app(pooled_engine, queries=2)) as client:
+        with caplog.at_level(logging.WARNING, logger="app.core.db_instrumentation"):
+            response = client.get("/items/1")
+
+    assert response.headers["X-DB-Statements"] == "2"
+    assert "N+1" not in caplog.text
+
+
+async def test_pool_wait_is_recorded(pooled_engine: AsyncEngine) -> None:
+    """Test time spent waiting for a pool connection is attributed to the request."""
+    seen = {}
+
+    async def request(scope: dict, receive, send) -> None:
+        async with pooled_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        seen["stats"] = current_stats()
+
+    middleware = DBInstrumentationMiddleware(request, expose_headers=False)
+    scope = {"type": "http", "method": "GET", "path": "/"}
+
+    async with pooled_engine.connect():
+        # The only pooled connection is busy until this one is released
+        waiting = asyncio.create_task(middleware(scope, None, None))
+        await asyncio.sleep(0.05)
+    await waiting
+
+    assert seen["stats"].statements == 1
+    assert seen["stats"].pool_wait_seconds >= 0.04
+    assert current_stats() is None
+    await pooled_engine.dispose()
@@ -0,0 +1,96 @@
+"""
+Tests for the compiled swing fault rule engine.
+"""
+
+import numpy as np
+
+from app.services.error_detector import (
+    BIOMECHANICS_METRICS,
+    ErrorDetector,
+    FaultRule,
+    SwingPhase,
+    metrics_vector,
+)
+
+
+def test_check_detects_phase_faults() -> None:
+    """Test faults are only reported for the current phase, most severe first."""
+    rules = ErrorDetector().compile()
+    metrics = metrics_vector({"spine_angle_loss": 12.0, "shoulder_turn": 60.0})
+
+    impact = rules.check(SwingPhase.IMPACT, metrics)
+    assert [d.error for d in impact] == ["early_extension"]
+    assert impact[0].data == {"spine_angle_loss": 12.0, "threshold": 8.0}
+
+    backswing = rules.check(
+        SwingPhase.BACKSWING, metrics_vector({"shoulder_turn": 60.0, "hip_rotation": 20.0})
+    )
+    assert [d.error for d in backswing] == ["restricted_shoulder_turn", "insufficient_hip_turn"]
+
+
+def test_missing_metrics_never_trigger() -> None:
+    """Test NaN metrics do not produce faults."""
+    rules = ErrorDetector().compile()
+    for phase in SwingPhase:
+        assert rules.check(phase, metrics_vector({})) == []
+
+
+def test_physical_limitations_relax_thresholds() -> None:
+    """Test profile limitations widen the allowed range."""
+    metrics = metrics_vector({"shoulder_turn": 70.0})
+
+    default = ErrorDetector().compile().check(SwingPhase.BACKSWING, metrics)
+    limited = (
+        ErrorDetector()
+        .compile(physical_limitations=["limited_shoulder_mobility"])
+        .check(SwingPhase.BACKSWING, metrics)
+    )
+
+    assert "restricted_shoulder_turn" in [d.error for d in default]
+    assert "restricted_shoulder_turn" not in [d.error for d in limited]
+
+
+def test_left_handed_golfer_thresholds_are_mirrored() -> None:
+    """Test handed metrics are mirrored for left-handed golfers."""
+    rules = ErrorDetector().compile(dominant_hand="left")
+
+    assert rules.check(SwingPhase.BACKSWING, metrics_vector({"shoulder_turn": -90.0})) == []
+    faults = rules.check(SwingPhase.DOWNSWING, metrics_vector({"shoulder_plane_angle": -8.0}))
+    assert [d.error for d in faults] == ["over_the_top"]
+
+
+def test_check_swing_matches_per_frame_checks() -> None:
+    """Test whole-swing evaluation reports each fault once at its worst frame."""
+    rules = ErrorDetector().compile()
+    phases = [SwingPhase.ADDRESS, SwingPhase.BACKSWING, SwingPhase.IMPACT, SwingPhase.IMPACT]
+    frames = np.vstack(
+        [
+            metrics_vector({"spine_angle": 40.0}),
+            metrics_vector({"shoulder_turn": 90.0, "hip_rotation": 45.0}),
+            metrics_vector({"spine_angle_loss": 9.0}),
+            metrics_vector({"spine_angle_loss": 14.0}),
+        ]
+    )
+
+    detections = rules.check_swing(phases, frames)
+
+    assert [d.error for d in detections] == ["early_extension"]
+    assert detections[0].data["frame"] == 3
+    assert detections[0].data["spine_angle_loss"] == 14.0
+
+
+def test_large_rule_library_compiles() -> None:
+    """Test hundreds of rules evaluate in one pass."""
+    rules = [
+        FaultRule(
+            f"rule_{i}",
+            SwingPhase.IMPACT,
+            BIOMECHANICS_METRICS[i % len(BIOMECHANICS_METRICS)],
+            max_value=float(i),
+        )
+        for i in range(500)
+    ]
+    compiled = ErrorDetector(rules).compile()
+    metrics = metrics_vector(dict.fromkeys(BIOMECHANICS_METRICS, 100.0))
+
+    assert len(compiled.check(SwingPhase.IMPACT, metrics)) == 100
@@ -0,0 +1,72 @@
+"""
+Tests for write-behind persistence of real-time frames.
+"""
+
+import numpy as np
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+from app.models.pose import PoseKeypoint
+from app.models.user import User
+from app.services.error_detector import metrics_vector
+from app.services.bulk_ingest import BulkIngester
+from app.services.frame_persistence import FrameWriteBehindBuffer
+
+
+@pytest.fixture()
+def buffer(db: Session, async_engine: AsyncEngine) -> FrameWriteBehindBuffer:
+    return FrameWriteBehindBuffer(
+        capacity=10,
+        flush_rows=5,
+        flush_interval_seconds=60,
+        ingester=BulkIngester(async_engine),
+    )
+
+
+def _append(buffer: FrameWriteBehindBuffer, user_id: int, frame: int) -> bool:
+    return buffer.append(
+        user_id=user_id,
+        session_id="session-1",
+        frame_number=frame,
+        timestamp_ms=frame * 16,
+        keypoints=np.full((33, 4), 0.5, dtype=np.float32),
+        metrics=metrics_vector({"spine_angle": 40.0}),
+    )
+
+
+async def test_flush_writes_batch(
+    buffer: FrameWriteBehindBuffer, db: Session, test_user: User
+) -> None:
+    """Test buffered frames are written in one flush."""
+    for frame in range(3):
+        assert _append(buffer, test_user.id, frame)
+
+    assert await buffer.flush() == 3
+    assert buffer.pending == 0
+
+    rows = db.query(PoseKeypoint).order_by(PoseKeypoint.frame_number).all()
+    assert [row.frame_number for row in rows] == [0, 1, 2]
+    assert rows[0].session_id == "session-1"
+    assert rows[0].metrics == {"spine_angle": 40.0}
+    assert len(rows[0].keypoints) == 33
+
+
+async def test_buffer_is_bounded(buffer: FrameWriteBehindBuffer, test_user: User) -> None:
+    """Test frames are dropped instead of growing memory when full."""
+    results = [_append(buffer, test_user.id, frame) for frame in range(12)]
+
+    assert results.count(True) == 10
+    assert buffer.pending == 10
+
+
+async def test_close_flushes_remaining(
+    buffer: FrameWriteBehindBuffer, db: Session, test_user: User
+) -> None:
+    """Test shutdown flushes pending frames."""
+    buffer.start()
+    _append(buffer, test_user.id, 0)
+
+    await buffer.close()
+
+    assert db.query(PoseKeypoint).count() == 1
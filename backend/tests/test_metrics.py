@@ -0,0 +1,80 @@
+"""
+Tests for metrics and real-time pipeline instrumentation.
+"""
+
+from fastapi.testclient import TestClient
+
+from app.core.metrics import MetricsRegistry
+from app.models.user import User
+from app.services import realtime_instrumentation
+from app.services.realtime_instrumentation import (
+    FrameTimer,
+    end_session_trace,
+    start_session_trace,
+)
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    """Test histogram buckets are cumulative in Prometheus output."""
+    registry = MetricsRegistry()
+    histogram = registry.histogram(
+        "test_latency_seconds", "Test latency", labelnames=("stage",), buckets=(0.001, 0.01)
+    )
+    histogram.observe(0.0005, stage="pose")
+    histogram.observe(0.005, stage="pose")
+    histogram.observe(1.0, stage="pose")
+
+    output = registry.render()
+    assert 'test_latency_seconds_bucket{stage="pose",le="0.001"} 1' in output
+    assert 'test_latency_seconds_bucket{stage="pose",le="0.01"} 2' in output
+    assert 'test_latency_seconds_bucket{stage="pose",le="+Inf"} 3' in output
+    assert 'test_latency_seconds_count{stage="pose"} 3' in output
+
+
+def test_registry_returns_existing_metric() -> None:
+    """Test registering a metric twice returns the same family."""
+    registry = MetricsRegistry()
+    assert registry.counter("test_total", "Test") is registry.counter("test_total", "Test")
+
+
+def test_frame_timer_records_stages() -> None:
+    """Test frame timer records stage timings into the session trace."""
+    before = realtime_instrumentation.stage_duration.labels(stage="pose").count
+    trace = start_session_trace("session-1", user_id=1)
+
+    timer = FrameTimer(trace)
+    with timer.stage("pose"):
+        pass
+    with timer.stage("errors"):
+        pass
+    total_ns = timer.finish()
+
+    assert realtime_instrumentation.stage_duration.labels(stage="pose").count == before + 1
+    data = trace.to_dict()
+    assert data["frame_count"] == 1
+    assert set(data["frames"][0]["stages_ms"]) == set(realtime_instrumentation.STAGES)
+    assert data["frames"][0]["total_ms"] == total_ns / 1_000_000
+    end_session_trace("session-1")
+
+
+def test_metrics_endpoint(client: TestClient) -> None:
+    """Test Prometheus metrics endpoint."""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "golfcoach_realtime_stage_duration_seconds" in response.text
+
+
+def test_session_trace_endpoint(
+    client: TestClient, test_user: User, auth_headers: dict
+) -> None:
+    """Test fetching a real-time session trace."""
+    trace = start_session_trace("session-2", user_id=test_user.id)
+    FrameTimer(trace).finish()
+
+    response = client.get("/api/v1/realtime/sessions/session-2/trace", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["frame_count"] == 1
+
+    end_session_trace("session-2")
+    response = client.get("/api/v1/realtime/sessions/session-2/trace", headers=auth_headers)
+    assert response.status_code == 404
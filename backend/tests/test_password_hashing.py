@@ -0,0 +1,99 @@
+"""
+Tests for password hashing in the process pool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+from sqlalchemy.orm import Session
+
+from app.core.password_hashing import PasswordHasher, rejected_total
+from app.core.security import pwd_context
+from app.models.user import User
+
+
+@pytest.fixture()
+def hasher() -> PasswordHasher:
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+    yield hasher
+    hasher.shutdown()
+
+
+async def test_hash_and_verify_in_workers(hasher: PasswordHasher) -> None:
+    """Test passwords hashed in the pool verify, and wrong ones do not."""
+    hashed = await hasher.hash("CorrectHorse1!")
+
+    assert pwd_context.verify("CorrectHorse1!", hashed)
+    assert await hasher.verify("CorrectHorse1!", hashed) == (True, None)
+    assert await hasher.verify("WrongHorse1!", hashed) == (False, None)
+
+
+async def test_event_loop_keeps_running_while_hashing(hasher: PasswordHasher) -> None:
+    """Test other coroutines keep running while a password is hashed."""
+    await hasher.hash("warm-up")
+    ticks = []
+
+    async def ticker() -> None:
+        while True:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.005)
+
+    task = asyncio.create_task(ticker())
+    await hasher.hash("CorrectHorse1!")
+    task.cancel()
+
+    gaps = [later - earlier for earlier, later in zip(ticks, ticks[1:], strict=False)]
+    assert len(ticks) > 10
+    assert max(gaps) < 0.1
+
+
+async def test_full_queue_is_rejected(hasher: PasswordHasher) -> None:
+    """Test calls beyond the workers and queue get 503 instead of waiting."""
+    rejected = rejected_total.labels(operation="hash")
+    before = rejected.value
+
+    results = await asyncio.gather(
+        *(hasher.hash("CorrectHorse1!") for _ in range(3)), return_exceptions=True
+    )
+
+    errors = [result for result in results if isinstance(result, HTTPException)]
+    assert len(errors) == 1
+    assert errors[0].status_code == 503
+    assert errors[0].headers == {"Retry-After": "1"}
+    assert rejected.value == before + 1
+
+
+async def test_stale_hash_is_upgraded(hasher: PasswordHasher) -> None:
+    """Test a hash with fewer rounds than configured is reported for rehashing."""
+    stale = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("CorrectHorse1!")
+
+    valid, new_hash = await hasher.verify("CorrectHorse1!", stale)
+
+    assert valid
+    assert new_hash is not None
+    assert not pwd_context.needs_update(new_hash)
+    assert pwd_context.verify("CorrectHorse1!", new_hash)
+
+
+def test_login_upgrades_stale_hash(client: TestClient, test_user: User, db: Session) -> None:
+    """Test logging in replaces a stale password hash."""
+    test_user.password_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash(
+        "TestPassword123!"
+    )
+    db.commit()
+
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"email": "test@example.com", "password": "TestPassword123!"},
+    )
+    db.refresh(test_user)
+
+    assert response.status_code == 200
+    assert not pwd_context.needs_update(test_user.password_hash)
+    assert pwd_context.verify("TestPassword123!", test_user.password_hash)
@@ -0,0 +1,140 @@
+"""
+Tests for the authenticated-principal cache.
+"""
+
+from __future__ import annotations
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.services.principal_cache import TOMBSTONE, Principal, PrincipalCache, lookups_total
+from tests.fake_redis import FakeAsyncRedis
+
+
+def lookups(source: str) -> float:
+    return lookups_total.labels(source=source).value
+
+
+@pytest.fixture()
+def redis_client() -> FakeAsyncRedis:
+    return FakeAsyncRedis()
+
+
+async def test_principal_json_round_trip(db: Session, test_user: User) -> None:
+    """Test a principal survives serialization for the Redis tier."""
+    principal = Principal.from_user(test_user)
+
+    assert Principal.from_json(principal.to_json()) == principal
+    assert principal.profile.dominant_hand == "right"
+
+
+async def test_lookups_are_served_from_cache_tiers(
+    async_session_factory: async_sessionmaker, redis_client: FakeAsyncRedis, test_user: User
+) -> None:
+    """Test only the first lookup loads the user from the database."""
+    cache = PrincipalCache(redis_client)
+    database, local = lookups("database"), lookups("local")
+
+    async with async_session_factory() as db:
+        first = await cache.get(db, test_user.id)
+        second = await cache.get(db, test_user.id)
+
+    assert first.email == test_user.email
+    assert second is first
+    assert lookups("database") == database + 1
+    assert lookups("local") == local + 1
+    assert f"principal:{test_user.id}" in redis_client.strings
+
+
+async def test_other_nodes_read_shared_tier(
+    async_session_factory: async_sessionmaker, redis_client: FakeAsyncRedis, test_user: User
+) -> None:
+    """Test a principal cached by one node is read from Redis by another."""
+    async with async_session_factory() as db:
+        cached = await PrincipalCache(redis_client).get(db, test_user.id)
+        redis_hits = lookups("redis")
+        principal = await PrincipalCache(redis_client).get(db, test_user.id)
+
+    assert principal == cached
+    assert lookups("redis") == redis_hits + 1
+
+
+async def test_invalidate_reloads_changed_user(
+    async_session_factory: async_sessionmaker,
+    redis_client: FakeAsyncRedis,
+    db: Session,
+    test_user: User,
+) -> None:
+    """Test an invalidated principal is reloaded with the changes."""
+    cache = PrincipalCache(redis_client)
+    async with async_session_factory() as session:
+        await cache.get(session, test_user.id)
+
+    test_user.handicap = 9.5
+    db.commit()
+    await cache.invalidate(test_user.id)
+
+    async with async_session_factory() as session:
+        principal = await cache.get(session, test_user.id)
+    assert principal.handicap == 9.5
+    assert redis_client.strings[f"principal:{test_user.id}"] == TOMBSTONE
+
+    # The tombstone expired
+    del redis_client.strings[f"principal:{test_user.id}"]
+    async with async_session_factory() as session:
+        await PrincipalCache(redis_client).get(session, test_user.id)
+    assert '"handicap": 9.5' in redis_client.strings[f"principal:{test_user.id}"]
+
+
+async def test_load_predating_invalidation_is_not_cached(
+    async_session_factory: async_sessionmaker,
+    redis_client: FakeAsyncRedis,
+    db: Session,
+    test_user: User,
+) -> None:
+    """Test a load that read the user before a change does not cache it afterwards."""
+    cache = PrincipalCache(redis_client)
+    stale = Principal.from_user(test_user)
+
+    test_user.handicap = 9.5
+    db.commit()
+    await cache.invalidate(test_user.id)
+    # The load that read the previous row finishes after the invalidation
+    assert not await cache._set_shared(stale)
+
+    async with async_session_factory() as session:
+        principal = await cache.get(session, test_user.id)
+    assert principal.handicap == 9.5
+    assert redis_client.strings[f"principal:{test_user.id}"] == TOMBSTONE
+
+
+async def test_missing_user_is_not_cached(
+    async_session_factory: async_sessionmaker, redis_client: FakeAsyncRedis, db: Session
+) -> None:
+    """Test lookups of unknown users return None and cache nothing."""
+    cache = PrincipalCache(redis_client)
+
+    async with async_session_factory() as db:
+        assert await cache.get(db, 999) is None
+    assert redis_client.strings == {}
+
+
+async def test_local_tier_evicts_least_recently_used(
+    async_session_factory: async_sessionmaker, test_user: User
+) -> None:
+    """Test the in-process tier is bounded and expires entries."""
+    cache = PrincipalCache(None, local_max_entries=1)
+    async with async_session_factory() as db:
+        await cache.get(db, test_user.id)
+    other = Principal(**{**vars(cache._local[test_user.id][1]), "id": test_user.id + 1})
+
+    cache._set_local(other)
+
+    assert list(cache._local) == [other.id]
+
+    expiring = PrincipalCache(None, local_ttl_seconds=0.0)
+    async with async_session_factory() as db:
+        first = await expiring.get(db, test_user.id)
+        assert await expiring.get(db, test_user.id) is not first
@@ -0,0 +1,60 @@
+"""
+Tests for token-budgeted prompt building.
+"""
+
+from app.services.error_detector import ErrorDetection, SwingPhase
+from app.services.prompt_builder import PromptBuilder, estimate_tokens
+
+
+BIOMECHANICS = {
+    "address": {"spine_angle": 34.2, "knee_flex": 25.0, "head_sway_cm": 0.0},
+    "top_of_backswing": {"shoulder_turn": 72.4, "hip_rotation": 45.0, "x_factor": 27.4},
+    "impact": {"spine_angle_loss": 14.0, "head_sway_cm": 6.0, "lead_arm_angle": 175.0},
+}
+BASELINES = {"top_of_backswing.shoulder_turn": 88.0, "address.spine_angle": 34.0}
+
+
+def test_prompt_contains_faults_snapshots_and_deltas() -> None:
+    """Test the prompt summarizes faults, key positions and baseline deltas."""
+    prompt = PromptBuilder(token_budget=1000).build(
+        BIOMECHANICS, ["restricted_shoulder_turn"], {"club": "7 iron"}, BASELINES
+    )
+
+    assert "- restricted_shoulder_turn" in prompt.text
+    assert "- top_of_backswing: shoulder_turn 72" in prompt.text
+    assert "top_of_backswing shoulder_turn -16" in prompt.text
+    # Within a quantization step of the baseline, so not worth mentioning
+    assert "address spine_angle +0" not in prompt.text
+    assert "Club: 7 iron" in prompt.text
+    assert not prompt.dropped
+
+
+def test_budget_keeps_most_important_items() -> None:
+    """Test a tight budget drops low-value items before faults and their metrics."""
+    full = PromptBuilder(token_budget=1000).build(
+        BIOMECHANICS, ["restricted_shoulder_turn"], {}, BASELINES
+    )
+    tight = PromptBuilder(token_budget=full.estimated_tokens - 20).build(
+        BIOMECHANICS, ["restricted_shoulder_turn"], {}, BASELINES
+    )
+
+    assert tight.estimated_tokens <= full.estimated_tokens - 20
+    assert tight.dropped
+    assert "restricted_shoulder_turn" in tight.text
+    assert "shoulder_turn 72" in tight.text
+    assert all(item.priority <= 40 for item in tight.dropped)
+    assert estimate_tokens(tight.text) == tight.estimated_tokens
+
+
+def test_faults_ranked_by_severity_and_capped() -> None:
+    """Test detections are deduplicated, ranked and capped."""
+    detections = [
+        ErrorDetection("low_x_factor", "minor", 0.7, SwingPhase.BACKSWING, {}),
+        ErrorDetection("early_extension", "critical", 0.9, SwingPhase.IMPACT, {}),
+        ErrorDetection("low_x_factor", "minor", 0.6, SwingPhase.BACKSWING, {}),
+        ErrorDetection("restricted_shoulder_turn", "major", 0.85, SwingPhase.BACKSWING, {}),
+    ]
+    prompt = PromptBuilder(token_budget=1000, max_faults=2).build(BIOMECHANICS, detections)
+
+    faults = [item.text for item in prompt.included if item.section == "faults"]
+    assert faults == ["- early_extension (critical)", "- restricted_shoulder_turn (major)"]
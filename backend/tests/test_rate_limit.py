@@ -0,0 +1,212 @@
+"""
+Tests for tiered, distributed API rate limiting.
+"""
+
+import math
+from dataclasses import replace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import NoScriptError
+
+from app.core.rate_limit import (
+    GCRA_SCRIPT,
+    GCRA_SCRIPT_SHA,
+    RateLimiter,
+    RateLimitMiddleware,
+    gcra,
+)
+from app.services.principal_cache import principal_cache
+
+
+LIMITS = {"default": 10, "free": 5, "pro": 20, "elite": 60}
+
+
+class FakeScriptRedis:
+    """Runs the GCRA script's logic on a Redis clock that stands still."""
+
+    def __init__(self) -> None:
+        self.now_ms = 1_000_000.0
+        self.tats: dict[str, float] = {}
+        self.loaded = False
+        self.calls = 0
+
+    async def evalsha(self, sha: str, numkeys: int, *args) -> list:
+        assert sha == GCRA_SCRIPT_SHA
+        if not self.loaded:
+            raise NoScriptError("NOSCRIPT No matching script")
+        return self._run(*args)
+
+    async def eval(self, script: str, numkeys: int, *args) -> list:
+        assert script == GCRA_SCRIPT
+        self.loaded = True
+        return self._run(*args)
+
+    def _run(self, key: str, interval: float, burst: int, cost: int) -> list:
+        self.calls += 1
+        allowed, tat, retry_after = gcra(
+            self.tats.get(key, self.now_ms), self.now_ms, interval, burst, cost
+        )
+        if allowed:
+            self.tats[key] = tat
+        return [int(allowed), math.ceil(tat - self.now_ms), math.ceil(retry_after)]
+
+
+class FailingRedis:
+    async def evalsha(self, *args) -> list:
+        raise RedisConnectionError("Connection refused")
+
+
+def _app(limiter: RateLimiter) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=limiter, expensive_cost=3)
+
+    @app.get("/api/v1/items")
+    async def items() -> dict:
+        return {"ok": True}
+
+    @app.post("/api/v1/swings/upload")
+    async def upload() -> dict:
+        return {"ok": True}
+
+    @app.get("/api/v1/health")
+    async def health() -> dict:
+        return {"ok": True}
+
+    return app
+
+
+def test_gcra_allows_burst_then_paces() -> None:
+    """Test GCRA allows a full burst, then one request per interval."""
+    tat = 0.0
+    for _ in range(5):
+        allowed, tat, _ = gcra(tat, 0.0, 100.0, 5, 1)
+        assert allowed
+
+    allowed, _, retry_after = gcra(tat, 0.0, 100.0, 5, 1)
+    assert not allowed
+    assert retry_after == pytest.approx(100.0)
+    assert gcra(tat, 100.0, 100.0, 5, 1)[0]
+
+
+async def test_rejections_are_answered_locally() -> None:
+    """Test requests past the limit are rejected without Redis round trips."""
+    redis_client = FakeScriptRedis()
+    limiter = RateLimiter(redis_client, limits=LIMITS)
+
+    decisions = [await limiter.check("user:1", "free") for _ in range(8)]
+
+    assert [decision.allowed for decision in decisions] == [True] * 5 + [False] * 3
+    assert [decision.remaining for decision in decisions[:5]] == [4, 3, 2, 1, 0]
+    assert redis_client.calls == 5
+    assert decisions[-1].retry_after > 0
+
+
+async def test_allowance_is_shared_between_nodes() -> None:
+    """Test a client's requests on one node count against it on every node."""
+    redis_client = FakeScriptRedis()
+    node_a = RateLimiter(redis_client, limits=LIMITS)
+    node_b = RateLimiter(redis_client, limits=LIMITS)
+
+    for _ in range(3):
+        assert (await node_a.check("ip:203.0.113.7", None, cost=3)).allowed
+
+    decision = await node_b.check("ip:203.0.113.7", None, cost=3)
+
+    assert not decision.allowed
+    assert decision.limit == 10
+    assert decision.remaining == 1
+    assert redis_client.calls == 4
+
+
+async def test_script_is_loaded_once() -> None:
+    """Test the script is sent in full only when Redis does not have it."""
+    redis_client = FakeScriptRedis()
+    limiter = RateLimiter(redis_client, limits=LIMITS)
+
+    await limiter.check("user:1", "pro")
+    assert redis_client.loaded
+
+    redis_client.loaded = True
+    await limiter.check("user:1", "pro")
+    assert redis_client.calls == 2
+
+
+async def test_redis_failure_falls_back_to_local_buckets() -> None:
+    """Test limits are still enforced per node while Redis is unavailable."""
+    limiter = RateLimiter(FailingRedis(), limits=LIMITS)
+
+    decisions = [await limiter.check("user:1", "free") for _ in range(6)]
+
+    assert [decision.allowed for decision in decisions] == [True] * 5 + [False]
+
+
+async def test_tiers_have_their_own_limits() -> None:
+    """Test each tier gets its limit and unknown tiers the default."""
+    limiter = RateLimiter(None, limits=LIMITS)
+
+    assert (await limiter.check("user:1", "elite")).limit == 60
+    assert (await limiter.check("user:2", "free")).limit == 5
+    assert (await limiter.check("user:3", "enterprise")).limit == 10
+    assert (await limiter.check("ip:203.0.113.7", None)).limit == 10
+
+
+def test_responses_carry_rate_limit_headers() -> None:
+    """Test API responses carry RateLimit-* headers."""
+    with TestClient(_app(RateLimiter(None, limits=LIMITS))) as client:
+        response = client.get("/api/v1/items")
+
+    assert response.status_code == 200
+    assert response.headers["RateLimit-Limit"] == "10"
+    assert response.headers["RateLimit-Remaining"] == "9"
+    assert response.headers["RateLimit-Reset"] == "6"
+    assert response.headers["RateLimit-Policy"] == "10;w=60"
+
+
+def test_exceeding_the_limit_returns_429() -> None:
+    """Test requests past the limit get 429 with Retry-After."""
+    with TestClient(_app(RateLimiter(None, limits=LIMITS))) as client:
+        for _ in range(10):
+            assert client.get("/api/v1/items").status_code == 200
+        response = client.get("/api/v1/items")
+
+    assert response.status_code == 429
+    assert response.json()["error"] == "rate_limited"
+    assert response.headers["Retry-After"] == "6"
+    assert response.headers["RateLimit-Remaining"] == "0"
+
+
+def test_expensive_endpoints_cost_more() -> None:
+    """Test uploads are charged the expensive-endpoint cost."""
+    with TestClient(_app(RateLimiter(None, limits=LIMITS))) as client:
+        response = client.post("/api/v1/swings/upload")
+
+    assert response.headers["RateLimit-Remaining"] == "7"
+
+
+def test_health_checks_are_not_limited() -> None:
+    """Test health checks are exempt from rate limiting."""
+    with TestClient(_app(RateLimiter(None, limits={"default": 1}))) as client:
+        responses = [client.get("/api/v1/health") for _ in range(3)]
+
+    assert all(response.status_code == 200 for response in responses)
+    assert "RateLimit-Limit" not in responses[0].headers
+
+
+def test_limit_follows_the_users_tier(client: TestClient, auth_headers: dict, test_user) -> None:
+    """Test authenticated users are limited at their subscription tier."""
+    # The first request caches the principal; until then the default applies
+    first = client.get("/api/v1/users/me", headers=auth_headers)
+    second = client.get("/api/v1/users/me", headers=auth_headers)
+
+    assert first.headers["RateLimit-Limit"] == "100"
+    assert second.headers["RateLimit-Limit"] == "60"
+
+    principal_cache._set_local(
+        replace(principal_cache.peek(test_user.id), subscription_tier="elite")
+    )
+    third = client.get("/api/v1/users/me", headers=auth_headers)
+
+    assert third.headers["RateLimit-Limit"] == "300"
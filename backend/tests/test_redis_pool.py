@@ -0,0 +1,91 @@
+"""
+Tests for the shared Redis connection pool.
+"""
+
+import logging
+
+import pytest
+import redis.asyncio as aioredis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core import redis_pool
+from app.core.config import settings
+from app.core.dependencies import get_redis
+from app.core.redis_pool import (
+    blocking_redis_client,
+    create_redis_pool,
+    redis_client,
+    run_pipeline,
+)
+from app.core.response_cache import response_cache
+from app.services.analysis_stream import analysis_streams
+from app.services.principal_cache import principal_cache
+from app.services.session_context import session_contexts
+from app.services.stats_service import user_stats
+from app.services.token_revocation import token_revocations
+from tests.fake_redis import FakeAsyncRedis
+
+
+async def test_redis_users_share_one_pool() -> None:
+    """Test the dependency and service singletons use the same pooled client."""
+    assert await get_redis() is redis_client
+    assert principal_cache._redis is redis_client
+    assert user_stats._redis is redis_client
+
+
+def test_pool_uses_configured_limits() -> None:
+    """Test the pool is bounded and health-checks idle connections."""
+    pool = create_redis_pool("redis://localhost:6379/0")
+
+    assert isinstance(pool, aioredis.BlockingConnectionPool)
+    assert pool.max_connections == settings.REDIS_POOL_MAX_CONNECTIONS
+    assert pool.timeout == settings.REDIS_POOL_TIMEOUT_SECONDS
+    assert pool.connection_kwargs["health_check_interval"] == (
+        settings.REDIS_HEALTH_CHECK_INTERVAL_SECONDS
+    )
+    assert pool.connection_kwargs["socket_timeout"] > 15
+
+
+def test_timeouts_are_not_retried() -> None:
+    """Test only connection errors are retried, since a timed-out command may have run."""
+    pool = create_redis_pool("redis://localhost:6379/0")
+    connection = pool.connection_class(**pool.connection_kwargs)
+
+    assert connection.retry_on_error == [RedisConnectionError]
+    assert connection.retry._supported_errors == (RedisConnectionError,)
+
+
+def test_blocking_readers_use_their_own_pool() -> None:
+    """Test stream and pub/sub readers cannot exhaust the shared pool."""
+    assert blocking_redis_client.connection_pool is not redis_client.connection_pool
+    assert blocking_redis_client.connection_pool.max_connections == (
+        settings.REDIS_BLOCKING_POOL_MAX_CONNECTIONS
+    )
+    assert analysis_streams._blocking_redis is blocking_redis_client
+    assert principal_cache._blocking_redis is blocking_redis_client
+    assert token_revocations._blocking_redis is blocking_redis_client
+    assert session_contexts._blocking_redis is blocking_redis_client
+    assert response_cache._blocking_redis is blocking_redis_client
+
+
+async def test_run_pipeline_returns_results_in_order() -> None:
+    """Test pipelined commands run in order and return their results."""
+    fake = FakeAsyncRedis()
+
+    results = await run_pipeline([("set", "a", "1"), ("get", "a"), ("get", "missing")], client=fake)
+
+    assert results == [True, "1", None]
+
+
+async def test_unreachable_redis_does_not_fail_startup(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Test startup continues, with a warning, when Redis is down."""
+    unreachable = aioredis.Redis.from_url("redis://127.0.0.1:1/0", socket_connect_timeout=0.1)
+    monkeypatch.setattr(redis_pool, "redis_client", unreachable)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.redis_pool"):
+        await redis_pool.open_redis()
+
+    assert "Redis unavailable on startup" in caplog.text
+    await unreachable.aclose()
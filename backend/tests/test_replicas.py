@@ -0,0 +1,131 @@
+"""
+Tests for read-replica routing.
+"""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.replicas import ReplicaRouter, ReplicationStopped, replication_lag
+from tests.fake_redis import FakeAsyncRedis
+
+
+class FakeLag:
+    """Scripted replication lag per replica session factory."""
+
+    def __init__(self) -> None:
+        self.lags: dict[str, float | Exception] = {}
+
+    async def __call__(self, db: AsyncSession) -> float:
+        lag = self.lags[db.info["replica"]]
+        if isinstance(lag, Exception):
+            raise lag
+        return lag
+
+
+def replica(name: str) -> tuple[str, async_sessionmaker]:
+    return name, async_sessionmaker(info={"replica": name})
+
+
+@pytest.fixture()
+def lag() -> FakeLag:
+    return FakeLag()
+
+
+@pytest.fixture()
+def router(lag: FakeLag) -> ReplicaRouter:
+    return ReplicaRouter(
+        [replica("replica-a"), replica("replica-b")],
+        FakeAsyncRedis(),
+        max_lag_seconds=5.0,
+        check_interval_seconds=1.0,
+        probe=lag,
+    )
+
+
+async def test_reads_use_primary_without_replicas() -> None:
+    """Test reads go to the primary when no replicas are configured."""
+    router = ReplicaRouter([], FakeAsyncRedis())
+
+    assert not router.enabled
+    assert await router.reader(1) is None
+
+
+async def test_reads_round_robin_healthy_replicas(router: ReplicaRouter, lag: FakeLag) -> None:
+    """Test reads are spread over replicas within the allowed lag."""
+    lag.lags = {"replica-a": 0.0, "replica-b": 0.5}
+    await router.check()
+
+    chosen = {(await router.reader()).kw["info"]["replica"] for _ in range(4)}
+
+    assert chosen == {"replica-a", "replica-b"}
+
+
+async def test_lagging_or_unreachable_replicas_are_skipped(
+    router: ReplicaRouter, lag: FakeLag
+) -> None:
+    """Test replicas behind the lag limit or failing the check are not read from."""
+    lag.lags = {"replica-a": 30.0, "replica-b": ConnectionError("refused")}
+    await router.check()
+
+    assert router.status() == {"replica-a": 30.0, "replica-b": None}
+    assert await router.reader() is None
+
+
+async def test_stale_lag_measurement_is_not_trusted(router: ReplicaRouter, lag: FakeLag) -> None:
+    """Test replicas are not read from when the monitor stopped measuring them."""
+    lag.lags = {"replica-a": 0.0, "replica-b": 0.0}
+    await router.check()
+    for measured in router._replicas:
+        measured.checked_at -= 10
+
+    assert await router.reader() is None
+
+
+async def test_users_read_their_own_writes(router: ReplicaRouter, lag: FakeLag) -> None:
+    """Test a user's reads stay on the primary until a replica has replayed their write."""
+    lag.lags = {"replica-a": 2.0, "replica-b": 2.0}
+    await router.check()
+    await router.mark_write(1)
+
+    assert await router.reader(1) is None
+    assert await router.reader(2) is not None
+
+    lag.lags = {"replica-a": 2.0, "replica-b": 0.0}
+    time.sleep(0.01)
+    await router.check()
+
+    assert (await router.reader(1)).kw["info"]["replica"] == "replica-b"
+
+
+class FakeLagResult:
+    def __init__(self, value: float | None) -> None:
+        self.value = value
+
+    def scalar_one(self) -> float | None:
+        return self.value
+
+
+class FakeReplicaSession:
+    def __init__(self, lag: float | None) -> None:
+        self.lag = lag
+
+    async def execute(self, statement: object) -> FakeLagResult:
+        return FakeLagResult(self.lag)
+
+
+async def test_replica_without_wal_receiver_is_unhealthy(
+    router: ReplicaRouter, lag: FakeLag
+) -> None:
+    """Test a replica that stopped streaming is not read from, however recent its replay."""
+    assert await replication_lag(FakeReplicaSession(0)) == 0.0
+    with pytest.raises(ReplicationStopped):
+        await replication_lag(FakeReplicaSession(None))
+
+    lag.lags = {"replica-a": ReplicationStopped("WAL receiver is not streaming"), "replica-b": 0.0}
+    await router.check()
+
+    assert router.status() == {"replica-a": None, "replica-b": 0.0}
@@ -0,0 +1,198 @@
+"""
+Tests for the response cache of read endpoints.
+"""
+
+from __future__ import annotations
+
+from fastapi.testclient import TestClient
+
+from app.core.response_cache import (
+    INVALIDATE_SCRIPT,
+    INVALIDATIONS_CHANNEL,
+    SET_SCRIPT,
+    TAG_KEY_PREFIX,
+    CachedResponse,
+    ResponseCache,
+    etag_matches,
+    etag_of,
+)
+from app.models.user import User
+from app.services.stats_service import user_stats
+from tests.fake_redis import FakeAsyncRedis
+
+
+class ScriptedRedis(FakeAsyncRedis):
+    """Runs the logic of the response cache's scripts."""
+
+    async def eval(self, script: str, numkeys: int, *args) -> int:
+        keys, argv = args[:numkeys], args[numkeys:]
+        if script == SET_SCRIPT:
+            tags = (numkeys - 1) // 2
+            generation_keys, tag_keys = keys[1 : 1 + tags], keys[1 + tags :]
+            for generation_key, generation in zip(generation_keys, argv[3:], strict=True):
+                if self.strings.get(generation_key, "0") != generation:
+                    return 0
+            await self.setex(keys[0], argv[0], argv[1])
+            for tag_key in tag_keys:
+                await self.sadd(tag_key, keys[0])
+                await self.expire(tag_key, argv[2])
+            return 1
+
+        assert script == INVALIDATE_SCRIPT
+        tags = numkeys // 2
+        for generation_key, tag_key in zip(keys[:tags], keys[tags:], strict=True):
+            await self.incr(generation_key)
+            await self.expire(generation_key, argv[0])
+            await self.delete(*await self.smembers(tag_key), tag_key)
+        return 1
+
+
+def _cached(body: bytes, *tags: str) -> CachedResponse:
+    return CachedResponse(body, "application/json", etag_of(body), tags)
+
+
+async def _set(cache: ResponseCache, key: str, cached: CachedResponse) -> None:
+    await cache.set(key, cached, 300, await cache.generations(cached.tags))
+
+
+def test_etag_comparison() -> None:
+    """Test If-None-Match matches listed, weak and wildcard entity tags."""
+    etag = etag_of(b'{"id": 1}')
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_responses_carry_etags_and_revalidate(
+    client: TestClient, test_user: User, auth_headers: dict, max_queries
+) -> None:
+    """Test a matching If-None-Match gets an empty 304 without touching the database."""
+    first = client.get("/api/v1/users/me", headers=auth_headers)
+    etag = first.headers["ETag"]
+
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    with max_queries(0):
+        cached = client.get("/api/v1/users/me", headers=auth_headers)
+        revalidated = client.get(
+            "/api/v1/users/me", headers={**auth_headers, "If-None-Match": etag}
+        )
+
+    assert cached.content == first.content
+    assert cached.headers["ETag"] == etag
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["ETag"] == etag
+
+
+def test_profile_update_invalidates_cached_profile(
+    client: TestClient, test_user: User, auth_headers: dict
+) -> None:
+    """Test a profile update changes the cached profile and its ETag."""
+    etag = client.get("/api/v1/users/me", headers=auth_headers).headers["ETag"]
+
+    client.patch("/api/v1/users/me", json={"handicap": 4.2}, headers=auth_headers)
+    response = client.get("/api/v1/users/me", headers={**auth_headers, "If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["handicap"] == 4.2
+    assert response.headers["ETag"] != etag
+
+
+def test_new_statistics_invalidate_cached_statistics(
+    client: TestClient, test_user: User, auth_headers: dict
+) -> None:
+    """Test recording an analysis invalidates the user's cached statistics."""
+    url = f"/api/v1/users/{test_user.id}/stats?period=all"
+    etag = client.get(url, headers=auth_headers).headers["ETag"]
+
+    client.portal.call(
+        user_stats.record_analysis,
+        test_user.id,
+        {"overall_assessment": {"score": 8}},
+        {"impact": {"hip_rotation": 40.0}},
+    )
+    response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["swings_analyzed"] == 1
+
+
+def test_invalid_tokens_are_not_served_cached_responses(
+    client: TestClient, test_user: User, auth_headers: dict
+) -> None:
+    """Test requests without a valid token reach the endpoint, which rejects them."""
+    client.get("/api/v1/users/me", headers=auth_headers)
+
+    response = client.get("/api/v1/users/me", headers={"Authorization": "Bearer invalid"})
+
+    assert response.status_code == 401
+    assert "ETag" not in response.headers
+
+
+async def test_redis_tier_is_shared_between_nodes() -> None:
+    """Test a response cached on one node is served from Redis on another."""
+    redis_client = ScriptedRedis()
+    node_a, node_b = ResponseCache(redis_client), ResponseCache(redis_client)
+    cached = _cached(b'{"id": 1}', "user:1", "user:1:profile")
+
+    await _set(node_a, "cache:response:1:/api/v1/users/me?", cached)
+    served, source = await node_b.get("cache:response:1:/api/v1/users/me?")
+    again, again_source = await node_b.get("cache:response:1:/api/v1/users/me?")
+
+    assert (served, source) == (cached, "redis")
+    assert (again, again_source) == (cached, "local")
+    assert redis_client.sets[f"{TAG_KEY_PREFIX}user:1:profile"] == {
+        "cache:response:1:/api/v1/users/me?"
+    }
+
+
+async def test_invalidation_drops_tagged_responses_everywhere() -> None:
+    """Test invalidating a tag deletes its responses in Redis and notifies other nodes."""
+    redis_client = ScriptedRedis()
+    cache = ResponseCache(redis_client)
+    subscriber = redis_client.pubsub()
+    await subscriber.subscribe(INVALIDATIONS_CHANNEL)
+    await _set(cache, "profile", _cached(b"{}", "user:1", "user:1:profile"))
+    await _set(cache, "stats", _cached(b"[]", "user:1", "user:1:stats"))
+
+    await cache.invalidate("user:1:profile")
+
+    assert await cache.get("profile") == (None, "miss")
+    assert (await cache.get("stats"))[1] == "local"
+    assert "stats" in redis_client.strings
+    assert (await subscriber.messages.get())["data"] == "user:1:profile"
+    assert f"{TAG_KEY_PREFIX}user:1:profile" not in redis_client.sets
+
+
+async def test_response_computed_before_invalidation_is_not_cached() -> None:
+    """Test a response whose tag was invalidated while it was computed is dropped."""
+    redis_client = ScriptedRedis()
+    cache = ResponseCache(redis_client)
+    cached = _cached(b'{"handicap": 12.0}', "user:1", "user:1:profile")
+
+    generations = await cache.generations(cached.tags)
+    await cache.invalidate("user:1:profile")
+    await cache.set("profile", cached, 300, generations)
+
+    assert await cache.get("profile") == (None, "miss")
+    assert "profile" not in redis_client.strings
+
+    await _set(cache, "profile", cached)
+    assert (await cache.get("profile"))[1] == "local"
+
+
+async def test_local_tier_is_bounded() -> None:
+    """Test the in-process tier evicts its least recently used responses."""
+    cache = ResponseCache(None, local_max_entries=2)
+    for key in ("a", "b", "c"):
+        await cache.set(key, _cached(key.encode(), "user:1"), 300, None)
+
+    assert await cache.get("a") == (None, "miss")
+    assert (await cache.get("c"))[1] == "local"
+    cache.evict("user:1")
+    assert await cache.get("c") == (None, "miss")
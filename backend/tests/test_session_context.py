@@ -0,0 +1,76 @@
+"""
+Tests for session-scoped real-time user context.
+"""
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.services.error_detector import SwingPhase, metrics_vector
+from app.services.session_context import SessionContextStore
+
+
+@pytest.fixture()
+def store(db: Session, async_session_factory: async_sessionmaker) -> SessionContextStore:
+    return SessionContextStore(redis_client=None, session_factory=async_session_factory)
+
+
+async def test_open_pins_context(store: SessionContextStore, test_user: User) -> None:
+    """Test the context is loaded once and served from memory."""
+    context = await store.open("session-1", test_user.id)
+
+    assert context.user_id == test_user.id
+    assert context.dominant_hand == "right"
+    assert context.handicap == 15.0
+    assert store.get(test_user.id) is context
+    assert await store.open("session-2", test_user.id) is context
+
+
+async def test_context_rules_are_personalized(
+    store: SessionContextStore, db: Session, test_user: User
+) -> None:
+    """Test compiled rules use the profile's physical limitations."""
+    test_user.profile.physical_limitations = ["limited_shoulder_mobility"]
+    db.commit()
+
+    context = await store.open("session-1", test_user.id)
+    faults = context.rules.check(SwingPhase.BACKSWING, metrics_vector({"shoulder_turn": 70.0}))
+
+    assert "restricted_shoulder_turn" not in [fault.error for fault in faults]
+
+
+async def test_refresh_replaces_snapshot(
+    store: SessionContextStore, db: Session, test_user: User
+) -> None:
+    """Test a profile change refreshes the pinned context."""
+    before = await store.open("session-1", test_user.id)
+    test_user.profile.dominant_hand = "left"
+    db.commit()
+
+    await store.refresh(test_user.id)
+
+    after = store.get(test_user.id)
+    assert after is not before
+    assert after.dominant_hand == "left"
+
+
+async def test_close_unpins_after_last_session(store: SessionContextStore, test_user: User) -> None:
+    """Test the context is dropped with the user's last session."""
+    await store.open("session-1", test_user.id)
+    await store.open("session-2", test_user.id)
+
+    store.close("session-1", test_user.id)
+    assert store.get(test_user.id) is not None
+
+    store.close("session-2", test_user.id)
+    assert store.get(test_user.id) is None
+
+    await store.refresh(test_user.id)
+    assert store.get(test_user.id) is None
+
+
+async def test_open_unknown_user(store: SessionContextStore, db: Session) -> None:
+    """Test opening a session for a missing user raises."""
+    with pytest.raises(LookupError):
+        await store.open("session-1", 999)
@@ -0,0 +1,69 @@
+"""
+Tests for real-time session routing.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from app.services.session_router import HashRing, SessionRouter
+from tests.fake_redis import FakeAsyncRedis
+
+
+@pytest.fixture()
+async def router() -> SessionRouter:
+    router = SessionRouter(FakeAsyncRedis(), vnodes=32)
+    for index in range(3):
+        await router.register_worker(f"worker-{index}", f"/run/golfcoach/worker-{index}.sock")
+    return router
+
+
+def test_hash_ring_moves_only_removed_node_keys() -> None:
+    """Test removing a node only remaps the keys it owned."""
+    ring = HashRing([f"worker-{index}" for index in range(4)], vnodes=64)
+    keys = [f"session-{index}" for index in range(1000)]
+    before = {key: ring.get(key) for key in keys}
+
+    ring.remove("worker-2")
+
+    for key in keys:
+        if before[key] != "worker-2":
+            assert ring.get(key) == before[key]
+        else:
+            assert ring.get(key) != "worker-2"
+
+
+def test_hash_ring_empty() -> None:
+    """Test an empty ring has no owner."""
+    assert HashRing().get("session-1") is None
+
+
+async def test_assign_is_sticky(router: SessionRouter) -> None:
+    """Test a session keeps its worker when new workers join."""
+    first = await router.assign("session-1")
+    for index in range(3, 10):
+        await router.register_worker(f"worker-{index}", f"/run/golfcoach/worker-{index}.sock")
+
+    again = await router.assign("session-1")
+    assert again == first
+    assert again.address.endswith(f"{first.worker_id}.sock")
+
+
+async def test_drain_hands_off_sessions(router: SessionRouter) -> None:
+    """Test draining a worker reassigns its sessions to live workers."""
+    assignments = [await router.assign(f"session-{index}") for index in range(30)]
+    draining = assignments[0].worker_id
+    owned = {a.session_id for a in assignments if a.worker_id == draining}
+
+    handoffs = await router.drain(draining)
+
+    assert {handoff.session_id for handoff in handoffs} == owned
+    for handoff in handoffs:
+        assert handoff.to_worker not in (None, draining)
+        assert (await router.assign(handoff.session_id)).worker_id == handoff.to_worker
+
+
+async def test_assign_without_workers_fails() -> None:
+    """Test assigning a session with no workers raises."""
+    with pytest.raises(RuntimeError):
+        await SessionRouter(FakeAsyncRedis()).assign("session-1")
@@ -0,0 +1,132 @@
+"""
+Tests for request coalescing (single-flight).
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+import redis.asyncio as aioredis
+
+from app.utils.singleflight import SingleFlight, calls_total
+from tests.fake_redis import FakeAsyncRedis
+
+
+class UnavailableRedis:
+    def lock(self, name: str, **kwargs) -> "UnavailableRedis":
+        return self
+
+    async def acquire(self) -> bool:
+        raise aioredis.ConnectionError("Connection refused")
+
+
+class Work:
+    """Counts runs of a slow computation."""
+
+    def __init__(self, result: object = "result") -> None:
+        self.runs = 0
+        self.result = result
+
+    async def __call__(self) -> object:
+        self.runs += 1
+        await asyncio.sleep(0.01)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+async def test_concurrent_identical_calls_run_once() -> None:
+    """Test concurrent calls with one key share a single run and its result."""
+    flight = SingleFlight("test_once")
+    work = Work()
+    coalesced = calls_total.labels(group="test_once", role="coalesced")
+
+    results = await asyncio.gather(*(flight.do("swing:1", work) for _ in range(10)))
+
+    assert results == ["result"] * 10
+    assert work.runs == 1
+    assert coalesced.value == 9
+    assert flight.in_flight == 0
+
+
+async def test_distinct_keys_run_separately() -> None:
+    """Test calls with different keys are not merged."""
+    flight = SingleFlight("test_keys")
+    work = Work()
+
+    await asyncio.gather(flight.do("swing:1", work), flight.do("swing:2", work))
+
+    assert work.runs == 2
+
+
+async def test_sequential_calls_run_again() -> None:
+    """Test a call after the flight landed runs again instead of reusing the result."""
+    flight = SingleFlight("test_sequential")
+    work = Work()
+
+    await flight.do("swing:1", work)
+    await flight.do("swing:1", work)
+
+    assert work.runs == 2
+
+
+async def test_errors_reach_every_caller() -> None:
+    """Test an exception of the shared run is raised to every caller."""
+    flight = SingleFlight("test_errors")
+    work = Work(ValueError("boom"))
+
+    results = await asyncio.gather(
+        *(flight.do("swing:1", work) for _ in range(3)), return_exceptions=True
+    )
+
+    assert work.runs == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+async def test_cancelled_leader_does_not_cancel_followers() -> None:
+    """Test the shared run completes for the others when its first caller is cancelled."""
+    flight = SingleFlight("test_cancel")
+    work = Work()
+    leader = asyncio.create_task(flight.do("swing:1", work))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do("swing:1", work))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+
+    assert await follower == "result"
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert work.runs == 1
+
+
+async def test_redis_lock_merges_calls_across_nodes() -> None:
+    """Test a node waiting for another's lock finds the result in the shared cache."""
+    redis_client = FakeAsyncRedis()
+    shared_cache: dict[str, str] = {}
+    work = Work()
+
+    async def cached_work() -> object:
+        if "swing:1" not in shared_cache:
+            shared_cache["swing:1"] = await work()
+        return shared_cache["swing:1"]
+
+    node_a, node_b = SingleFlight("test_nodes"), SingleFlight("test_nodes")
+    results = await asyncio.gather(
+        node_a.do("swing:1", cached_work, redis_client),
+        node_b.do("swing:1", cached_work, redis_client),
+    )
+
+    assert results == ["result", "result"]
+    assert work.runs == 1
+    assert redis_client.locks == set()
+
+
+async def test_unavailable_lock_still_runs() -> None:
+    """Test the call runs without the cross-node lock when Redis is unavailable."""
+    flight = SingleFlight("test_no_lock")
+    work = Work()
+
+    assert await flight.do("swing:1", work, UnavailableRedis()) == "result"
+    assert work.runs == 1
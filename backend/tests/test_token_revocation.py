@@ -0,0 +1,117 @@
+"""
+Tests for refresh token revocation.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from app.core.security import create_refresh_token, decode_token
+from app.services.token_revocation import (
+    LEGACY_KEY_PREFIX,
+    REVOKED_KEY_PREFIX,
+    TokenRevocationStore,
+    token_id,
+)
+from tests.fake_redis import FakeAsyncRedis
+
+
+def _refresh_token() -> tuple[str, dict]:
+    token = create_refresh_token({"sub": "1"})
+    return token, decode_token(token)
+
+
+async def _wait_until(condition) -> None:
+    for _ in range(100):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+@pytest.fixture()
+def redis_client() -> FakeAsyncRedis:
+    return FakeAsyncRedis()
+
+
+async def test_revoked_token_is_stored_compactly(redis_client: FakeAsyncRedis) -> None:
+    """Test revocations store the jti in a bucket expiring after the token."""
+    store = TokenRevocationStore(redis_client)
+    token, payload = _refresh_token()
+
+    await store.revoke_token(token, payload)
+
+    key = f"{REVOKED_KEY_PREFIX}{payload['exp'] // 86400}"
+    assert redis_client.sets[key] == {payload["jti"]}
+    assert len(payload["jti"]) == 12
+    assert redis_client.expire_at[key] > payload["exp"]
+    assert await store.is_token_revoked(token, payload)
+    assert not await store.is_token_revoked(*_refresh_token())
+
+
+async def test_untrusted_filter_checks_redis(redis_client: FakeAsyncRedis) -> None:
+    """Test every check goes to Redis until the filter is in sync."""
+    store = TokenRevocationStore(redis_client)
+
+    assert not store.filter_trusted
+    assert not await store.is_token_revoked(*_refresh_token())
+    assert redis_client.lookups == 1
+
+
+async def test_synced_filter_skips_redis(redis_client: FakeAsyncRedis) -> None:
+    """Test non-revoked tokens are answered locally and revocations reach other nodes."""
+    node_a = TokenRevocationStore(redis_client, sync_interval_seconds=60)
+    node_b = TokenRevocationStore(redis_client, sync_interval_seconds=60)
+    revoked_before, payload_before = _refresh_token()
+    await node_b.revoke_token(revoked_before, payload_before)
+
+    listener = asyncio.create_task(node_a.listen())
+    try:
+        await _wait_until(lambda: node_a.filter_trusted)
+        revoked_after, payload_after = _refresh_token()
+        await node_b.revoke_token(revoked_after, payload_after)
+        await _wait_until(lambda: payload_after["jti"] in node_a._filter)
+
+        lookups = redis_client.lookups
+        for _ in range(20):
+            assert not await node_a.is_token_revoked(*_refresh_token())
+        assert redis_client.lookups - lookups <= 1  # at most one false positive
+
+        assert await node_a.is_token_revoked(revoked_before, payload_before)
+        assert await node_a.is_token_revoked(revoked_after, payload_after)
+    finally:
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+
+    assert not node_a.filter_trusted
+
+
+async def test_overdue_sync_makes_filter_untrusted(redis_client: FakeAsyncRedis) -> None:
+    """Test a filter that missed its syncs is not relied on."""
+    store = TokenRevocationStore(redis_client, sync_interval_seconds=1)
+    await store.sync()
+    store._subscribed = True
+    assert store.filter_trusted
+
+    store._synced_at = time.monotonic() - 10
+
+    assert not store.filter_trusted
+
+
+async def test_legacy_tokens_without_jti(redis_client: FakeAsyncRedis) -> None:
+    """Test tokens issued before jtis are revoked by hash and honor old blacklist keys."""
+    store = TokenRevocationStore(redis_client)
+    token, payload = _refresh_token()
+    del payload["jti"]
+
+    assert token_id(token, payload) != token_id(*_refresh_token())
+    redis_client.strings[f"{LEGACY_KEY_PREFIX}{token}"] = "1"
+    assert await store.is_token_revoked(token, payload)
+
+    other, other_payload = _refresh_token()
+    del other_payload["jti"]
+    await store.revoke_token(other, other_payload)
+    assert await store.is_token_revoked(other, other_payload)
@@ -0,0 +1,217 @@
+"""
+Tests for the rollup-backed user statistics engine.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.services.stats_service import CACHE_SCRIPT, UserStatsService, user_stats
+from tests.fake_redis import FakeAsyncRedis
+
+
+TODAY = date(2026, 10, 19)
+BIOMECHANICS = {
+    "address": {"spine_angle": 30.0},
+    "top_of_backswing": {"spine_angle": 34.0, "shoulder_turn": 90.0, "x_factor": 45.0},
+}
+
+
+class StatsRedis(FakeAsyncRedis):
+    """Runs the logic of the statistics cache script."""
+
+    async def eval(self, script: str, numkeys: int, *args) -> int:
+        assert script == CACHE_SCRIPT
+        key, generation_key, generation, ttl, stats = args
+        if self.strings.get(generation_key, "0") != generation:
+            return 0
+        await self.setex(key, ttl, stats)
+        return 1
+
+
+def analysis(*scores: float) -> dict:
+    return {"swing_phases": [{"phase": "impact", "quality_score": score} for score in scores]}
+
+
+def days_ago(days: int) -> datetime:
+    return datetime(TODAY.year, TODAY.month, TODAY.day, 12, tzinfo=timezone.utc) - timedelta(
+        days=days
+    )
+
+
+@pytest.fixture()
+def stats(db: Session, async_session_factory: async_sessionmaker) -> UserStatsService:
+    return UserStatsService(redis_client=None, session_factory=async_session_factory)
+
+
+async def test_stats_aggregate_recorded_analyses(
+    stats: UserStatsService, async_session_factory: async_sessionmaker, test_user: User
+) -> None:
+    """Test period statistics are computed from the recorded analyses."""
+    await stats.record_analysis(
+        test_user.id, analysis(6.0, 8.0), BIOMECHANICS, ["early_extension"], days_ago(0)
+    )
+    await stats.record_analysis(
+        test_user.id, analysis(8.0), BIOMECHANICS, ["early_extension", "sway"], days_ago(2)
+    )
+    await stats.record_analysis(test_user.id, {}, {}, ["sway"], days_ago(40))
+
+    async with async_session_factory() as db:
+        month = await stats.get_stats(db, test_user.id, "month", TODAY)
+
+    assert month["swings_analyzed"] == 2
+    assert month["average_score"] == 7.5
+    assert month["practice_sessions"] == 2
+    assert month["most_common_issues"][0] == {
+        "issue": "early_extension",
+        "count": 2,
+        "percentage": 100.0,
+    }
+    assert month["biomechanics_avg"]["spine_angle"] == 32.0
+    assert month["biomechanics_avg"]["hip_rotation"] == 0.0
+
+
+async def test_all_time_stats_and_baselines_use_totals(
+    stats: UserStatsService, async_session_factory: async_sessionmaker, test_user: User
+) -> None:
+    """Test all-time statistics and session baselines read the all-time rollup."""
+    for days in (0, 0, 100, 400):
+        await stats.record_analysis(test_user.id, analysis(5.0), BIOMECHANICS, (), days_ago(days))
+
+    async with async_session_factory() as db:
+        all_time = await stats.get_stats(db, test_user.id, "all", TODAY)
+        baselines = await stats.baselines(db, test_user.id)
+
+    assert all_time["swings_analyzed"] == 4
+    assert all_time["practice_sessions"] == 3
+    assert baselines["top_of_backswing.x_factor"] == 45.0
+
+
+@pytest.mark.parametrize(
+    ("earlier", "later", "trend"),
+    [(5.0, 7.0, "improving"), (7.0, 5.0, "regressing"), (6.0, 6.1, "stable")],
+)
+async def test_improvement_trend_compares_period_halves(
+    stats: UserStatsService,
+    async_session_factory: async_sessionmaker,
+    test_user: User,
+    earlier: float,
+    later: float,
+    trend: str,
+) -> None:
+    """Test the trend compares the average score of each half of the period."""
+    await stats.record_analysis(test_user.id, analysis(earlier), {}, (), days_ago(6))
+    await stats.record_analysis(test_user.id, analysis(later), {}, (), days_ago(1))
+
+    async with async_session_factory() as db:
+        week = await stats.get_stats(db, test_user.id, "week", TODAY)
+
+    assert week["improvement_trend"] == trend
+
+
+async def test_cached_stats_invalidated_by_new_analysis(
+    async_session_factory: async_sessionmaker, db: Session, test_user: User
+) -> None:
+    """Test statistics are cached until the user records another analysis."""
+    redis_client = StatsRedis()
+    stats = UserStatsService(redis_client, session_factory=async_session_factory)
+
+    async with async_session_factory() as session:
+        assert (await stats.get_stats(session, test_user.id, "week"))["swings_analyzed"] == 0
+        assert f"stats:{test_user.id}:week" in redis_client.strings
+
+        await stats.record_analysis(test_user.id, analysis(7.0), BIOMECHANICS)
+
+        assert f"stats:{test_user.id}:week" not in redis_client.strings
+        assert (await stats.get_stats(session, test_user.id, "week"))["swings_analyzed"] == 1
+
+
+async def test_stats_computed_before_new_analysis_are_not_cached(
+    async_session_factory: async_sessionmaker, db: Session, test_user: User, monkeypatch
+) -> None:
+    """Test statistics read before an analysis is recorded do not overwrite the invalidation."""
+    redis_client = StatsRedis()
+    stats = UserStatsService(redis_client, session_factory=async_session_factory)
+    compute = stats._compute
+
+    async def compute_then_record(*args):
+        computed = await compute(*args)
+        await stats.record_analysis(test_user.id, analysis(7.0), BIOMECHANICS)
+        return computed
+
+    monkeypatch.setattr(stats, "_compute", compute_then_record)
+    async with async_session_factory() as session:
+        assert (await stats.get_stats(session, test_user.id, "week"))["swings_analyzed"] == 0
+        assert f"stats:{test_user.id}:week" not in redis_client.strings
+
+        monkeypatch.setattr(stats, "_compute", compute)
+        assert (await stats.get_stats(session, test_user.id, "week"))["swings_analyzed"] == 1
+        assert f"stats:{test_user.id}:week" in redis_client.strings
+
+
+async def test_concurrent_misses_compute_once(
+    async_session_factory: async_sessionmaker, db: Session, test_user: User, monkeypatch
+) -> None:
+    """Test concurrent requests for uncached statistics share one computation."""
+    stats = UserStatsService(StatsRedis(), session_factory=async_session_factory)
+    compute = stats._compute
+    computations = []
+
+    async def counted_compute(*args):
+        computations.append(args[2])
+        return await compute(*args)
+
+    monkeypatch.setattr(stats, "_compute", counted_compute)
+
+    async with async_session_factory() as session:
+        results = await asyncio.gather(
+            *(stats.get_stats(session, test_user.id, "month") for _ in range(5))
+        )
+
+    assert computations == ["month"]
+    assert all(result == results[0] for result in results)
+
+
+def test_stats_endpoint_reports_rollups(
+    client: TestClient, test_user: User, auth_headers: dict
+) -> None:
+    """Test the stats endpoint serves the user's recorded analyses."""
+    client.portal.call(
+        user_stats.record_analysis, test_user.id, analysis(9.0), BIOMECHANICS, ["sway"]
+    )
+
+    response = client.get(f"/api/v1/users/{test_user.id}/stats?period=week", headers=auth_headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["swings_analyzed"] == 1
+    assert data["average_score"] == 9.0
+    assert data["most_common_issues"][0]["issue"] == "sway"
+
+
+async def test_shared_computation_has_its_own_session(
+    async_session_factory: async_sessionmaker, db: Session, test_user: User, monkeypatch
+) -> None:
+    """Test a shared computation does not read through the session of the request starting it."""
+    stats = UserStatsService(StatsRedis(), session_factory=async_session_factory)
+    compute = stats._compute
+    sessions = []
+
+    async def tracked_compute(session, *args):
+        sessions.append(session)
+        return await compute(session, *args)
+
+    monkeypatch.setattr(stats, "_compute", tracked_compute)
+
+    async with async_session_factory() as session:
+        month = await stats.get_stats(session, test_user.id, "month")
+
+    assert month["swings_analyzed"] == 0
+    assert len(sessions) == 1 and sessions[0] is not session
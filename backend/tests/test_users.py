@@ -23,6 +23,18 @@ def test_get_current_user(
     assert "profile" in data
 
 
+def test_get_current_user_statement_budget(
+    client: TestClient, test_user: User, auth_headers: dict, max_queries
+) -> None:
+    """Test the current user is loaded in one query, then served from cache."""
+    with max_queries(1):
+        assert client.get("/api/v1/users/me", headers=auth_headers).status_code == 200
+    with max_queries(0):
+        response = client.get("/api/v1/users/me", headers=auth_headers)
+
+    assert response.json()["profile"]["dominant_hand"] == "right"
+
+
 def test_get_current_user_unauthorized(client: TestClient) -> None:
     """Test getting current user without authentication fails."""
     response = client.get("/api/v1/users/me")
@@ -59,6 +71,20 @@ def test_update_user_profile(
     assert "Break 80" in data["profile"]["goals"]
 
 
+def test_update_user_profile_statement_budget(
+    client: TestClient, test_user: User, auth_headers: dict, max_queries
+) -> None:
+    """Test a profile update stays within its statement budget."""
+    update_data = {"handicap": 9.0, "profile": {"primary_miss": "slice"}}
+
+    # Principal, user, UPDATE user, UPDATE profile, reload
+    with max_queries(5):
+        response = client.patch("/api/v1/users/me", json=update_data, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json()["profile"]["primary_miss"] == "slice"
+
+
 def test_update_user_profile_partial(
     client: TestClient, test_user: User, auth_headers: dict
 ) -> None: